@@ -1,10 +1,32 @@
 """
 智能Agent模块
+
+各Agent在第一次访问时才导入（PEP 562），导入 agents.regex_patterns、
+agents.table_fixer 等轻量子模块时不会连带加载全部Agent和API客户端
 """
-from .query_planner import QueryPlannerAgent
-from .information_collector import InformationCollectorAgent
-from .deep_analyst import DeepAnalystAgent
-from .sector_leader_analyzer import SectorLeaderAnalyzer
+import importlib
+
+# 导出名 -> 所在子模块
+_LAZY_EXPORTS = {
+    'QueryPlannerAgent': 'query_planner',
+    'InformationCollectorAgent': 'information_collector',
+    'DeepAnalystAgent': 'deep_analyst',
+    'SectorLeaderAnalyzer': 'sector_leader_analyzer',
+    'get_shared_sector_analyzer': 'sector_leader_analyzer',
+}
+
+__all__ = ['QueryPlannerAgent', 'InformationCollectorAgent', 'DeepAnalystAgent', 'SectorLeaderAnalyzer',
+           'get_shared_sector_analyzer']
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value  # 之后直接命中模块属性
+    return value
 
-__all__ = ['QueryPlannerAgent', 'InformationCollectorAgent', 'DeepAnalystAgent', 'SectorLeaderAnalyzer']
 
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
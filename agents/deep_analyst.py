@@ -7,6 +7,7 @@ from api_clients.qwen_client import QwenClient
 from agents.format_enhancer import FormatEnhancer
 from agents.text_cleaner import TextCleaner
 from config import DEEP_ANALYSIS_MAX_TOKENS
+from progress_bus import EVENT_SECTION_DONE, EVENT_STAGE, emit
 import json
 
 
@@ -690,6 +691,7 @@ Start directly with the opening brace. DO NOT forget table format!"""
             )
             
             print(f"✅ 报告生成完成")
+            emit(EVENT_STAGE, stage="analyzing", progress=70, message="模型输出完成，正在整理章节...")
             
             # 尝试解析JSON格式
             import json
@@ -761,6 +763,9 @@ Start directly with the opening brace. DO NOT forget table format!"""
                             print(f"  ✅ {section_name}: {table_count}个表格")
                         else:
                             print(f"  ⚠️  {section_name}: 仅{table_count}个表格 (要求至少{min_tables}个)")
+                        # 章节整理完成即发布（Web界面在报告保存、PDF生成前先显示章节内容）
+                        emit(EVENT_SECTION_DONE, key=section_key, title=section_name,
+                             content=enhanced_json[section_key], tables=table_count)
                     
                     # 简单组合（专业格式化将在main.py中进行）
                     markdown_report = f"# {company} 估值分析报告\n\n"
@@ -1,10 +1,11 @@
 """
 格式增强器 - 确保报告格式专业统一
 """
-import re
 from bs4 import BeautifulSoup
 from typing import Dict
 
+from agents import regex_patterns as rx
+
 
 class FormatEnhancer:
     """专业格式增强器 - 统一字体、空格、排版"""
@@ -46,9 +47,9 @@ class FormatEnhancer:
         content = content.replace('\r\n', '\n').replace('\r', '\n')
         
         # 2. 清理多余空格
-        content = re.sub(r' +', ' ', content)  # 多个空格变单个
-        content = re.sub(r'\n +', '\n', content)  # 行首空格
-        content = re.sub(r' +\n', '\n', content)  # 行尾空格
+        content = rx.FE_SPACE_RUN.sub(' ', content)  # 多个空格变单个
+        content = rx.FE_LEADING_SPACES.sub('\n', content)  # 行首空格
+        content = rx.FE_TRAILING_SPACES.sub('\n', content)  # 行尾空格
         
         # 3. 规范化标题格式
         content = self._normalize_headings(content)
@@ -63,35 +64,20 @@ class FormatEnhancer:
         content = self._normalize_numbers(content)
         
         # 7. 清理多余空行
-        content = re.sub(r'\n{4,}', '\n\n\n', content)
+        content = rx.FOUR_PLUS_NEWLINES.sub('\n\n\n', content)
         
         return content.strip()
     
     def _normalize_headings(self, content: str) -> str:
         """规范化标题格式"""
         # H2标题 - 确保前后有空行
-        content = re.sub(
-            r'<h2[^>]*>\s*(.*?)\s*</h2>',
-            r'\n\n<h2>\1</h2>\n\n',
-            content,
-            flags=re.IGNORECASE | re.DOTALL
-        )
+        content = rx.FE_HTML_H2.sub(r'\n\n<h2>\1</h2>\n\n', content)
         
         # H3标题 - 确保前后有空行
-        content = re.sub(
-            r'<h3[^>]*>\s*(.*?)\s*</h3>',
-            r'\n\n<h3>\1</h3>\n\n',
-            content,
-            flags=re.IGNORECASE | re.DOTALL
-        )
+        content = rx.FE_HTML_H3.sub(r'\n\n<h3>\1</h3>\n\n', content)
         
         # H4标题 - 确保前后有空行
-        content = re.sub(
-            r'<h4[^>]*>\s*(.*?)\s*</h4>',
-            r'\n\n<h4>\1</h4>\n\n',
-            content,
-            flags=re.IGNORECASE | re.DOTALL
-        )
+        content = rx.FE_HTML_H4.sub(r'\n\n<h4>\1</h4>\n\n', content)
         
         return content
     
@@ -143,42 +129,32 @@ class FormatEnhancer:
                 print(f"⚠️ 表格格式化失败: {e}")
                 return table_html
         
-        content = re.sub(
-            r'<table[^>]*>.*?</table>',
-            format_table,
-            content,
-            flags=re.IGNORECASE | re.DOTALL
-        )
+        content = rx.FE_HTML_TABLE.sub(format_table, content)
         
         return content
     
     def _normalize_paragraphs(self, content: str) -> str:
         """规范化段落格式"""
         # P标签 - 确保前后有适当空行
-        content = re.sub(
-            r'<p[^>]*>\s*(.*?)\s*</p>',
-            r'\n<p>\1</p>\n',
-            content,
-            flags=re.IGNORECASE | re.DOTALL
-        )
+        content = rx.FE_HTML_P.sub(r'\n<p>\1</p>\n', content)
         
         # 强调标签
-        content = re.sub(r'<strong[^>]*>\s*(.*?)\s*</strong>', r'<strong>\1</strong>', content, flags=re.IGNORECASE | re.DOTALL)
-        content = re.sub(r'<em[^>]*>\s*(.*?)\s*</em>', r'<em>\1</em>', content, flags=re.IGNORECASE | re.DOTALL)
-        content = re.sub(r'<b[^>]*>\s*(.*?)\s*</b>', r'<strong>\1</strong>', content, flags=re.IGNORECASE | re.DOTALL)
-        content = re.sub(r'<i[^>]*>\s*(.*?)\s*</i>', r'<em>\1</em>', content, flags=re.IGNORECASE | re.DOTALL)
+        content = rx.FE_HTML_STRONG.sub(r'<strong>\1</strong>', content)
+        content = rx.FE_HTML_EM.sub(r'<em>\1</em>', content)
+        content = rx.FE_HTML_B.sub(r'<strong>\1</strong>', content)
+        content = rx.FE_HTML_I.sub(r'<em>\1</em>', content)
         
         return content
     
     def _normalize_numbers(self, content: str) -> str:
         """规范化数字格式"""
         # 确保货币符号和数字之间没有空格
-        content = re.sub(r'\$\s+(\d)', r'$\1', content)
-        content = re.sub(r'(\d)\s+%', r'\1%', content)
+        content = rx.FE_CURRENCY_SPACE.sub(r'$\1', content)
+        content = rx.FE_PERCENT_SPACE.sub(r'\1%', content)
         
         # 确保百分比和正负号格式
-        content = re.sub(r'\+\s+(\d)', r'+\1', content)
-        content = re.sub(r'-\s+(\d)', r'-\1', content)
+        content = rx.FE_PLUS_SPACE.sub(r'+\1', content)
+        content = rx.FE_MINUS_SPACE.sub(r'-\1', content)
         
         return content
     
@@ -189,6 +165,6 @@ class FormatEnhancer:
         Returns:
             (是否合格, 实际表格数)
         """
-        table_count = len(re.findall(r'<table[^>]*>.*?</table>', content, re.IGNORECASE | re.DOTALL))
+        table_count = len(rx.FE_HTML_TABLE.findall(content))
         return (table_count >= min_tables, table_count)
 
@@ -5,6 +5,7 @@
 from typing import List, Dict
 from api_clients.sonar_client import SonarClient
 from config import MAX_CONCURRENT_SEARCHES
+from progress_bus import EVENT_QUERY_DONE, emit, preview
 
 
 class InformationCollectorAgent:
@@ -50,11 +51,26 @@ class InformationCollectorAgent:
         
         print(f"🔍 开始并行搜索 {len(query_strings)} 个查询...")
         
+        # 每个查询完成时发布进度事件（Web界面逐条显示搜索结果）
+        def on_result(index: int, result: Dict):
+            emit(
+                EVENT_QUERY_DONE,
+                index=index,
+                total=len(queries),
+                query=queries[index]["query"],
+                purpose=queries[index].get("purpose", ""),
+                status=result.get("status"),
+                content=preview(result.get("content")),
+                citations=result.get("citations", [])[:5],
+                error=result.get("error"),
+            )
+        
         # 并行执行所有查询（成本优化：节省时间）
         try:
             results = self.sonar_client.batch_search(
                 query_strings,
-                max_concurrent=MAX_CONCURRENT_SEARCHES
+                max_concurrent=MAX_CONCURRENT_SEARCHES,
+                on_result=on_result
             )
         except Exception as e:
             print(f"❌ 批量搜索异常: {e}")
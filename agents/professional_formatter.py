@@ -3,7 +3,8 @@
 """
 from datetime import datetime
 from typing import Dict
-import re
+
+from agents import regex_patterns as rx
 
 
 class ProfessionalReportFormatter:
@@ -125,7 +126,7 @@ class ProfessionalReportFormatter:
             recommendation = "SELL"
         
         # 尝试提取目标价
-        target_match = re.search(r'\$?(\d+)\s*(?:target|price)', valuation_content, re.IGNORECASE)
+        target_match = rx.PF_TARGET_PRICE.search(valuation_content)
         target_price = f"${target_match.group(1)}" if target_match else "TBD"
         
         summary = f"""## Executive Summary
@@ -205,18 +206,18 @@ class ProfessionalReportFormatter:
             
             return table_title + "\n\n" + table_content
         
-        return re.sub(r'\|[^\n]+\|(?:\n\|[^\n]+\|)+', replace_table, content)
+        return rx.PF_MARKDOWN_TABLE.sub(replace_table, content)
     
     def _clean_html_content(self, content: str) -> str:
         """清理HTML标签"""
         # 移除HTML标签
-        content = re.sub(r'<h2[^>]*>(.*?)</h2>', r'#### \1\n', content, flags=re.DOTALL)
-        content = re.sub(r'<h3[^>]*>(.*?)</h3>', r'##### \1\n', content, flags=re.DOTALL)
-        content = re.sub(r'<p[^>]*>(.*?)</p>', r'\1\n\n', content, flags=re.DOTALL)
-        content = re.sub(r'<[^>]+>', '', content)
+        content = rx.PF_HTML_H2.sub(r'#### \1\n', content)
+        content = rx.PF_HTML_H3.sub(r'##### \1\n', content)
+        content = rx.PF_HTML_P.sub(r'\1\n\n', content)
+        content = rx.HTML_TAG.sub('', content)
         
         # 清理多余空行
-        content = re.sub(r'\n{4,}', '\n\n\n', content)
+        content = rx.FOUR_PLUS_NEWLINES.sub('\n\n\n', content)
         
         return content
     
@@ -294,7 +295,24 @@ This report is based on analysis of real-time data from multiple authoritative s
 
 ## 📚 References and Citations
 
-This report is based on information from the following verified sources:
+"""
+        section += self.format_references(citations)
+        return section
+    
+    def format_references(self, citations: list) -> str:
+        """
+        生成引用来源正文（不含章节标题），Markdown报告和PDF共用
+        
+        Args:
+            citations: 引用来源列表
+            
+        Returns:
+            引用来源正文
+        """
+        if not citations:
+            return ""
+        
+        section = """This report is based on information from the following verified sources:
 
 """
         
@@ -0,0 +1,309 @@
+"""
+正则表达式注册表 - 格式化模块共用的预编译模式
+
+所有热路径上的正则在导入时编译一次并按名称注册，避免依赖 re 模块内部
+有限的缓存（超过512个活跃模式后会频繁失效重编译）。
+
+性能分析：设置环境变量 REGEX_PROFILE=1 后，每个模式都会统计调用次数与耗时，
+进程退出时打印汇总；也可以调用 print_profile() 手动查看。
+"""
+import atexit
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Tuple, Union
+
+
+PROFILE_ENABLED = os.getenv("REGEX_PROFILE", "").lower() in ("1", "true", "yes")
+
+
+class ProfiledPattern:
+    """带调用计数和计时的正则包装器（仅在 REGEX_PROFILE 开启时使用）"""
+
+    __slots__ = ('name', 'compiled', 'calls', 'total_time')
+
+    def __init__(self, name: str, compiled: re.Pattern):
+        self.name = name
+        self.compiled = compiled
+        self.calls = 0
+        self.total_time = 0.0
+
+    @property
+    def pattern(self):
+        return self.compiled.pattern
+
+    @property
+    def flags(self):
+        return self.compiled.flags
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self.calls += 1
+            self.total_time += time.perf_counter() - start
+
+    def search(self, *args, **kwargs):
+        return self._timed(self.compiled.search, *args, **kwargs)
+
+    def match(self, *args, **kwargs):
+        return self._timed(self.compiled.match, *args, **kwargs)
+
+    def fullmatch(self, *args, **kwargs):
+        return self._timed(self.compiled.fullmatch, *args, **kwargs)
+
+    def sub(self, *args, **kwargs):
+        return self._timed(self.compiled.sub, *args, **kwargs)
+
+    def subn(self, *args, **kwargs):
+        return self._timed(self.compiled.subn, *args, **kwargs)
+
+    def split(self, *args, **kwargs):
+        return self._timed(self.compiled.split, *args, **kwargs)
+
+    def findall(self, *args, **kwargs):
+        return self._timed(self.compiled.findall, *args, **kwargs)
+
+    def finditer(self, *args, **kwargs):
+        # finditer是惰性的，这里计时的是完整迭代
+        return iter(self._timed(lambda: list(self.compiled.finditer(*args, **kwargs))))
+
+
+Pattern = Union[re.Pattern, ProfiledPattern]
+
+_REGISTRY: Dict[str, Pattern] = {}
+
+
+def register(name: str, pattern: str, flags: int = 0) -> Pattern:
+    """
+    编译并注册一个命名模式
+
+    同名重复注册时，如果模式一致则返回已有对象，否则抛出 ValueError
+    """
+    existing = _REGISTRY.get(name)
+    if existing is not None:
+        if existing.pattern != pattern or existing.flags != re.compile(pattern, flags).flags:
+            raise ValueError(f"正则名称冲突: {name}")
+        return existing
+
+    compiled = re.compile(pattern, flags)
+    _REGISTRY[name] = ProfiledPattern(name, compiled) if PROFILE_ENABLED else compiled
+    return _REGISTRY[name]
+
+
+def register_group(name: str, rules: Iterable[Tuple[str, str]], flags: int = 0) -> List[Tuple[Pattern, str]]:
+    """批量注册 (模式, 替换文本) 规则，名称为 name[序号]"""
+    return [
+        (register(f"{name}[{idx}]", pattern, flags), replacement)
+        for idx, (pattern, replacement) in enumerate(rules)
+    ]
+
+
+def get(name: str) -> Pattern:
+    """按名称获取已注册的模式"""
+    return _REGISTRY[name]
+
+
+def names() -> List[str]:
+    """所有已注册的模式名称"""
+    return sorted(_REGISTRY)
+
+
+def profile_stats() -> List[Dict]:
+    """
+    各模式的调用统计（按总耗时倒序）
+
+    未开启 REGEX_PROFILE 时返回空列表
+    """
+    stats = [
+        {
+            'name': p.name,
+            'calls': p.calls,
+            'total_ms': p.total_time * 1000,
+            'avg_us': (p.total_time / p.calls * 1e6) if p.calls else 0.0,
+        }
+        for p in _REGISTRY.values()
+        if isinstance(p, ProfiledPattern) and p.calls
+    ]
+    return sorted(stats, key=lambda s: s['total_ms'], reverse=True)
+
+
+def reset_profile():
+    """清零统计数据"""
+    for p in _REGISTRY.values():
+        if isinstance(p, ProfiledPattern):
+            p.calls = 0
+            p.total_time = 0.0
+
+
+def print_profile(top: int = 30):
+    """打印耗时最多的模式"""
+    stats = profile_stats()
+    if not stats:
+        print("ℹ️  没有正则统计数据（设置 REGEX_PROFILE=1 开启）")
+        return
+    total = sum(s['total_ms'] for s in stats)
+    print("="*80)
+    print(f"📈 正则耗时统计（共 {len(stats)} 个模式, {total:.1f} ms）")
+    print("="*80)
+    print(f"{'模式':<48} {'调用':>9} {'总耗时ms':>10} {'平均us':>9}")
+    for s in stats[:top]:
+        print(f"{s['name']:<48} {s['calls']:>9} {s['total_ms']:>10.2f} {s['avg_us']:>9.2f}")
+
+
+if PROFILE_ENABLED:
+    atexit.register(print_profile)
+
+
+# ---------------------------------------------------------------------------
+# 通用
+# ---------------------------------------------------------------------------
+MD_BOLD_STARS = register('common.md_bold_stars', r'\*\*([^*]+)\*\*')
+MD_BOLD_UNDERSCORES = register('common.md_bold_underscores', r'__([^_]+)__')
+MD_ITALIC_STAR = register('common.md_italic_star', r'\*([^*]+)\*')
+MD_ITALIC_UNDERSCORE = register('common.md_italic_underscore', r'_([^_]+)_')
+MD_STRIKETHROUGH = register('common.md_strikethrough', r'~~([^~]+)~~')
+MULTI_BLANK_LINES = register('common.multi_blank_lines', r'\n\s*\n\s*\n+')
+FOUR_PLUS_NEWLINES = register('common.four_plus_newlines', r'\n{4,}')
+HTML_TAG = register('common.html_tag', r'<[^>]+>')
+CJK_CHAR = register('common.cjk_char', r'[\u4e00-\u9fff]')
+
+# ---------------------------------------------------------------------------
+# agents/table_fixer.py
+# ---------------------------------------------------------------------------
+TF_DIGIT = register('table_fixer.digit', r'\d')
+TF_UPPERCASE_CLUSTER = register('table_fixer.uppercase_cluster', r'[A-Z][a-z]+[A-Z][a-z]+')
+TF_MONEY_PERCENT = register('table_fixer.money_percent', r'[$%][\d.]+[BMK]?')
+TF_PERCENT_CHANGE = register('table_fixer.percent_change', r'[+\-]\d+\.?\d*%')
+TF_NUMBER_UNIT = register('table_fixer.number_unit', r'\d+\.?\d*[%$BMK]')
+TF_HEADER_LINE = register('table_fixer.header_line', r'^[A-Z][a-z]+[A-Z]')
+TF_HEADER_WORDS = register('table_fixer.header_words', r'[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*')
+TF_CAMEL_BOUNDARY = register('table_fixer.camel_boundary', r'([a-z])([A-Z])')
+TF_DATA_ROW = register('table_fixer.data_row', r'^([A-Za-z\s,&]+?)([\$\d%+\-].*)')
+TF_DATA_VALUES = register('table_fixer.data_values', r'[\$]?[\d.]+[BMK]?%?|[+\-]\d+\.?\d*%')
+
+# ---------------------------------------------------------------------------
+# report_enhancer.py
+# ---------------------------------------------------------------------------
+RE_BROKEN_TABLE_LINE = [
+    register('report_enhancer.broken.word_upper_number', r'^[A-Z][a-z]+[A-Z][\d.]+'),
+    register('report_enhancer.broken.label_two_amounts', r'^[A-Z][a-z]+\$[\d.]+[BMK]\$[\d.]+[BMK]'),
+    register('report_enhancer.broken.ratio_value', r'^RatioValue'),
+    register('report_enhancer.broken.ratio_upper', r'^Ratio[A-Z]+[\d.–~<>]'),
+    register('report_enhancer.broken.segment', r'^Segment[A-Z][a-z]+[\d%]'),
+    register('report_enhancer.broken.metric_fy', r'^Metric.*FY\d{4}.*[\d.%]'),
+    register('report_enhancer.broken.metric_q', r'^MetricQ\d'),
+]
+RE_FINANCIAL_TABLE_HEADER = register('report_enhancer.financial_header', r'Metric.*FY.*YoY|Metric.*Q\d', re.IGNORECASE)
+RE_VALUATION_TABLE_HEADER = register(
+    'report_enhancer.valuation_header',
+    r'Ratio.*Value.*Industry|Ratio.*NVIDIA.*Sector|Ratio.*Interpretation',
+    re.IGNORECASE
+)
+RE_MARKET_SHARE_HEADER = register('report_enhancer.market_share_header', r'Segment.*Market.*Share|Products', re.IGNORECASE)
+RE_FINANCIAL_ROW = register(
+    'report_enhancer.financial_row',
+    r'([A-Za-z\s\(\)]+?)\s*\(?\$?([B\d.~]+)\)?\s*([B\d.*~]+)\s*([B\d.~]+)\s*([+\-\d%~]+)'
+)
+RE_MARKET_SHARE_SPLIT = register('report_enhancer.market_share_split', r'(\d+[–\-]\d+%|\d+%|>?\d+%|Emerging\s+Leader)')
+RE_CAPITALIZED_WORD = register('report_enhancer.capitalized_word', r'[A-Z][a-z]+')
+RE_CONDENSED_PARTS = register('report_enhancer.condensed_parts', r'([A-Za-z ]+)(\$?[\d.]+[BMK%]?)')
+RE_NUMERIC_CELL = register('report_enhancer.numeric_cell', r'[\d.]+[%BMK]?|\$[\d.]+')
+RE_FIRST_NUMBER = register('report_enhancer.first_number', r'(\d+\.?\d*)')
+
+_FINANCIAL_METRICS = ['Revenue', 'Net Income', 'Gross Margin', 'Operating Margin', 'EBITDA', 'EPS']
+RE_FINANCIAL_METRIC_ROWS = {
+    metric: register(
+        f'report_enhancer.metric_row.{metric}',
+        rf'{metric}\s*([\d.]+%?)\s*([\d.]+%?|Not\s+disclosed)\s*([+\-]?[\d.]+%|Not\s+disclosed|Stable[^A-Z]*)'
+        if 'Margin' in metric else
+        rf'{metric}\s*\$?([\d.]+[BMK]?)\s*\$?([\d.]+[BMK]?)\s*([+\-]?[\d.]+%|Not\s+disclosed)',
+        re.IGNORECASE
+    )
+    for metric in _FINANCIAL_METRICS
+}
+RE_VALUATION_RATIO_ROWS = [
+    (ratio_name, register(
+        f'report_enhancer.ratio_row.{ratio_name}',
+        rf'{ratio_pattern}\s*([~\d.%\(\)a-z\s]+?)\s*([~\d.%<>]+)\s*([A-Z][^~\d]*?)(?=[A-Z][a-z]+\s+[~\d]|$)'
+    ))
+    for ratio_name, ratio_pattern in [
+        ('Gross Margin', r'(Gross\s+Margin)'),
+        ('Net Margin', r'(Net\s+Margin)'),
+        ('ROE', r'(ROE)'),
+        ('Operating Margin', r'(Operating\s+Margin)'),
+        ('ROIC', r'(ROIC)'),
+    ]
+]
+RE_SECTOR_RATIO_ROWS = [
+    (ratio_name, register(
+        f'report_enhancer.sector_ratio_row.{ratio_name}',
+        rf'{ratio_pattern}\s*([\d.–~<>]+)\s*([\d.–~<>]+)\s*([+\-~][\d.%x]+)'
+    ))
+    for ratio_name, ratio_pattern in [
+        ('P/E (TTM)', r'P/E\s*\(TTM\)'),
+        ('P/S (TTM)', r'P/S\s*\(TTM\)'),
+        ('P/B', r'P/B(?!\w)'),
+        ('EV/EBITDA', r'EV/EBITDA'),
+        ('Forward P/E', r'Forward\s*P/E'),
+    ]
+]
+
+# ---------------------------------------------------------------------------
+# pdf_generator.py
+# ---------------------------------------------------------------------------
+PDF_HK_TICKER = register('pdf.hk_ticker', r'^\d{4,5}\.(hk|HK)$', re.IGNORECASE)
+PDF_CN_TICKER = register('pdf.cn_ticker', r'^\d{6}\.(sh|sz|SH|SZ)$', re.IGNORECASE)
+PDF_NAME_WITH_TICKER = register('pdf.name_with_ticker', r'(.+?)\s*\(([^)]+)\)')
+PDF_CJK_PARENTHETICAL = register('pdf.cjk_parenthetical', r'\s*\([^)]*[\u4e00-\u9fff][^)]*\)')
+PDF_CJK_RUN = register('pdf.cjk_run', r'[\u4e00-\u9fff]+')
+PDF_DUPLICATE_SECTION_NUM = register('pdf.duplicate_section_num', r'(\d+\.\d+)\s+\1\s*')
+PDF_REPEATED_SECTION_NUM = register('pdf.repeated_section_num', r'(\d+\.\d+)(\s+\1)+')
+PDF_WHITESPACE_RUN = register('pdf.whitespace_run', r'\s+')
+PDF_HEADING_PREFIX = register('pdf.heading_prefix', r'^#+\s*')
+PDF_SUBSECTION_TITLE = register('pdf.subsection_title', r'^(\d+\.\d+)\s+(.+)$')
+PDF_HEADING_MARKERS = register('pdf.heading_markers', r'^#+\s+', re.MULTILINE)
+PDF_MULTI_SPACE = register('pdf.multi_space', r'\s{2,}')
+PDF_REFERENCE_NUMBER = register('pdf.reference_number', r'^\[\d+\]')
+PDF_MARKUP_TAG = register('pdf.markup_tag', r'<[^>]+>')
+# 短数值单元格（$44.6B、+13.5%、12.3x、(1,234)），可以用纯字符串代替Paragraph
+PDF_NUMERIC_CELL = register(
+    'pdf.numeric_cell',
+    r'^[~+\-]?\(?[$€£¥]?[+\-]?\d[\d,]*(?:\.\d+)?(?:%|x|[BMKT]|bn|mn)?\)?$',
+    re.IGNORECASE
+)
+
+# ---------------------------------------------------------------------------
+# agents/professional_formatter.py
+# ---------------------------------------------------------------------------
+PF_TARGET_PRICE = register('professional_formatter.target_price', r'\$?(\d+)\s*(?:target|price)', re.IGNORECASE)
+PF_MARKDOWN_TABLE = register('professional_formatter.markdown_table', r'\|[^\n]+\|(?:\n\|[^\n]+\|)+')
+PF_HTML_H2 = register('professional_formatter.html_h2', r'<h2[^>]*>(.*?)</h2>', re.DOTALL)
+PF_HTML_H3 = register('professional_formatter.html_h3', r'<h3[^>]*>(.*?)</h3>', re.DOTALL)
+PF_HTML_P = register('professional_formatter.html_p', r'<p[^>]*>(.*?)</p>', re.DOTALL)
+
+# ---------------------------------------------------------------------------
+# agents/format_enhancer.py
+# ---------------------------------------------------------------------------
+FE_SPACE_RUN = register('format_enhancer.space_run', r' +')
+FE_LEADING_SPACES = register('format_enhancer.leading_spaces', r'\n +')
+FE_TRAILING_SPACES = register('format_enhancer.trailing_spaces', r' +\n')
+FE_HTML_H2 = register('format_enhancer.html_h2', r'<h2[^>]*>\s*(.*?)\s*</h2>', re.IGNORECASE | re.DOTALL)
+FE_HTML_H3 = register('format_enhancer.html_h3', r'<h3[^>]*>\s*(.*?)\s*</h3>', re.IGNORECASE | re.DOTALL)
+FE_HTML_H4 = register('format_enhancer.html_h4', r'<h4[^>]*>\s*(.*?)\s*</h4>', re.IGNORECASE | re.DOTALL)
+FE_HTML_TABLE = register('format_enhancer.html_table', r'<table[^>]*>.*?</table>', re.IGNORECASE | re.DOTALL)
+FE_HTML_P = register('format_enhancer.html_p', r'<p[^>]*>\s*(.*?)\s*</p>', re.IGNORECASE | re.DOTALL)
+FE_HTML_STRONG = register('format_enhancer.html_strong', r'<strong[^>]*>\s*(.*?)\s*</strong>', re.IGNORECASE | re.DOTALL)
+FE_HTML_EM = register('format_enhancer.html_em', r'<em[^>]*>\s*(.*?)\s*</em>', re.IGNORECASE | re.DOTALL)
+FE_HTML_B = register('format_enhancer.html_b', r'<b[^>]*>\s*(.*?)\s*</b>', re.IGNORECASE | re.DOTALL)
+FE_HTML_I = register('format_enhancer.html_i', r'<i[^>]*>\s*(.*?)\s*</i>', re.IGNORECASE | re.DOTALL)
+FE_CURRENCY_SPACE = register('format_enhancer.currency_space', r'\$\s+(\d)')
+FE_PERCENT_SPACE = register('format_enhancer.percent_space', r'(\d)\s+%')
+FE_PLUS_SPACE = register('format_enhancer.plus_space', r'\+\s+(\d)')
+FE_MINUS_SPACE = register('format_enhancer.minus_space', r'-\s+(\d)')
+
+# ---------------------------------------------------------------------------
+# agents/word_fixer.py
+# ---------------------------------------------------------------------------
+WF_DOUBLE_SPACE = register('word_fixer.double_space', r' {2,}')
@@ -1,8 +1,10 @@
 """
 行业龙头分析Agent - 筛选各市场行业龙头并分析热点
 """
+import threading
 from typing import Dict, List, Optional
-from api_clients import SonarClient, QwenClient
+from api_clients import get_shared_qwen_client, get_shared_sonar_client
+from progress_bus import EVENT_PARTIAL, EVENT_QUERY_DONE, EVENT_STAGE, emit, preview
 
 
 class SectorLeaderAnalyzer:
@@ -14,9 +16,14 @@ class SectorLeaderAnalyzer:
     3. 提供龙头公司基本信息
     """
     
-    def __init__(self):
-        self.sonar_client = SonarClient()
-        self.qwen_client = QwenClient()
+    def __init__(self, sonar_client=None, qwen_client=None):
+        """
+        Args:
+            sonar_client: Sonar客户端，默认使用进程内共享的客户端（与报告系统共用限速、缓存和连接池）
+            qwen_client: Qwen客户端，默认同上
+        """
+        self.sonar_client = sonar_client or get_shared_sonar_client()
+        self.qwen_client = qwen_client or get_shared_qwen_client()
         
         # 定义主要行业板块（通用）
         self.sectors = {
@@ -87,12 +94,19 @@ class SectorLeaderAnalyzer:
             f"US stock sectors leaders gainers {date}"
         ]
         
-        # 并行搜索
+        # 并行搜索（每个查询完成时发布事件，Web界面逐条显示）
+        emit(EVENT_STAGE, stage="collecting", progress=10, message=f"搜索 {len(queries)} 个市场数据源...")
+        
+        def on_result(index: int, result: Dict):
+            emit(EVENT_QUERY_DONE, index=index, total=len(queries), query=queries[index], purpose="",
+                 status=result.get("status"), content=preview(result.get("content")),
+                 citations=result.get("citations", [])[:5], error=result.get("error"))
+        
         import asyncio
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         search_results = loop.run_until_complete(
-            self.sonar_client.batch_search_async(queries)
+            self.sonar_client.batch_search_async(queries, on_result=on_result)
         )
         loop.close()
         
@@ -104,7 +118,10 @@ class SectorLeaderAnalyzer:
         ])
         
         # 使用Qwen分析热点
+        emit(EVENT_STAGE, stage="analyzing", progress=40, message="AI分析热点行业...")
         analysis = self._analyze_hotspots_with_ai(market_data)
+        if analysis.get("status") == "success":
+            emit(EVENT_PARTIAL, name="hotspots", data=analysis)
         
         return analysis
     
@@ -423,8 +440,9 @@ START YOUR RESPONSE WITH [ and END WITH ]"""
         top_sectors = hotspots.get("top_sectors", [])[:3]  # 只分析前3个热点
         
         sector_leaders = {}
-        for sector_info in top_sectors:
+        for i, sector_info in enumerate(top_sectors):
             sector_name = sector_info.get("sector", "")
+            emit(EVENT_STAGE, stage="leaders", progress=50 + i * 15, message=f"查找 {sector_name} 行业龙头...")
             market = sector_info.get("market", "")
             
             # 确定要查询的市场
@@ -439,6 +457,7 @@ START YOUR RESPONSE WITH [ and END WITH ]"""
             
             leaders = self.find_sector_leaders(sector_name, markets)
             sector_leaders[sector_name] = leaders
+            emit(EVENT_PARTIAL, name="sector_leaders", sector=sector_name, data=leaders)
         
         # 第3步：生成Markdown报告
         report = self._format_report(hotspots, sector_leaders)
@@ -549,6 +568,46 @@ START YOUR RESPONSE WITH [ and END WITH ]"""
 """
         
         return report
+    
+    def save_report(self, result: Dict) -> str:
+        """
+        保存完整热点报告
+        
+        与估值报告相同：先写入暂存目录，在报告写入器的事务中原子发布到 reports/，
+        发布之后登记报告目录和全文索引，历史报告页面和全文检索立即可见
+        
+        Args:
+            result: generate_hotspot_report() 的结果
+        
+        Returns:
+            报告路径（reports/sector_hotspot_YYYYMMDD_HHMMSS.md）
+        """
+        from storage import get_default_catalog, get_default_search_index, get_default_writer
+        
+        with get_default_writer().begin("sector_hotspot") as txn:
+            filename = txn.write_text(f"{txn.stem}.md", result["report"])
+        try:
+            get_default_catalog().record(filename)
+        except Exception as e:
+            print(f"⚠️  报告目录登记跳过: {e}")
+        try:
+            get_default_search_index().index_report(filename)
+        except Exception as e:
+            print(f"⚠️  全文索引跳过: {e}")
+        return filename
+
+
+_shared_analyzer: Optional[SectorLeaderAnalyzer] = None
+_shared_analyzer_lock = threading.Lock()
+
+
+def get_shared_sector_analyzer() -> SectorLeaderAnalyzer:
+    """进程内共享的行业龙头分析器（Web界面各会话和后台工作线程共用）"""
+    global _shared_analyzer
+    with _shared_analyzer_lock:
+        if _shared_analyzer is None:
+            _shared_analyzer = SectorLeaderAnalyzer()
+        return _shared_analyzer
 
 
 def main():
@@ -564,14 +623,7 @@ def main():
         print("="*80)
         
         # 保存报告
-        from datetime import datetime
-        filename = f"reports/sector_hotspot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-        
-        import os
-        os.makedirs("reports", exist_ok=True)
-        
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(result["report"])
+        filename = analyzer.save_report(result)
         
         print(f"\n📄 报告已保存: {filename}")
         
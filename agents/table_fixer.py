@@ -2,8 +2,15 @@
 表格格式自动修复器
 处理Qwen生成的各种错误表格格式
 """
-import re
 from typing import List
+from agents import regex_patterns as rx
+
+
+# 紧凑表格判定阈值（特征得分之和）
+COMPACT_TABLE_THRESHOLD = 3
+
+# 常见句子词汇：超长行中出现这些词通常是正文而不是表格
+COMMON_SENTENCE_WORDS = ('the', 'is', 'are', 'was', 'were', 'will', 'has', 'have')
 
 
 class TableFixer:
@@ -19,6 +26,8 @@ class TableFixer:
         3. 不一致的列数
         """
         lines = content.split('\n')
+        # 每行只检测一次（表格结束行不再被内外两层循环重复检测）
+        compact_flags = [self._is_compact_table_line(line) for line in lines]
         fixed_lines = []
         i = 0
         
@@ -26,11 +35,11 @@ class TableFixer:
             line = lines[i]
             
             # 检测紧凑表格（没有|分隔符的表格）
-            if self._is_compact_table_line(line):
+            if compact_flags[i]:
                 # 收集整个表格
                 table_lines = [line]
                 i += 1
-                while i < len(lines) and self._is_compact_table_line(lines[i]):
+                while i < len(lines) and compact_flags[i]:
                     table_lines.append(lines[i])
                     i += 1
                 
@@ -66,36 +75,64 @@ class TableFixer:
         if line.startswith('|') and line.endswith('|'):
             return False
         
-        # 检测特征
-        indicators = 0
+        return self._scan_compact_indicators(line) >= COMPACT_TABLE_THRESHOLD
+    
+    @staticmethod
+    def _scan_compact_indicators(line: str) -> int:
+        """
+        单遍计算紧凑表格特征得分
         
-        # 1. 包含多个大写单词连在一起（如：RevenueGrowthMargin）
-        uppercase_clusters = len(re.findall(r'[A-Z][a-z]+[A-Z][a-z]+', line))
-        if uppercase_clusters >= 2:
-            indicators += 2
+        先用字符计数（str.count）算出每项特征可能的最高得分，普通段落在这一步
+        就会被排除，不做任何正则匹配；剩下的行按得分从高到低逐项计算，每个正则
+        最多扫描一次，且得分达到阈值或已不可能达到阈值时立即返回。
+        返回值只保证与阈值的比较结果和逐项完整计算一致。
         
-        # 2. 包含多个货币/百分比值
-        money_percent = len(re.findall(r'[$%][\d.]+[BMK]?', line))
-        if money_percent >= 2:
-            indicators += 2
+        特征及得分：
+        1. 多个大写单词连在一起（如：RevenueGrowthMargin）≥2处: +2
+        2. 多个货币/百分比值 ≥2个: +2
+        3. 多个百分比变化（如：+13.5%）≥2个: +1
+        4. 超过100字符且没有常见句子词汇: +1
+        5. 连续的数字+单位模式 ≥3个: +1
+        """
+        # 4. 非常长的行且没有常见句子词汇（纯字符串操作）
+        score = 0
+        if len(line) > 100:
+            lowered = line.lower()
+            if not any(word in lowered for word in COMMON_SENTENCE_WORDS):
+                score += 1
         
-        # 3. 包含多个百分比变化（如：+13.5%）
-        changes = len(re.findall(r'[+\-]\d+\.?\d*%', line))
-        if changes >= 2:
-            indicators += 1
+        # 廉价上限：每个匹配至少包含一个对应字符
+        has_digit = rx.TF_DIGIT.search(line) is not None
+        percent = line.count('%')
+        dollar = line.count('$')
+        money_possible = has_digit and percent + dollar >= 2
+        changes_possible = has_digit and percent >= 2 and line.count('+') + line.count('-') >= 2
+        units_possible = has_digit and (
+            percent + dollar + line.count('B') + line.count('M') + line.count('K') >= 3
+        )
         
-        # 4. 非常长的行（超过100字符）且没有常见句子词汇
-        if len(line) > 100:
-            common_words = ['the', 'is', 'are', 'was', 'were', 'will', 'has', 'have']
-            if not any(word in line.lower() for word in common_words):
-                indicators += 1
+        # (得分, 最少匹配数, 正则)，按得分从高到低排列；大写单词簇没有廉价上限
+        checks = [(2, 2, rx.TF_UPPERCASE_CLUSTER)]
+        if money_possible:
+            checks.append((2, 2, rx.TF_MONEY_PERCENT))
+        if changes_possible:
+            checks.append((1, 2, rx.TF_PERCENT_CHANGE))
+        if units_possible:
+            checks.append((1, 3, rx.TF_NUMBER_UNIT))
         
-        # 5. 包含多个连续的数字+单位模式
-        number_patterns = len(re.findall(r'\d+\.?\d*[%$BMK]', line))
-        if number_patterns >= 3:
-            indicators += 1
+        remaining = sum(points for points, _, _ in checks)
+        for points, min_count, pattern in checks:
+            if score >= COMPACT_TABLE_THRESHOLD or score + remaining < COMPACT_TABLE_THRESHOLD:
+                break
+            remaining -= points
+            count = 0
+            for _ in pattern.finditer(line):
+                count += 1
+                if count >= min_count:
+                    score += points
+                    break
         
-        return indicators >= 3
+        return score
     
     def _fix_compact_table(self, lines: List[str]) -> List[str]:
         """
@@ -138,15 +175,15 @@ class TableFixer:
             # 模式1：列标题（大写单词连续）+ 数据
             
             # 检测是否是第一行（标题行）
-            if re.match(r'^[A-Z][a-z]+[A-Z]', line):
+            if rx.TF_HEADER_LINE.match(line):
                 # 提取标题
-                headers = re.findall(r'[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*', line)
+                headers = rx.TF_HEADER_WORDS.findall(line)
                 if headers:
                     # 清理标题，分离粘连的词
                     clean_headers = []
                     for h in headers:
                         # 分离CamelCase
-                        h = re.sub(r'([a-z])([A-Z])', r'\1 \2', h)
+                        h = rx.TF_CAMEL_BOUNDARY.sub(r'\1 \2', h)
                         clean_headers.append(h)
                     
                     # 只取前4-6个合理的标题
@@ -166,13 +203,13 @@ class TableFixer:
             
             # 数据行：提取数值
             # 模式：Name + 一系列数字/百分比/货币值
-            match = re.match(r'^([A-Za-z\s,&]+?)([\$\d%+\-].*)', line)
+            match = rx.TF_DATA_ROW.match(line)
             if match:
                 name = match.group(1).strip()
                 data_str = match.group(2)
                 
                 # 提取所有数据值
-                values = re.findall(r'[\$]?[\d.]+[BMK]?%?|[+\-]\d+\.?\d*%', data_str)
+                values = rx.TF_DATA_VALUES.findall(data_str)
                 
                 if values:
                     row = f'| {name} | ' + ' | '.join(values) + ' |'
@@ -210,12 +247,17 @@ class TableFixer:
         cleaned_parts = []
         
         for part in parts:
+            # 没有格式标记字符的单元格直接跳过（绝大多数单元格）
+            if '*' not in part and '_' not in part and '~' not in part:
+                cleaned_parts.append(part)
+                continue
+            
             # 移除格式标记，但保留内容
-            part = re.sub(r'\*\*([^*]+)\*\*', r'\1', part)  # **bold**
-            part = re.sub(r'\*([^*]+)\*', r'\1', part)      # *italic*
-            part = re.sub(r'~~([^~]+)~~', r'\1', part)      # ~~strike~~
-            part = re.sub(r'__([^_]+)__', r'\1', part)      # __bold__
-            part = re.sub(r'_([^_]+)_', r'\1', part)        # _italic_
+            part = rx.MD_BOLD_STARS.sub(r'\1', part)           # **bold**
+            part = rx.MD_ITALIC_STAR.sub(r'\1', part)          # *italic*
+            part = rx.MD_STRIKETHROUGH.sub(r'\1', part)        # ~~strike~~
+            part = rx.MD_BOLD_UNDERSCORES.sub(r'\1', part)     # __bold__
+            part = rx.MD_ITALIC_UNDERSCORE.sub(r'\1', part)    # _italic_
             
             cleaned_parts.append(part)
         
@@ -3,7 +3,9 @@
 这是一个全新的、更直接的方法，不依赖复杂的正则表达式
 """
 import re
-from typing import Dict
+from typing import Dict, List, Tuple
+
+from agents import regex_patterns as rx
 
 
 class WordFixer:
@@ -90,19 +92,11 @@ class WordFixer:
         if not text:
             return text
         
-        # 按长度排序（长单词优先，避免部分匹配）
-        sorted_words = sorted(
-            WordFixer.SPLIT_WORDS_DICT.items(),
-            key=lambda x: len(x[0]),
-            reverse=True
-        )
-        
-        # 逐个替换
-        for split_word, correct_word in sorted_words:
+        # 逐个替换（已按长度排序，长单词优先，避免部分匹配）
+        for split_word, pattern, correct_word in _SPLIT_WORD_RULES:
             # 使用单词边界确保精确匹配
             # 但也要处理在句子中间的情况
-            pattern = r'\b' + re.escape(split_word) + r'\b'
-            text = re.sub(pattern, correct_word, text, flags=re.IGNORECASE)
+            text = pattern.sub(correct_word, text)
             
             # 也处理不在单词边界的情况（如 "R are earth"）
             text = text.replace(split_word, correct_word)
@@ -120,16 +114,31 @@ class WordFixer:
             return text
         
         # 先移除markdown标记
-        text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)
-        text = re.sub(r'__([^_]+)__', r'\1', text)
+        text = rx.MD_BOLD_STARS.sub(r'\1', text)
+        text = rx.MD_BOLD_UNDERSCORES.sub(r'\1', text)
         text = text.replace('*', '').replace('_', '')
         
         # 修复被拆分的单词
         text = WordFixer.fix_split_words(text)
         
         # 规范化空格
-        text = re.sub(r' {2,}', ' ', text)
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
+        text = rx.WF_DOUBLE_SPACE.sub(' ', text)
+        text = rx.MULTI_BLANK_LINES.sub('\n\n', text)
         
         return text.strip()
 
+
+
+# 按长度排序（长单词优先），模式在模块加载时预编译一次
+_SORTED_SPLIT_WORDS = sorted(WordFixer.SPLIT_WORDS_DICT.items(), key=lambda x: len(x[0]), reverse=True)
+_SPLIT_WORD_RULES: List[Tuple[str, rx.Pattern, str]] = [
+    (split_word, pattern, correct_word)
+    for (split_word, _), (pattern, correct_word) in zip(
+        _SORTED_SPLIT_WORDS,
+        rx.register_group(
+            'word_fixer.split_words',
+            [(r'\b' + re.escape(split_word) + r'\b', correct_word) for split_word, correct_word in _SORTED_SPLIT_WORDS],
+            re.IGNORECASE
+        )
+    )
+]
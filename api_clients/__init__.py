@@ -1,16 +1,39 @@
 """
 API客户端模块
+
+客户端在第一次访问时才导入（PEP 562）
 """
-from .sonar_client import SonarClient
-from .qwen_client import QwenClient
+import importlib
+
+__all__ = ['SonarClient', 'QwenClient', 'get_shared_sonar_client', 'get_shared_qwen_client']
+
+# 进程内共享的客户端（带限速、缓存和连接池），见 shared.py
+_SHARED_NAMES = ('get_shared_sonar_client', 'get_shared_qwen_client')
+
+
+def _load_qwen_client():
+    # 尝试导入增强版，如果失败则使用标准版
+    try:
+        from .qwen_client_enhanced import QwenClientEnhanced
+        # 使用增强版作为默认
+        return QwenClientEnhanced
+    except:
+        from .qwen_client import QwenClient
+        return QwenClient
+
 
-# 尝试导入增强版，如果失败则使用标准版
-try:
-    from .qwen_client_enhanced import QwenClientEnhanced
-    # 使用增强版作为默认
-    QwenClient = QwenClientEnhanced
-except:
-    pass
+def __getattr__(name):
+    if name == 'SonarClient':
+        value = importlib.import_module('.sonar_client', __name__).SonarClient
+    elif name == 'QwenClient':
+        value = _load_qwen_client()
+    elif name in _SHARED_NAMES:
+        value = getattr(importlib.import_module('.shared', __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # 之后直接命中模块属性
+    return value
 
-__all__ = ['SonarClient', 'QwenClient']
 
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
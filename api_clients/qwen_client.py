@@ -14,10 +14,20 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 class QwenClient:
     """Qwen3Max API客户端，用于深度推理和分析"""
     
-    def __init__(self, api_key: str = QWEN_API_KEY):
+    def __init__(self, api_key: str = QWEN_API_KEY, rate_limiter=None, cache=None, session=None):
+        """
+        Args:
+            api_key: API密钥
+            rate_limiter: 限速器（api_clients.shared.RateLimiter），多个客户端可共用
+            cache: 响应缓存（api_clients.shared.ResponseCache），只缓存成功的结果
+            session: 复用连接的 requests.Session，默认每次请求单独连接
+        """
         self.api_key = api_key
         self.api_url = QWEN_API_URL
         self.model = QWEN_MODEL
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.http = session or requests
         
     def _get_headers(self) -> Dict[str, str]:
         """获取API请求头"""
@@ -60,8 +70,16 @@ class QwenClient:
         # 16000 tokens大约需要10-15分钟，设置更长的超时时间
         timeout_seconds = max(600, int(max_tokens / 20))  # 至少10分钟，或根据tokens计算
         
+        cache_key = self.cache.make_key('qwen', payload) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
-            response = requests.post(
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            response = self.http.post(
                 self.api_url,
                 headers=self._get_headers(),
                 json=payload,
@@ -71,11 +89,14 @@ class QwenClient:
             
             if response.status_code == 200:
                 result = response.json()
-                return {
+                reply = {
                     "content": result["choices"][0]["message"]["content"],
                     "status": "success",
                     "usage": result.get("usage", {})
                 }
+                if cache_key:
+                    self.cache.put(cache_key, reply)
+                return reply
             else:
                 # 解析错误信息，提供更友好的提示
                 error_info = {
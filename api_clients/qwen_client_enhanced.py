@@ -15,12 +15,22 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 class QwenClientEnhanced:
     """增强版Qwen3Max API客户端，带重试机制"""
     
-    def __init__(self, api_key: str = QWEN_API_KEY):
+    def __init__(self, api_key: str = QWEN_API_KEY, rate_limiter=None, cache=None, session=None):
+        """
+        Args:
+            api_key: API密钥
+            rate_limiter: 限速器（api_clients.shared.RateLimiter），多个客户端可共用
+            cache: 响应缓存（api_clients.shared.ResponseCache），只缓存成功的结果
+            session: 复用连接的 requests.Session，默认每次请求单独连接
+        """
         self.api_key = api_key
         self.api_url = QWEN_API_URL
         self.model = QWEN_MODEL
         self.timeout = API_TIMEOUT
         self.max_retries = MAX_RETRIES
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.http = session or requests
         
     def _get_headers(self) -> Dict[str, str]:
         """获取API请求头"""
@@ -59,6 +69,13 @@ class QwenClientEnhanced:
             "stream": False  # 禁用流式响应以提高稳定性
         }
         
+        cache_key = self.cache.make_key('qwen', payload) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print(f"✅ 命中Qwen响应缓存")
+                return cached
+        
         last_error = None
         
         for attempt in range(self.max_retries):
@@ -70,7 +87,9 @@ class QwenClientEnhanced:
                 
                 print(f"🔄 正在调用Qwen API (尝试 {attempt + 1}/{self.max_retries})...")
                 
-                response = requests.post(
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                response = self.http.post(
                     self.api_url,
                     headers=self._get_headers(),
                     json=payload,
@@ -81,11 +100,14 @@ class QwenClientEnhanced:
                 if response.status_code == 200:
                     result = response.json()
                     print(f"✅ API调用成功")
-                    return {
+                    reply = {
                         "content": result["choices"][0]["message"]["content"],
                         "status": "success",
                         "usage": result.get("usage", {})
                     }
+                    if cache_key:
+                        self.cache.put(cache_key, reply)
+                    return reply
                 elif response.status_code == 429:  # 速率限制
                     print(f"⚠️ API速率限制，等待后重试...")
                     time.sleep(5)
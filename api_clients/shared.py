@@ -0,0 +1,186 @@
+"""
+进程内共享的API资源
+
+Web界面的每个浏览器会话、每个后台工作线程不再各自创建Sonar/Qwen客户端，
+而是共用这里的一组客户端：
+- RateLimiter: 令牌桶限速，所有会话合计不超过服务商的每分钟请求数
+- ResponseCache: 有过期时间的LRU响应缓存（ENABLE_CACHE / CACHE_EXPIRY_HOURS），
+  不同用户查询同一公司时直接命中
+- get_http_session(): 带连接池的 requests.Session，Qwen请求复用TCP/TLS连接
+
+get_shared_sonar_client() / get_shared_qwen_client() 返回进程内唯一的客户端实例。
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# Qwen请求连接池大小（同时进行的请求数超过时等待空闲连接）
+HTTP_POOL_MAXSIZE = 16
+
+
+class RateLimiter:
+    """
+    线程安全的令牌桶限速器
+
+    每个请求消耗一个令牌，令牌按 requests_per_minute 的速度补充，最多积累 burst 个。
+    令牌不足时先预订再等待，多个线程同时请求时按到达顺序依次放行。
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            requests_per_minute: 每分钟允许的请求数（<=0 表示不限速）
+            burst: 空闲后允许连续发出的请求数，默认每分钟请求数的1/6（至少1个）
+            clock: 单调时钟（测试时可注入）
+            sleep: 同步等待函数（测试时可注入）
+        """
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst if burst is not None else max(1, int(requests_per_minute / 6))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _reserve(self) -> float:
+        """预订一个令牌，返回需要等待的秒数"""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """阻塞直到可以发出请求，返回等待的秒数"""
+        wait = self._reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """acquire 的异步版本（不阻塞事件循环）"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class ResponseCache:
+    """
+    线程安全的API响应缓存（LRU + 过期时间）
+
+    只应缓存成功的响应；取出的是副本，调用方修改结果不影响缓存。
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 512, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """由请求内容（模型、消息、参数等）生成缓存键"""
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Dict):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+_shared: Dict = {}
+_shared_lock = threading.RLock()  # 创建客户端时会嵌套获取限速器和缓存
+
+
+def _get_or_create(name: str, factory):
+    with _shared_lock:
+        if name not in _shared:
+            _shared[name] = factory()
+        return _shared[name]
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """共享的响应缓存（ENABLE_CACHE=false 时返回None）"""
+    from config import CACHE_EXPIRY_HOURS, ENABLE_CACHE, RESPONSE_CACHE_MAX_ENTRIES
+    if not ENABLE_CACHE:
+        return None
+    return _get_or_create('cache', lambda: ResponseCache(CACHE_EXPIRY_HOURS * 3600, RESPONSE_CACHE_MAX_ENTRIES))
+
+
+def get_rate_limiter(service: str) -> RateLimiter:
+    """共享的限速器: service 为 'sonar' 或 'qwen'"""
+    from config import QWEN_REQUESTS_PER_MINUTE, SONAR_REQUESTS_PER_MINUTE
+    limits = {'sonar': SONAR_REQUESTS_PER_MINUTE, 'qwen': QWEN_REQUESTS_PER_MINUTE}
+    return _get_or_create(f'limiter:{service}', lambda: RateLimiter(limits[service]))
+
+
+def get_http_session():
+    """共享的 requests.Session（连接池复用TCP/TLS连接）"""
+    def create():
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    return _get_or_create('http_session', create)
+
+
+def get_shared_sonar_client():
+    """进程内共享的Sonar客户端"""
+    def create():
+        from .sonar_client import SonarClient
+        return SonarClient(rate_limiter=get_rate_limiter('sonar'), cache=get_response_cache())
+    return _get_or_create('sonar', create)
+
+
+def get_shared_qwen_client():
+    """进程内共享的Qwen客户端（增强版不可用时使用标准版）"""
+    def create():
+        from . import QwenClient
+        return QwenClient(rate_limiter=get_rate_limiter('qwen'), cache=get_response_cache(),
+                          session=get_http_session())
+    return _get_or_create('qwen', create)
@@ -4,17 +4,25 @@ Perplexity Sonar API客户端 - 实时信息搜索
 import asyncio
 import aiohttp
 import json
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from config import PERPLEXITY_API_KEY, PERPLEXITY_API_URL, SONAR_MODEL
 
 
 class SonarClient:
     """Perplexity Sonar API客户端，用于实时信息检索"""
     
-    def __init__(self, api_key: str = PERPLEXITY_API_KEY):
+    def __init__(self, api_key: str = PERPLEXITY_API_KEY, rate_limiter=None, cache=None):
+        """
+        Args:
+            api_key: API密钥
+            rate_limiter: 限速器（api_clients.shared.RateLimiter），多个客户端可共用
+            cache: 响应缓存（api_clients.shared.ResponseCache），只缓存成功的结果
+        """
         self.api_key = api_key
         self.api_url = PERPLEXITY_API_URL
         self.model = SONAR_MODEL
+        self.rate_limiter = rate_limiter
+        self.cache = cache
         
     def _get_headers(self) -> Dict[str, str]:
         """获取API请求头"""
@@ -23,13 +31,15 @@ class SonarClient:
             "Content-Type": "application/json"
         }
     
-    async def search_async(self, query: str, temperature: float = 0.2) -> Dict:
+    async def search_async(self, query: str, temperature: float = 0.2,
+                           session: Optional[aiohttp.ClientSession] = None) -> Dict:
         """
         异步搜索单个查询
         
         Args:
             query: 搜索查询
             temperature: 温度参数（低温度=更精确的事实）
+            session: 复用的HTTP会话（批量搜索时共用连接），默认临时创建
             
         Returns:
             包含搜索结果的字典
@@ -50,57 +60,75 @@ class SonarClient:
             "max_tokens": 2000
         }
         
+        cache_key = self.cache.make_key('sonar', payload) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        if session is None:
+            async with aiohttp.ClientSession() as own_session:
+                result = await self._post_search(own_session, query, payload)
+        else:
+            result = await self._post_search(session, query, payload)
+        if cache_key and result.get("status") == "success":
+            self.cache.put(cache_key, result)
+        return result
+    
+    async def _post_search(self, session: aiohttp.ClientSession, query: str, payload: Dict) -> Dict:
+        """发送一次搜索请求并解析响应"""
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.api_url,
-                    headers=self._get_headers(),
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=60)
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        
-                        # 检查响应格式
-                        if "choices" not in result or len(result["choices"]) == 0:
-                            return {
-                                "query": query,
-                                "error": "API响应格式错误：缺少choices",
-                                "status": "error"
-                            }
-                        
-                        message = result["choices"][0]["message"]
-                        
-                        # 提取citations（如果存在）
-                        citations = []
-                        if "citations" in result:
-                            citations = result["citations"]
-                        elif "citations" in message:
-                            citations = message["citations"]
-                        
-                        # 检查content是否存在
-                        if "content" not in message:
-                            return {
-                                "query": query,
-                                "error": "API响应格式错误：缺少content",
-                                "status": "error"
-                            }
-                        
+            async with session.post(
+                self.api_url,
+                headers=self._get_headers(),
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=60)
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    
+                    # 检查响应格式
+                    if "choices" not in result or len(result["choices"]) == 0:
                         return {
                             "query": query,
-                            "content": message["content"],
-                            "citations": citations,
-                            "status": "success"
+                            "error": "API响应格式错误：缺少choices",
+                            "status": "error"
                         }
-                    else:
-                        error_text = await response.text()
-                        error_msg = f"API错误 {response.status}: {error_text[:200]}"
-                        print(f"  ⚠️  查询失败: {query[:50]}... - {error_msg}")
+                    
+                    message = result["choices"][0]["message"]
+                    
+                    # 提取citations（如果存在）
+                    citations = []
+                    if "citations" in result:
+                        citations = result["citations"]
+                    elif "citations" in message:
+                        citations = message["citations"]
+                    
+                    # 检查content是否存在
+                    if "content" not in message:
                         return {
                             "query": query,
-                            "error": error_msg,
+                            "error": "API响应格式错误：缺少content",
                             "status": "error"
                         }
+                    
+                    return {
+                        "query": query,
+                        "content": message["content"],
+                        "citations": citations,
+                        "status": "success"
+                    }
+                else:
+                    error_text = await response.text()
+                    error_msg = f"API错误 {response.status}: {error_text[:200]}"
+                    print(f"  ⚠️  查询失败: {query[:50]}... - {error_msg}")
+                    return {
+                        "query": query,
+                        "error": error_msg,
+                        "status": "error"
+                    }
         except asyncio.TimeoutError:
             error_msg = f"查询超时: {query[:50]}..."
             print(f"  ⚠️  {error_msg}")
@@ -120,32 +148,41 @@ class SonarClient:
                 "status": "error"
             }
     
-    async def batch_search_async(self, queries: List[str], max_concurrent: int = 5) -> List[Dict]:
+    async def batch_search_async(self, queries: List[str], max_concurrent: int = 5,
+                                 on_result: Optional[Callable[[int, Dict], None]] = None) -> List[Dict]:
         """
         批量并行搜索多个查询（成本优化：节省时间）
         
         Args:
             queries: 查询列表
             max_concurrent: 最大并发数
+            on_result: 每个查询完成时立即调用 (查询序号, 结果)，用于增量显示
             
         Returns:
             搜索结果列表
         """
         semaphore = asyncio.Semaphore(max_concurrent)
         
-        async def limited_search(query: str) -> Dict:
-            async with semaphore:
-                return await self.search_async(query)
-        
-        tasks = [limited_search(query) for query in queries]
-        results = await asyncio.gather(*tasks)
+        # 同一批查询共用一个会话和连接池，不再每个查询单独建立连接
+        connector = aiohttp.TCPConnector(limit=max_concurrent)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def limited_search(index: int, query: str) -> Dict:
+                async with semaphore:
+                    result = await self.search_async(query, session=session)
+                if on_result:
+                    on_result(index, result)
+                return result
+            
+            tasks = [limited_search(i, query) for i, query in enumerate(queries)]
+            results = await asyncio.gather(*tasks)
         return results
     
     def search(self, query: str) -> Dict:
         """同步搜索（包装异步方法）"""
         return asyncio.run(self.search_async(query))
     
-    def batch_search(self, queries: List[str], max_concurrent: int = 5) -> List[Dict]:
+    def batch_search(self, queries: List[str], max_concurrent: int = 5,
+                     on_result: Optional[Callable[[int, Dict], None]] = None) -> List[Dict]:
         """同步批量搜索（包装异步方法）"""
-        return asyncio.run(self.batch_search_async(queries, max_concurrent))
+        return asyncio.run(self.batch_search_async(queries, max_concurrent, on_result))
 
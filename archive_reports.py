@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+报告归档工具
+
+把较早的报告（Markdown各版本和PDF）移入 reports/archive 的压缩归档：
+内容相同的文件只存一份，_enhanced 等变体以原始版本为字典差分压缩。
+归档后的报告仍出现在Web历史页面中，查看和下载时按需解压。
+
+用法:
+    python archive_reports.py                      # 归档30天前的报告（校验后删除原文件）
+    python archive_reports.py --older-than 7       # 归档7天前的报告
+    python archive_reports.py --keep               # 归档但保留原文件
+    python archive_reports.py --restore X.md ...   # 从归档恢复到 reports/
+    python archive_reports.py --stats              # 查看归档占用
+    python archive_reports.py --gc                 # 回收不再被引用的归档内容
+"""
+import argparse
+import os
+import time
+from typing import List
+
+from storage.report_archive import ReportArchive, base_variant_name
+from storage.report_catalog import REPORT_EXTENSIONS, STATUS_ARCHIVED, ReportCatalog
+
+
+def find_archivable(reports_dir: str, older_than_days: float) -> List[str]:
+    """修改时间早于指定天数的报告，原始版本排在变体之前（变体归档时以原始版本为字典）"""
+    cutoff = time.time() - older_than_days * 86400
+    paths = []
+    with os.scandir(reports_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(REPORT_EXTENSIONS) and entry.stat().st_mtime < cutoff:
+                paths.append(entry.path)
+    return sorted(paths, key=lambda p: (base_variant_name(p) is not None, os.path.basename(p)))
+
+
+def _format_size(num_bytes: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if num_bytes < 1024 or unit == 'GB':
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+def print_stats(archive: ReportArchive):
+    stats = archive.stats()
+    print(f"📦 归档文件: {stats['files']} 个, 原始大小 {_format_size(stats['logical_bytes'])}")
+    print(f"💾 磁盘占用: {_format_size(stats['stored_bytes'])} ({stats['blobs']} 个blob), "
+          f"压缩比 {stats['ratio']:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报告压缩归档')
+    parser.add_argument('--reports-dir', default='reports', help='报告目录（默认 reports/）')
+    parser.add_argument('--older-than', type=float, default=30, help='归档多少天前的报告（默认30）')
+    parser.add_argument('--keep', action='store_true', help='归档后保留原文件')
+    parser.add_argument('--restore', nargs='+', metavar='NAME', help='从归档恢复指定文件')
+    parser.add_argument('--stats', action='store_true', help='只显示归档统计')
+    parser.add_argument('--gc', action='store_true', help='回收不再被引用的归档内容')
+    args = parser.parse_args()
+
+    archive = ReportArchive(os.path.join(args.reports_dir, 'archive'))
+
+    if args.stats:
+        print_stats(archive)
+        return 0
+
+    if args.gc:
+        result = archive.collect_garbage()
+        print(f"🧹 回收 {result['removed']} 个blob, 释放 {_format_size(result['bytes'])}")
+        return 0
+
+    catalog = ReportCatalog(args.reports_dir)
+    catalog.sync()
+
+    if args.restore:
+        failures = 0
+        for name in args.restore:
+            dest = os.path.join(args.reports_dir, os.path.basename(name))
+            try:
+                archive.restore(name, dest)
+                catalog.record(dest)
+                print(f"✅ 已恢复: {dest}")
+            except FileNotFoundError as e:
+                failures += 1
+                print(f"❌ {e}")
+        return 1 if failures else 0
+
+    paths = find_archivable(args.reports_dir, args.older_than)
+    if not paths:
+        print(f"✅ 没有 {args.older_than:g} 天前的报告需要归档")
+        return 0
+
+    print("="*80)
+    print(f"📦 归档 {len(paths)} 个报告文件{'（保留原文件）' if args.keep else ''}")
+    print("="*80)
+
+    original_bytes, stored_bytes = 0, 0
+    for path in paths:
+        try:
+            manifest = archive.archive_file(path, remove_original=not args.keep)
+        except Exception as e:
+            print(f"❌ {os.path.basename(path)}: {e}")
+            continue
+        original_bytes += manifest['size']
+        stored_bytes += manifest['stored_bytes']
+        mode = "差分" if manifest['base'] else "完整"
+        print(f"  {os.path.basename(path)}: {_format_size(manifest['size'])} -> "
+              f"{_format_size(manifest['stored_bytes'])} ({mode})")
+        if not args.keep:
+            catalog.set_status(path, STATUS_ARCHIVED)
+
+    print(f"\n✅ 本次归档 {_format_size(original_bytes)}，新增占用 {_format_size(stored_bytes)}")
+    print_stats(archive)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
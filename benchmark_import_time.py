@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+导入耗时基准（冷启动）
+
+在全新的解释器中用 `python -X importtime -c "import <模块>"` 导入各入口模块，
+统计总导入耗时和最重的依赖，并检查不应被连带导入的重型依赖：
+- config 不应导入 streamlit（命令行没有secrets.toml时）
+- report_enhancer 不应导入 matplotlib / reportlab（绘图、排版都按需加载）
+- main 不应导入 reportlab / matplotlib / streamlit，也不应加载板块分析Agent
+
+用法:
+    python benchmark_import_time.py [模块 ...] [--rounds N] [--top N] [--budget-ms MS]
+
+出现不应有的导入、或超出 --budget-ms 时返回非0，可用于CI中防止启动耗时回退
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# 入口模块 -> 导入它时不应被加载的模块
+IMPORT_GUARDS: Dict[str, List[str]] = {
+    'config': ['streamlit'],
+    'report_enhancer': ['matplotlib', 'reportlab', 'streamlit', 'agents.query_planner'],
+    'enhance_all_reports': ['matplotlib', 'reportlab', 'streamlit'],
+    'main': ['reportlab', 'matplotlib', 'streamlit', 'agents.sector_leader_analyzer'],
+}
+
+
+def measure_import(module: str) -> Tuple[Optional[Dict[str, int]], str]:
+    """
+    在子进程中导入模块，解析 -X importtime 输出
+
+    Returns:
+        ({模块名: 累计耗时us}, 错误信息)；导入失败时第一项为None
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        error_lines = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        return None, error_lines[-1] if error_lines else f'exit {result.returncode}'
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        timings[name] = max(timings.get(name, 0), int(parts[1]))
+    return timings, ''
+
+
+def forbidden_imports(module: str, timings: Dict[str, int]) -> List[str]:
+    """导入 module 时被连带加载的、不应出现的模块"""
+    found = []
+    for guarded in IMPORT_GUARDS.get(module, []):
+        if any(name == guarded or name.startswith(guarded + '.') for name in timings):
+            found.append(guarded)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='入口模块冷启动导入耗时基准')
+    parser.add_argument('modules', nargs='*', default=list(IMPORT_GUARDS), help='要测量的模块（默认全部入口）')
+    parser.add_argument('--rounds', type=int, default=3, help='每个模块重复测量的次数（取最快一次）')
+    parser.add_argument('--top', type=int, default=5, help='显示耗时最多的依赖数')
+    parser.add_argument('--budget-ms', type=float, default=None, help='单个模块导入耗时上限（毫秒）')
+    args = parser.parse_args()
+
+    print("="*80)
+    print(f"⏱️  导入耗时基准: {', '.join(args.modules)}")
+    print("="*80)
+
+    failures = 0
+    for module in args.modules:
+        best = None
+        error = ''
+        for _ in range(args.rounds):
+            timings, error = measure_import(module)
+            if timings is None:
+                break
+            if best is None or timings.get(module, 0) < best.get(module, 0):
+                best = timings
+
+        if best is None:
+            # 缺少第三方依赖时无法测量，不算回退
+            print(f"⚠️  {module}: 导入失败，跳过 ({error})")
+            continue
+
+        total_ms = best.get(module, 0) / 1000
+        print(f"\n📦 {module}: {total_ms:.1f} ms（{len(best)} 个模块）")
+        heaviest = sorted(((t, name) for name, t in best.items() if name != module), reverse=True)
+        for t, name in heaviest[:args.top]:
+            print(f"   {t/1000:8.1f} ms  {name}")
+
+        unexpected = forbidden_imports(module, best)
+        if unexpected:
+            failures += 1
+            print(f"❌ {module} 连带导入了: {', '.join(unexpected)}")
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            failures += 1
+            print(f"❌ {module} 导入耗时超出上限 {args.budget_ms:.0f} ms")
+
+    print()
+    if failures:
+        print(f"❌ {failures} 项检查未通过")
+        return 1
+    print("✅ 导入检查通过")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+PDF生成性能基准
+
+对 reports/ 下的报告重复生成PDF（写入内存），对比：
+- 冷启动：进程内第一次构建（注册字体、建立样式表）
+- 热构建：之后每次新建 ProfessionalPDFGenerator 并生成PDF（复用进程级缓存）
+
+用法:
+    python benchmark_pdf_generator.py [报告文件或目录 ...] [--rounds N]
+"""
+import argparse
+import glob
+import io
+import os
+import time
+from contextlib import redirect_stdout
+from typing import Dict, List
+
+import pdf_generator
+from pdf_generator import ProfessionalPDFGenerator
+
+
+def load_reports(paths: List[str]) -> List[Dict]:
+    """读取报告，整篇markdown作为一个章节交给生成器"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(f for f in glob.glob(os.path.join(path, '*.md')) if '_enhanced' not in f))
+        else:
+            files.append(path)
+
+    reports = []
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            reports.append({'metadata': {}, 'fundamentalAnalysis': f.read()})
+    return reports
+
+
+def build_all(reports: List[Dict]) -> float:
+    """每份报告新建一个生成器并生成PDF，返回耗时"""
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        for report_data in reports:
+            ProfessionalPDFGenerator().generate_report_pdf('BENCH', report_data, io.BytesIO())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF生成性能基准')
+    parser.add_argument('paths', nargs='*', default=['reports'], help='报告文件或目录（默认 reports/）')
+    parser.add_argument('--rounds', type=int, default=3, help='热构建重复轮数（取最快一轮）')
+    args = parser.parse_args()
+
+    reports = load_reports(args.paths)
+    if not reports:
+        print("❌ 没有找到报告")
+        return 1
+
+    print("="*80)
+    print(f"📊 PDF生成基准: {len(reports)} 份报告")
+    print("="*80)
+
+    cold = build_all(reports[:1])
+    warm = min(build_all(reports) for _ in range(args.rounds))
+
+    print(f"冷启动（首份报告）: {cold*1000:.1f} ms")
+    print(f"热构建（全部报告）: {warm*1000:.1f} ms, 平均 {warm/len(reports)*1000:.1f} ms/份")
+    print(f"单元格样式缓存: {pdf_generator.get_cell_style.cache_info()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+图表渲染服务 - 在工作进程中绘制报告图表
+
+- 图表规格（标签、数据系列、标题）在调用方进程中从表格计算，是普通dict，可跨进程传递
+- 可插拔的图表后端：
+  png - matplotlib 面向对象 Figure API（不使用 pyplot 全局状态），150dpi位图
+  svg - 基于模板直接生成SVG文本，不依赖matplotlib，几乎零耗时且文件更小
+- ChartRenderService 把一批图表作为一次任务提交给进程池，返回 Future，
+  报告保存流程不必等待绘制完成
+"""
+import atexit
+import importlib.util
+import io
+import math
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from agents import regex_patterns as rx
+
+# matplotlib 只在第一次绘制PNG时导入（svg后端和只读取缓存的增强流程不需要它）
+HAS_MATPLOTLIB = importlib.util.find_spec('matplotlib') is not None
+_matplotlib_api = None
+
+
+def _load_matplotlib():
+    """导入matplotlib并设置字体（每个进程一次），返回 (Figure, FigureCanvasAgg)"""
+    global _matplotlib_api
+    if _matplotlib_api is None:
+        import matplotlib
+        matplotlib.use('Agg')  # 无GUI后端
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
+        matplotlib.rcParams['axes.unicode_minus'] = False
+        _matplotlib_api = (Figure, FigureCanvasAgg)
+    return _matplotlib_api
+
+CHART_DPI = 150
+CHART_FIGSIZE = (10, 6)
+
+# 与matplotlib默认配色一致，两种后端的图表风格相同
+SERIES_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
+
+
+def _parse_cell_number(cell: str) -> float:
+    """从单元格提取数值（B转换为百万，K转换为千分之一百万），无法解析时为0"""
+    # 移除$, %, B, M, K等符号
+    cell_clean = cell.replace('$', '').replace(',', '').replace('%', '')
+
+    # 提取有效数字（必须包含至少一位完整的数字）
+    num_match = rx.RE_FIRST_NUMBER.search(cell_clean)
+    if not num_match:
+        return 0
+    try:
+        num_val = float(num_match.group(1))
+    except (ValueError, AttributeError):
+        return 0
+    # 处理单位 B/M/K
+    if 'B' in cell:
+        num_val *= 1000  # 转换为百万为单位
+    elif 'K' in cell:
+        num_val /= 1000
+    return num_val
+
+
+def build_bar_chart_spec(table: Dict, table_idx: int) -> Optional[Dict]:
+    """
+    从表格数据计算柱状图规格
+
+    Args:
+        table: {'headers': [...], 'rows': [[...], ...]}
+        table_idx: 图表序号（用于标题）
+
+    Returns:
+        图表规格dict；没有有效数值数据时返回None
+    """
+    headers = table['headers']
+    rows = table['rows']
+
+    # 提取标签（第一列）
+    labels = [row[0] for row in rows[:5]]  # 最多5个标签
+
+    # 提取数值（其他列）
+    series = []
+    for col_idx in range(1, min(len(headers), 4)):  # 最多3个数据系列
+        values = [_parse_cell_number(row[col_idx]) for row in rows[:5] if col_idx < len(row)]
+        if values and sum(values) > 0:  # 确保有有效数据
+            series.append([headers[col_idx], values])
+
+    if not series:
+        return None
+
+    return {
+        'kind': 'bar',
+        'title': f'Data Visualization - Table {table_idx + 1}',
+        'xlabel': 'Metric',
+        'ylabel': 'Value',
+        'labels': labels,
+        'series': series,
+    }
+
+
+def _write_atomic(data: bytes, output_path: str):
+    """先写临时文件再原子替换：目标文件可能是缓存对象的硬链接，不能原地覆盖"""
+    output_dir = os.path.dirname(output_path) or '.'
+    os.makedirs(output_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)  # mkstemp默认只有属主可读
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ChartBackend:
+    """图表后端接口：把图表规格（kind为bar或line）渲染为文件内容"""
+
+    name = ''
+    extension = ''
+
+    def render_bytes(self, spec: Dict) -> bytes:
+        raise NotImplementedError
+
+    def render(self, spec: Dict, output_path: str):
+        _write_atomic(self.render_bytes(spec), output_path)
+
+
+class MatplotlibPNGBackend(ChartBackend):
+    """matplotlib Figure API 绘制的PNG位图"""
+
+    name = 'png'
+    extension = 'png'
+
+    def __init__(self, dpi: int = CHART_DPI):
+        self.dpi = dpi
+
+    def render_bytes(self, spec: Dict) -> bytes:
+        if not HAS_MATPLOTLIB:
+            raise ImportError("PNG图表需要matplotlib: pip install matplotlib（或改用svg后端）")
+
+        Figure, FigureCanvasAgg = _load_matplotlib()
+        fig = Figure(figsize=CHART_FIGSIZE)
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+
+        labels = spec['labels']
+        series = spec['series']
+        x = range(len(labels))
+
+        if spec.get('kind') == 'line':
+            for series_name, values in series:
+                ax.plot(list(x)[:len(values)], values, marker='o', label=series_name)
+        else:
+            width = 0.8 / len(series)
+            for i, (series_name, values) in enumerate(series):
+                offset = width * i - (width * len(series) / 2 - width / 2)
+                ax.bar([pos + offset for pos in x][:len(values)], values, width, label=series_name)
+
+        ax.set_xlabel(spec.get('xlabel', ''), fontsize=12)
+        ax.set_ylabel(spec.get('ylabel', ''), fontsize=12)
+        ax.set_title(spec.get('title', ''), fontsize=14, fontweight='bold')
+        ax.set_xticks(list(x))
+        ax.set_xticklabels(labels, rotation=45, ha='right')
+        ax.legend()
+        ax.grid(axis='y', alpha=0.3)
+        fig.tight_layout()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=self.dpi, bbox_inches='tight')
+        return buffer.getvalue()
+
+
+def _nice_ticks(low: float, high: float, count: int = 5) -> List[float]:
+    """计算覆盖 [low, high] 的整齐刻度（步长为 1/2/2.5/5 × 10^n）"""
+    if high == low:
+        high = low + 1
+    raw_step = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = magnitude * 10
+    for multiple in (1, 2, 2.5, 5, 10):
+        if multiple * magnitude >= raw_step:
+            step = multiple * magnitude
+            break
+    start = math.floor(low / step) * step
+    end = math.ceil(high / step) * step
+    return [round(start + i * step, 10) for i in range(int(round((end - start) / step)) + 1)]
+
+
+def _format_tick(value: float) -> str:
+    return f"{value:,.0f}" if abs(value) >= 1000 else f"{value:g}"
+
+
+class SVGChartBackend(ChartBackend):
+    """基于模板生成的SVG矢量图（不依赖matplotlib）"""
+
+    name = 'svg'
+    extension = 'svg'
+
+    WIDTH = 800
+    HEIGHT = 480
+    MARGIN_LEFT = 80
+    MARGIN_RIGHT = 30
+    MARGIN_TOP = 60
+    MARGIN_BOTTOM = 120
+
+    SVG_TEMPLATE = (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        'viewBox="0 0 {width} {height}" font-family="Arial Unicode MS, SimHei, DejaVu Sans, sans-serif">\n'
+        '<rect width="{width}" height="{height}" fill="#ffffff"/>\n'
+        '<text x="{title_x}" y="32" font-size="18" font-weight="bold" text-anchor="middle">{title}</text>\n'
+        '{grid}{plot}'
+        '<line x1="{left}" y1="{top}" x2="{left}" y2="{bottom}" stroke="#000000"/>\n'
+        '<line x1="{left}" y1="{zero_y}" x2="{right}" y2="{zero_y}" stroke="#000000"/>\n'
+        '{xticks}{legend}'
+        '<text x="{title_x}" y="{xlabel_y}" font-size="14" text-anchor="middle">{xlabel}</text>\n'
+        '<text x="20" y="{ylabel_y}" font-size="14" text-anchor="middle" '
+        'transform="rotate(-90 20 {ylabel_y})">{ylabel}</text>\n'
+        '</svg>\n'
+    )
+    GRID_TEMPLATE = (
+        '<line x1="{left}" y1="{y}" x2="{right}" y2="{y}" stroke="#b0b0b0" stroke-opacity="0.3"/>'
+        '<text x="{label_x}" y="{text_y}" font-size="11" text-anchor="end">{label}</text>\n'
+    )
+    BAR_TEMPLATE = '<rect x="{x}" y="{y}" width="{w}" height="{h}" fill="{color}"/>\n'
+    XTICK_TEMPLATE = (
+        '<text x="{x}" y="{y}" font-size="12" text-anchor="end" '
+        'transform="rotate(-45 {x} {y})">{label}</text>\n'
+    )
+    LEGEND_TEMPLATE = (
+        '<rect x="{x}" y="{y}" width="14" height="10" fill="{color}"/>'
+        '<text x="{text_x}" y="{text_y}" font-size="12">{label}</text>\n'
+    )
+
+    def render_bytes(self, spec: Dict) -> bytes:
+        return self.render_svg(spec).encode('utf-8')
+
+    def render_svg(self, spec: Dict) -> str:
+        labels = spec['labels']
+        series = spec['series']
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+        right, bottom = self.WIDTH - self.MARGIN_RIGHT, self.HEIGHT - self.MARGIN_BOTTOM
+
+        all_values = [v for _, values in series for v in values] or [0]
+        ticks = _nice_ticks(min(0, min(all_values)), max(0, max(all_values)))
+        y_low, y_high = ticks[0], ticks[-1]
+
+        def to_y(value: float) -> float:
+            return bottom - (value - y_low) / (y_high - y_low) * (bottom - top)
+
+        grid = ''.join(
+            self.GRID_TEMPLATE.format(
+                left=left, right=right, y=f"{to_y(t):.1f}", label_x=left - 6,
+                text_y=f"{to_y(t) + 4:.1f}", label=_format_tick(t)
+            )
+            for t in ticks
+        )
+
+        slot = (right - left) / max(len(labels), 1)
+        centers = [left + slot * (i + 0.5) for i in range(len(labels))]
+        zero_y = to_y(0)
+
+        if spec.get('kind') == 'line':
+            plot = self._line_marks(series, centers, to_y)
+        else:
+            plot = self._bar_marks(series, centers, slot, to_y, zero_y)
+
+        xticks = ''.join(
+            self.XTICK_TEMPLATE.format(x=f"{x:.1f}", y=bottom + 16, label=escape(str(label)))
+            for x, label in zip(centers, labels)
+        )
+        legend = ''.join(
+            self.LEGEND_TEMPLATE.format(
+                x=right - 170, y=top + 6 + i * 18, text_x=right - 150, text_y=top + 15 + i * 18,
+                color=SERIES_COLORS[i % len(SERIES_COLORS)], label=escape(str(name))
+            )
+            for i, (name, _) in enumerate(series)
+        )
+
+        return self.SVG_TEMPLATE.format(
+            width=self.WIDTH, height=self.HEIGHT, title_x=self.WIDTH // 2,
+            title=escape(spec.get('title', '')), grid=grid, plot=plot,
+            left=left, right=right, top=top, bottom=bottom, zero_y=f"{zero_y:.1f}",
+            xticks=xticks, legend=legend, xlabel=escape(spec.get('xlabel', '')),
+            xlabel_y=self.HEIGHT - 12, ylabel=escape(spec.get('ylabel', '')), ylabel_y=(top + bottom) // 2,
+        )
+
+    def _bar_marks(self, series, centers: List[float], slot: float, to_y, zero_y: float) -> str:
+        width = slot * 0.8 / len(series)
+        marks = []
+        for i, (_, values) in enumerate(series):
+            offset = width * i - (width * len(series) / 2 - width / 2)
+            color = SERIES_COLORS[i % len(SERIES_COLORS)]
+            for center, value in zip(centers, values):
+                y = to_y(value)
+                marks.append(self.BAR_TEMPLATE.format(
+                    x=f"{center + offset - width / 2:.1f}", y=f"{min(y, zero_y):.1f}",
+                    w=f"{width:.1f}", h=f"{abs(zero_y - y):.1f}", color=color
+                ))
+        return ''.join(marks)
+
+    def _line_marks(self, series, centers: List[float], to_y) -> str:
+        marks = []
+        for i, (_, values) in enumerate(series):
+            color = SERIES_COLORS[i % len(SERIES_COLORS)]
+            points: List[Tuple[float, float]] = [(x, to_y(v)) for x, v in zip(centers, values)]
+            marks.append('<polyline fill="none" stroke="{color}" stroke-width="2" points="{points}"/>\n'.format(
+                color=color, points=' '.join(f"{x:.1f},{y:.1f}" for x, y in points)
+            ))
+            marks.extend(
+                f'<circle cx="{x:.1f}" cy="{y:.1f}" r="4" fill="{color}"/>\n' for x, y in points
+            )
+        return ''.join(marks)
+
+
+CHART_BACKENDS: Dict[str, ChartBackend] = {
+    'png': MatplotlibPNGBackend(),
+    'svg': SVGChartBackend(),
+}
+
+
+def get_chart_backend(name: str) -> ChartBackend:
+    """按名称获取图表后端（png / svg）"""
+    try:
+        return CHART_BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"未知的图表后端: {name}（可选: {', '.join(CHART_BACKENDS)}）")
+
+
+def render_chart(spec: Dict, output_path: str, backend: str = 'png'):
+    """用指定后端绘制图表并原子写入 output_path"""
+    get_chart_backend(backend).render(spec, output_path)
+
+
+def render_batch(jobs: List[Dict]) -> List[Dict]:
+    """
+    绘制一批图表（一次工作进程调用处理多张表格）
+
+    Args:
+        jobs: [{'spec': 图表规格, 'output_path': 输出路径, 'backend': 'png'|'svg'}, ...]
+
+    Returns:
+        与jobs顺序一致的结果: {'output_path', 'success', 'error', 'elapsed'}
+    """
+    results = []
+    for job in jobs:
+        start = time.perf_counter()
+        result = {'output_path': job['output_path'], 'success': False, 'error': None}
+        try:
+            render_chart(job['spec'], job['output_path'], job.get('backend', 'png'))
+            result['success'] = True
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        result['elapsed'] = time.perf_counter() - start
+        results.append(result)
+    return results
+
+
+class ChartRenderService:
+    """后台图表渲染服务（进程池，绘制不占用报告保存流程的时间）"""
+
+    def __init__(self, max_workers: Optional[int] = None, use_processes: bool = True):
+        """
+        Args:
+            max_workers: 工作进程数，默认 min(4, CPU核数)
+            use_processes: False 时使用线程池（Figure API 不依赖 pyplot 全局状态，线程中也安全）
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.use_processes = use_processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # 多个会话线程可能同时提交第一批图表，加锁保证只创建一个进程池
+        with self._lock:
+            if self._executor is None:
+                executor_cls = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+                self._executor = executor_cls(max_workers=self.max_workers)
+            return self._executor
+
+    def submit(self, jobs: List[Dict]) -> Future:
+        """提交一批图表任务，返回结果为 render_batch 输出的 Future"""
+        return self._get_executor().submit(render_batch, jobs)
+
+    def render(self, jobs: List[Dict]) -> List[Dict]:
+        """同步渲染（等待结果）"""
+        return self.submit(jobs).result()
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_default_service: Optional[ChartRenderService] = None
+_default_service_lock = threading.Lock()
+
+
+def get_default_service() -> ChartRenderService:
+    """进程内共享的渲染服务（退出时等待未完成的图表）"""
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            _default_service = ChartRenderService()
+            atexit.register(_default_service.shutdown)
+        return _default_service
@@ -1,5 +1,31 @@
 import os
-import streamlit as st
+import sys
+
+# 命令行运行时，只有存在这些Secrets文件才需要导入Streamlit
+_SECRETS_FILES = (
+    os.path.join('.streamlit', 'secrets.toml'),
+    os.path.join(os.path.expanduser('~'), '.streamlit', 'secrets.toml'),
+)
+_streamlit = None
+
+
+def _get_streamlit():
+    """
+    读取Secrets用的Streamlit模块（按需导入）
+    Web界面已经导入了Streamlit，直接复用；命令行下没有secrets.toml时不导入，
+    省去Streamlit的启动开销
+    """
+    global _streamlit
+    if _streamlit is None:
+        st = sys.modules.get('streamlit')
+        if st is None and any(os.path.exists(path) for path in _SECRETS_FILES):
+            try:
+                import streamlit as st
+            except ImportError:
+                st = None
+        _streamlit = st or False
+    return _streamlit or None
+
 
 # --- 核心逻辑：从安全的地方读取配置 ---
 def get_conf(key, default_value=None):
@@ -9,7 +35,8 @@ def get_conf(key, default_value=None):
     如果都没有，返回默认值
     """
     # 1. 检查 Streamlit Secrets (云端)
-    if hasattr(st, "secrets") and key in st.secrets:
+    st = _get_streamlit()
+    if st is not None and hasattr(st, "secrets") and key in st.secrets:
         return st.secrets[key]
     
     # 2. 检查系统环境变量 (本地/容器)
@@ -53,3 +80,43 @@ else:
     ENABLE_CACHE = bool(_enable_cache_raw)
 
 CACHE_EXPIRY_HOURS = int(get_conf("CACHE_EXPIRY_HOURS", 6))
+RESPONSE_CACHE_MAX_ENTRIES = int(get_conf("RESPONSE_CACHE_MAX_ENTRIES", 512))
+
+# API限速（每分钟请求数，所有会话和工作线程合计；0表示不限速）
+SONAR_REQUESTS_PER_MINUTE = float(get_conf("SONAR_REQUESTS_PER_MINUTE", 50))
+QWEN_REQUESTS_PER_MINUTE = float(get_conf("QWEN_REQUESTS_PER_MINUTE", 60))
+
+# 图表后端: png（matplotlib位图）或 svg（模板生成的矢量图，更快更小）
+CHART_BACKEND = get_conf("CHART_BACKEND", "png")
+
+# PDF并行排版: 按分页位置把报告分段，在多个进程中排版后合并（需要pypdf）
+_pdf_parallel_raw = get_conf("PDF_PARALLEL", False)
+if isinstance(_pdf_parallel_raw, str):
+    PDF_PARALLEL = _pdf_parallel_raw.lower() == 'true'
+else:
+    PDF_PARALLEL = bool(_pdf_parallel_raw)
+
+# 后台任务: Web界面提交的报告、热点、比较分析任务由工作线程执行
+# JOB_WORKERS 为同时执行的任务数；JOB_SIDECAR=true 时Web进程只提交任务，
+# 由单独运行的 python job_service.py 执行（可多开以增加吞吐）
+JOB_WORKERS = int(get_conf("JOB_WORKERS", 2))
+_job_sidecar_raw = get_conf("JOB_SIDECAR", False)
+if isinstance(_job_sidecar_raw, str):
+    JOB_SIDECAR = _job_sidecar_raw.lower() == 'true'
+else:
+    JOB_SIDECAR = bool(_job_sidecar_raw)
+
+# Web会话分析历史的记录数上限（只保存标题、时间等轻量记录，正文按需从报告目录读取）
+HISTORY_MAX_ITEMS = int(get_conf("HISTORY_MAX_ITEMS", 50))
+
+# 报告保留策略（RETENTION_ENABLED=true 时在后台按批清理，也可手动运行 python retention_service.py）
+# 各项为0时不启用；被取代的中间变体（_formatted、被更完整版本取代的 _enhanced）总是清理
+_retention_enabled_raw = get_conf("RETENTION_ENABLED", False)
+if isinstance(_retention_enabled_raw, str):
+    RETENTION_ENABLED = _retention_enabled_raw.lower() == 'true'
+else:
+    RETENTION_ENABLED = bool(_retention_enabled_raw)
+RETENTION_KEEP_PER_TICKER = int(get_conf("RETENTION_KEEP_PER_TICKER", 10))
+RETENTION_MAX_AGE_DAYS = float(get_conf("RETENTION_MAX_AGE_DAYS", 0))
+RETENTION_MAX_TOTAL_MB = float(get_conf("RETENTION_MAX_TOTAL_MB", 0))
+RETENTION_INTERVAL_MINUTES = float(get_conf("RETENTION_INTERVAL_MINUTES", 60))
@@ -1,45 +1,184 @@
 #!/usr/bin/env python3
 """
 批量增强所有报告的脚本
+
+用法:
+    python enhance_all_reports.py              # 串行处理
+    python enhance_all_reports.py --jobs 4     # 4个进程并行处理
+    python enhance_all_reports.py --jobs 0     # 按CPU核数并行
+    python enhance_all_reports.py --no-cache   # 忽略缓存强制重算
+    python enhance_all_reports.py --chart-backend svg   # 生成SVG矢量图表
+    python enhance_all_reports.py --gc-charts   # 处理完成后回收不再被任何报告引用的图表
+    python enhance_all_reports.py --dir other/  # 处理其他目录（图表和缓存放在 other/charts、other/.cache）
 """
+import argparse
+import io
 import os
 import glob
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from typing import Dict, List, Optional
+
 from report_enhancer import ReportEnhancer
+from storage.chart_store import ChartStore
+from storage.stage_cache import StageCache
 
-def main():
-    """批量增强reports目录下的所有.md文件"""
-    reports_dir = "reports"
-    
-    # 查找所有未增强的报告
+
+# 每个工作进程各自持有一个增强器（matplotlib只在进程启动时初始化一次）
+_worker_enhancer: Optional[ReportEnhancer] = None
+
+
+def _init_worker(use_cache: bool, chart_backend: str = 'png', reports_dir: str = "reports"):
+    """进程池初始化：创建本进程的增强器（导入图表模块时完成matplotlib设置），图表和缓存放在报告目录下"""
+    global _worker_enhancer
+    cache = StageCache(os.path.join(reports_dir, ".cache")) if use_cache else None
+    _worker_enhancer = ReportEnhancer(use_cache=use_cache, cache=cache, chart_backend=chart_backend,
+                                      charts_dir=os.path.join(reports_dir, "charts"))
+
+
+def _enhance_one(report_path: str) -> Dict:
+    """
+    增强单个报告（在工作进程中执行）
+
+    异常在这里捕获并作为结果返回，单个报告失败不会中断整批处理；
+    增强过程的输出被收集起来，由主进程按报告顺序打印，避免多进程输出交错
+    """
+    log = io.StringIO()
+    cache = _worker_enhancer.cache
+    hits_before, misses_before = (cache.hits, cache.misses) if cache else (0, 0)
+    start = time.perf_counter()
+    result = {'report': report_path, 'success': False, 'enhanced_path': None, 'error': None}
+
+    try:
+        with redirect_stdout(log):
+            result['enhanced_path'] = _worker_enhancer.enhance_report(report_path)
+        result['success'] = True
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+
+    result['elapsed'] = time.perf_counter() - start
+    result['log'] = log.getvalue()
+    result['cache_hits'] = cache.hits - hits_before if cache else 0
+    result['cache_misses'] = cache.misses - misses_before if cache else 0
+    return result
+
+
+def find_reports(reports_dir: str = "reports") -> List[str]:
+    """查找所有未增强的报告（按文件名排序，保证输出顺序稳定）"""
     all_reports = glob.glob(f"{reports_dir}/*.md")
     # 排除已经增强过的
-    reports_to_enhance = [r for r in all_reports if '_enhanced' not in r and '_formatted' not in r]
-    
-    if not reports_to_enhance:
-        print("✅ 没有找到需要增强的报告")
-        return
-    
-    print(f"找到 {len(reports_to_enhance)} 个报告需要增强\n")
-    
-    enhancer = ReportEnhancer()
-    
-    success_count = 0
-    for report_path in reports_to_enhance:
+    return sorted(r for r in all_reports if '_enhanced' not in r and '_formatted' not in r)
+
+
+def enhance_reports(reports: List[str], jobs: int = 1, use_cache: bool = True, chart_backend: str = 'png',
+                    reports_dir: str = "reports") -> List[Dict]:
+    """
+    增强一批报告，结果顺序与输入顺序一致
+
+    Args:
+        reports: 报告路径列表
+        jobs: 并行进程数（1为当前进程串行）
+        use_cache: 是否启用阶段缓存
+        chart_backend: 图表后端（png / svg）
+        reports_dir: 报告目录（图表写入其下的 charts/，缓存写入 .cache/）
+    """
+    if jobs <= 1 or len(reports) <= 1:
+        _init_worker(use_cache, chart_backend, reports_dir)
+        return [_enhance_one(report_path) for report_path in reports]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(use_cache, chart_backend, reports_dir)) as executor:
+        futures = [executor.submit(_enhance_one, report_path) for report_path in reports]
+        for report_path, future in zip(reports, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # 工作进程异常退出（如崩溃）时也只记录为该报告失败
+                results.append({
+                    'report': report_path, 'success': False, 'enhanced_path': None,
+                    'error': f"{type(e).__name__}: {e}", 'elapsed': 0.0, 'log': '',
+                    'cache_hits': 0, 'cache_misses': 0,
+                })
+    return results
+
+
+def print_summary(results: List[Dict], wall_time: float, jobs: int):
+    """按报告顺序打印处理日志和耗时汇总"""
+    for result in results:
         print(f"\n{'='*80}")
-        print(f"正在处理: {os.path.basename(report_path)}")
+        print(f"正在处理: {os.path.basename(result['report'])}")
         print(f"{'='*80}")
-        
-        try:
-            enhanced_path = enhancer.enhance_report(report_path)
-            print(f"✅ 成功: {enhanced_path}")
-            success_count += 1
-        except Exception as e:
-            print(f"❌ 失败: {e}")
-    
+        print(result['log'], end='')
+        if result['success']:
+            print(f"✅ 成功: {result['enhanced_path']}")
+        else:
+            print(f"❌ 失败: {result['error']}")
+
+    success_count = sum(1 for r in results if r['success'])
     print(f"\n{'='*80}")
-    print(f"✨ 完成! 成功增强 {success_count}/{len(reports_to_enhance)} 个报告")
+    print("⏱️  各报告耗时")
+    print(f"{'='*80}")
+    for result in results:
+        status = "✅" if result['success'] else "❌"
+        print(f"{status} {os.path.basename(result['report']):<55} {result['elapsed']:>7.2f}s")
+
+    busy_time = sum(r['elapsed'] for r in results)
+    hits = sum(r['cache_hits'] for r in results)
+    misses = sum(r['cache_misses'] for r in results)
+    print(f"\n✨ 完成! 成功增强 {success_count}/{len(results)} 个报告")
+    print(f"   总耗时 {wall_time:.2f}s（累计处理 {busy_time:.2f}s, {jobs} 个进程）")
+    if hits or misses:
+        print(f"📦 缓存: 命中 {hits} 次, 未命中 {misses} 次")
     print(f"{'='*80}\n")
 
+
+def run_batch(reports_to_enhance: List[str], args):
+    """按命令行参数增强一批报告并打印汇总"""
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    jobs = min(jobs, len(reports_to_enhance))
+    print(f"找到 {len(reports_to_enhance)} 个报告需要增强（{jobs} 个进程）\n")
+
+    start = time.perf_counter()
+    results = enhance_reports(
+        reports_to_enhance, jobs=jobs, use_cache=not args.no_cache, chart_backend=args.chart_backend,
+        reports_dir=args.dir
+    )
+    print_summary(results, time.perf_counter() - start, jobs)
+
+
+def collect_chart_garbage(charts_dir: str, dry_run: bool = False):
+    """回收没有任何报告引用的图表"""
+    result = ChartStore(charts_dir).collect_garbage(dry_run=dry_run)
+    action = "可回收" if dry_run else "已回收"
+    print(f"🧹 图表{action}: {len(result['removed'])} 个（{result['bytes'] / 1024:.1f} KB），保留 {result['kept']} 个")
+    for name in result['removed'][:10]:
+        print(f"   - {name}")
+    if len(result['removed']) > 10:
+        print(f"   ... 共 {len(result['removed'])} 个")
+
+
+def main():
+    """批量增强reports目录下的所有.md文件"""
+    parser = argparse.ArgumentParser(description='批量增强reports目录下的报告')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行进程数（默认1，0表示CPU核数）')
+    parser.add_argument('--no-cache', action='store_true', help='忽略阶段缓存，强制重新计算')
+    parser.add_argument('--dir', default='reports', help='报告目录（默认 reports）')
+    parser.add_argument('--chart-backend', default='png', choices=['png', 'svg'], help='图表后端（默认png）')
+    parser.add_argument('--gc-charts', action='store_true', help='处理完成后回收没有报告引用的图表')
+    parser.add_argument('--dry-run', action='store_true', help='配合 --gc-charts，只列出可回收的图表')
+    args = parser.parse_args()
+
+    reports_to_enhance = find_reports(args.dir)
+
+    if not reports_to_enhance:
+        print("✅ 没有找到需要增强的报告")
+    else:
+        run_batch(reports_to_enhance, args)
+
+    if args.gc_charts:
+        collect_chart_garbage(os.path.join(args.dir, 'charts'), args.dry_run)
+
+
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+后台任务服务
+
+Web界面不再在Streamlit脚本线程中同步运行几分钟的分析流程，而是把任务提交到
+SQLite任务队列（storage.job_queue），立即返回任务ID；工作线程领取任务执行，
+把阶段进度写回队列。页面重新运行、切换页面甚至刷新浏览器都不会丢失任务，
+多个用户的任务排队执行，不占用Streamlit的会话线程。
+
+任务类型:
+    report      估值报告        params: company, report_type, save_to_file, generate_pdf ...
+    hotspot     行业热点        params: full（True时生成含龙头的完整热点报告）
+    comparison  多公司比较      params: companies
+
+运行方式:
+    - 默认在Web进程内启动 JOB_WORKERS 个工作线程（get_default_job_service）
+    - JOB_SIDECAR=true 时Web进程只提交任务，由单独的工作进程执行:
+          python job_service.py --workers 2
+"""
+import argparse
+import atexit
+import os
+import socket
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+from progress_bus import EVENT_RUN_FINISHED, EVENT_STAGE, emit, get_default_bus, progress_run
+from storage.job_queue import FINISHED_STATUSES, JobQueue, get_default_job_queue
+
+# 任务处理函数: (params, progress) -> 结果字典；progress(stage, progress, message)
+# 处理函数在以任务ID为运行ID的进度上下文中执行，progress 和流程内部发布的阶段事件都会写回任务队列
+JobHandler = Callable[[Dict, Callable[..., None]], Dict]
+
+
+# 工作线程共用进程内的报告系统和分析器（以及其中的API客户端、限速器和响应缓存）
+def _worker_system():
+    from main import get_shared_system
+    return get_shared_system()
+
+
+def _worker_sector_analyzer():
+    from agents.sector_leader_analyzer import get_shared_sector_analyzer
+    return get_shared_sector_analyzer()
+
+
+def run_report_job(params: Dict, progress: Callable[..., None]) -> Dict:
+    """
+    估值报告：Markdown写完任务即完成，PDF交给后台导出队列，
+    结果的 metadata['pdf_job_id'] / metadata['pdf_path'] 供页面轮询PDF状态
+    """
+    options = dict(params)
+    options.setdefault('async_pdf', True)
+    return _worker_system().generate_report(**options)
+
+
+def run_hotspot_job(params: Dict, progress: Callable[..., None]) -> Dict:
+    """行业热点分析，full=True 时生成含龙头公司的完整热点报告"""
+    analyzer = _worker_sector_analyzer()
+    if params.get('full'):
+        return analyzer.generate_hotspot_report()
+    return analyzer.analyze_market_hotspots()
+
+
+def run_comparison_job(params: Dict, progress: Callable[..., None]) -> Dict:
+    """多公司比较分析"""
+    return _worker_system().compare_companies(params['companies'])
+
+
+DEFAULT_HANDLERS: Dict[str, JobHandler] = {
+    'report': run_report_job,
+    'hotspot': run_hotspot_job,
+    'comparison': run_comparison_job,
+}
+
+
+class JobService:
+    """
+    任务服务：提交、查询任务，并（可选）运行领取任务的工作线程
+
+    同一个任务队列可以被多个进程共用：Web进程提交，sidecar工作进程执行，
+    也可以多个工作进程同时执行（领取是原子的）。
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None, max_workers: int = 2,
+                 handlers: Optional[Dict[str, JobHandler]] = None, poll_interval: float = 1.0):
+        """
+        Args:
+            queue: 任务队列，默认 reports/jobs.db
+            max_workers: 工作线程数（start 后生效）
+            handlers: 任务类型 -> 处理函数，默认 DEFAULT_HANDLERS
+            poll_interval: 空闲时检查队列的间隔（秒），用于领取其他进程提交的任务
+        """
+        self.queue = queue or get_default_job_queue()
+        self.max_workers = max_workers
+        self.handlers = dict(DEFAULT_HANDLERS if handlers is None else handlers)
+        self.poll_interval = poll_interval
+        self._threads: List[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 提交与查询
+    # ------------------------------------------------------------------
+    def submit(self, kind: str, params: Dict, owner: Optional[str] = None) -> str:
+        """提交任务，立即返回任务ID"""
+        if kind not in self.handlers:
+            raise ValueError(f"未知任务类型: {kind}")
+        job_id = self.queue.submit(kind, params, owner=owner)
+        self._wakeup.set()
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """任务状态，额外包含排队位置 'position'"""
+        job = self.queue.status(job_id)
+        if job is not None:
+            job['position'] = self.queue.queue_position(job_id)
+        return job
+
+    def list_jobs(self, owner: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        return self.queue.list_jobs(owner=owner, limit=limit)
+
+    def cancel(self, job_id: str) -> bool:
+        return self.queue.cancel(job_id)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """轮询等待任务结束（超时抛出 TimeoutError）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.status(job_id)
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"等待任务超时: {job_id}")
+            time.sleep(min(self.poll_interval, 0.2))
+
+    # ------------------------------------------------------------------
+    # 工作线程
+    # ------------------------------------------------------------------
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        """启动工作线程（重复调用无副作用），先把崩溃的工作进程遗留的任务重新排队"""
+        with self._lock:
+            if self.running:
+                return
+            recovered = self.queue.requeue_orphans(_worker_exited)
+            if recovered['requeued'] or recovered['failed']:
+                print(f"♻️  恢复中断的任务: 重新排队 {recovered['requeued']} 个，失败 {recovered['failed']} 个")
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+                for i in range(self.max_workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _worker_loop(self):
+        worker = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+        kinds = list(self.handlers)
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(worker, kinds=kinds)
+            except Exception as e:
+                print(f"⚠️  领取任务失败: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._execute(job)
+
+    def _execute(self, job: Dict):
+        job_id = job['job_id']
+        print(f"▶️  开始任务 [{job_id}] {job['kind']}")
+
+        def progress(stage: Optional[str] = None, percent: Optional[int] = None, message: Optional[str] = None):
+            emit(EVENT_STAGE, stage=stage, progress=percent, message=message)
+
+        def record_stage(event: Dict):
+            # 阶段事件写回任务队列（sidecar模式下Web进程只能从队列读取进度）
+            if event['type'] != EVENT_STAGE:
+                return
+            try:
+                self.queue.update_progress(job_id, stage=event.get('stage'), progress=event.get('progress'),
+                                           message=event.get('message'))
+            except Exception as e:
+                print(f"⚠️  任务进度更新失败 [{job_id}]: {e}")
+
+        bus = get_default_bus()
+        start = time.perf_counter()
+        with progress_run(job_id), bus.subscription(record_stage, job_id):
+            try:
+                result = self.handlers[job['kind']](job['params'], progress)
+            except Exception as e:
+                traceback.print_exc()
+                self.queue.fail(job_id, f"{type(e).__name__}: {e}")
+                emit(EVENT_RUN_FINISHED, status='error', error=str(e))
+                print(f"❌ 任务失败 [{job_id}]: {e}")
+                return
+
+        result = result if isinstance(result, dict) else {'status': 'success', 'result': result}
+        if result.get('status', 'success') == 'success':
+            self.queue.finish(job_id, result)
+            print(f"✅ 任务完成 [{job_id}] ({time.perf_counter() - start:.1f}秒)")
+        else:
+            self.queue.fail(job_id, result.get('error') or '未知错误', result)
+            print(f"❌ 任务失败 [{job_id}]: {result.get('error')}")
+        bus.publish(EVENT_RUN_FINISHED, run_id=job_id, status=result.get('status', 'success'),
+                    error=result.get('error'))
+
+    def shutdown(self, wait: bool = True):
+        """停止领取新任务（执行中的任务在 wait=True 时等待完成）"""
+        self._stop.set()
+        self._wakeup.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+
+def _worker_exited(worker: str) -> bool:
+    """工作者（主机:进程号:线程）所在进程是否已退出（其他主机的工作者无法判断，视为存活）"""
+    parts = worker.split(':')
+    if len(parts) < 2 or parts[0] != socket.gethostname() or not parts[1].isdigit():
+        return False
+    pid = int(parts[1])
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+_default_service: Optional[JobService] = None
+_default_service_lock = threading.Lock()
+
+
+def get_default_job_service(start_workers: Optional[bool] = None) -> JobService:
+    """
+    进程内共享的任务服务
+
+    Args:
+        start_workers: 是否在本进程运行工作线程，默认取决于 config.JOB_SIDECAR（sidecar模式下不运行）
+    """
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            from config import JOB_WORKERS
+            _default_service = JobService(max_workers=JOB_WORKERS)
+            atexit.register(_default_service.shutdown, False)
+        if start_workers is None:
+            from config import JOB_SIDECAR
+            start_workers = not JOB_SIDECAR
+    if start_workers:
+        _default_service.start()
+    return _default_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description='后台任务工作进程（sidecar）')
+    parser.add_argument('--workers', type=int, default=None, help='工作线程数（默认 config.JOB_WORKERS）')
+    parser.add_argument('--purge-days', type=float, default=7, help='启动时删除多少天前结束的任务记录')
+    args = parser.parse_args()
+
+    service = get_default_job_service(start_workers=False)
+    if args.workers:
+        service.max_workers = args.workers
+    purged = service.queue.purge(args.purge_days)
+    if purged:
+        print(f"🧹 删除 {purged} 条旧任务记录")
+    service.start()
+    print(f"🚀 任务工作进程已启动: {service.max_workers} 个工作线程，队列 {service.queue.db_path}")
+    from retention_service import get_default_retention_service
+    retention = get_default_retention_service()
+    if retention.running:
+        print(f"🧹 保留策略已启用: {retention.engine.policy.describe()}")
+    try:
+        while service.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n⏹️  停止领取新任务，等待执行中的任务完成...")
+        service.shutdown(wait=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,12 +2,28 @@
 深度估值报告系统 - 主程序
 整合Sonar实时搜索和Qwen3Max深度推理
 """
+import os
+import threading
 import time
+import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Optional
 from agents import QueryPlannerAgent, InformationCollectorAgent, DeepAnalystAgent
 from agents.professional_formatter import ProfessionalReportFormatter
-from api_clients import SonarClient, QwenClient
+from api_clients import get_shared_qwen_client, get_shared_sonar_client
+from storage import MetricsStore, get_default_catalog, get_default_search_index, get_default_writer
+from storage.report_catalog import STATUS_PENDING, STATUS_READY
+from pdf_export import get_default_queue, PDF_JOB_DONE, PDF_JOB_FAILED, PDF_JOB_QUEUED
+from progress_bus import EVENT_PDF, EVENT_STAGE, current_run_id, emit, progress_run
+
+
+def _progress_reporter(on_progress: Optional[Callable[..., None]] = None) -> Callable[..., None]:
+    """阶段进度函数 (stage, progress, message)：发布到进度事件总线，并转给调用方的回调"""
+    def progress(stage: str, percent: int, message: Optional[str] = None):
+        emit(EVENT_STAGE, stage=stage, progress=percent, message=message)
+        if on_progress:
+            on_progress(stage, percent, message)
+    return progress
 
 
 class ValuationReportSystem:
@@ -20,10 +36,15 @@ class ValuationReportSystem:
     3. DeepAnalyst (Qwen深度) -> 生成专业报告
     """
     
-    def __init__(self):
+    def __init__(self, sonar_client=None, qwen_client=None):
+        """
+        Args:
+            sonar_client: Sonar客户端，默认使用进程内共享的客户端（共用限速、缓存和连接池）
+            qwen_client: Qwen客户端，默认同上
+        """
         # 初始化API客户端
-        self.sonar_client = SonarClient()
-        self.qwen_client = QwenClient()
+        self.sonar_client = sonar_client or get_shared_sonar_client()
+        self.qwen_client = qwen_client or get_shared_qwen_client()
         
         # 初始化Agents
         self.query_planner = QueryPlannerAgent(self.qwen_client)
@@ -31,6 +52,21 @@ class ValuationReportSystem:
         self.deep_analyst = DeepAnalystAgent(self.qwen_client)
         self.professional_formatter = ProfessionalReportFormatter()
         
+        # 结构化指标库
+        self.metrics_store = MetricsStore()
+        
+        # 报告目录索引（Web历史页面按索引分页查询）
+        self.report_catalog = get_default_catalog()
+        
+        # 报告全文索引（章节和引用来源）
+        self.search_index = get_default_search_index()
+        
+        # 报告写入器（暂存后原子发布，启动时恢复崩溃遗留的写入）
+        self.report_writer = get_default_writer()
+        
+        # 后台PDF导出队列（进程内共享）
+        self.pdf_queue = get_default_queue()
+        
     def generate_report(
         self,
         company: str,
@@ -38,11 +74,17 @@ class ValuationReportSystem:
         report_type: str = "comprehensive",
         save_to_file: bool = True,
         generate_pdf: bool = True,  # 默认生成PDF
-        keep_markdown: bool = True  # 是否保留Markdown文件
+        keep_markdown: bool = True,  # 是否保留Markdown文件
+        async_pdf: bool = False,  # PDF是否在后台队列中生成
+        on_progress: Optional[Callable[..., None]] = None,  # 阶段进度回调
+        run_id: Optional[str] = None  # 进度事件所属的运行ID
     ) -> dict:
         """
         生成完整的估值报告
         
+        生成过程中向进度事件总线（progress_bus）发布阶段、逐条搜索结果、
+        报告章节和PDF状态事件，Web界面订阅后增量显示
+        
         Args:
             company: 公司名称或股票代码
             analysis_type: 分析类型
@@ -50,10 +92,28 @@ class ValuationReportSystem:
             save_to_file: 是否保存到文件
             generate_pdf: 是否生成PDF版本（默认True）
             keep_markdown: 是否保留Markdown文件（默认True）
+            async_pdf: 在后台队列中生成PDF，Markdown写完即返回；
+                metadata['pdf_job_id'] 为导出任务ID，完成后 metadata['pdf_file'] 被填入
+            on_progress: 进度回调 (stage, progress, message)，progress为0-100
+            run_id: 进度事件的运行ID，默认沿用当前运行（如后台任务ID），否则新建
             
         Returns:
             包含报告内容的字典
         """
+        run_id = run_id or current_run_id() or uuid.uuid4().hex[:12]
+        with progress_run(run_id):
+            result = self._generate_report(
+                company, analysis_type, report_type, save_to_file, generate_pdf, keep_markdown,
+                async_pdf, _progress_reporter(on_progress)
+            )
+            if result.get("status") == "success":
+                result["metadata"]["run_id"] = run_id
+                emit(EVENT_STAGE, stage="done", progress=100, message="报告已生成")
+            return result
+    
+    def _generate_report(self, company: str, analysis_type: str, report_type: str, save_to_file: bool,
+                         generate_pdf: bool, keep_markdown: bool, async_pdf: bool, progress) -> dict:
+        """generate_report 的主流程（在进度运行上下文中执行）"""
         print("="*80)
         print(f"🚀 深度估值报告系统")
         print(f"📊 分析对象: {company}")
@@ -63,6 +123,7 @@ class ValuationReportSystem:
         start_time = time.time()
         
         # 阶段1: 查询规划（Qwen轻量调用）
+        progress("planning", 5, "智能查询规划...")
         print("\n【阶段1/3】查询规划")
         print("-"*80)
         query_plan = self.query_planner.generate_search_plan(company, analysis_type)
@@ -75,6 +136,7 @@ class ValuationReportSystem:
             print(f"   {i}. [{q['priority']}] {q['purpose']}: {q['query'][:60]}...")
         
         # 阶段2: 信息收集（Sonar并行调用）
+        progress("collecting", 15, f"并行收集实时信息（{len(query_plan['plan']['queries'])} 个查询）...")
         print("\n【阶段2/3】信息收集")
         print("-"*80)
         collection_result = self.information_collector.collect_information(query_plan)
@@ -86,6 +148,7 @@ class ValuationReportSystem:
         formatted_info = self.information_collector.format_for_analysis(collection_result)
         
         # 阶段3: 深度分析（Qwen深度推理）
+        progress("analyzing", 45, f"深度分析生成报告（{collection_result['success_count']} 条有效信息）...")
         print("\n【阶段3/3】深度分析")
         print("-"*80)
         
@@ -107,6 +170,7 @@ class ValuationReportSystem:
         elapsed_time = time.time() - start_time
         
         # 如果报告包含JSON，更新元数据并重新格式化
+        all_citations = []
         if "report_json" in analysis_result and analysis_result.get("report_json"):
             metadata = {
                 "elapsed_time": elapsed_time,
@@ -115,7 +179,6 @@ class ValuationReportSystem:
             }
             
             # 收集所有citations
-            all_citations = []
             for result in collection_result.get("results", []):
                 if result.get("status") == "success" and result.get("citations"):
                     for citation in result["citations"]:
@@ -123,7 +186,8 @@ class ValuationReportSystem:
                             all_citations.append(citation)
             
             # 重新生成专业格式报告（带正确的元数据和citations）
-            analysis_result["report"] = self.professional_formatter.format_professional_report(
+            # 表格编号计数器属于单份报告，每次用新的格式化器（系统实例可被多个会话同时使用）
+            analysis_result["report"] = ProfessionalReportFormatter().format_professional_report(
                 company,
                 analysis_result["report_json"],
                 metadata,
@@ -152,45 +216,90 @@ class ValuationReportSystem:
         
         # 保存到文件
         if save_to_file:
+            progress("saving", 85, "保存并增强报告...")
             filename = self._save_report(company, result)
             result["metadata"]["saved_file"] = filename
             
-            # 生成PDF（默认启用）
+            # 生成PDF（默认启用）：直接使用内存中的报告结构，不再回读Markdown
             if generate_pdf:
-                pdf_filename = self._generate_pdf_report(filename, company, analysis_result.get("report_json"))
-                if pdf_filename:
-                    result["metadata"]["pdf_file"] = pdf_filename
-                    print(f"📄 PDF报告已生成: {pdf_filename}")
-                    
-                    # 如果不保留Markdown，删除它
-                    if not keep_markdown:
-                        import os
-                        try:
-                            os.remove(filename)
-                            # 同时删除enhanced版本（如果存在）
-                            enhanced_file = filename.replace('.md', '_enhanced.md')
-                            if os.path.exists(enhanced_file):
-                                os.remove(enhanced_file)
-                            print(f"🗑️  已删除临时Markdown文件")
-                            result["metadata"].pop("saved_file", None)
-                        except Exception as e:
-                            print(f"⚠️  删除Markdown文件失败: {e}")
+                progress("pdf", 95, "生成PDF...")
+                pdf_data = self._build_pdf_data(analysis_result.get("report_json"), result["metadata"], all_citations)
+                if async_pdf and pdf_data:
+                    self._submit_pdf_export(filename, company, pdf_data, result, keep_markdown)
                 else:
-                    print(f"⚠️  PDF生成失败，保留Markdown: {filename}")
+                    pdf_filename = self._generate_pdf_report(filename, company, pdf_data)
+                    emit(EVENT_PDF, status=PDF_JOB_DONE if pdf_filename else PDF_JOB_FAILED, pdf_path=pdf_filename)
+                    self._finish_pdf(filename, pdf_filename, result, keep_markdown)
             else:
                 print(f"💾 Markdown报告已保存: {filename}")
         
         return result
     
+    def _submit_pdf_export(self, markdown_path: str, company: str, pdf_data: dict, result: dict, keep_markdown: bool) -> str:
+        """把PDF生成提交到后台导出队列，任务结束后更新 result 的元数据"""
+        from config import PDF_PARALLEL
+        
+        def on_done(job: dict):
+            self._finish_pdf(markdown_path, job['pdf_path'] if job['status'] == PDF_JOB_DONE else None, result, keep_markdown)
+            result["metadata"]["pdf_status"] = job['status']
+        
+        pdf_path = markdown_path.replace('.md', '.pdf')
+        job_id = self.pdf_queue.submit(company, pdf_data, pdf_path, on_done=on_done, parallel=PDF_PARALLEL)
+        result["metadata"]["pdf_job_id"] = job_id
+        result["metadata"]["pdf_path"] = pdf_path
+        self._catalog_report(pdf_path, company, status=STATUS_PENDING)
+        result["metadata"]["pdf_status"] = PDF_JOB_QUEUED
+        print(f"📄 PDF已加入后台导出队列 (任务 {job_id})")
+        print(f"💾 Markdown报告已保存: {markdown_path}")
+        return job_id
+    
+    def get_pdf_status(self, job_id: str) -> Optional[dict]:
+        """查询后台PDF导出任务状态（queued / running / done / failed）"""
+        return self.pdf_queue.status(job_id)
+    
+    def _finish_pdf(self, markdown_path: str, pdf_filename: Optional[str], result: dict, keep_markdown: bool):
+        """PDF生成结束后记录路径，并按需删除Markdown"""
+        if not pdf_filename:
+            print(f"⚠️  PDF生成失败，保留Markdown: {markdown_path}")
+            self._uncatalog_report(markdown_path.replace('.md', '.pdf'))
+            return
+        
+        result["metadata"]["pdf_file"] = pdf_filename
+        print(f"📄 PDF报告已生成: {pdf_filename}")
+        
+        # PDF登记到报告清单；不保留Markdown时在同一事务中删除原始版和增强版
+        enhanced_file = markdown_path.replace('.md', '_enhanced.md')
+        try:
+            with self.report_writer.open(self._report_stem(markdown_path)) as txn:
+                txn.adopt(pdf_filename)
+                if not keep_markdown:
+                    txn.delete(markdown_path)
+                    txn.delete(enhanced_file)
+        except Exception as e:
+            print(f"⚠️  报告清单更新失败: {e}")
+            keep_markdown = True
+        self._catalog_report(pdf_filename, result.get("company"))
+        
+        if not keep_markdown:
+            for path in (markdown_path, enhanced_file):
+                self._uncatalog_report(path)
+            self._unindex_report(markdown_path)
+            print(f"🗑️  已删除临时Markdown文件")
+            result["metadata"].pop("saved_file", None)
+    
+    @staticmethod
+    def _report_stem(report_path: str) -> str:
+        """报告名（报告清单和写入事务以它为键）"""
+        return os.path.splitext(os.path.basename(report_path))[0]
+    
     def _save_report(self, company: str, result: dict) -> str:
-        """保存报告到文件（自动格式化）"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_company = company.replace(" ", "_").replace("/", "_")
-        filename = f"reports/{safe_company}_{timestamp}.md"
+        """
+        保存报告到文件（自动格式化）
         
-        # 创建reports目录
-        import os
-        os.makedirs("reports", exist_ok=True)
+        原始版和增强版先写入暂存目录，在同一个事务中原子发布到 reports/；
+        发布之后才登记目录、全文索引和指标，Web界面不会读到写了一半的文件
+        """
+        safe_company = company.replace(" ", "_").replace("/", "_")
         
         # 准备报告内容
         report_content = f"# {company} 估值报告\n\n"
@@ -204,25 +313,91 @@ class ValuationReportSystem:
         # 格式化报告（转换HTML表格为Markdown）
         formatted_content = self._format_report_content(report_content)
         
-        # 写入报告
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(formatted_content)
+        # 报告名（公司_时间）由写入器分配，同一秒内的并发报告不会互相覆盖
+        enhancer, enhanced_filename = None, None
+        with self.report_writer.begin(safe_company) as txn:
+            filename = txn.write_text(f"{txn.stem}.md", formatted_content)
+            
+            # 🆕 自动增强报告（修复表格格式并生成图表）
+            try:
+                from report_enhancer import ReportEnhancer
+                from chart_renderer import get_default_service
+                # 图表在后台进程中渲染，不阻塞报告保存和PDF生成
+                from config import CHART_BACKEND
+                enhancer = ReportEnhancer(chart_service=get_default_service(), chart_backend=CHART_BACKEND,
+                                          report_writer=self.report_writer)
+                enhanced_content = enhancer.enhance_content(formatted_content, filename, async_charts=True)
+                enhanced_filename = txn.write_text(enhancer.enhanced_path(filename), enhanced_content)
+            except Exception as e:
+                print(f"\n⚠️  报告增强跳过: {e}")
+                print(f"   可以手动运行: python report_enhancer.py {filename}")
+        self._catalog_report(filename, company)
         
-        # 🆕 自动增强报告（修复表格格式并生成图表）
-        try:
-            from report_enhancer import ReportEnhancer
-            enhancer = ReportEnhancer()
-            enhanced_filename = enhancer.enhance_report(filename)
+        metrics_source = filename
+        if enhanced_filename:
+            try:
+                # 增强版已发布：登记图表引用、提交后台图表渲染
+                enhancer.finish_enhancement(formatted_content, filename, enhanced_filename)
+            except Exception as e:
+                print(f"⚠️  图表登记跳过: {e}")
+            metrics_source = enhanced_filename
+            self._catalog_report(enhanced_filename, company)
             print(f"\n✨ 报告已自动增强: {enhanced_filename}")
             print(f"   - 修复了表格格式")
             print(f"   - 生成了数据可视化图表")
             print(f"   - 清理了格式问题")
-        except Exception as e:
-            print(f"\n⚠️  报告增强跳过: {e}")
-            print(f"   可以手动运行: python report_enhancer.py {filename}")
+        
+        # 🆕 抽取结构化指标入库（供比较分析、图表和Web界面直接查询）
+        self._store_metrics(company, metrics_source)
+        
+        # 🆕 写入全文索引（优先增强版，同一报告只索引一份）
+        self._index_report(company, metrics_source)
         
         return filename
     
+    def _catalog_report(self, report_path: str, company: Optional[str], status: str = STATUS_READY):
+        """在报告目录索引中登记报告文件"""
+        try:
+            self.report_catalog.record(report_path, company=company, status=status)
+        except Exception as e:
+            print(f"⚠️  报告目录登记跳过: {e}")
+    
+    def _uncatalog_report(self, report_path: str):
+        """报告文件删除后移出报告目录索引"""
+        try:
+            self.report_catalog.remove(report_path)
+        except Exception as e:
+            print(f"⚠️  报告目录更新跳过: {e}")
+    
+    def _index_report(self, company: str, report_path: str):
+        """将报告章节写入全文索引"""
+        try:
+            self.search_index.index_report(report_path, company=company)
+        except Exception as e:
+            print(f"⚠️  全文索引跳过: {e}")
+    
+    def _unindex_report(self, report_path: str):
+        """报告Markdown删除后移出全文索引"""
+        try:
+            self.search_index.remove_report(report_path)
+        except Exception as e:
+            print(f"⚠️  全文索引更新跳过: {e}")
+    
+    def search_reports(self, query: str, company: Optional[str] = None, since: Optional[str] = None,
+                       until: Optional[str] = None, limit: int = 20) -> list:
+        """全文检索已保存的报告（见 ReportSearchIndex.search）"""
+        return self.search_index.search(query, company=company, since=since, until=until, limit=limit)
+    
+    def _store_metrics(self, company: str, report_path: str) -> int:
+        """将报告表格中的指标写入本地指标库"""
+        try:
+            count = self.metrics_store.ingest_report(report_path, company=company)
+            print(f"📊 已入库 {count} 条结构化指标")
+            return count
+        except Exception as e:
+            print(f"⚠️  指标入库跳过: {e}")
+            return 0
+    
     def _format_report_content(self, content: str) -> str:
         """格式化报告内容（转换HTML表格为Markdown）"""
         import re
@@ -284,100 +459,80 @@ class ValuationReportSystem:
         
         return content
     
-    def _generate_pdf_report(self, markdown_path: str, company: str, report_json: dict = None) -> str:
+    def _build_pdf_data(self, report_json: Optional[dict], metadata: dict, citations: list) -> Optional[dict]:
+        """
+        由内存中的报告结构构建PDF数据
+        
+        report_json 在深度分析阶段已经过 WordFixer 和格式增强处理，这里直接使用；
+        References 与Markdown报告使用同一份格式化结果，只需修复一次
+        
+        Args:
+            report_json: 深度分析返回的报告JSON（快速分析时为空）
+            metadata: 报告元数据
+            citations: 去重后的引用来源
+            
+        Returns:
+            PDF数据，没有报告JSON时返回None
+        """
+        if not report_json:
+            return None
+        
+        from agents.word_fixer import WordFixer
+        
+        # 准备报告数据（不包含Executive Summary，已删除（用户要求））
+        pdf_data = {
+            'metadata': {
+                'timestamp': metadata['timestamp'],
+                'queries_successful': metadata['queries_successful'],
+                'queries_total': metadata['queries_executed'],
+            },
+            'fundamentalAnalysis': report_json.get('fundamentalAnalysis', ''),
+            'businessSegments': report_json.get('businessSegments', ''),
+            'growthCatalysts': report_json.get('growthCatalysts', ''),
+            'valuationAnalysis': report_json.get('valuationAnalysis', ''),
+        }
+        
+        if 'aiInsights' in report_json:
+            pdf_data['aiInsights'] = report_json['aiInsights']
+        
+        references = self.professional_formatter.format_references(citations).strip()
+        if references:
+            pdf_data['references'] = WordFixer.fix_all_issues(references)
+        
+        return pdf_data
+    
+    def _generate_pdf_report(self, markdown_path: str, company: str, pdf_data: Optional[dict] = None) -> str:
         """
         生成PDF报告
         
         Args:
-            markdown_path: Markdown报告路径
+            markdown_path: Markdown报告路径（PDF保存在同目录同名）
             company: 公司名称
-            report_json: 报告JSON数据（可选）
+            pdf_data: _build_pdf_data 构建的PDF数据（可选）
             
         Returns:
             PDF文件路径
         """
         try:
             from pdf_generator import ProfessionalPDFGenerator
-            import os
             
             print(f"\n📄 正在生成PDF报告...")
             
             # 准备PDF输出路径
             pdf_path = markdown_path.replace('.md', '.pdf')
             
-            # 如果有JSON数据，直接使用
-            if report_json:
-                # 读取markdown文件获取元数据和Executive Summary
-                with open(markdown_path, 'r', encoding='utf-8') as f:
-                    md_content = f.read()
-                
-                # 提取元数据
-                import re
-                metadata = {}
-                timestamp_match = re.search(r'\*\*生成时间\*\*: (.+)', md_content)
-                if timestamp_match:
-                    metadata['timestamp'] = timestamp_match.group(1)
-                
-                queries_match = re.search(r'\*\*查询数\*\*: (\d+)/(\d+)', md_content)
-                if queries_match:
-                    metadata['queries_successful'] = int(queries_match.group(1))
-                    metadata['queries_total'] = int(queries_match.group(2))
-                
-                # 提取Executive Summary（从Markdown中）
-                exec_summary = ""
-                exec_summary_match = re.search(
-                    r'## Executive Summary\s*\n(.*?)(?=\n##|\Z)',
-                    md_content,
-                    re.DOTALL
-                )
-                if exec_summary_match:
-                    exec_summary = exec_summary_match.group(1).strip()
-                    print(f"   ✅ Executive Summary已提取 ({len(exec_summary)} 字符)")
-                
-                # 提取References（从Markdown中）
-                references = ""
-                references_match = re.search(
-                    r'## 📚 References and Citations\s*\n(.*?)(?=\n##|\Z)',
-                    md_content,
-                    re.DOTALL
-                )
-                if references_match:
-                    references = references_match.group(1).strip()
-                    print(f"   ✅ References已提取 ({len(references)} 字符)")
-                
-                # 文本清理 - 使用WordFixer直接修复所有问题
-                from agents.word_fixer import WordFixer
-                print("   🧹 修复单词拆分问题...")
-                
-                # 使用WordFixer直接修复所有章节的文本
-                cleaned_fundamental = WordFixer.fix_all_issues(report_json.get('fundamentalAnalysis', ''))
-                cleaned_business = WordFixer.fix_all_issues(report_json.get('businessSegments', ''))
-                cleaned_growth = WordFixer.fix_all_issues(report_json.get('growthCatalysts', ''))
-                cleaned_valuation = WordFixer.fix_all_issues(report_json.get('valuationAnalysis', ''))
-                
-                # 准备报告数据（不包含Executive Summary）
-                report_data = {
-                    'metadata': metadata,
-                    # 'executiveSummary': exec_summary,  # 已删除（用户要求）
-                    'fundamentalAnalysis': cleaned_fundamental,
-                    'businessSegments': cleaned_business,
-                    'growthCatalysts': cleaned_growth,
-                    'valuationAnalysis': cleaned_valuation
-                }
-                
-                # 如果有AI洞察，也包含进去（使用WordFixer修复）
-                if 'aiInsights' in report_json:
-                    report_data['aiInsights'] = WordFixer.fix_all_issues(report_json['aiInsights'])
-                    print(f"   ✅ AI Insights已包含（已修复）")
-                
-                # 如果有References，也包含进去（使用WordFixer修复）
-                if references:
-                    report_data['references'] = WordFixer.fix_all_issues(references)
-                    print(f"   ✅ References已包含（已修复）")
+            # 如果有报告数据，直接使用
+            if pdf_data:
+                if pdf_data.get('aiInsights'):
+                    print(f"   ✅ AI Insights已包含")
+                if pdf_data.get('references'):
+                    print(f"   ✅ References已包含 ({len(pdf_data['references'])} 字符)")
                 
                 # 生成PDF
+                from config import PDF_PARALLEL
                 generator = ProfessionalPDFGenerator()
-                generator.generate_report_pdf(company, report_data, pdf_path)
+                with self.report_writer.open(self._report_stem(markdown_path)) as txn:
+                    generator.generate_report_pdf(company, pdf_data, txn.stage_path(pdf_path), parallel=PDF_PARALLEL)
                 
             else:
                 # 从Markdown转换（备用方案）
@@ -401,13 +556,21 @@ class ValuationReportSystem:
         else:
             return f"分析失败: {result.get('error', '未知错误')}"
     
-    def compare_companies(self, companies: list) -> dict:
-        """比较多个公司"""
+    def compare_companies(self, companies: list, on_progress: Optional[Callable[..., None]] = None) -> dict:
+        """
+        比较多个公司
+        
+        Args:
+            companies: 公司名称列表
+            on_progress: 进度回调 (stage, progress, message)，同 generate_report
+        """
         print(f"🔄 比较分析: {', '.join(companies)}")
+        progress = _progress_reporter(on_progress)
         
         companies_data = {}
         
-        for company in companies:
+        for i, company in enumerate(companies):
+            progress("collecting", int(i * 70 / len(companies)), f"正在收集 {company} 的信息...")
             print(f"\n正在收集 {company} 的信息...")
             query_plan = self.query_planner.generate_search_plan(company)
             collection_result = self.information_collector.collect_information(query_plan)
@@ -415,10 +578,50 @@ class ValuationReportSystem:
                 collection_result
             )
         
+        # 已入库的结构化指标直接查询，无需重新解析报告文本
+        stored_metrics = self.metrics_store.format_comparison_table(companies)
+        if stored_metrics:
+            print("📊 已加载历史报告中的结构化指标")
+            for company in companies:
+                companies_data[company] += (
+                    "\n\n## 历史报告结构化指标（本地指标库）\n\n"
+                    + self._format_stored_metrics(company)
+                )
+        
         print("\n正在生成比较分析...")
+        progress("analyzing", 75, "正在生成比较分析...")
         comparison_result = self.deep_analyst.compare_companies(companies_data)
+        if stored_metrics:
+            comparison_result["metrics_table"] = stored_metrics
         
         return comparison_result
+    
+    def _format_stored_metrics(self, company: str, limit: int = 30) -> str:
+        """将某公司最新报告中的指标格式化为Markdown表格"""
+        rows = self.metrics_store.latest_metrics(company)[:limit]
+        if not rows:
+            return "暂无数据\n"
+        lines = ["| Metric | Period | Value |", "| --- | --- | --- |"]
+        for row in rows:
+            lines.append(f"| {row['metric']} | {row['period']} | {row['raw_value']} |")
+        return "\n".join(lines) + "\n"
+
+
+_shared_system: Optional[ValuationReportSystem] = None
+_shared_system_lock = threading.Lock()
+
+
+def get_shared_system() -> ValuationReportSystem:
+    """
+    进程内共享的报告系统（Web界面各会话和后台工作线程共用）
+
+    系统实例在生成报告过程中不保存会话状态，客户端、指标库、目录索引本身都是线程安全的。
+    """
+    global _shared_system
+    with _shared_system_lock:
+        if _shared_system is None:
+            _shared_system = ValuationReportSystem()
+        return _shared_system
 
 
 def main():
@@ -34,6 +34,98 @@ def extract_financial_data_from_text(text):
     
     return data
 
+CHART_METRICS = ['Revenue', 'Net Income', 'Gross Margin']
+
+
+def load_metrics_from_store(report_path, db_path="reports/metrics.db"):
+    """
+    从指标库读取该报告的核心指标
+
+    Returns:
+        (periods, {metric: {period: value}})，无数据时返回None
+    """
+    if not os.path.exists(db_path):
+        return None
+    try:
+        from storage import MetricsStore
+        store = MetricsStore(db_path)
+        basename = os.path.basename(report_path)
+        rows = store.query(source_report=basename)
+        if not rows and '_enhanced' not in basename:
+            rows = store.query(source_report=basename.replace('.md', '_enhanced.md'))
+    except Exception as e:
+        print(f"   ⚠️  读取指标库失败: {e}")
+        return None
+    
+    values = {}
+    periods = []
+    for row in rows:
+        if row['metric'] not in CHART_METRICS or row['unit'] in ('bps',):
+            continue
+        # 同比变化列不作为期间
+        if 'change' in row['period'].lower() or 'yoy' in row['period'].lower():
+            continue
+        values.setdefault(row['metric'], {}).setdefault(row['period'], row['value'])
+        if row['period'] not in periods:
+            periods.append(row['period'])
+    if not values or not periods:
+        return None
+    return periods[:2], values
+
+
+def render_stored_metrics_chart(report_path, content, stored):
+    """用指标库中的数据绘制对比柱状图"""
+    periods, values = stored
+    metrics = [m for m in CHART_METRICS if m in values]
+    print(f"   → 使用指标库数据: {', '.join(metrics)} ({' vs '.join(periods)})")
+    
+    fig, ax = plt.subplots(figsize=(12, 7))
+    x = range(len(metrics))
+    width = 0.8 / len(periods)
+    colors = ['#2E86AB', '#A23B72']
+    for i, period in enumerate(periods):
+        series = [values[m].get(period, 0) for m in metrics]
+        offset = width * i - (width * len(periods) / 2 - width / 2)
+        bars = ax.bar([pos + offset for pos in x], series, width, label=period, color=colors[i % len(colors)])
+        for bar in bars:
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height, f'{height:.1f}',
+                    ha='center', va='bottom', fontsize=10, fontweight='bold')
+    
+    ax.set_xlabel('Financial Metrics', fontsize=13, fontweight='bold')
+    ax.set_ylabel('Value', fontsize=13, fontweight='bold')
+    ax.set_title(f"Financial Performance - {' vs '.join(periods)}", fontsize=15, fontweight='bold', pad=20)
+    ax.set_xticks(x)
+    ax.set_xticklabels(metrics, fontsize=11)
+    ax.legend(fontsize=11)
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+    plt.tight_layout()
+    
+    os.makedirs('reports/charts', exist_ok=True)
+    report_name = os.path.basename(report_path).replace('.md', '')
+    chart_filename = f"{report_name}_manual_chart.png"
+    chart_path = os.path.join('reports/charts', chart_filename)
+    plt.savefig(chart_path, dpi=150, bbox_inches='tight')
+    plt.close()
+    print(f"   ✅ 图表已生成: {chart_path}")
+    
+    enhanced_content = content.rstrip() + f"""
+
+---
+
+## 📊 财务数据可视化
+
+![Financial Chart](charts/{chart_filename})
+
+*数据来源：结构化指标库*
+"""
+    enhanced_path = report_path.replace('.md', '_with_chart.md')
+    with open(enhanced_path, 'w', encoding='utf-8') as f:
+        f.write(enhanced_content)
+    print(f"   ✅ 图表已插入报告: {enhanced_path}")
+    return enhanced_path
+
+
 def generate_financial_chart(report_path):
     """为报告生成财务图表"""
     print(f"📊 正在为 {os.path.basename(report_path)} 生成图表...")
@@ -45,6 +137,11 @@ def generate_financial_chart(report_path):
     # 提取数据
     print("   → 提取财务数据...")
     
+    # 优先从结构化指标库读取（报告生成时已入库）
+    stored = load_metrics_from_store(report_path)
+    if stored:
+        return render_stored_metrics_chart(report_path, content, stored)
+    
     # 方法1：从文本段落中提取
     q2_section = re.search(r'Q2 FY2026.*?(?=Q1 FY2026|---)', content, re.DOTALL | re.IGNORECASE)
     if q2_section:
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+后台PDF导出队列
+
+- generate_report 写完Markdown即可返回，PDF排版在后台线程中进行
+- 每个导出任务有唯一ID，调用方（CLI、Web界面）按ID轮询状态：
+  queued（排队）→ running（排版中）→ done（完成）/ failed（失败）
+- 排版结束后先调用 on_done 回调（由调用方把PDF路径写回报告结果、登记清单），
+  回调返回后任务才标记为 done/failed，轮询到 done 时PDF已可下载
+"""
+import atexit
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from progress_bus import EVENT_PDF, current_run_id, get_default_bus
+
+PDF_JOB_QUEUED = 'queued'
+PDF_JOB_RUNNING = 'running'
+PDF_JOB_DONE = 'done'
+PDF_JOB_FAILED = 'failed'
+
+# 最多保留的已结束任务记录（更早的记录按完成顺序丢弃）
+MAX_FINISHED_JOBS = 200
+
+
+def export_report_pdf(company: str, pdf_data: Dict, pdf_path: str, **options) -> str:
+    """默认导出函数：用 ProfessionalPDFGenerator 生成PDF，返回PDF路径"""
+    # 在工作线程中才导入ReportLab，创建队列本身不增加启动开销
+    from pdf_generator import ProfessionalPDFGenerator
+    from storage.report_files import get_default_store
+
+    # 在内存中排版，写盘的同时放入文件缓存，下载刚生成的PDF时不必再读盘
+    pdf_bytes = ProfessionalPDFGenerator().generate_report_pdf_bytes(company, pdf_data, **options)
+    get_default_store().write_bytes(pdf_path, pdf_bytes)
+    return pdf_path
+
+
+class PDFExportQueue:
+    """后台PDF导出队列（线程池，任务按提交顺序执行）"""
+
+    def __init__(self, max_workers: int = 1, exporter: Optional[Callable[..., str]] = None):
+        """
+        Args:
+            max_workers: 同时排版的PDF数（ReportLab排版是CPU密集型，默认1个）
+            exporter: 导出函数 (company, pdf_data, pdf_path, **options) -> pdf_path，默认 export_report_pdf
+        """
+        self.max_workers = max_workers
+        self.exporter = exporter or export_report_pdf
+        self._executor = None
+        self._jobs: Dict[str, Dict] = {}
+        self._futures: Dict[str, Future] = {}
+        self._finished: List[str] = []
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pdf-export')
+        return self._executor
+
+    def submit(self, company: str, pdf_data: Dict, pdf_path: str,
+               on_done: Optional[Callable[[Dict], None]] = None, **options) -> str:
+        """
+        提交PDF导出任务，立即返回任务ID
+
+        Args:
+            company: 公司名称
+            pdf_data: PDF数据（见 ValuationReportSystem._build_pdf_data）
+            pdf_path: PDF输出路径
+            on_done: 排版结束（成功或失败）后、任务标记为结束前调用，参数为最终状态
+            options: 传给导出函数的其他参数（如 parallel）
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            'job_id': job_id,
+            'company': company,
+            'pdf_path': pdf_path,
+            'status': PDF_JOB_QUEUED,
+            'error': None,
+            'submitted_at': datetime.now().isoformat(timespec='seconds'),
+            'finished_at': None,
+            'elapsed': None,
+            # 提交时所在的运行（报告生成流程），导出线程中的进度事件归属于它
+            'run_id': current_run_id(),
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._futures[job_id] = self._get_executor().submit(
+                self._run, job_id, company, pdf_data, pdf_path, on_done, options
+            )
+        self._publish(job)
+        return job_id
+
+    def _run(self, job_id: str, company: str, pdf_data: Dict, pdf_path: str,
+             on_done: Optional[Callable[[Dict], None]], options: Dict):
+        self._update(job_id, status=PDF_JOB_RUNNING)
+        start = time.perf_counter()
+        try:
+            result_path = self.exporter(company, pdf_data, pdf_path, **options)
+            changes = {'status': PDF_JOB_DONE, 'pdf_path': result_path or pdf_path}
+        except Exception as e:
+            print(f"⚠️  PDF导出失败 [{job_id}]: {e}")
+            traceback.print_exc()
+            changes = {'status': PDF_JOB_FAILED, 'error': f"{type(e).__name__}: {e}"}
+
+        # 回调拿到的是最终状态，但在回调完成前轮询方仍看到 running
+        if on_done:
+            try:
+                on_done(dict(self.status(job_id), **changes))
+            except Exception as e:
+                print(f"⚠️  PDF导出回调失败 [{job_id}]: {e}")
+
+        changes['elapsed'] = time.perf_counter() - start
+        changes['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        self._update(job_id, **changes)
+        self._publish(self.status(job_id))
+        self._record_finished(job_id)
+
+    def _update(self, job_id: str, **changes):
+        with self._lock:
+            self._jobs[job_id].update(changes)
+        if changes.get('status') == PDF_JOB_RUNNING:
+            self._publish(self.status(job_id))
+
+    @staticmethod
+    def _publish(job: Optional[Dict]):
+        """向提交任务的运行发布PDF状态事件"""
+        if job and job.get('run_id'):
+            get_default_bus().publish(EVENT_PDF, run_id=job['run_id'], job_id=job['job_id'],
+                                      status=job['status'], pdf_path=job['pdf_path'], error=job['error'])
+
+    def _record_finished(self, job_id: str):
+        """记录已结束的任务，超过上限时丢弃最早的记录"""
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._finished.append(job_id)
+            while len(self._finished) > MAX_FINISHED_JOBS:
+                self._jobs.pop(self._finished.pop(0), None)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """任务状态（副本），未知任务返回None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """等待任务结束并返回状态（超时抛出 concurrent.futures.TimeoutError）"""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.status(job_id)
+
+    def jobs(self) -> List[Dict]:
+        """全部任务状态（按提交顺序）"""
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()]
+
+    def pending_count(self) -> int:
+        """排队或排版中的任务数"""
+        with self._lock:
+            return len(self._futures)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_default_queue: Optional[PDFExportQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_default_queue() -> PDFExportQueue:
+    """进程内共享的导出队列（退出时等待未完成的PDF）"""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = PDFExportQueue()
+            atexit.register(_default_queue.shutdown)
+        return _default_queue
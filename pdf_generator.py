@@ -14,9 +14,216 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfgen import canvas as pdf_canvas
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from types import SimpleNamespace
+import io
+import os
 import re
-from typing import Dict, List
+import tempfile
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from agents import regex_patterns as rx
+from agents.word_fixer import WordFixer
+from pdf_table_layout import CELL_PADDING_H, CELL_PADDING_V, layout_table
+
+# 并行分段渲染需要pypdf合并各段PDF（可选依赖，缺失时退回串行生成）
+try:
+    from pypdf import PdfReader, PdfWriter
+    HAS_PYPDF = True
+except ImportError:
+    HAS_PYPDF = False
+
+
+# 正文章节（key, 标题），按报告顺序排列
+REPORT_SECTIONS = [
+    ('fundamentalAnalysis', '1. Fundamental Analysis'),
+    ('businessSegments', '2. Business Segments Analysis'),
+    ('growthCatalysts', '3. Growth Catalysts and Strategic Initiatives'),
+    ('valuationAnalysis', '4. Valuation Analysis and Investment Recommendation'),
+    ('aiInsights', '5. AI-Powered Deep Insights & Predictions'),
+]
+SECTION_TITLES = dict(REPORT_SECTIONS)
+
+# 分段中的特殊条目（其余条目为 REPORT_SECTIONS 的key）
+COVER_PART = 'cover'
+REFERENCES_PART = 'references'
+
+
+# 被空格拆分的单词映射（_clean_text_minimal 使用）
+_SPLIT_WORDS = {
+    # 长单词（先处理）
+    'a n t i c i p a t e d': 'anticipated',
+    'a n t i c i p a t e': 'anticipate',
+    'o p e r a t i o n a l': 'operational',
+    'i n t e g r a t i o n': 'integration',
+    'p r o f i t a b i l i t y': 'profitability',
+    'e x p e c t a t i o n s': 'expectations',
+    'e x p e c t a t i o n': 'expectation',
+    's u g g e s t i n g': 'suggesting',
+    'u n d e r s c o r e s': 'underscores',
+    'r e s i l i e n c e': 'resilience',
+    'p a r t i a l l y': 'partially',
+    'd e c l i n e s': 'declines',
+    'm a t e r i a l s': 'materials',
+    'm a g n e t i c s': 'magnetics',
+    'a d j u s t e d': 'adjusted',
+    'a n a l y s i s': 'analysis',
+    'a n a l y z e': 'analyze',
+    'a n a l y s t': 'analyst',
+    's u g g e s t': 'suggest',
+    'u n d e r s c o r e': 'underscore',
+    'd e c l i n e': 'decline',
+    's e g m e n t': 'segment',
+    'm a t e r i a l': 'material',
+    'm a g n e t i c': 'magnetic',
+    'a d j u s t': 'adjust',
+    'e b i t d a': 'ebitda',
+    'r e v e n u e': 'revenue',
+    'p r i o r': 'prior',
+    'o f f s e t': 'offset',
+    'v a l i d a t e s': 'validates',
+    'v a l i d a t e': 'validate',
+    'e l u s i v e': 'elusive',
+    # 短词
+    'o f t h e': 'of the',
+    'o f': 'of',
+    't h e': 'the',
+    'i n': 'in',
+    'a n d': 'and',
+    'a t': 'at',
+    'i s': 'is',
+    'o n': 'on',
+    'b y': 'by',
+    't o': 'to',
+    'f o r': 'for',
+    'a n': 'an',
+    'a s': 'as',
+    'i f': 'if',
+    'o r': 'or',
+    'n o t': 'not',
+    'h a s': 'has',
+    'h a d': 'had',
+    'h a v e': 'have',
+    'i t': 'it',
+    'w i t h': 'with',
+    'f r o m': 'from',
+    't h i s': 'this',
+    't h a t': 'that',
+    'n e t': 'net',
+    'l o s s': 'loss',
+    'b e a t': 'beat',
+}
+
+# 修复部分拆分的单词（如 "a djusted" → "adjusted"）
+# 这些是常见的部分拆分模式（按长度排序，长单词优先）
+_PARTIAL_SPLIT_FIXES = [
+    # 用户报告的问题单词
+    (r'\bR\s+are\b', 'Rare'),
+    (r'\br\s+are\b', 'rare'),
+    (r'\bMag\s+net\b', 'Magnet'),
+    (r'\bmag\s+net\b', 'magnet'),
+    (r'\ba\s+dditional\b', 'additional'),
+    (r'\bA\s+dditional\b', 'Additional'),
+    # 修复 "Ch in a" → "China"（需要特殊处理，因为可能后面跟其他字符）
+    # 先处理后面跟空格的情况（优先级最高）
+    (r'\bCh\s+in\s+a\s+', 'China '),  # 修复 "Ch in a " → "China "
+    (r'\bch\s+in\s+a\s+', 'china '),
+    # 再处理单词边界的情况
+    (r'\bCh\s+in\s+a\b', 'China'),  # 修复 "Ch in a" → "China"（单词边界）
+    (r'\bch\s+in\s+a\b', 'china'),
+    (r'\bCh\s+ina\b', 'China'),  # 修复 "Ch ina" → "China"
+    (r'\bch\s+ina\b', 'china'),
+    (r'\ba\s+nd\b', 'and'),
+    (r'\bA\s+nd\b', 'And'),
+    # 其他常见拆分
+    (r'\ba\s+djusted\b', 'adjusted'),
+    (r'\bA\s+djusted\b', 'Adjusted'),
+    (r'\ba\s+nalyst\b', 'analyst'),
+    (r'\bA\s+nalyst\b', 'Analyst'),
+    (r'\ba\s+nticipated\b', 'anticipated'),
+    (r'\bA\s+nticipated\b', 'Anticipated'),
+    (r'\bo\s+perational\b', 'operational'),
+    (r'\bO\s+perational\b', 'Operational'),
+    (r'\bp\s+rior\b', 'prior'),
+    (r'\bP\s+rior\b', 'Prior'),
+    (r'\bv\s+alidates\b', 'validates'),
+    (r'\bV\s+alidates\b', 'Validates'),
+    (r'\be\s+bitda\b', 'ebitda'),
+    (r'\bE\s+bitda\b', 'EBITDA'),
+    (r'\be\s+ps\b', 'eps'),
+    (r'\bE\s+ps\b', 'EPS'),
+    (r'\bE\s+B\s+I\s+T\s+D\s+A\b', 'EBITDA'),
+    (r'\bE\s+P\s+S\b', 'EPS'),
+    (r'\bbe\s+at\b', 'beat'),
+    (r'\bBe\s+at\b', 'Beat'),
+    # 更多常见拆分模式
+    (r'\bTh\s+e\b', 'The'),
+    (r'\bth\s+e\b', 'the'),
+    (r'\bTh\s+is\b', 'This'),
+    (r'\bth\s+is\b', 'this'),
+    (r'\bTh\s+at\b', 'That'),
+    (r'\bth\s+at\b', 'that'),
+    (r'\bCo\s+mpany\b', 'Company'),
+    (r'\bco\s+mpany\b', 'company'),
+    (r'\bRe\s+venue\b', 'Revenue'),
+    (r'\bre\s+venue\b', 'revenue'),
+    (r'\bMa\s+terial\b', 'Material'),
+    (r'\bma\s+terial\b', 'material'),
+    (r'\bMa\s+terials\b', 'Materials'),
+    (r'\bma\s+terials\b', 'materials'),
+]
+
+# 按长度排序（长单词优先），被拆分的单词之间允许任意空白
+SPLIT_WORD_PATTERNS = rx.register_group(
+    'pdf.split_words',
+    [(split.replace(' ', r'\s+'), word)
+     for split, word in sorted(_SPLIT_WORDS.items(), key=lambda x: len(x[0]), reverse=True)],
+    re.IGNORECASE
+)
+PARTIAL_SPLIT_PATTERNS = rx.register_group('pdf.partial_split_fixes', _PARTIAL_SPLIT_FIXES, re.IGNORECASE)
+
+
+# 进程级缓存：字体只注册一次，同一进程内的生成器共享样式表（样式表建好后只读）
+_FONT_REGISTRATION: Optional[Tuple[str, bool]] = None
+_STYLE_SHEETS: Dict[bool, object] = {}
+
+# 表格单元格样式的角色：表头 / 数据行（leading = 字号 + 行距余量）
+_CELL_STYLE_ROLES = {
+    'header': {'fontName': 'Helvetica-Bold', 'textColor': colors.white, 'fontSize': 10, 'extra_leading': 4},
+    'cell': {'fontName': 'Helvetica', 'textColor': colors.HexColor('#333333'), 'fontSize': 9, 'extra_leading': 3},
+}
+
+
+@lru_cache(maxsize=32)
+def get_cell_style(role: str, alignment: int = TA_LEFT, font_size: Optional[int] = None) -> ParagraphStyle:
+    """
+    获取共享的表格单元格样式，按 (角色, 对齐方式, 字号) 缓存
+
+    ParagraphStyle 在排版时只被读取，所有单元格可以共用同一个对象
+
+    Args:
+        role: 'header' 或 'cell'
+        alignment: 对齐方式（TA_LEFT 等）
+        font_size: 字号，默认使用角色的默认字号
+    """
+    spec = _CELL_STYLE_ROLES[role]
+    font_size = font_size or spec['fontSize']
+    return ParagraphStyle(
+        name=f"Table{role.capitalize()}_{alignment}_{font_size}",
+        fontSize=font_size,
+        fontName=spec['fontName'],
+        textColor=spec['textColor'],
+        alignment=alignment,
+        leading=font_size + spec['extra_leading'],  # 行间距
+        spaceBefore=0,
+        spaceAfter=0,
+        wordWrap='LTR',
+        allowWidows=0,
+        allowOrphans=0,
+    )
 
 
 class ProfessionalPDFGenerator:
@@ -24,18 +231,22 @@ class ProfessionalPDFGenerator:
     
     def __init__(self):
         self._register_chinese_fonts()
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
+        self.styles = _STYLE_SHEETS.get(self.has_chinese_support)
+        if self.styles is None:
+            self.styles = getSampleStyleSheet()
+            self._setup_custom_styles()
+            _STYLE_SHEETS[self.has_chinese_support] = self.styles
     
     def _register_chinese_fonts(self):
-        """注册中文字体"""
-        try:
-            pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
-            self.chinese_font = 'STSong-Light'
-            self.has_chinese_support = True
-        except Exception as e:
-            self.chinese_font = 'Helvetica'
-            self.has_chinese_support = False
+        """注册中文字体（每个进程只注册一次）"""
+        global _FONT_REGISTRATION
+        if _FONT_REGISTRATION is None:
+            try:
+                pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+                _FONT_REGISTRATION = ('STSong-Light', True)
+            except Exception:
+                _FONT_REGISTRATION = ('Helvetica', False)
+        self.chinese_font, self.has_chinese_support = _FONT_REGISTRATION
     
     def _setup_custom_styles(self):
         """设置专业样式 - 投资银行级格式"""
@@ -101,60 +312,196 @@ class ProfessionalPDFGenerator:
             keepWithNext=0,  # 不强制与下一段保持在一起
             keepTogether=0  # 不强制段落内保持在一起
         ))
-    
-    def generate_report_pdf(self, company: str, report_data: Dict, output_path: str):
-        """生成专业PDF报告"""
         
-        def add_page_number(canvas, doc):
-            self._add_page_number(canvas, doc)
+        # 封面（参照参考PDF格式）
+        cover_font = self.chinese_font if self.has_chinese_support else 'Helvetica'
+        self.styles.add(ParagraphStyle(
+            name='CoverCompany',
+            fontSize=24,
+            textColor=body_color,
+            alignment=TA_CENTER,
+            fontName=self.chinese_font if self.has_chinese_support else heading_font,
+            leading=30,
+            spaceAfter=15
+        ))
+        self.styles.add(ParagraphStyle(
+            name='CoverSubtitle',
+            fontSize=14,
+            textColor=body_color,
+            alignment=TA_CENTER,
+            fontName=cover_font,
+            spaceAfter=2*inch
+        ))
+        self.styles.add(ParagraphStyle(
+            name='CoverDate',
+            fontSize=10,
+            textColor=body_color,
+            alignment=TA_RIGHT,
+            fontName=cover_font,
+            spaceBefore=0
+        ))
         
-        doc = SimpleDocTemplate(
+        # 紧凑的引用样式（References章节）
+        self.styles.add(ParagraphStyle(
+            name='ReferenceStyle',
+            parent=self.styles['BodyText'],
+            fontSize=9,  # 更小的字体
+            textColor=body_color,
+            alignment=TA_LEFT,
+            spaceAfter=4,  # 更小的段落间距
+            leading=12,  # 更小的行间距
+            fontName=body_font,
+            leftIndent=0,
+            rightIndent=0,
+            firstLineIndent=0,
+            allowWidows=1,
+            allowOrphans=1
+        ))
+    
+    def generate_report_pdf(self, company: str, report_data: Dict, output_path: str,
+                            parallel: bool = False, max_workers: Optional[int] = None,
+                            section_page_breaks: bool = False):
+        """
+        生成专业PDF报告
+
+        Args:
+            company: 公司名称
+            report_data: 报告数据（metadata、各章节内容、references）
+            output_path: PDF输出路径，或可写的二进制文件对象（如 io.BytesIO）
+            parallel: 是否按分段在多个进程中并行排版（需要pypdf，缺失时串行生成）
+            max_workers: 并行进程数（默认CPU核数）
+            section_page_breaks: 每个正文章节是否另起一页（开启后每章可单独并行排版）
+        """
+        parts = self._plan_parts(report_data, section_page_breaks)
+
+        if parallel and len(parts) > 1:
+            if HAS_PYPDF:
+                try:
+                    self._generate_parallel(company, report_data, parts, output_path, max_workers)
+                    print(f"✅ 专业PDF报告已生成: {_output_label(output_path)}（{len(parts)} 段并行排版）")
+                    return
+                except Exception as e:
+                    print(f"⚠️  并行PDF生成失败，改为串行生成: {e}")
+            else:
+                print("⚠️  未安装pypdf，无法合并分段PDF，改为串行生成")
+
+        story = []
+        for index, items in enumerate(parts):
+            if index:
+                story.append(PageBreak())
+            story.extend(self._build_part_story(company, report_data, items))
+
+        # 生成PDF
+        self._create_doc(output_path, with_page_numbers=True).build(story)
+        print(f"✅ 专业PDF报告已生成: {_output_label(output_path)}")
+
+    def generate_report_pdf_bytes(self, company: str, report_data: Dict, **options) -> bytes:
+        """在内存中生成PDF并返回字节（不落盘，适合直接下载或写入存储），参数同 generate_report_pdf"""
+        buffer = io.BytesIO()
+        self.generate_report_pdf(company, report_data, buffer, **options)
+        return buffer.getvalue()
+
+    def _create_doc(self, output_path: str, with_page_numbers: bool) -> SimpleDocTemplate:
+        """创建文档模板（分段渲染时不画页码，合并后统一编号）"""
+        page_callbacks = {}
+        if with_page_numbers:
+            def add_page_number(canvas, doc):
+                self._add_page_number(canvas, doc)
+            page_callbacks = {'onFirstPage': add_page_number, 'onLaterPages': add_page_number}
+
+        return SimpleDocTemplate(
             output_path,
             pagesize=A4,
             rightMargin=2*cm,
             leftMargin=2*cm,
             topMargin=2*cm,
             bottomMargin=2.5*cm,  # 底部留更多空间给页码
-            onFirstPage=add_page_number,
-            onLaterPages=add_page_number
+            **page_callbacks
         )
-        
+
+    @staticmethod
+    def _plan_parts(report_data: Dict, section_page_breaks: bool = False) -> List[List[str]]:
+        """
+        按强制分页位置把报告划分为若干段，每段可以独立排版
+
+        分段之间本来就是分页符（封面之后、AI Insights之前、References之前），
+        所以分段排版后按顺序拼接与整体排版的分页结果一致；章节1-4之间是连续排版的，
+        只有 section_page_breaks=True 时才各自成段
+        """
+        parts = [[COVER_PART]]
+
+        body = [key for key, _ in REPORT_SECTIONS[:4] if report_data.get(key)]
+        if section_page_breaks:
+            parts.extend([key] for key in body)
+        elif body:
+            parts.append(body)
+
+        if report_data.get('aiInsights'):
+            parts.append(['aiInsights'])
+        if report_data.get('references'):
+            parts.append([REFERENCES_PART])
+        return parts
+
+    def _build_part_story(self, company: str, report_data: Dict, items: List[str]) -> List:
+        """构建一个分段的flowables"""
         story = []
-        
-        # 封面页
-        story.extend(self._create_cover_page(company, report_data.get('metadata', {})))
-        story.append(PageBreak())
-        
-        # 四大核心部分
-        sections = [
-            ('fundamentalAnalysis', '1. Fundamental Analysis'),
-            ('businessSegments', '2. Business Segments Analysis'),
-            ('growthCatalysts', '3. Growth Catalysts and Strategic Initiatives'),
-            ('valuationAnalysis', '4. Valuation Analysis and Investment Recommendation')
-        ]
-        
-        for key, title in sections:
-            if key in report_data and report_data[key]:
-                cleaned_title = self._remove_chinese_from_title(title)
-                story.extend(self._create_section(cleaned_title, report_data[key]))
+        for item in items:
+            if item == COVER_PART:
+                story.extend(self._create_cover_page(company, report_data.get('metadata', {})))
+            elif item == REFERENCES_PART:
+                story.extend(self._create_references_section(report_data['references']))
+            else:
+                cleaned_title = self._remove_chinese_from_title(SECTION_TITLES[item])
+                story.extend(self._create_section(cleaned_title, report_data[item]))
                 story.append(Spacer(1, 0.2*inch))
-        
-        # AI Insights
-        if 'aiInsights' in report_data and report_data['aiInsights']:
-            story.append(PageBreak())
-            ai_title = '5. AI-Powered Deep Insights & Predictions'
-            cleaned_ai_title = self._remove_chinese_from_title(ai_title)
-            story.extend(self._create_section(cleaned_ai_title, report_data['aiInsights']))
-            story.append(Spacer(1, 0.2*inch))
-        
-        # References（重要！）
-        if 'references' in report_data and report_data['references']:
-            story.append(PageBreak())
-            story.extend(self._create_references_section(report_data['references']))
-        
-        # 生成PDF
-        doc.build(story)
-        print(f"✅ 专业PDF报告已生成: {output_path}")
+        return story
+
+    def _generate_parallel(self, company: str, report_data: Dict, parts: List[List[str]],
+                           output_path: str, max_workers: Optional[int] = None):
+        """各分段在进程池中排版为独立PDF，按顺序合并后统一添加页码"""
+        # 输出到文件时临时分段放在同目录（最终可原子替换），输出到内存时用系统临时目录
+        output_dir = os.path.dirname(os.path.abspath(output_path)) if isinstance(output_path, str) else None
+        workers = min(len(parts), max_workers or os.cpu_count() or 1)
+
+        with tempfile.TemporaryDirectory(dir=output_dir, prefix='.pdf_parts_') as tmp_dir:
+            part_paths = [os.path.join(tmp_dir, f'part_{index:03d}.pdf') for index in range(len(parts))]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(_render_part, company, _part_data(report_data, items), items, part_path)
+                    for items, part_path in zip(parts, part_paths)
+                ]
+                for future in futures:
+                    future.result()
+
+            writer = PdfWriter()
+            for part_path in part_paths:
+                for page in PdfReader(part_path).pages:
+                    writer.add_page(page)
+            self._stamp_page_numbers(writer)
+
+            if not isinstance(output_path, str):
+                writer.write(output_path)
+                return
+
+            # 先写到临时文件再替换，失败时不会留下不完整的PDF
+            merged_path = os.path.join(tmp_dir, 'merged.pdf')
+            with open(merged_path, 'wb') as f:
+                writer.write(f)
+            os.replace(merged_path, output_path)
+
+    def _stamp_page_numbers(self, writer):
+        """用 _add_page_number 画一份只有页码的PDF，逐页叠加到合并结果上"""
+        buffer = io.BytesIO()
+        overlay_canvas = pdf_canvas.Canvas(buffer, pagesize=A4)
+        doc = SimpleNamespace(pagesize=A4)
+        for _ in writer.pages:
+            self._add_page_number(overlay_canvas, doc)
+            overlay_canvas.showPage()
+        overlay_canvas.save()
+
+        buffer.seek(0)
+        for page, number_page in zip(writer.pages, PdfReader(buffer).pages):
+            page.merge_page(number_page)
     
     def _create_cover_page(self, company: str, metadata: Dict) -> List:
         """创建封面页 - 参照参考PDF格式"""
@@ -165,58 +512,29 @@ class ProfessionalPDFGenerator:
         
         # 公司名称（参照参考PDF格式）
         formatted_company = self._format_company_name(company)
-        title_font = self.chinese_font if self.has_chinese_support else 'Helvetica-Bold'
-        story.append(Paragraph(
-            f"<b>{formatted_company}</b>",
-            ParagraphStyle(
-                name='CoverTitle',
-                fontSize=24,
-                textColor=colors.HexColor('#000000'),  # 黑色（参照参考PDF）
-                alignment=TA_CENTER,
-                fontName=title_font,
-                leading=30,
-                spaceAfter=15
-            )
-        ))
+        story.append(Paragraph(f"<b>{formatted_company}</b>", self.styles['CoverCompany']))
         
         # 副标题（参照参考PDF格式）
-        story.append(Paragraph(
-            "Professional Equity Analysis Report",
-            ParagraphStyle(
-                name='CoverSubtitle',
-                fontSize=14,
-                textColor=colors.HexColor('#000000'),  # 黑色（参照参考PDF）
-                alignment=TA_CENTER,
-                fontName=self.chinese_font if self.has_chinese_support else 'Helvetica',
-                spaceAfter=2*inch
-            )
-        ))
+        story.append(Paragraph("Professional Equity Analysis Report", self.styles['CoverSubtitle']))
         
         # 报告时间（参照参考PDF格式，右对齐）
         story.append(Paragraph(
             f"Report Generated: {datetime.now().strftime('%m/%d/%Y, %I:%M %p')}",
-            ParagraphStyle(
-                name='CoverDate',
-                fontSize=10,
-                textColor=colors.HexColor('#000000'),  # 黑色（参照参考PDF）
-                alignment=TA_RIGHT,
-                fontName=self.chinese_font if self.has_chinese_support else 'Helvetica',
-                spaceBefore=0
-            )
+            self.styles['CoverDate']
         ))
         
         return story
     
     def _format_company_name(self, company: str) -> str:
         """格式化公司名称"""
-        if re.match(r'^\d{4,5}\.(hk|HK)$', company, re.IGNORECASE):
+        if rx.PDF_HK_TICKER.match(company):
             return company.upper()
-        if re.match(r'^\d{6}\.(sh|sz|SH|SZ)$', company, re.IGNORECASE):
+        if rx.PDF_CN_TICKER.match(company):
             return company.upper()
-        if re.search(r'[\u4e00-\u9fff]', company):
+        if rx.CJK_CHAR.search(company):
             return company
         if '(' in company and ')' in company:
-            match = re.match(r'(.+?)\s*\(([^)]+)\)', company)
+            match = rx.PDF_NAME_WITH_TICKER.match(company)
             if match:
                 name, ticker = match.groups()
                 return f"{name.strip()} ({ticker.strip().upper()})"
@@ -228,20 +546,20 @@ class ProfessionalPDFGenerator:
             return title
         
         # 1. 移除中文（包括括号中的中文）
-        if re.search(r'[\u4e00-\u9fff]', title):
+        if rx.CJK_CHAR.search(title):
             # 移除括号中的中文（如 "(基本面分析)"）
-            title = re.sub(r'\s*\([^)]*[\u4e00-\u9fff][^)]*\)', '', title)
+            title = rx.PDF_CJK_PARENTHETICAL.sub('', title)
             # 移除所有中文字符
-            title = re.sub(r'[\u4e00-\u9fff]+', '', title)
+            title = rx.PDF_CJK_RUN.sub('', title)
         
         # 2. 修复重复的标题数字（如 "1.1 1.1 Company Overview" -> "1.1 Company Overview"）
         # 匹配模式：数字.数字 空格 数字.数字
-        title = re.sub(r'(\d+\.\d+)\s+\1\s*', r'\1 ', title)
+        title = rx.PDF_DUPLICATE_SECTION_NUM.sub(r'\1 ', title)
         # 也处理其他重复模式（如 "1.1 1.1 1.1" -> "1.1"）
-        title = re.sub(r'(\d+\.\d+)(\s+\1)+', r'\1', title)
+        title = rx.PDF_REPEATED_SECTION_NUM.sub(r'\1', title)
         
         # 3. 规范化空格
-        title = re.sub(r'\s+', ' ', title).strip()
+        title = rx.PDF_WHITESPACE_RUN.sub(' ', title).strip()
         
         return title
     
@@ -278,8 +596,8 @@ class ProfessionalPDFGenerator:
             # 检查段落的第一行是否是小标题
             first_line = para.split('\n')[0].strip()
             # 移除Markdown标记（##, ###等）
-            clean_first_line = re.sub(r'^#+\s*', '', first_line)
-            subsection_match = re.match(r'^(\d+\.\d+)\s+(.+)$', clean_first_line)
+            clean_first_line = rx.PDF_HEADING_PREFIX.sub('', first_line)
+            subsection_match = rx.PDF_SUBSECTION_TITLE.match(clean_first_line)
             
             if subsection_match:
                 # 如果之前有小标题，先渲染它的内容
@@ -352,14 +670,12 @@ class ProfessionalPDFGenerator:
                     story.append(Spacer(1, 0.15*inch))
                 else:
                     # 表格解析失败，作为普通文本显示
-                    from agents.word_fixer import WordFixer
                     clean_para = WordFixer.fix_all_issues(para)
                     if clean_para:
                         story.append(Paragraph(clean_para, self.styles['CustomBody']))
                         story.append(Spacer(1, 0.05*inch))
             else:
                 # 普通段落（使用WordFixer直接修复所有问题）
-                from agents.word_fixer import WordFixer
                 clean_para = WordFixer.fix_all_issues(para)
                 if clean_para:
                     # 确保段落使用两端对齐样式
@@ -377,8 +693,8 @@ class ProfessionalPDFGenerator:
             return text
         
         # 1. 移除markdown粗体标记（转换为HTML）
-        text = re.sub(r'\*\*([^*]+)\*\*', r'<b>\1</b>', text)
-        text = re.sub(r'__([^_]+)__', r'<b>\1</b>', text)
+        text = rx.MD_BOLD_STARS.sub(r'<b>\1</b>', text)
+        text = rx.MD_BOLD_UNDERSCORES.sub(r'<b>\1</b>', text)
         
         # 2. 移除所有 * 和 _（防止斜体）
         text = text.replace('*', '')
@@ -388,149 +704,20 @@ class ProfessionalPDFGenerator:
         # 使用更通用的方法：修复所有被空格拆分的常见单词
         # 注意：不使用单词边界，因为被拆分的单词可能不在单词边界处
         
-        # 定义被拆分的单词映射（按长度排序，先处理长单词）
-        split_words = {
-            # 长单词（先处理）
-            'a n t i c i p a t e d': 'anticipated',
-            'a n t i c i p a t e': 'anticipate',
-            'o p e r a t i o n a l': 'operational',
-            'i n t e g r a t i o n': 'integration',
-            'p r o f i t a b i l i t y': 'profitability',
-            'e x p e c t a t i o n s': 'expectations',
-            'e x p e c t a t i o n': 'expectation',
-            's u g g e s t i n g': 'suggesting',
-            'u n d e r s c o r e s': 'underscores',
-            'r e s i l i e n c e': 'resilience',
-            'p a r t i a l l y': 'partially',
-            'd e c l i n e s': 'declines',
-            'm a t e r i a l s': 'materials',
-            'm a g n e t i c s': 'magnetics',
-            'a d j u s t e d': 'adjusted',
-            'a n a l y s i s': 'analysis',
-            'a n a l y z e': 'analyze',
-            'a n a l y s t': 'analyst',
-            's u g g e s t': 'suggest',
-            'u n d e r s c o r e': 'underscore',
-            'd e c l i n e': 'decline',
-            's e g m e n t': 'segment',
-            'm a t e r i a l': 'material',
-            'm a g n e t i c': 'magnetic',
-            'a d j u s t': 'adjust',
-            'e b i t d a': 'ebitda',
-            'r e v e n u e': 'revenue',
-            'p r i o r': 'prior',
-            'o f f s e t': 'offset',
-            'v a l i d a t e s': 'validates',
-            'v a l i d a t e': 'validate',
-            'e l u s i v e': 'elusive',
-            # 短词
-            'o f t h e': 'of the',
-            'o f': 'of',
-            't h e': 'the',
-            'i n': 'in',
-            'a n d': 'and',
-            'a t': 'at',
-            'i s': 'is',
-            'o n': 'on',
-            'b y': 'by',
-            't o': 'to',
-            'f o r': 'for',
-            'a n': 'an',
-            'a s': 'as',
-            'i f': 'if',
-            'o r': 'or',
-            'n o t': 'not',
-            'h a s': 'has',
-            'h a d': 'had',
-            'h a v e': 'have',
-            'i t': 'it',
-            'w i t h': 'with',
-            'f r o m': 'from',
-            't h i s': 'this',
-            't h a t': 'that',
-            'n e t': 'net',
-            'l o s s': 'loss',
-            'b e a t': 'beat',
-        }
-        
-        # 按长度排序（长单词优先）
-        sorted_words = sorted(split_words.items(), key=lambda x: len(x[0]), reverse=True)
-        
-        # 修复被拆分的单词（不区分大小写）
-        for split_pattern, replacement in sorted_words:
-            # 创建正则表达式模式（匹配被空格拆分的单词）
-            pattern = split_pattern.replace(' ', r'\s+')
-            # 使用不区分大小写的替换
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        # 修复被拆分的单词（不区分大小写，长单词优先，模式在模块加载时预编译）
+        for pattern, replacement in SPLIT_WORD_PATTERNS:
+            text = pattern.sub(replacement, text)
         
         # 修复部分拆分的单词（如 "a djusted" → "adjusted"）
-        # 这些是常见的部分拆分模式（按长度排序，长单词优先）
-        partial_split_fixes = [
-            # 用户报告的问题单词
-            (r'\bR\s+are\b', 'Rare'),
-            (r'\br\s+are\b', 'rare'),
-            (r'\bMag\s+net\b', 'Magnet'),
-            (r'\bmag\s+net\b', 'magnet'),
-            (r'\ba\s+dditional\b', 'additional'),
-            (r'\bA\s+dditional\b', 'Additional'),
-            # 修复 "Ch in a" → "China"（需要特殊处理，因为可能后面跟其他字符）
-            # 先处理后面跟空格的情况（优先级最高）
-            (r'\bCh\s+in\s+a\s+', 'China '),  # 修复 "Ch in a " → "China "
-            (r'\bch\s+in\s+a\s+', 'china '),
-            # 再处理单词边界的情况
-            (r'\bCh\s+in\s+a\b', 'China'),  # 修复 "Ch in a" → "China"（单词边界）
-            (r'\bch\s+in\s+a\b', 'china'),
-            (r'\bCh\s+ina\b', 'China'),  # 修复 "Ch ina" → "China"
-            (r'\bch\s+ina\b', 'china'),
-            (r'\ba\s+nd\b', 'and'),
-            (r'\bA\s+nd\b', 'And'),
-            # 其他常见拆分
-            (r'\ba\s+djusted\b', 'adjusted'),
-            (r'\bA\s+djusted\b', 'Adjusted'),
-            (r'\ba\s+nalyst\b', 'analyst'),
-            (r'\bA\s+nalyst\b', 'Analyst'),
-            (r'\ba\s+nticipated\b', 'anticipated'),
-            (r'\bA\s+nticipated\b', 'Anticipated'),
-            (r'\bo\s+perational\b', 'operational'),
-            (r'\bO\s+perational\b', 'Operational'),
-            (r'\bp\s+rior\b', 'prior'),
-            (r'\bP\s+rior\b', 'Prior'),
-            (r'\bv\s+alidates\b', 'validates'),
-            (r'\bV\s+alidates\b', 'Validates'),
-            (r'\be\s+bitda\b', 'ebitda'),
-            (r'\bE\s+bitda\b', 'EBITDA'),
-            (r'\be\s+ps\b', 'eps'),
-            (r'\bE\s+ps\b', 'EPS'),
-            (r'\bE\s+B\s+I\s+T\s+D\s+A\b', 'EBITDA'),
-            (r'\bE\s+P\s+S\b', 'EPS'),
-            (r'\bbe\s+at\b', 'beat'),
-            (r'\bBe\s+at\b', 'Beat'),
-            # 更多常见拆分模式
-            (r'\bTh\s+e\b', 'The'),
-            (r'\bth\s+e\b', 'the'),
-            (r'\bTh\s+is\b', 'This'),
-            (r'\bth\s+is\b', 'this'),
-            (r'\bTh\s+at\b', 'That'),
-            (r'\bth\s+at\b', 'that'),
-            (r'\bCo\s+mpany\b', 'Company'),
-            (r'\bco\s+mpany\b', 'company'),
-            (r'\bRe\s+venue\b', 'Revenue'),
-            (r'\bre\s+venue\b', 'revenue'),
-            (r'\bMa\s+terial\b', 'Material'),
-            (r'\bma\s+terial\b', 'material'),
-            (r'\bMa\s+terials\b', 'Materials'),
-            (r'\bma\s+terials\b', 'materials'),
-        ]
-        
-        for pattern, replacement in partial_split_fixes:
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        for pattern, replacement in PARTIAL_SPLIT_PATTERNS:
+            text = pattern.sub(replacement, text)
         
         # 4. 移除markdown标题标记
-        text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
+        text = rx.PDF_HEADING_MARKERS.sub('', text)
         
         # 5. 规范化空格（但不要过度）
-        text = re.sub(r'\s{2,}', ' ', text)  # 多个空格变一个
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)  # 多个换行变两个
+        text = rx.PDF_MULTI_SPACE.sub(' ', text)  # 多个空格变一个
+        text = rx.MULTI_BLANK_LINES.sub('\n\n', text)  # 多个换行变两个
         
         return text.strip()
     
@@ -554,52 +741,10 @@ class ProfessionalPDFGenerator:
                     
                     if len(cells) > 1:
                         # 使用WordFixer直接修复单元格中的所有问题
-                        cleaned_cells = []
-                        from agents.word_fixer import WordFixer
-                        is_header = len(rows) == 0  # 第一行是表头
-                        
-                        for cell in cells:
-                            # 直接使用WordFixer修复所有问题
-                            cell_text = WordFixer.fix_all_issues(cell)
-                            # 将单元格内容转换为Paragraph对象，确保正确换行和避免重叠
-                            # 表头和数据行使用不同的样式
-                            if is_header:
-                                # 表头样式
-                                cell_para = Paragraph(
-                                    f"<b>{cell_text.replace('<b>', '').replace('</b>', '').replace('\n', '<br/>')}</b>",
-                                    ParagraphStyle(
-                                        name='TableHeader',
-                                        fontSize=10,
-                                        fontName='Helvetica-Bold',
-                                        textColor=colors.white,
-                                        alignment=TA_LEFT,
-                                        leading=14,  # 行间距
-                                        spaceBefore=0,
-                                        spaceAfter=0,
-                                        wordWrap='LTR',
-                                        allowWidows=0,
-                                        allowOrphans=0,
-                                    )
-                                )
-                            else:
-                                # 数据行样式
-                                cell_para = Paragraph(
-                                    cell_text.replace('\n', '<br/>'),
-                                    ParagraphStyle(
-                                        name='TableCell',
-                                        fontSize=9,
-                                        fontName='Helvetica',
-                                        textColor=colors.HexColor('#333333'),
-                                        alignment=TA_LEFT,
-                                        leading=12,  # 行间距
-                                        spaceBefore=0,
-                                        spaceAfter=0,
-                                        wordWrap='LTR',
-                                        allowWidows=0,
-                                        allowOrphans=0,
-                                    )
-                                )
-                            cleaned_cells.append(cell_para)
+                        cleaned_cells = [WordFixer.fix_all_issues(cell) for cell in cells]
+                        if not rows:
+                            # 表头样式本身是粗体，去掉多余的<b>标记
+                            cleaned_cells = [cell.replace('<b>', '').replace('</b>', '') for cell in cleaned_cells]
                         rows.append(cleaned_cells)
             
             if not rows or len(rows) < 2:
@@ -611,20 +756,14 @@ class ProfessionalPDFGenerator:
                 while len(row) < num_cols:
                     row.append('')
             
-            # 计算列宽（更智能的分配，确保文本不溢出）
-            available_width = 16 * cm
-            
-            # 根据列数和内容动态调整列宽
-            if num_cols <= 2:
-                col_widths = [available_width / num_cols * 0.98] * num_cols
-            elif num_cols <= 4:
-                col_widths = [available_width / num_cols * 0.95] * num_cols
-            else:
-                # 超过4列时，使用更小的宽度以确保内容不溢出
-                col_widths = [available_width / num_cols * 0.92] * num_cols
+            # 按字体度量预计算列宽和行高（短数值单元格用纯字符串），
+            # 表格不必再自己折行测量每个单元格
+            header_style = get_cell_style('header')
+            cell_style = get_cell_style('cell')
+            rows, col_widths, row_heights = layout_table(rows, header_style, cell_style)
             
             # 创建表格
-            table = Table(rows, colWidths=col_widths, repeatRows=1)
+            table = Table(rows, colWidths=col_widths, rowHeights=row_heights, repeatRows=1)
             
             # 专业表格样式 - 投资银行格式（防止溢出和重叠）
             # 注意：由于单元格内容已经是Paragraph对象，某些样式可能不适用
@@ -635,19 +774,20 @@ class ProfessionalPDFGenerator:
                 ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
                 ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),  # 表头粗体
                 ('FONTSIZE', (0, 0), (-1, 0), 10),
-                # 数据行样式（Paragraph对象会使用自己的样式，这里设置备用）
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),  # 正文常规体
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.HexColor('#000000')),  # 黑色正文（参照参考PDF）
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),  # 增加内边距（防止重叠）
-                ('TOPPADDING', (0, 0), (-1, -1), 12),  # 增加内边距（防止重叠）
-                ('LEFTPADDING', (0, 0), (-1, -1), 8),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+                # 数据行样式（纯字符串单元格使用，与Paragraph单元格的样式一致）
+                ('FONTSIZE', (0, 1), (-1, -1), cell_style.fontSize),
+                ('FONTNAME', (0, 1), (-1, -1), cell_style.fontName),  # 正文常规体
+                ('TEXTCOLOR', (0, 1), (-1, -1), cell_style.textColor),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), CELL_PADDING_V),  # 增加内边距（防止重叠）
+                ('TOPPADDING', (0, 0), (-1, -1), CELL_PADDING_V),  # 增加内边距（防止重叠）
+                ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING_H),
+                ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING_H),
                 ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),  # 浅灰色边框
                 ('VALIGN', (0, 0), (-1, -1), 'TOP'),  # 顶部对齐，防止重叠
                 ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f5f5')]),  # 交替行颜色
                 # Paragraph对象会自动处理换行，不需要WORDWRAP和SPLITLONGWORDS
-                ('LEADING', (0, 0), (-1, -1), 14),  # 增加表格行间距（防止重叠）
+                ('LEADING', (0, 0), (-1, 0), header_style.leading),  # 表格行间距（与单元格样式一致，行高按此预计算）
+                ('LEADING', (0, 1), (-1, -1), cell_style.leading),
             ]))
             
             return table
@@ -669,22 +809,8 @@ class ProfessionalPDFGenerator:
             spaceBefore=0
         ))
         
-        # 创建紧凑的引用样式
-        reference_style = ParagraphStyle(
-            name='ReferenceStyle',
-            parent=self.styles['BodyText'],
-            fontSize=9,  # 更小的字体
-            textColor=colors.HexColor('#000000'),
-            alignment=TA_LEFT,
-            spaceAfter=4,  # 更小的段落间距
-            leading=12,  # 更小的行间距
-            fontName='Helvetica',
-            leftIndent=0,
-            rightIndent=0,
-            firstLineIndent=0,
-            allowWidows=1,
-            allowOrphans=1
-        )
+        # 紧凑的引用样式
+        reference_style = self.styles['ReferenceStyle']
         
         # 处理references，优化格式使其更紧凑
         lines = references_text.strip().split('\n')
@@ -699,7 +825,7 @@ class ProfessionalPDFGenerator:
                     clean_ref = self._clean_text_minimal(ref_text)
                     if clean_ref:
                         # 检测是否是引用编号格式（如 [1], [2] 等）
-                        if re.match(r'^\[\d+\]', clean_ref):
+                        if rx.PDF_REFERENCE_NUMBER.match(clean_ref):
                             # 引用格式：编号 + 内容
                             story.append(Paragraph(clean_ref, reference_style))
                         else:
@@ -709,7 +835,7 @@ class ProfessionalPDFGenerator:
                 continue
             
             # 检测是否是新的引用（以 [数字] 开头）
-            if re.match(r'^\[\d+\]', line):
+            if rx.PDF_REFERENCE_NUMBER.match(line):
                 # 如果之前有引用，先添加
                 if current_ref:
                     ref_text = ' '.join(current_ref)
@@ -749,3 +875,31 @@ class ProfessionalPDFGenerator:
         
         canvas.drawString(x, y, text)
         canvas.restoreState()
+
+
+# 每个工作进程各自持有一个生成器（字体注册和样式表只在进程内初始化一次）
+_worker_generator: Optional[ProfessionalPDFGenerator] = None
+
+
+def _output_label(output) -> str:
+    """日志中显示的输出位置"""
+    return output if isinstance(output, str) else '内存'
+
+
+def _part_data(report_data: Dict, items: List[str]) -> Dict:
+    """只把分段用到的数据发送给工作进程"""
+    data = {'metadata': report_data.get('metadata', {})}
+    for item in items:
+        if item in report_data:
+            data[item] = report_data[item]
+    return data
+
+
+def _render_part(company: str, report_data: Dict, items: List[str], output_path: str) -> str:
+    """在工作进程中把一个分段排版为独立PDF（不带页码）"""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = ProfessionalPDFGenerator()
+    story = _worker_generator._build_part_story(company, report_data, items)
+    _worker_generator._create_doc(output_path, with_page_numbers=False).build(story)
+    return output_path
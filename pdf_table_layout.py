@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+ReportLab表格布局预计算
+
+ProfessionalPDFGenerator 的财务表格在交给 Table 之前先算好布局：
+- 列宽：按字体度量（stringWidth）估算每列的自然宽度和最长单词宽度，
+  先保证每列放得下最长单词，剩余宽度按内容多少分配
+- 行高：逐个单元格折行测量，结果按 (文本, 宽度, 样式) 缓存，相同单元格
+  （指标名、年份、N/A 等）在整份报告中只测量一次；行高全部给定后，
+  Table 不再自己做一遍折行测量
+- 短数值单元格（$44.6B、+13.5%）直接用纯字符串，不创建 Paragraph
+"""
+from functools import lru_cache
+from typing import List, Tuple
+
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Paragraph
+
+from agents import regex_patterns as rx
+
+# 表格可用宽度（正文框宽度留少量余量）
+TABLE_WIDTH = 16 * cm * 0.95
+
+# 单元格内边距，需与表格 TableStyle 的 *PADDING 一致
+CELL_PADDING_H = 8
+CELL_PADDING_V = 12
+
+# 列宽下限，以及计算自然宽度时单列最多按多宽计（超长文本本来就要折行）
+MIN_COLUMN_WIDTH = 1.6 * cm
+MAX_NATURAL_WIDTH = 7 * cm
+
+
+@lru_cache(maxsize=8192)
+def text_width(text: str, font_name: str, font_size: float) -> float:
+    """字符串宽度（按字体度量，结果缓存）"""
+    return stringWidth(text, font_name, font_size)
+
+
+@lru_cache(maxsize=8192)
+def wrapped_height(text: str, width: float, style: ParagraphStyle) -> float:
+    """
+    单元格文本折行后的高度，按 (文本, 宽度, 样式) 缓存
+
+    style 应来自 get_cell_style 的共享样式池（同一对象，缓存才能命中）
+    """
+    _, height = Paragraph(text, style).wrap(width, 1e6)
+    return height
+
+
+def _plain(text: str) -> str:
+    """去掉内联标记，用于度量"""
+    if '<' not in text:
+        return text
+    return rx.PDF_MARKUP_TAG.sub('', text)
+
+
+def estimate_column_widths(rows: List[List[str]], header_style: ParagraphStyle, cell_style: ParagraphStyle,
+                           available_width: float = TABLE_WIDTH) -> List[float]:
+    """
+    根据单元格文本估算列宽（总宽度 = available_width）
+
+    1. 各列自然宽度（最长一行）之和放得下：按比例放大填满
+    2. 各列最小宽度（最长单词）之和都放不下：按最小宽度比例压缩
+    3. 其余情况：先满足最小宽度，剩余宽度按 (自然宽度 - 最小宽度) 比例分配
+    """
+    num_cols = max(len(row) for row in rows)
+    natural = [0.0] * num_cols
+    minimum = [0.0] * num_cols
+
+    for row_index, row in enumerate(rows):
+        style = header_style if row_index == 0 else cell_style
+        for col, text in enumerate(row):
+            text = _plain(text)
+            for line in text.split('\n'):
+                natural[col] = max(natural[col], text_width(line, style.fontName, style.fontSize))
+            for word in text.split():
+                minimum[col] = max(minimum[col], text_width(word, style.fontName, style.fontSize))
+
+    padding = 2 * CELL_PADDING_H
+    natural = [min(w, MAX_NATURAL_WIDTH) + padding for w in natural]
+    minimum = [max(MIN_COLUMN_WIDTH, min(w, MAX_NATURAL_WIDTH) + padding) for w in minimum]
+    natural = [max(n, m) for n, m in zip(natural, minimum)]
+
+    total_natural = sum(natural)
+    if total_natural <= available_width:
+        return [w * available_width / total_natural for w in natural]
+
+    total_minimum = sum(minimum)
+    if total_minimum >= available_width:
+        return [w * available_width / total_minimum for w in minimum]
+
+    extra = available_width - total_minimum
+    wants = [n - m for n, m in zip(natural, minimum)]
+    total_wants = sum(wants)
+    return [m + extra * w / total_wants for m, w in zip(minimum, wants)]
+
+
+def layout_table(rows: List[List[str]], header_style: ParagraphStyle, cell_style: ParagraphStyle,
+                 available_width: float = TABLE_WIDTH) -> Tuple[List[List], List[float], List[float]]:
+    """
+    计算表格布局
+
+    Args:
+        rows: 单元格文本（第一行为表头，各行列数相同，可含 <b> 等内联标记和换行）
+        header_style: 表头单元格样式
+        cell_style: 数据单元格样式
+        available_width: 表格总宽度
+
+    Returns:
+        (cells, col_widths, row_heights)：cells 中短数值为纯字符串，其余为 Paragraph；
+        纯字符串单元格的字体、字号、行距由表格 TableStyle 决定，需与对应样式一致
+    """
+    col_widths = estimate_column_widths(rows, header_style, cell_style, available_width)
+    inner_widths = [w - 2 * CELL_PADDING_H for w in col_widths]
+
+    cells = []
+    row_heights = []
+    for row_index, row in enumerate(rows):
+        style = header_style if row_index == 0 else cell_style
+        row_cells = []
+        content_height = 0.0
+        for text, inner_width in zip(row, inner_widths):
+            if not text:
+                row_cells.append('')
+            elif (rx.PDF_NUMERIC_CELL.match(text)
+                    and text_width(text, style.fontName, style.fontSize) <= inner_width):
+                row_cells.append(text)
+                content_height = max(content_height, style.leading)
+            else:
+                markup = text.replace('\n', '<br/>')
+                row_cells.append(Paragraph(markup, style))
+                content_height = max(content_height, wrapped_height(markup, inner_width, style))
+        cells.append(row_cells)
+        row_heights.append(content_height + 2 * CELL_PADDING_V)
+
+    return cells, col_widths, row_heights
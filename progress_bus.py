@@ -0,0 +1,202 @@
+"""
+进度事件总线
+
+分析流程各环节在进行中发布事件，Web界面订阅后增量显示进度和阶段性结果
+（例如搜索结果逐条出现），不再只有服务器控制台上的print输出。
+
+- 事件属于一次运行（run_id）：报告生成、热点分析等入口用 progress_run() 设置当前运行，
+  其中调用的Agent用 emit() 发布事件，不需要逐层传递ID（contextvars，asyncio任务中同样有效）
+- subscribe() 注册回调（在发布事件的线程中调用，应尽快返回）
+- 每次运行最近的事件保留在内存中，Streamlit页面重新运行后用 events(run_id, after_seq) 补读
+- stream_events() 在后台线程运行一个函数并逐个产出它的事件，供Gradio生成器函数使用
+"""
+import contextvars
+import itertools
+import queue
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+# 事件类型
+EVENT_RUN_STARTED = 'run_started'      # 运行开始: title
+EVENT_STAGE = 'stage'                  # 阶段变化: stage, progress(0-100), message
+EVENT_QUERY_DONE = 'query_done'        # 一个搜索查询完成: index, total, query, status, content, citations
+EVENT_SECTION_DONE = 'section_done'    # 报告一个章节完成: key, title, content
+EVENT_PDF = 'pdf'                      # PDF状态: status(queued/running/done/failed), pdf_path, error
+EVENT_PARTIAL = 'partial'              # 其他阶段性结果: name, data
+EVENT_RUN_FINISHED = 'run_finished'    # 运行结束: status, error，stream_events 中还带 result
+
+# 每次运行保留的事件数、同时保留的运行数
+MAX_EVENTS_PER_RUN = 500
+MAX_RUNS = 100
+
+# 事件中文本内容的最大长度（阶段性结果只用于预览）
+MAX_PREVIEW_CHARS = 2000
+
+_current_run: contextvars.ContextVar = contextvars.ContextVar('progress_run_id', default=None)
+
+
+def current_run_id() -> Optional[str]:
+    """当前上下文所属的运行ID（不在运行中时为None）"""
+    return _current_run.get()
+
+
+@contextmanager
+def progress_run(run_id: str):
+    """在 with 块内发布的事件都属于 run_id"""
+    token = _current_run.set(run_id)
+    try:
+        yield run_id
+    finally:
+        _current_run.reset(token)
+
+
+def preview(text: Optional[str], limit: int = MAX_PREVIEW_CHARS) -> str:
+    """截断过长的文本用于事件预览"""
+    text = text or ''
+    return text if len(text) <= limit else text[:limit] + '…'
+
+
+class ProgressBus:
+    """线程安全的进程内事件总线"""
+
+    def __init__(self, max_events_per_run: int = MAX_EVENTS_PER_RUN, max_runs: int = MAX_RUNS):
+        self.max_events_per_run = max_events_per_run
+        self.max_runs = max_runs
+        self._subscribers: Dict[int, Dict] = {}
+        self._runs: 'OrderedDict[str, deque]' = OrderedDict()
+        self._seq = itertools.count(1)
+        self._tokens = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict], None], run_id: Optional[str] = None) -> int:
+        """
+        订阅事件
+
+        Args:
+            callback: 事件回调 (event) -> None
+            run_id: 只接收该运行的事件，默认接收全部
+
+        Returns:
+            订阅标识（用于 unsubscribe）
+        """
+        token = next(self._tokens)
+        with self._lock:
+            self._subscribers[token] = {'callback': callback, 'run_id': run_id}
+        return token
+
+    def unsubscribe(self, token: int):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    @contextmanager
+    def subscription(self, callback: Callable[[Dict], None], run_id: Optional[str] = None):
+        """with 块内有效的订阅"""
+        token = self.subscribe(callback, run_id)
+        try:
+            yield token
+        finally:
+            self.unsubscribe(token)
+
+    def publish(self, event_type: str, run_id: Optional[str] = None, **data) -> Optional[Dict]:
+        """
+        发布事件（run_id 默认取当前运行；不在任何运行中时不发布）
+
+        Returns:
+            事件 {'type', 'run_id', 'seq', 'time', ...data}，未发布时返回None
+        """
+        run_id = run_id or current_run_id()
+        if run_id is None:
+            return None
+        event = {'type': event_type, 'run_id': run_id, 'seq': next(self._seq), 'time': time.time()}
+        event.update(data)
+        with self._lock:
+            events = self._runs.get(run_id)
+            if events is None:
+                events = self._runs[run_id] = deque(maxlen=self.max_events_per_run)
+                while len(self._runs) > self.max_runs:
+                    self._runs.popitem(last=False)
+            events.append(event)
+            callbacks = [s['callback'] for s in self._subscribers.values() if s['run_id'] in (None, run_id)]
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"⚠️  进度事件订阅者出错: {e}")
+        return event
+
+    def events(self, run_id: str, after_seq: int = 0, event_type: Optional[str] = None) -> List[Dict]:
+        """运行的历史事件（seq 大于 after_seq 的，按发布顺序）"""
+        with self._lock:
+            events = list(self._runs.get(run_id, ()))
+        return [e for e in events if e['seq'] > after_seq and (event_type is None or e['type'] == event_type)]
+
+    def latest(self, run_id: str, event_type: str) -> Optional[Dict]:
+        """运行中某类型的最新事件"""
+        with self._lock:
+            for event in reversed(self._runs.get(run_id, ())):
+                if event['type'] == event_type:
+                    return event
+        return None
+
+    def clear(self, run_id: str):
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+
+_default_bus: Optional[ProgressBus] = None
+_default_bus_lock = threading.Lock()
+
+
+def get_default_bus() -> ProgressBus:
+    """进程内共享的事件总线"""
+    global _default_bus
+    with _default_bus_lock:
+        if _default_bus is None:
+            _default_bus = ProgressBus()
+        return _default_bus
+
+
+def emit(event_type: str, **data) -> Optional[Dict]:
+    """向共享总线发布当前运行的事件（不在运行中时什么也不做）"""
+    return get_default_bus().publish(event_type, **data)
+
+
+def stream_events(func: Callable, *args, run_id: Optional[str] = None, title: str = '',
+                  poll_interval: float = 0.5, **kwargs) -> Iterator[Dict]:
+    """
+    在后台线程中运行 func(*args, **kwargs)，逐个产出它发布的事件
+
+    最后一个事件为 EVENT_RUN_FINISHED，带 'result'（func的返回值）或 'error'。
+    没有新事件时每隔 poll_interval 秒产出一次 None，调用方可借此刷新耗时显示。
+    """
+    import uuid
+    run_id = run_id or uuid.uuid4().hex[:12]
+    bus = get_default_bus()
+    inbox: 'queue.Queue[Dict]' = queue.Queue()
+    outcome: Dict = {}
+
+    def target():
+        with progress_run(run_id):
+            try:
+                outcome['result'] = func(*args, **kwargs)
+            except Exception as e:
+                traceback.print_exc()
+                outcome['error'] = f"{type(e).__name__}: {e}"
+
+    with bus.subscription(inbox.put, run_id):
+        bus.publish(EVENT_RUN_STARTED, run_id=run_id, title=title)
+        worker = threading.Thread(target=target, name=f'progress-{run_id}', daemon=True)
+        worker.start()
+        while worker.is_alive() or not inbox.empty():
+            try:
+                yield inbox.get(timeout=poll_interval)
+            except queue.Empty:
+                yield None
+    finished = bus.publish(EVENT_RUN_FINISHED, run_id=run_id,
+                           status='error' if 'error' in outcome else 'success', error=outcome.get('error'))
+    finished = dict(finished, result=outcome.get('result'))
+    yield finished
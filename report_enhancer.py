@@ -1,38 +1,91 @@
 """
 报告增强器 - 修复表格格式并添加数据可视化
 """
-import re
 import json
 import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  # 无GUI后端
 import os
 from datetime import datetime
 
 # 导入表格修复器
 sys.path.insert(0, os.path.dirname(__file__))
 from agents.table_fixer import TableFixer
+from agents import regex_patterns as rx
+from storage.stage_cache import StageCache
+from storage.report_writer import ReportWriter, atomic_write
+from storage.chart_store import ChartStore
+from chart_renderer import ChartRenderService, build_bar_chart_spec, get_chart_backend
+
+# 异步渲染时图表位置的占位符，渲染完成后替换为图片链接
+CHART_PLACEHOLDER = '<!-- chart-pending: {link} -->'
+
+# 图表链接写回在单独的小线程池中执行：不占用渲染服务分发结果的线程，
+# 等待报告写入事务（如同步生成PDF）时也不会拖住其他批次
+WRITEBACK_WORKERS = 2
+# 报告事务一直被占用时写回的最多尝试次数（每次最多等待 LOCK_TIMEOUT）
+WRITEBACK_ATTEMPTS = 5
+
+_writeback_executor: Optional[ThreadPoolExecutor] = None
+_writeback_lock = threading.Lock()
+
+
+def _get_writeback_executor() -> ThreadPoolExecutor:
+    global _writeback_executor
+    with _writeback_lock:
+        if _writeback_executor is None:
+            _writeback_executor = ThreadPoolExecutor(max_workers=WRITEBACK_WORKERS,
+                                                     thread_name_prefix='chart-writeback')
+        return _writeback_executor
+
 
 class ReportEnhancer:
     """报告增强器：修复表格格式并生成图表"""
     
-    def __init__(self):
-        self.charts_dir = "reports/charts"
-        os.makedirs(self.charts_dir, exist_ok=True)
+    # 各阶段版本号：修改对应阶段的逻辑后递增，使旧缓存失效
+    STAGE_VERSIONS = {
+        'table_fixer': '2',
+        'fix_tables': '1',
+        'html_entities': '1',
+        'table_formatting': '1',
+        'bar_chart': '3',
+    }
+    
+    def __init__(self, use_cache: bool = True, cache: Optional[StageCache] = None,
+                 chart_service: Optional[ChartRenderService] = None, chart_backend: str = 'png',
+                 charts_dir: str = "reports/charts", report_writer: Optional[ReportWriter] = None):
+        """
+        Args:
+            use_cache: 是否启用内容哈希缓存（输入未变化的阶段和已存在的图表直接复用）
+            cache: 自定义缓存实例，默认使用 reports/.cache
+            chart_service: 异步图表渲染服务（enhance_report(async_charts=True) 时使用）
+            chart_backend: 图表后端，'png'（matplotlib位图）或 'svg'（模板生成的矢量图，不依赖matplotlib）
+            charts_dir: 图表目录（报告目录下的 charts/，报告中以 charts/文件名 引用）
+            report_writer: 报告写入器；提供时后台图表的链接在该报告的写入事务中写回，
+                           与PDF发布、删除Markdown等事务互斥
+        """
+        self.chart_backend = get_chart_backend(chart_backend)
+        self.charts_dir = charts_dir
+        self.chart_store = ChartStore(self.charts_dir)
         self.table_fixer = TableFixer()
-        
-        # 设置中文字体
-        plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
+        self.cache = (cache or StageCache()) if use_cache else None
+        self.chart_service = chart_service
+        self.report_writer = report_writer
+        self._chart_outputs: List[str] = []
+        self._pending_charts: List[Dict] = []
+        self._async_charts = False
+        self._chart_futures = []
+        self._patch_lock = threading.Lock()
     
-    def enhance_report(self, report_path: str) -> str:
+    def enhance_report(self, report_path: str, async_charts: bool = False) -> str:
         """
         增强报告：修复表格格式并添加图表
         
         Args:
             report_path: 报告文件路径
+            async_charts: 为True时图表交给渲染服务在后台绘制，报告先以占位符保存，
+                          绘制完成后再把图片链接写回（可用 wait_for_charts 等待）
             
         Returns:
             增强后的报告路径
@@ -43,13 +96,55 @@ class ReportEnhancer:
         with open(report_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
+        enhanced_path = self.enhanced_path(report_path)
+        
+        # 输入和各阶段版本都没变时直接复用上次的输出
+        if self.cache and self.cache.lookup(report_path, self._input_key(content, report_path)) \
+                and self._charts_present(enhanced_path):
+            print(f"⏭️  报告未变化，复用缓存结果: {enhanced_path}")
+            return enhanced_path
+        
+        enhanced = self.enhance_content(content, report_path, async_charts=async_charts)
+        
+        # 保存增强后的报告（原子替换，不会覆盖硬链接的缓存对象）
+        atomic_write(enhanced_path, enhanced.encode('utf-8'))
+        self.finish_enhancement(content, report_path, enhanced_path)
+        return enhanced_path
+    
+    @staticmethod
+    def enhanced_path(report_path: str) -> str:
+        """增强版报告的路径"""
+        return report_path.replace('.md', '_enhanced.md')
+    
+    def _input_key(self, content: str, report_path: str) -> str:
+        return StageCache.key(
+            'enhance_report', self._pipeline_version(), self.chart_backend.name, content, os.path.basename(report_path)
+        )
+    
+    def enhance_content(self, content: str, report_path: str, async_charts: bool = False) -> str:
+        """
+        在内存中增强报告内容（不写文件），供调用方把增强版与原始报告放在同一个写入事务中发布。
+        发布后必须调用 finish_enhancement 登记图表引用、提交后台图表和记录缓存。
+        
+        Args:
+            content: 原始报告内容
+            report_path: 原始报告的（最终）路径，用于图表命名
+            async_charts: 同 enhance_report
+            
+        Returns:
+            增强后的内容
+        """
+        self._chart_outputs = []
+        self._pending_charts = []
+        self._async_charts = async_charts
+        
         # 1a. 修复紧凑表格（没有|分隔符的表格）
         print("   → 修复紧凑表格格式...")
-        content = self.table_fixer.fix_all_tables(content)
+        content = self._run_stage('table_fixer', self.table_fixer.fix_all_tables, content)
         
         # 1b. 修复残留的表格问题
         print("   → 修复其他表格格式...")
-        content = self._fix_all_tables(content)
+        content = self._run_stage('fix_tables', self._fix_all_tables, content)
         
         # 2. 提取数据并生成图表
         print("   → 生成数据可视化图表...")
@@ -57,19 +152,65 @@ class ReportEnhancer:
         
         # 3. 清理HTML实体
         print("   → 清理HTML编码...")
-        content = self._clean_html_entities(content)
+        content = self._run_stage('html_entities', self._clean_html_entities, content)
         
         # 4. 优化表格样式
         print("   → 优化表格样式...")
-        content = self._enhance_table_formatting(content)
+        content = self._run_stage('table_formatting', self._enhance_table_formatting, content)
+        return content
+    
+    def finish_enhancement(self, content: str, report_path: str, enhanced_path: str):
+        """
+        增强版发布到 enhanced_path 之后调用
         
-        # 保存增强后的报告
-        enhanced_path = report_path.replace('.md', '_enhanced.md')
-        with open(enhanced_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        Args:
+            content: 增强前的原始报告内容（缓存键）
+            report_path: 原始报告路径
+            enhanced_path: 已发布的增强版路径
+        """
+        # 记录本报告引用的图表（包括后台渲染中的），未被引用的图表才会被回收
+        self.chart_store.set_refs(
+            enhanced_path,
+            [os.path.basename(path) for path in self._chart_outputs] +
+            [os.path.basename(job['output_path']) for job in self._pending_charts]
+        )
+        
+        input_key = self._input_key(content, report_path)
+        if self._pending_charts:
+            # 图表在后台绘制，完成后写回链接并记录缓存
+            self._submit_pending_charts(report_path, enhanced_path, input_key)
+            print(f"      {len(self._pending_charts)} 个图表在后台渲染")
+        elif self.cache:
+            self.cache.record(report_path, input_key, [enhanced_path])
         
         print(f"✅ 报告增强完成: {enhanced_path}")
-        return enhanced_path
+    
+    def wait_for_charts(self, timeout: Optional[float] = None):
+        """等待所有后台图表渲染完成并写回报告（等待的是写回结束，而不只是渲染结束）"""
+        for future in list(self._chart_futures):
+            future.result(timeout=timeout)
+        self._chart_futures = []
+    
+    def _charts_present(self, enhanced_path: str) -> bool:
+        """
+        复用缓存结果前检查增强报告链接的图表是否都还在（被删除或回收时需要重新生成），
+        都在时重新登记引用（引用记录可能随报告删除被回收过）
+        """
+        names = self.chart_store.linked_charts(enhanced_path)
+        if not all(self.chart_store.touch(name) for name in names):
+            return False
+        self.chart_store.set_refs(enhanced_path, names)
+        return True
+    
+    def _pipeline_version(self) -> str:
+        """整条流水线的版本（任一阶段版本变化都会使报告级缓存失效）"""
+        return ','.join(f'{name}={version}' for name, version in sorted(self.STAGE_VERSIONS.items()))
+    
+    def _run_stage(self, stage: str, func, content: str) -> str:
+        """执行文本阶段，启用缓存时按输入内容哈希复用结果"""
+        if not self.cache:
+            return func(content)
+        return self.cache.run_text_stage(stage, self.STAGE_VERSIONS[stage], func, content)
     
     def _fix_all_tables(self, content: str) -> str:
         """修复所有损坏的表格格式"""
@@ -125,18 +266,9 @@ class ReportEnhancer:
         
         # 特征：包含多个连续的数据项（金额、百分比等）但没有表格边框
         # 必须同时满足：特定格式 + 多个数据项
-        patterns = [
-            r'^[A-Z][a-z]+[A-Z][\d.]+',  # 开头是单词连着大写字母和数字（如"MetricQ246.7"）
-            r'^[A-Z][a-z]+\$[\d.]+[BMK]\$[\d.]+[BMK]',  # 标签+两个紧密金额
-            r'^RatioValue',  # RatioValue开头（新的损坏表格格式）
-            r'^Ratio[A-Z]+[\d.–~<>]',  # Ratio开头紧跟大写字母和数据
-            r'^Segment[A-Z][a-z]+[\d%]',  # Segment开头紧跟数据
-            r'^Metric.*FY\d{4}.*[\d.%]',  # Metric + FY年份 + 数据
-            r'^MetricQ\d',  # MetricQ后面跟数字（财务报表标题）
-        ]
-        
-        for pattern in patterns:
-            if re.search(pattern, line):
+        # 模式定义见 agents/regex_patterns.py（RE_BROKEN_TABLE_LINE）
+        for pattern in rx.RE_BROKEN_TABLE_LINE:
+            if pattern.search(line):
                 return True
         return False
     
@@ -149,15 +281,15 @@ class ReportEnhancer:
         first_line = table_lines[0]
         
         # 模式1: 财务指标表格（Metric, Q2 FY2026, Q1 FY2026, YoY Change）
-        if re.search(r'Metric.*FY.*YoY|Metric.*Q\d', first_line, re.IGNORECASE):
+        if rx.RE_FINANCIAL_TABLE_HEADER.search(first_line):
             return self._rebuild_financial_metrics_table(table_lines)
         
         # 模式2: 估值比率表格（Ratio, NVIDIA, Sector Avg, Premium）
-        if re.search(r'Ratio.*Value.*Industry|Ratio.*NVIDIA.*Sector|Ratio.*Interpretation', first_line, re.IGNORECASE):
+        if rx.RE_VALUATION_TABLE_HEADER.search(first_line):
             return self._rebuild_valuation_table(table_lines)
         
         # 模式3: 市场份额表格（Segment, Market Share, Products）
-        if re.search(r'Segment.*Market.*Share|Products', first_line, re.IGNORECASE):
+        if rx.RE_MARKET_SHARE_HEADER.search(first_line):
             return self._rebuild_market_share_table(table_lines)
         
         # 通用模式：尝试分割
@@ -174,16 +306,11 @@ class ReportEnhancer:
         # 合并所有行（可能数据都在一行中）
         full_text = ' '.join(lines)
         
-        # 识别常见的财务指标名称
-        metrics = ['Revenue', 'Net Income', 'Gross Margin', 'Operating Margin', 'EBITDA', 'EPS']
-        
         # 尝试通用解析方法
         # 查找所有看起来像表格行的内容
         # 格式：单词(可能带括号) + 数字 + 数字 + ... 
-        row_pattern = r'([A-Za-z\s\(\)]+?)\s*\(?\$?([B\d.~]+)\)?\s*([B\d.*~]+)\s*([B\d.~]+)\s*([+\-\d%~]+)'
-        
         for line in lines:
-            match = re.search(row_pattern, line)
+            match = rx.RE_FINANCIAL_ROW.search(line)
             if match and len(match.groups()) >= 4:
                 label = match.group(1).strip()
                 val1 = match.group(2).strip()
@@ -205,14 +332,10 @@ class ReportEnhancer:
         
         # 如果通用解析失败，尝试逐个指标解析
         if len(result) == 2:
-            for metric in metrics:
+            # 识别常见的财务指标名称（Margin类指标的值为百分比）
+            for metric, pattern in rx.RE_FINANCIAL_METRIC_ROWS.items():
                 # 查找该指标及其后面的数据
-                if 'Margin' in metric:
-                    pattern = rf'{metric}\s*([\d.]+%?)\s*([\d.]+%?|Not\s+disclosed)\s*([+\-]?[\d.]+%|Not\s+disclosed|Stable[^A-Z]*)'
-                else:
-                    pattern = rf'{metric}\s*\$?([\d.]+[BMK]?)\s*\$?([\d.]+[BMK]?)\s*([+\-]?[\d.]+%|Not\s+disclosed)'
-                
-                match = re.search(pattern, full_text, re.IGNORECASE)
+                match = pattern.search(full_text)
                 if match:
                     val1 = match.group(1).strip()
                     val2 = match.group(2).strip()
@@ -254,18 +377,9 @@ class ReportEnhancer:
             
             # 查找常见的比率名称和它们的值
             # 格式：Gross Margin~75% (est.)~55%Exceptional pricing power...
-            ratio_patterns = [
-                (r'(Gross\s+Margin)', r'Gross\s+Margin'),
-                (r'(Net\s+Margin)', r'Net\s+Margin'),
-                (r'(ROE)', r'ROE'),
-                (r'(Operating\s+Margin)', r'Operating\s+Margin'),
-                (r'(ROIC)', r'ROIC'),
-            ]
-            
-            for ratio_name, ratio_pattern in ratio_patterns:
+            for ratio_name, pattern in rx.RE_VALUATION_RATIO_ROWS:
                 # 模式：Ratio名~值1~值2描述文字
-                pattern = rf'{ratio_pattern}\s*([~\d.%\(\)a-z\s]+?)\s*([~\d.%<>]+)\s*([A-Z][^~\d]*?)(?=[A-Z][a-z]+\s+[~\d]|$)'
-                match = re.search(pattern, full_text)
+                match = pattern.search(full_text)
                 if match:
                     value = match.group(2).strip()
                     industry_avg = match.group(3).strip() if len(match.groups()) >= 3 else ''
@@ -286,18 +400,9 @@ class ReportEnhancer:
             ]
             
             # 常见的估值比率
-            ratios = [
-                ('P/E (TTM)', r'P/E\s*\(TTM\)'),
-                ('P/S (TTM)', r'P/S\s*\(TTM\)'),
-                ('P/B', r'P/B(?!\w)'),
-                ('EV/EBITDA', r'EV/EBITDA'),
-                ('Forward P/E', r'Forward\s*P/E')
-            ]
-            
-            for ratio_name, ratio_pattern in ratios:
+            for ratio_name, pattern in rx.RE_SECTOR_RATIO_ROWS:
                 # 模式：比率名 + NVIDIA值 + Sector值 + Premium/Discount
-                pattern = rf'{ratio_pattern}\s*([\d.–~<>]+)\s*([\d.–~<>]+)\s*([+\-~][\d.%x]+)'
-                match = re.search(pattern, full_text)
+                match = pattern.search(full_text)
                 if match:
                     nvidia_val = match.group(1)
                     sector_val = match.group(2)
@@ -320,7 +425,7 @@ class ReportEnhancer:
         
         for line in lines:
             # 尝试分割：细分市场, 市场份额, 产品
-            parts = re.split(r'(\d+[–\-]\d+%|\d+%|>?\d+%|Emerging\s+Leader)', line, maxsplit=1)
+            parts = rx.RE_MARKET_SHARE_SPLIT.split(line, maxsplit=1)
             if len(parts) >= 3:
                 segment = parts[0].strip()
                 share = parts[1].strip()
@@ -338,7 +443,7 @@ class ReportEnhancer:
         
         # 寻找可能的列分隔点（大写字母后跟数字或$）
         split_points = []
-        for match in re.finditer(r'[A-Z][a-z]+', first_line):
+        for match in rx.RE_CAPITALIZED_WORD.finditer(first_line):
             split_points.append(match.start())
         
         if len(split_points) < 2:
@@ -367,7 +472,7 @@ class ReportEnhancer:
         """解析压缩的表格行"""
         # 这是一个简化版本，实际可能需要更复杂的解析
         # 尝试用正则表达式分割
-        parts = re.findall(r'([A-Za-z ]+)(\$?[\d.]+[BMK%]?)', line)
+        parts = rx.RE_CONDENSED_PARTS.findall(line)
         if len(parts) >= 2:
             return '| ' + ' | '.join([p[0].strip() + ' ' + p[1] for p in parts]) + ' |'
         return None
@@ -396,12 +501,12 @@ class ReportEnhancer:
             # 如果是表格行或表格附近的行，清理格式标记
             if '|' in line or (i > 0 and '|' in lines[i-1]) or (i < len(lines)-1 and '|' in lines[i+1]):
                 # 清理删除线 ~~text~~
-                line = re.sub(r'~~([^~]+)~~', r'\1', line)
+                line = rx.MD_STRIKETHROUGH.sub(r'\1', line)
                 # 清理过多的斜体标记（保留合理的强调）
                 # 如果整行都是斜体或混乱的斜体，移除斜体标记
                 if line.count('*') > 4 or line.count('_') > 4:
-                    line = re.sub(r'\*([^\*]+)\*', r'\1', line)
-                    line = re.sub(r'_([^_]+)_', r'\1', line)
+                    line = rx.MD_ITALIC_STAR.sub(r'\1', line)
+                    line = rx.MD_ITALIC_UNDERSCORE.sub(r'\1', line)
             
             cleaned_lines.append(line)
         
@@ -474,12 +579,12 @@ class ReportEnhancer:
                     table_data = self._parse_table(table_lines)
                     
                     if table_data and self._is_numeric_table(table_data):
-                        chart_path = self._generate_chart_from_table(table_data, report_name, chart_count)
-                        if chart_path:
+                        chart_line = self._generate_chart_from_table(table_data, report_name, chart_count)
+                        if chart_line:
                             result_lines.append('')
                             result_lines.append(f'**图表 {chart_count + 1}**: 数据可视化')
                             result_lines.append('')
-                            result_lines.append(f'![图表 {chart_count + 1}]({chart_path})')
+                            result_lines.append(chart_line)
                             result_lines.append('')
                             chart_count += 1
             
@@ -553,7 +658,11 @@ class ReportEnhancer:
         return '\n'.join(lines)
     
     def _generate_chart_from_table(self, table: Dict, report_name: str, table_idx: int) -> Optional[str]:
-        """从表格数据生成图表"""
+        """
+        从表格数据生成图表，返回插入报告的图片行
+        
+        异步模式下缓存未命中的图表只登记渲染任务，返回占位符
+        """
         try:
             headers = table['headers']
             rows = table['rows']
@@ -563,10 +672,24 @@ class ReportEnhancer:
                 return None
             
             # 尝试识别表格类型并生成相应图表
-            if self._is_numeric_table(table):
-                return self._generate_bar_chart(table, report_name, table_idx)
+            if not self._is_numeric_table(table):
+                return None
             
-            return None
+            job = self._plan_bar_chart(table, report_name, table_idx)
+            if job is None:
+                return None
+            image_line = f"![图表 {job['number']}]({job['link']})"
+            
+            if self._link_cached_chart(job):
+                return image_line
+            
+            if self._async_charts and self.chart_service:
+                self._pending_charts.append(job)
+                return CHART_PLACEHOLDER.format(link=job['link'])
+            
+            self.chart_backend.render(job['spec'], job['output_path'])
+            self._store_rendered_chart(job)
+            return image_line
             
         except Exception as e:
             print(f"      警告: 生成图表时出错 - {e}")
@@ -574,84 +697,139 @@ class ReportEnhancer:
     
     def _is_numeric_table(self, table: Dict) -> bool:
         """检查表格是否包含数值数据"""
-        numeric_pattern = r'[\d.]+[%BMK]?|\$[\d.]+'
-        
         for row in table['rows']:
             # 检查是否至少有一列包含数字
             for cell in row[1:]:  # 跳过第一列（通常是标签）
-                if re.search(numeric_pattern, cell):
+                if rx.RE_NUMERIC_CELL.search(cell):
                     return True
         return False
     
-    def _generate_bar_chart(self, table: Dict, report_name: str, table_idx: int) -> str:
-        """生成柱状图"""
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        headers = table['headers']
-        rows = table['rows']
-        
-        # 提取标签（第一列）
-        labels = [row[0] for row in rows[:5]]  # 最多5个标签
-        
-        # 提取数值（其他列）
-        numeric_data = []
-        for col_idx in range(1, min(len(headers), 4)):  # 最多3个数据系列
-            values = []
-            for row in rows[:5]:
-                if col_idx < len(row):
-                    # 提取数字
-                    cell = row[col_idx]
-                    # 移除$, %, B, M, K等符号
-                    cell_clean = cell.replace('$', '').replace(',', '').replace('%', '')
-                    
-                    # 提取有效数字（必须包含至少一位完整的数字）
-                    num_match = re.search(r'(\d+\.?\d*)', cell_clean)
-                    if num_match:
-                        try:
-                            num_val = float(num_match.group(1))
-                            # 处理单位 B/M/K
-                            if 'B' in cell:
-                                num_val *= 1000  # 转换为百万为单位
-                            elif 'K' in cell:
-                                num_val /= 1000
-                            values.append(num_val)
-                        except (ValueError, AttributeError):
-                            values.append(0)
-                    else:
-                        values.append(0)
-            if values and sum(values) > 0:  # 确保有有效数据
-                numeric_data.append((headers[col_idx], values))
-        
-        if not numeric_data:
-            plt.close()
+    def _plan_bar_chart(self, table: Dict, report_name: str, table_idx: int) -> Optional[Dict]:
+        """计算柱状图规格和输出位置（不绘制）；没有有效数值时返回None"""
+        spec = build_bar_chart_spec(table, table_idx)
+        if spec is None:
             return None
         
-        # 绘制柱状图
-        x = range(len(labels))
-        width = 0.8 / len(numeric_data)
-        
-        for i, (series_name, values) in enumerate(numeric_data):
-            offset = width * i - (width * len(numeric_data) / 2 - width / 2)
-            ax.bar([pos + offset for pos in x], values, width, label=series_name)
-        
-        ax.set_xlabel('Metric', fontsize=12)
-        ax.set_ylabel('Value', fontsize=12)
-        ax.set_title(f'Data Visualization - Table {table_idx + 1}', fontsize=14, fontweight='bold')
-        ax.set_xticks(x)
-        ax.set_xticklabels(labels, rotation=45, ha='right')
-        ax.legend()
-        ax.grid(axis='y', alpha=0.3)
-        
-        plt.tight_layout()
-        
-        # 保存图表
-        chart_filename = f"{report_name}_chart_{table_idx}.png"
-        chart_path = os.path.join(self.charts_dir, chart_filename)
-        plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-        plt.close()
+        # 图表只取决于规格（数据、标题）和后端，按内容哈希命名，相同表格在不同报告间共用一个文件
+        chart_key = StageCache.key(
+            'bar_chart', self.STAGE_VERSIONS['bar_chart'], self.chart_backend.name,
+            json.dumps(spec, sort_keys=True, ensure_ascii=False)
+        )
+        chart_filename = self.chart_store.chart_name(chart_key, self.chart_backend.extension)
+        return {
+            'spec': spec,
+            'backend': self.chart_backend.name,
+            'output_path': self.chart_store.path(chart_filename),
+            'link': f"charts/{chart_filename}",
+            'number': table_idx + 1,
+        }
+    
+    def _link_cached_chart(self, job: Dict) -> bool:
+        """内容相同的图表已经存在时直接引用，不再绘制"""
+        if not self.cache:
+            return False
+        if self.chart_store.touch(os.path.basename(job['output_path'])):
+            self.cache.hits += 1
+            self._chart_outputs.append(job['output_path'])
+            return True
+        self.cache.misses += 1
+        return False
+    
+    def _store_rendered_chart(self, job: Dict, outputs: Optional[List[str]] = None):
+        """登记新绘制的图表（文件名即内容哈希，无需另存缓存对象）"""
+        (self._chart_outputs if outputs is None else outputs).append(job['output_path'])
+    
+    def _submit_pending_charts(self, report_path: str, enhanced_path: str, input_key: str):
+        """把本报告待渲染的图表作为一批提交，完成后回调写回链接"""
+        jobs = list(self._pending_charts)
+        outputs = list(self._chart_outputs)
+        future = self.chart_service.submit([
+            {'spec': job['spec'], 'output_path': job['output_path'], 'backend': job['backend']} for job in jobs
+        ])
+        # concurrent.futures 先唤醒 result() 的等待者再执行回调，
+        # 所以 wait_for_charts 等待的是写回结束时才完成的 written
+        written = Future()
+        
+        def on_rendered(f):
+            args = (f, jobs, outputs, report_path, enhanced_path, input_key, written)
+            try:
+                _get_writeback_executor().submit(self._finish_pending_charts, *args)
+            except RuntimeError:
+                # 解释器退出中，线程池不再接受任务
+                self._finish_pending_charts(*args)
+        
+        future.add_done_callback(on_rendered)
+        self._chart_futures.append(written)
+    
+    def _finish_pending_charts(self, future, jobs: List[Dict], outputs: List[str],
+                               report_path: str, enhanced_path: str, input_key: str,
+                               written: Optional[Future] = None):
+        """渲染完成：占位符替换为图片链接（失败的标注为生成失败），并记录缓存；结束时完成 written"""
+        try:
+            self._write_back_charts(future, jobs, outputs, report_path, enhanced_path, input_key)
+        except Exception as e:
+            print(f"      警告: 图表链接写回失败 {enhanced_path} - {e}")
+        finally:
+            if written is not None:
+                written.set_result(None)
+    
+    def _write_back_charts(self, future, jobs: List[Dict], outputs: List[str],
+                           report_path: str, enhanced_path: str, input_key: str):
+        try:
+            results = future.result()
+        except Exception as e:
+            results = [{'success': False, 'error': f"{type(e).__name__}: {e}"} for _ in jobs]
+        
+        replacements = {}
+        all_succeeded = True
+        for job, result in zip(jobs, results):
+            placeholder = CHART_PLACEHOLDER.format(link=job['link'])
+            if result['success']:
+                replacements[placeholder] = f"![图表 {job['number']}]({job['link']})"
+                self._store_rendered_chart(job, outputs)
+            else:
+                all_succeeded = False
+                replacements[placeholder] = '*（图表生成失败）*'
+                print(f"      警告: 图表渲染失败 {job['link']} - {result['error']}")
         
-        # 返回相对路径
-        return f"charts/{chart_filename}"
+        if self.report_writer is None:
+            patched = self._patch_placeholders(enhanced_path, replacements)
+        else:
+            # 与 PDF 发布（keep_markdown=False 时删除增强版）等事务互斥；报告被长时间占用时重试
+            stem = os.path.splitext(os.path.basename(report_path))[0]
+            for attempt in range(1, WRITEBACK_ATTEMPTS + 1):
+                try:
+                    with self.report_writer.open(stem) as txn:
+                        patched = self._patch_placeholders(enhanced_path, replacements, txn)
+                    break
+                except TimeoutError:
+                    print(f"      报告 {stem} 正在写入，稍后重试图表链接写回（{attempt}/{WRITEBACK_ATTEMPTS}）")
+            else:
+                print(f"      警告: 图表链接写回失败 {enhanced_path} - 报告事务一直被占用")
+                return
+        if not patched:
+            # 增强版已被删除（如PDF生成后不保留Markdown），不再重新创建
+            print(f"      增强版已删除，跳过图表链接写回: {enhanced_path}")
+            return
+        
+        # 有失败的图表时不记录manifest，下次运行会重新处理
+        if self.cache and all_succeeded:
+            self.cache.record(report_path, input_key, [enhanced_path])
+    
+    def _patch_placeholders(self, enhanced_path: str, replacements: Dict[str, str], txn=None) -> bool:
+        """把占位符替换为图表链接（在事务中时由事务发布），增强版已不存在时返回False"""
+        with self._patch_lock:
+            if not os.path.exists(enhanced_path):
+                return False
+            with open(enhanced_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            for placeholder, replacement in replacements.items():
+                content = content.replace(placeholder, replacement)
+            if txn is not None:
+                txn.write_text(os.path.basename(enhanced_path), content)
+            else:
+                atomic_write(enhanced_path, content.encode('utf-8'))
+            return True
     
     def enhance_report_from_path(self, report_path: str) -> str:
         """便捷方法：直接从路径增强报告"""
@@ -665,14 +843,15 @@ def main():
     """命令行工具"""
     import sys
     
-    if len(sys.argv) < 2:
-        print("使用方法: python report_enhancer.py <report_path>")
+    args = [arg for arg in sys.argv[1:] if arg != '--no-cache']
+    if not args:
+        print("使用方法: python report_enhancer.py <report_path> [--no-cache]")
         print("示例: python report_enhancer.py reports/NVIDIA_20251104.md")
         sys.exit(1)
     
-    report_path = sys.argv[1]
+    report_path = args[0]
     
-    enhancer = ReportEnhancer()
+    enhancer = ReportEnhancer(use_cache='--no-cache' not in sys.argv)
     try:
         enhanced_path = enhancer.enhance_report_from_path(report_path)
         print(f"\n✨ 增强完成！")
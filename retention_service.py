@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+报告保留策略的后台执行与命令行工具
+
+RetentionService 在后台线程中增量清理：每轮按目录索引重新计算计划，
+只执行一小批删除（batch_size），还有剩余时稍后继续，清理完毕后回收孤立的图表和归档blob，
+然后等待下一个周期。生成报告和查看历史不会被长时间的清理阻塞。
+
+用法:
+    python retention_service.py --dry-run                  # 按 config.py 的策略预览要删除的内容
+    python retention_service.py --keep-latest 5            # 每个公司只保留最新5份报告
+    python retention_service.py --max-age-days 90 --max-total-mb 500
+    python retention_service.py --gc                       # 只回收孤立的图表和归档blob
+"""
+import argparse
+import atexit
+import threading
+import time
+from typing import Dict, Optional
+
+from storage.retention import RetentionEngine, RetentionPolicy
+
+# 每轮最多执行的删除项数、两批之间的间隔（秒）
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_BATCH_PAUSE = 2.0
+
+REASON_LABELS = {
+    'superseded': '被取代的变体',
+    'keep_latest': '超出保留份数',
+    'max_age': '超过保留时间',
+    'max_bytes': '超出总大小',
+}
+
+
+class RetentionService:
+    """后台增量清理"""
+
+    def __init__(self, engine: Optional[RetentionEngine] = None, interval: float = 3600,
+                 batch_size: int = DEFAULT_BATCH_SIZE, batch_pause: float = DEFAULT_BATCH_PAUSE):
+        """
+        Args:
+            engine: 保留策略引擎，默认按 config.py 的策略清理 reports/
+            interval: 清理完毕后等待下一轮的时间（秒）
+            batch_size: 每批最多执行的删除项数
+            batch_pause: 还有剩余时两批之间的间隔（秒）
+        """
+        self.engine = engine or RetentionEngine()
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.last_summary: Optional[Dict] = None
+        self._pending_gc = False
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def run_once(self) -> Dict:
+        """执行一批清理；本轮计划执行完毕且删除过内容时回收图表和归档blob"""
+        with self._lock:
+            summary = self.engine.apply(max_actions=self.batch_size)
+            if summary['files']:
+                self._pending_gc = True
+                print(f"🧹 保留策略: 删除 {summary['reports']} 次运行、{summary['variants']} 组变体，"
+                      f"共 {summary['files']} 个文件（{summary['bytes'] / 1024 / 1024:.1f} MB）")
+            if not summary['remaining'] and self._pending_gc:
+                summary['gc'] = self.engine.collect_garbage()
+                self._pending_gc = False
+            summary['finished_at'] = time.time()
+            self.last_summary = summary
+            return summary
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动后台线程（重复调用无副作用）"""
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='retention', daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                summary = self.run_once()
+                wait = self.batch_pause if summary['remaining'] else self.interval
+            except Exception as e:
+                print(f"⚠️  保留策略清理失败: {e}")
+                wait = self.interval
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def trigger(self):
+        """立即开始下一轮（不等待周期结束）"""
+        self._wakeup.set()
+
+    def shutdown(self, wait: bool = True):
+        self._stop.set()
+        self._wakeup.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+
+_default_service: Optional[RetentionService] = None
+_default_service_lock = threading.Lock()
+
+
+def get_default_retention_service(start: Optional[bool] = None) -> RetentionService:
+    """
+    进程内共享的清理服务
+
+    Args:
+        start: 是否启动后台线程，默认取决于 config.RETENTION_ENABLED
+    """
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            from config import RETENTION_INTERVAL_MINUTES
+            _default_service = RetentionService(interval=RETENTION_INTERVAL_MINUTES * 60)
+            atexit.register(_default_service.shutdown, False)
+        if start is None:
+            from config import RETENTION_ENABLED
+            start = RETENTION_ENABLED
+    if start:
+        _default_service.start()
+    return _default_service
+
+
+def _format_summary(summary: Dict) -> str:
+    reasons = "，".join(f"{REASON_LABELS.get(r, r)} {n}" for r, n in summary['reasons'].items())
+    return (f"{summary['reports']} 次运行、{summary['variants']} 组变体，共 {summary['files']} 个文件，"
+            f"{summary['bytes'] / 1024 / 1024:.2f} MB" + (f"（{reasons}）" if reasons else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按保留策略清理报告和图表')
+    parser.add_argument('--reports-dir', default='reports', help='报告目录（默认 reports/）')
+    parser.add_argument('--keep-latest', type=int, default=None, help='每个公司保留的最新报告数')
+    parser.add_argument('--max-age-days', type=float, default=None, help='最长保留天数')
+    parser.add_argument('--max-total-mb', type=float, default=None, help='报告总大小上限（MB）')
+    parser.add_argument('--keep-variants', action='store_true', help='不删除被取代的变体')
+    parser.add_argument('--min-age-hours', type=float, default=1, help='多少小时内的报告不清理（默认1）')
+    parser.add_argument('--dry-run', action='store_true', help='只显示要删除的内容')
+    parser.add_argument('--gc', action='store_true', help='只回收孤立的图表和归档blob')
+    args = parser.parse_args()
+
+    policy = RetentionPolicy.from_config()
+    if args.keep_latest is not None:
+        policy.keep_latest_per_ticker = args.keep_latest
+    if args.max_age_days is not None:
+        policy.max_age_days = args.max_age_days
+    if args.max_total_mb is not None:
+        policy.max_total_bytes = int(args.max_total_mb * 1024 * 1024)
+    policy.drop_superseded_variants = not args.keep_variants
+    policy.min_age_seconds = args.min_age_hours * 3600
+
+    engine = RetentionEngine(policy, reports_dir=args.reports_dir)
+    if not args.gc:
+        engine.catalog.sync()
+        print(f"📋 保留策略: {policy.describe()}")
+        actions = engine.plan()
+        for action in actions[:20]:
+            print(f"  - [{REASON_LABELS.get(action['reason'], action['reason'])}] {', '.join(action['names'])}")
+        if len(actions) > 20:
+            print(f"  ... 共 {len(actions)} 项")
+        summary = engine.apply(actions, dry_run=args.dry_run)
+        print(f"{'🔍 将删除' if args.dry_run else '🧹 已删除'}: {_format_summary(summary)}")
+        if summary['skipped']:
+            print(f"⏭️  {summary['skipped']} 项因报告正在写入而跳过，下次再清理")
+
+    result = engine.collect_garbage(dry_run=args.dry_run)
+    print(f"{'🔍 可回收' if args.dry_run else '♻️  已回收'}: 图表 {result['charts']} 个（{result['chart_bytes'] / 1024:.1f} KB），"
+          f"归档blob {result['blobs']} 个（{result['blob_bytes'] / 1024:.1f} KB），"
+          f"缓存对象 {result['cache_objects']} 个（{result['cache_bytes'] / 1024:.1f} KB）")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,7 +2,6 @@
 行业热点分析 - 命令行工具
 """
 from agents.sector_leader_analyzer import SectorLeaderAnalyzer
-from datetime import datetime
 import sys
 
 
@@ -194,14 +193,8 @@ def generate_full_report():
         print(f"\n❌ 报告生成失败: {result.get('error', '未知错误')}")
         return
     
-    # 保存报告
-    filename = f"reports/sector_hotspot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-    
-    import os
-    os.makedirs("reports", exist_ok=True)
-    
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(result["report"])
+    # 保存报告（原子发布并登记到报告目录和全文索引）
+    filename = analyzer.save_report(result)
     
     print("\n" + "="*80)
     print("✅ 报告生成成功！")
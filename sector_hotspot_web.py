@@ -3,20 +3,77 @@
 基于Gradio构建的交互式界面
 """
 import gradio as gr
-from agents.sector_leader_analyzer import SectorLeaderAnalyzer
-from datetime import datetime
+from agents.sector_leader_analyzer import get_shared_sector_analyzer
+from progress_bus import (
+    EVENT_PARTIAL, EVENT_QUERY_DONE, EVENT_RUN_FINISHED, EVENT_STAGE, stream_events,
+)
+import html
 import json
+import time
 
 
-# 全局分析器实例
-analyzer = SectorLeaderAnalyzer()
+# 全局分析器实例（与后台任务共用客户端、限速器和响应缓存）
+analyzer = get_shared_sector_analyzer()
+
+
+def _describe_event(event: dict) -> str:
+    """把进度事件转成一行进度说明（不需要显示的事件返回空字符串）"""
+    if event['type'] == EVENT_STAGE:
+        return f"⏳ {event.get('message') or event.get('stage')}"
+    if event['type'] == EVENT_QUERY_DONE:
+        icon = "✅" if event['status'] == 'success' else "❌"
+        line = f"{icon} 搜索 {event['index'] + 1}/{event['total']}: {html.escape(event['query'][:60])}"
+        if event['status'] == 'success' and event.get('content'):
+            line += f"<br><small style='color: #666;'>{html.escape(event['content'][:200])}…</small>"
+        return line
+    if event['type'] == EVENT_PARTIAL and event['name'] == 'hotspots':
+        sectors = [s.get('sector', '') for s in event['data'].get('top_sectors', [])]
+        return f"🔥 热点行业: {', '.join(sectors)}"
+    if event['type'] == EVENT_PARTIAL and event['name'] == 'sector_leaders':
+        return f"🏆 已找到 {event['sector']} 行业龙头"
+    return ""
+
+
+def _progress_html(title: str, lines: list, elapsed: float) -> str:
+    items = "".join(f"<li style='margin: 4px 0;'>{line}</li>" for line in lines)
+    return f"""
+    <div style="padding: 15px; background: #f8f9fa; border-radius: 8px;">
+        <h3 style="margin: 0 0 10px 0;">{title}（已用时 {elapsed:.0f} 秒）</h3>
+        <ul style="margin: 0; padding-left: 20px;">{items}</ul>
+    </div>
+    """
+
+
+def _stream_progress(func, title: str):
+    """
+    运行 func 并订阅其进度事件：进行中产出进度HTML（str），结束时产出结果（dict）
+    """
+    lines = []
+    start = time.time()
+    for event in stream_events(func, title=title):
+        if event is None:
+            yield _progress_html(title, lines, time.time() - start)
+        elif event['type'] == EVENT_RUN_FINISHED:
+            yield event['result'] if event['status'] == 'success' else {"status": "error", "error": event['error']}
+        else:
+            line = _describe_event(event)
+            if line:
+                lines.append(line)
+                yield _progress_html(title, lines, time.time() - start)
 
 
 def analyze_hotspots_web():
-    """Web版本的热点分析"""
+    """Web版本的热点分析（分析过程中逐步显示搜索进度）"""
+    for update in _stream_progress(analyzer.analyze_market_hotspots, "🔥 正在分析市场热点"):
+        if isinstance(update, str):
+            yield update, ""
+        else:
+            yield _render_hotspots(update)
+
+
+def _render_hotspots(result: dict):
+    """热点分析结果 -> (HTML, JSON)"""
     try:
-        result = analyzer.analyze_market_hotspots()
-        
         if result.get("status") != "success":
             return "❌ 分析失败，请稍后重试", ""
         
@@ -219,21 +276,22 @@ def find_leaders_web(sector, market_choice):
 
 
 def generate_report_web():
-    """Web版本的完整报告生成"""
+    """Web版本的完整报告生成（生成过程中逐步显示热点和龙头查找进度）"""
+    for update in _stream_progress(analyzer.generate_hotspot_report, "📝 正在生成完整报告"):
+        if isinstance(update, str):
+            yield update, "", ""
+        else:
+            yield _save_hotspot_report(update)
+
+
+def _save_hotspot_report(result: dict):
+    """保存完整报告 -> (状态HTML, 报告内容, 文件路径)"""
     try:
-        result = analyzer.generate_hotspot_report()
-        
         if result.get("status") != "success":
             return "❌ 报告生成失败", "", ""
         
-        # 保存报告
-        filename = f"reports/sector_hotspot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-        
-        import os
-        os.makedirs("reports", exist_ok=True)
-        
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(result["report"])
+        # 保存报告（原子发布并登记到报告目录和全文索引）
+        filename = analyzer.save_report(result)
         
         success_msg = f"""
         <div style="padding: 20px; background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%); border-radius: 10px; color: white;">
@@ -389,6 +447,8 @@ def create_web_interface():
 def main():
     """启动Web界面"""
     app = create_web_interface()
+    # 启用队列：生成器函数的进度更新才能逐步推送到浏览器
+    app.queue()
     app.launch(
         server_name="0.0.0.0",
         server_port=7861,
@@ -0,0 +1,163 @@
+"""
+Web会话的分析历史
+
+st.session_state 中只保存轻量记录（ID、标题、类型、时间，以及报告文件路径或任务ID），
+不保存报告正文。查看历史时再按需读取正文：
+- 已保存的报告：先在报告目录索引中确认仍然存在，再通过 ReportFileStore 读取（含已归档的报告）
+- 后台任务的结果（热点报告、比较分析等）：从任务队列读取
+
+记录数有上限（HISTORY_MAX_ITEMS），超出时淘汰最久未查看的记录，
+无论会话做了多少次分析，占用的内存都保持不变。
+"""
+import itertools
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# 历史类型 -> 图标
+TYPE_ICONS = {
+    "comprehensive": "📈",
+    "quick": "⚡",
+    "comparison": "🔄",
+    "hotspot": "🔥",
+    "sector_leader": "🏆",
+}
+
+
+class AnalysisHistory:
+    """
+    有上限的会话分析历史（LRU淘汰）
+
+    记录按最近使用排序：添加或查看正文都算使用，超出上限时淘汰最久未使用的记录。
+    显示顺序（records）仍按添加时间从新到旧。
+    """
+
+    def __init__(self, max_items: Optional[int] = None, catalog=None, store=None, job_queue=None):
+        """
+        Args:
+            max_items: 最多保留的记录数，默认 config.HISTORY_MAX_ITEMS
+            catalog: 报告目录索引，默认进程内共享的目录
+            store: 报告文件读取（含归档），默认进程内共享的 ReportFileStore
+            job_queue: 任务队列，默认 reports/jobs.db
+        """
+        if max_items is None:
+            from config import HISTORY_MAX_ITEMS
+            max_items = HISTORY_MAX_ITEMS
+        self.max_items = max(1, int(max_items))
+        self._catalog = catalog
+        self._store = store
+        self._job_queue = job_queue
+        self._records: 'OrderedDict[int, Dict]' = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __bool__(self) -> bool:
+        return bool(self._records)
+
+    def add(self, title: str, kind: str, path: Optional[str] = None, job_id: Optional[str] = None,
+            time: Optional[str] = None) -> int:
+        """
+        添加一条记录
+
+        Args:
+            title: 显示标题（公司名或分析名称）
+            kind: 类型（comprehensive / quick / comparison / hotspot / sector_leader）
+            path: 已保存的报告文件路径（正文从报告目录读取）
+            job_id: 后台任务ID（正文从任务结果读取）
+            time: 时间字符串，默认当前时间
+
+        Returns:
+            记录ID
+        """
+        record = {
+            'id': next(self._ids),
+            'company': title,
+            'type': kind,
+            'time': time or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'path': path,
+            'job_id': job_id,
+        }
+        with self._lock:
+            self._records[record['id']] = record
+            while len(self._records) > self.max_items:
+                self._records.popitem(last=False)
+                self.evicted += 1
+        return record['id']
+
+    def get(self, record_id: int) -> Optional[Dict]:
+        with self._lock:
+            record = self._records.get(record_id)
+            return dict(record) if record else None
+
+    def touch(self, record_id: int) -> bool:
+        """标记记录为最近使用"""
+        with self._lock:
+            if record_id not in self._records:
+                return False
+            self._records.move_to_end(record_id)
+            return True
+
+    def records(self, limit: Optional[int] = None) -> List[Dict]:
+        """记录列表（按添加时间从新到旧）"""
+        with self._lock:
+            records = sorted(self._records.values(), key=lambda r: r['id'], reverse=True)
+        return [dict(r) for r in records[:limit]]
+
+    def has_body(self, record: Dict) -> bool:
+        """记录是否有可查看的正文"""
+        return bool(record.get('path') or record.get('job_id'))
+
+    def load_body(self, record_id: int) -> Optional[str]:
+        """
+        按需读取记录对应的报告正文（不缓存在会话中），并标记为最近使用
+
+        Returns:
+            Markdown正文；报告已删除、任务结果已清理或记录已淘汰时返回None
+        """
+        record = self.get(record_id)
+        if record is None:
+            return None
+        self.touch(record_id)
+        if record.get('path'):
+            # 报告已被删除（手动或按保留策略）时不再回退到任务结果中的副本
+            return self._load_report(record['path'])
+        if record.get('job_id'):
+            return self._load_job_result(record['job_id'])
+        return None
+
+    def _load_report(self, path: str) -> Optional[str]:
+        catalog = self._catalog
+        if catalog is None:
+            from storage import get_default_catalog
+            catalog = get_default_catalog()
+        entry = catalog.get(path)
+        if entry is None:
+            return None
+        path = entry.get('path') or path
+        store = self._store
+        if store is None:
+            from storage import get_default_store
+            store = get_default_store()
+        try:
+            return store.load_bytes(path).decode('utf-8')
+        except (OSError, KeyError) as e:
+            print(f"⚠️  读取历史报告失败 {path}: {e}")
+            return None
+
+    def _load_job_result(self, job_id: str) -> Optional[str]:
+        job_queue = self._job_queue
+        if job_queue is None:
+            from storage import get_default_job_queue
+            job_queue = get_default_job_queue()
+        job = job_queue.status(job_id)
+        result = (job or {}).get('result') or {}
+        return result.get('report') or result.get('comparison')
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
@@ -0,0 +1,19 @@
+"""
+本地存储模块
+"""
+from .metrics_store import MetricsStore, MetricsExtractor
+from .stage_cache import StageCache
+from .chart_store import ChartStore
+from .report_archive import ReportArchive
+from .report_files import ReportByteSource, ReportFileStore, get_default_store
+from .report_catalog import ReportCatalog, get_default_catalog
+from .report_search import ReportSearchIndex, get_default_search_index
+from .report_writer import ReportWriter, atomic_write, get_default_writer
+from .job_queue import JobQueue, get_default_job_queue
+from .render_cache import ReportRenderCache, get_default_render_cache
+from .retention import RetentionEngine, RetentionPolicy
+
+__all__ = ['MetricsStore', 'MetricsExtractor', 'StageCache', 'ChartStore', 'ReportByteSource', 'ReportFileStore', 'get_default_store',
+           'ReportCatalog', 'get_default_catalog', 'ReportSearchIndex', 'get_default_search_index', 'ReportArchive',
+           'ReportWriter', 'atomic_write', 'get_default_writer', 'JobQueue', 'get_default_job_queue',
+           'ReportRenderCache', 'get_default_render_cache', 'RetentionEngine', 'RetentionPolicy']
@@ -0,0 +1,166 @@
+"""
+内容寻址的图表存储
+图表文件按 (图表版本, 后端, 图表规格) 的哈希命名，保存在 reports/charts/ 下：
+- 不同报告、同一报告的多次增强中相同的表格共用同一个图表文件，命中时不再绘制
+- 每份报告一个引用记录文件（refs/<报告路径哈希>.json），列出它链接的图表，
+  图表的引用计数 = 仍然存在的报告中引用它的次数
+- collect_garbage 删除没有任何报告引用的图表（包括旧版按报告命名的图表）；
+  已移入 reports/archive 的报告仍算作存在，恢复后图表链接依然有效
+"""
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Set
+
+from agents import regex_patterns as rx
+from storage.report_archive import ReportArchive
+from storage.stage_cache import content_hash
+
+# Markdown中的图表链接（含异步渲染的占位符），用于保护引用记录之外的旧图表
+CHART_LINK = rx.register('store.chart_link', r'(?:\]\(|chart-pending: )charts/([^)\s]+)')
+
+# 新写入的图表在这段时间内不会被回收（异步渲染时文件可能先于引用记录出现）
+DEFAULT_GC_MIN_AGE = 3600
+
+
+class ChartStore:
+    """reports/charts 下的内容寻址图表存储（引用计数 + 孤儿回收）"""
+
+    def __init__(self, charts_dir: str = "reports/charts"):
+        self.charts_dir = charts_dir
+        self.refs_dir = os.path.join(charts_dir, "refs")
+        os.makedirs(self.refs_dir, exist_ok=True)
+        self.archive = ReportArchive(os.path.join(os.path.dirname(os.path.abspath(charts_dir)), "archive"))
+
+    @staticmethod
+    def chart_name(key: str, extension: str) -> str:
+        """图表文件名：内容哈希前20位（约80位，足以避免冲突）"""
+        return f"{key[:20]}.{extension}"
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.charts_dir, name)
+
+    def has(self, name: str) -> bool:
+        return os.path.exists(self.path(name))
+
+    def touch(self, name: str) -> bool:
+        """
+        复用已有图表前刷新修改时间，使它在写入引用记录之前也处于回收保护期内
+        （图表已被回收时返回False，调用方重新绘制）
+        """
+        try:
+            os.utime(self.path(name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    # ------------------------------------------------------------------
+    # 引用记录：报告 -> 图表
+    # ------------------------------------------------------------------
+    def _refs_path(self, report_path: str) -> str:
+        return os.path.join(self.refs_dir, content_hash(os.path.abspath(report_path)) + '.json')
+
+    def set_refs(self, report_path: str, names: List[str]):
+        """记录报告引用的图表（覆盖该报告之前的记录）"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.refs_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'report': os.path.abspath(report_path), 'charts': sorted(set(names))}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._refs_path(report_path))
+
+    def get_refs(self, report_path: str) -> List[str]:
+        """报告引用的图表（没有记录时为空）"""
+        entry = self._load_refs(self._refs_path(report_path))
+        return entry['charts'] if entry else []
+
+    def drop_refs(self, report_path: str):
+        """报告被删除时调用，释放它对图表的引用"""
+        path = self._refs_path(report_path)
+        if os.path.exists(path):
+            os.remove(path)
+
+    @staticmethod
+    def linked_charts(report_path: str) -> List[str]:
+        """报告文件中实际链接的图表"""
+        with open(report_path, 'r', encoding='utf-8', errors='ignore') as f:
+            return CHART_LINK.findall(f.read())
+
+    @staticmethod
+    def _load_refs(path: str) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _report_exists(self, report_path: str) -> bool:
+        return bool(report_path) and (os.path.exists(report_path) or self.archive.has(report_path))
+
+    def ref_counts(self, drop_stale: bool = False) -> Dict[str, int]:
+        """
+        各图表的引用计数（只统计仍然存在的报告）
+
+        Args:
+            drop_stale: 同时删除报告已不存在的引用记录
+        """
+        counts: Dict[str, int] = {}
+        for entry_name in os.listdir(self.refs_dir):
+            if not entry_name.endswith('.json'):
+                continue
+            entry_path = os.path.join(self.refs_dir, entry_name)
+            entry = self._load_refs(entry_path)
+            if not entry or not self._report_exists(entry.get('report', '')):
+                if drop_stale:
+                    os.remove(entry_path)
+                continue
+            for name in entry.get('charts', []):
+                counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    # ------------------------------------------------------------------
+    # 回收
+    # ------------------------------------------------------------------
+    def _linked_in_reports(self) -> Set[str]:
+        """reports目录下（及已归档的）Markdown报告中链接到的图表（旧报告没有引用记录）"""
+        reports_dir = os.path.dirname(os.path.abspath(self.charts_dir))
+        linked = set()
+        for entry in os.scandir(reports_dir):
+            if entry.is_file() and entry.name.endswith('.md'):
+                linked.update(self.linked_charts(entry.path))
+        # 已归档的报告解压后检查
+        for manifest in self.archive.list_files():
+            if manifest['name'].endswith('.md') and not os.path.exists(os.path.join(reports_dir, manifest['name'])):
+                content = self.archive.read_bytes(manifest['name']).decode('utf-8', errors='ignore')
+                linked.update(CHART_LINK.findall(content))
+        return linked
+
+    def collect_garbage(self, dry_run: bool = False, min_age: float = DEFAULT_GC_MIN_AGE) -> Dict:
+        """
+        删除没有被任何报告引用的图表
+
+        Args:
+            dry_run: 只统计不删除
+            min_age: 只回收修改时间早于这么多秒之前的文件
+
+        Returns:
+            {'removed': [文件名], 'bytes': 释放字节数, 'kept': 保留的图表数}
+        """
+        live = set(self.ref_counts(drop_stale=not dry_run)) | self._linked_in_reports()
+        cutoff = time.time() - min_age
+        removed = []
+        freed = 0
+        kept = 0
+
+        for entry in os.scandir(self.charts_dir):
+            if not entry.is_file() or entry.name.startswith('.'):
+                continue
+            stat = entry.stat()
+            if entry.name in live or stat.st_mtime > cutoff:
+                kept += 1
+                continue
+            if not dry_run:
+                os.remove(entry.path)
+            removed.append(entry.name)
+            freed += stat.st_size
+
+        return {'removed': sorted(removed), 'bytes': freed, 'kept': kept}
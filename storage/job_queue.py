@@ -0,0 +1,283 @@
+"""
+后台任务队列（SQLite）
+Web界面把估值报告、热点分析、比较分析作为任务提交到 reports/jobs.db，
+由 JobService 的工作线程（在Web进程内，或单独运行的 python job_service.py）领取执行。
+任务的阶段和进度写回数据库，任一进程、任一会话都可以按任务ID轮询状态和取回结果。
+
+状态流转: queued（排队）→ running（执行中）→ done（完成）/ failed（失败）
+         queued → cancelled（排队中取消）
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+# 工作进程崩溃后，执行中的任务最多重新排队的次数
+MAX_ATTEMPTS = 2
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class JobQueue:
+    """
+    基于SQLite的任务队列
+
+    领取任务用 BEGIN IMMEDIATE 事务完成“查询最早的排队任务 + 标记为执行中”，
+    多个工作线程或进程同时领取时每个任务只会被一个工作者拿到。
+    """
+
+    def __init__(self, db_path: str = "reports/jobs.db"):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            # WAL：工作者写进度时，Web页面的轮询读取不被阻塞
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    owner TEXT,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    message TEXT,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    submitted_at TEXT NOT NULL,
+                    started_at TEXT,
+                    updated_at TEXT,
+                    finished_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status_submitted ON jobs(status, submitted_at);
+                CREATE INDEX IF NOT EXISTS idx_jobs_owner_submitted ON jobs(owner, submitted_at);
+            """)
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    # ------------------------------------------------------------------
+    # 提交与查询
+    # ------------------------------------------------------------------
+    def submit(self, kind: str, params: Dict, owner: Optional[str] = None) -> str:
+        """
+        提交任务，立即返回任务ID
+
+        Args:
+            kind: 任务类型（report / hotspot / comparison ...）
+            params: 任务参数（需可JSON序列化）
+            owner: 提交者（如Web会话ID），用于列出自己的任务
+        """
+        job_id = uuid.uuid4().hex[:12]
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO jobs (job_id, kind, params, owner, status, submitted_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (job_id, kind, json.dumps(params, ensure_ascii=False), owner, JOB_QUEUED, _now(), _now())
+            )
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """任务状态（含参数和结果），未知任务返回None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row else None
+
+    def list_jobs(self, owner: Optional[str] = None, status: Optional[str] = None,
+                  limit: int = 50) -> List[Dict]:
+        """任务列表（从新到旧，不含结果内容）"""
+        clauses, params = [], []
+        if owner:
+            clauses.append("owner = ?")
+            params.append(owner)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""SELECT job_id, kind, params, owner, status, stage, progress, message, error,
+                           worker, attempts, submitted_at, started_at, updated_at, finished_at, NULL AS result
+                    FROM jobs{where} ORDER BY submitted_at DESC, rowid DESC LIMIT ?""",
+                params + [int(limit)]
+            )
+            return [self._decode(row) for row in rows]
+
+    def queue_position(self, job_id: str) -> int:
+        """排队任务前面还有多少个排队任务（不在排队时返回0）"""
+        with self._connect() as conn:
+            row = conn.execute(
+                """SELECT COUNT(*) FROM jobs
+                   WHERE status = ? AND rowid < (SELECT rowid FROM jobs WHERE job_id = ? AND status = ?)""",
+                (JOB_QUEUED, job_id, JOB_QUEUED)
+            ).fetchone()
+        return row[0]
+
+    def pending_count(self) -> int:
+        """排队或执行中的任务数"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)",
+                                (JOB_QUEUED, JOB_RUNNING)).fetchone()[0]
+
+    def cancel(self, job_id: str) -> bool:
+        """取消排队中的任务（已开始执行的任务不能取消）"""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? WHERE job_id = ? AND status = ?",
+                (JOB_CANCELLED, _now(), _now(), job_id, JOB_QUEUED)
+            ).rowcount > 0
+
+    # ------------------------------------------------------------------
+    # 工作者
+    # ------------------------------------------------------------------
+    def claim(self, worker: str, kinds: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        领取最早的排队任务并标记为执行中
+
+        Args:
+            worker: 工作者标识（主机:进程号:线程）
+            kinds: 只领取这些类型的任务（默认全部）
+
+        Returns:
+            任务，没有排队任务时返回None
+        """
+        kind_clause, params = "", [JOB_QUEUED]
+        if kinds:
+            kind_clause = f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT * FROM jobs WHERE status = ?{kind_clause} ORDER BY rowid LIMIT 1", params
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    """UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1,
+                              started_at = ?, updated_at = ?, progress = 0, stage = NULL, message = NULL
+                       WHERE job_id = ?""",
+                    (JOB_RUNNING, worker, _now(), _now(), row['job_id'])
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        job = self._decode(row)
+        job.update(status=JOB_RUNNING, worker=worker, attempts=row['attempts'] + 1)
+        return job
+
+    def update_progress(self, job_id: str, stage: Optional[str] = None, progress: Optional[int] = None,
+                        message: Optional[str] = None):
+        """更新执行中任务的阶段、进度（0-100）和说明"""
+        with self._connect() as conn:
+            conn.execute(
+                """UPDATE jobs SET stage = COALESCE(?, stage), progress = COALESCE(?, progress),
+                          message = COALESCE(?, message), updated_at = ?
+                   WHERE job_id = ? AND status = ?""",
+                (stage, None if progress is None else max(0, min(100, int(progress))), message,
+                 _now(), job_id, JOB_RUNNING)
+            )
+
+    def finish(self, job_id: str, result: Dict):
+        """任务完成，保存结果（需可JSON序列化，其他类型转为字符串）"""
+        with self._connect() as conn:
+            conn.execute(
+                """UPDATE jobs SET status = ?, progress = 100, result = ?, finished_at = ?, updated_at = ?
+                   WHERE job_id = ?""",
+                (JOB_DONE, json.dumps(result, ensure_ascii=False, default=str), _now(), _now(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str, result: Optional[Dict] = None):
+        """任务失败"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, result = ?, finished_at = ?, updated_at = ? WHERE job_id = ?",
+                (JOB_FAILED, error, json.dumps(result, ensure_ascii=False, default=str) if result else None,
+                 _now(), _now(), job_id)
+            )
+
+    def requeue_orphans(self, dead_workers) -> Dict[str, int]:
+        """
+        处理崩溃工作者遗留的执行中任务：未超过 MAX_ATTEMPTS 的重新排队，否则标记失败
+
+        Args:
+            dead_workers: 判断工作者是否已退出的函数 (worker) -> bool
+
+        Returns:
+            {'requeued': 重新排队数, 'failed': 标记失败数}
+        """
+        result = {'requeued': 0, 'failed': 0}
+        with self._connect() as conn:
+            rows = conn.execute("SELECT job_id, worker, attempts FROM jobs WHERE status = ?",
+                                (JOB_RUNNING,)).fetchall()
+            for row in rows:
+                if not dead_workers(row['worker'] or ''):
+                    continue
+                if row['attempts'] < MAX_ATTEMPTS:
+                    conn.execute("UPDATE jobs SET status = ?, worker = NULL, updated_at = ? "
+                                 "WHERE job_id = ? AND status = ?", (JOB_QUEUED, _now(), row['job_id'], JOB_RUNNING))
+                    result['requeued'] += 1
+                else:
+                    conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? "
+                                 "WHERE job_id = ? AND status = ?",
+                                 (JOB_FAILED, '工作进程异常退出', _now(), _now(), row['job_id'], JOB_RUNNING))
+                    result['failed'] += 1
+        return result
+
+    def purge(self, older_than_days: float = 7) -> int:
+        """删除早于指定天数结束的任务记录"""
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat(timespec='seconds')
+        with self._connect() as conn:
+            return conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED_STATUSES))}) AND finished_at < ?",
+                list(FINISHED_STATUSES) + [cutoff]
+            ).rowcount
+
+
+_default_job_queue: Optional[JobQueue] = None
+_default_job_queue_lock = threading.Lock()
+
+
+def get_default_job_queue() -> JobQueue:
+    """进程内共享的任务队列（reports/jobs.db）"""
+    global _default_job_queue
+    with _default_job_queue_lock:
+        if _default_job_queue is None:
+            _default_job_queue = JobQueue()
+        return _default_job_queue
@@ -0,0 +1,402 @@
+"""
+结构化财务指标存储
+从生成的报告表格中抽取 (company, metric, period, value, unit, source_report) 行，
+写入本地SQLite，供比较分析、图表和Web界面直接查询（无需重新解析Markdown或调用LLM）
+"""
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+# 报告文件名：{company}_{YYYYMMDD}_{HHMMSS}[_enhanced|_formatted...].md
+REPORT_NAME_PATTERN = re.compile(r'^(?P<company>.+?)_(?P<date>\d{8})_(?P<time>\d{6})(?P<variant>_[a-z_]+)?\.md$')
+
+# 第一列是时间维度的表格（行=期间，列=指标）
+PERIOD_FIRST_HEADERS = {'quarter', 'year', 'period', 'fiscal year', 'date', '季度', '年份', '期间'}
+
+CURRENCY_SYMBOLS = {
+    'US$': 'USD',
+    'HK$': 'HKD',
+    '$': 'USD',
+    '¥': 'CNY',
+    '￥': 'CNY',
+    'RMB': 'CNY',
+    'CNY': 'CNY',
+    '€': 'EUR',
+    '£': 'GBP',
+}
+
+SCALE_UNITS = {
+    'b': 'B', 'bn': 'B', 'billion': 'B',
+    'm': 'M', 'mn': 'M', 'million': 'M',
+    'k': 'K', 'thousand': 'K',
+    't': 'T', 'trillion': 'T',
+    '亿': '亿', '万': '万',
+}
+
+_NUMBER = r'\d[\d,]*(?:\.\d+)?'
+VALUE_PATTERN = re.compile(
+    r'^(?P<sign>[+\-−])?\s*'
+    r'(?P<currency>US\$|HK\$|RMB|CNY|[$¥￥€£])?\s*'
+    r'(?P<sign2>[+\-−])?'
+    r'(?P<number>' + _NUMBER + r')'
+    r'(?:\s*[–\-~]\s*(?:US\$|HK\$|[$¥￥€£])?(?P<number_hi>' + _NUMBER + r'))?'
+    r'\s*(?P<suffix>%|bps|x|倍|亿|万|billion|million|thousand|trillion|bn|mn|[BMKT])?'
+    r'(?:\s*\((?:est\.?|e|estimated|TTM|预估|预计)\))?\s*$',
+    re.IGNORECASE
+)
+APPROX_PREFIX = re.compile(r'^(?:~|≈|approx\.?\s*|约|>|<|≥|≤)\s*', re.IGNORECASE)
+
+
+def parse_metric_value(cell: str) -> Optional[Tuple[float, str]]:
+    """
+    将表格单元格解析为 (数值, 单位)
+
+    示例: "$46.7B" -> (46.7, "USD B"), "+12%" -> (12.0, "%"),
+    "¥382.81亿" -> (382.81, "CNY 亿"), "28.5x" -> (28.5, "x")
+    区间（如 "$300-350"）取中值；无法解析时返回None
+    """
+    text = cell.strip().replace('**', '')
+    if not text:
+        return None
+    text = APPROX_PREFIX.sub('', text)
+    match = VALUE_PATTERN.match(text)
+    if not match:
+        return None
+
+    try:
+        value = float(match.group('number').replace(',', ''))
+        if match.group('number_hi'):
+            value = (value + float(match.group('number_hi').replace(',', ''))) / 2
+    except ValueError:
+        return None
+
+    if (match.group('sign') or match.group('sign2') or '') in ('-', '−'):
+        value = -value
+
+    currency = CURRENCY_SYMBOLS.get((match.group('currency') or '').upper(), '')
+    if match.group('currency') and not currency:
+        currency = CURRENCY_SYMBOLS.get(match.group('currency'), '')
+    suffix = (match.group('suffix') or '')
+    if suffix in ('%', 'bps'):
+        return value, suffix
+    if suffix.lower() in ('x', '倍'):
+        return value, 'x'
+    scale = SCALE_UNITS.get(suffix.lower(), '') if suffix else ''
+    unit = ' '.join(part for part in (currency, scale) if part)
+    return value, unit
+
+
+def parse_report_filename(report_path: str) -> Dict[str, Optional[str]]:
+    """从报告文件名解析公司标识和生成时间"""
+    basename = os.path.basename(report_path)
+    match = REPORT_NAME_PATTERN.match(basename)
+    if not match:
+        return {'company': basename.rsplit('.', 1)[0], 'report_time': None}
+    report_time = datetime.strptime(match.group('date') + match.group('time'), '%Y%m%d%H%M%S')
+    return {'company': match.group('company'), 'report_time': report_time.isoformat()}
+
+
+class MetricsExtractor:
+    """从Markdown报告的表格中抽取规范化的指标行"""
+
+    def extract(self, content: str) -> List[Dict]:
+        """
+        抽取报告中所有数值型表格单元格
+
+        Returns:
+            指标行列表，每行包含 metric, period, value, unit, raw_value, table_title
+        """
+        rows = []
+        for table_lines in self._iter_tables(content):
+            rows.extend(self._extract_table(table_lines))
+        return rows
+
+    def _iter_tables(self, content: str):
+        """按连续的 | 行切分表格"""
+        current = []
+        for line in content.split('\n'):
+            stripped = line.strip()
+            if stripped.startswith('|'):
+                current.append(stripped)
+            elif current:
+                yield current
+                current = []
+        if current:
+            yield current
+
+    def _split_cells(self, line: str) -> List[str]:
+        cells = [cell.strip() for cell in line.strip().strip('|').split('|')]
+        return [cell.replace('**', '').strip() for cell in cells]
+
+    def _extract_table(self, lines: List[str]) -> List[Dict]:
+        if len(lines) < 3 or not all(c in '|-: ' for c in lines[1]):
+            return []
+
+        headers = self._split_cells(lines[0])
+        if len(headers) < 2:
+            return []
+        period_first = headers[0].lower().rstrip(':') in PERIOD_FIRST_HEADERS
+
+        rows = []
+        for line in lines[2:]:
+            cells = self._split_cells(line)
+            if len(cells) != len(headers) or not cells[0]:
+                continue
+            label = cells[0].rstrip(':')
+            for col_idx in range(1, len(headers)):
+                parsed = parse_metric_value(cells[col_idx])
+                if parsed is None:
+                    continue
+                value, unit = parsed
+                if period_first:
+                    metric, period = headers[col_idx], label
+                else:
+                    metric, period = label, headers[col_idx]
+                rows.append({
+                    'metric': metric,
+                    'period': period,
+                    'value': value,
+                    'unit': unit,
+                    'raw_value': cells[col_idx],
+                    'table_title': headers[0],
+                })
+        return rows
+
+
+class MetricsStore:
+    """
+    基于SQLite的本地指标库
+
+    每份报告写入前会先删除同一source_report的旧数据，重复入库是幂等的。
+    company 与 metric 列带索引且不区分大小写。
+    """
+
+    def __init__(self, db_path: str = "reports/metrics.db"):
+        self.db_path = db_path
+        self.extractor = MetricsExtractor()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    company TEXT NOT NULL COLLATE NOCASE,
+                    metric TEXT NOT NULL COLLATE NOCASE,
+                    period TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    unit TEXT NOT NULL DEFAULT '',
+                    raw_value TEXT,
+                    table_title TEXT,
+                    source_report TEXT NOT NULL,
+                    report_time TEXT,
+                    created_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_metrics_company ON metrics(company);
+                CREATE INDEX IF NOT EXISTS idx_metrics_metric ON metrics(metric);
+                CREATE INDEX IF NOT EXISTS idx_metrics_company_metric ON metrics(company, metric);
+                CREATE INDEX IF NOT EXISTS idx_metrics_source ON metrics(source_report);
+            """)
+
+    def ingest_report(self, report_path: str, company: Optional[str] = None) -> int:
+        """
+        从报告文件抽取指标并入库
+
+        Args:
+            report_path: 报告路径（建议使用已修复表格的 _enhanced 版本）
+            company: 公司名称，缺省时从文件名推断
+
+        Returns:
+            写入的行数
+        """
+        with open(report_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        info = parse_report_filename(report_path)
+        return self.ingest_content(
+            content,
+            company or info['company'],
+            os.path.basename(report_path),
+            report_time=info['report_time']
+        )
+
+    def ingest_content(
+        self,
+        content: str,
+        company: str,
+        source_report: str,
+        report_time: Optional[str] = None
+    ) -> int:
+        """抽取Markdown内容中的指标并写入（替换同一来源的旧数据）"""
+        rows = self.extractor.extract(content)
+        now = datetime.now().isoformat()
+        report_time = report_time or now
+        with self._connect() as conn:
+            conn.execute("DELETE FROM metrics WHERE source_report = ?", (source_report,))
+            conn.executemany(
+                """INSERT INTO metrics
+                   (company, metric, period, value, unit, raw_value, table_title,
+                    source_report, report_time, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [
+                    (company, r['metric'], r['period'], r['value'], r['unit'], r['raw_value'],
+                     r['table_title'], source_report, report_time, now)
+                    for r in rows
+                ]
+            )
+        return len(rows)
+
+    def remove_report(self, source_report: str) -> int:
+        """删除某份报告的所有指标"""
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM metrics WHERE source_report = ?", (source_report,))
+            return cursor.rowcount
+
+    def query(
+        self,
+        company: Optional[str] = None,
+        metric: Optional[str] = None,
+        period: Optional[str] = None,
+        source_report: Optional[str] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False
+    ) -> List[Dict]:
+        """按条件查询指标行（默认按报告时间倒序）"""
+        clauses, params = [], []
+        for column, value in (('company', company), ('metric', metric),
+                              ('period', period), ('source_report', source_report)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT * FROM metrics"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY report_time, id" if ascending else " ORDER BY report_time DESC, id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def companies(self) -> List[str]:
+        """已入库的公司列表"""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT DISTINCT company FROM metrics ORDER BY company")]
+
+    def latest_report(self, company: str) -> Optional[str]:
+        """某公司最新一份已入库报告"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT source_report FROM metrics WHERE company = ? "
+                "ORDER BY report_time DESC LIMIT 1",
+                (company,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def latest_metrics(self, company: str) -> List[Dict]:
+        """某公司最新一份报告中的全部指标"""
+        source_report = self.latest_report(company)
+        if not source_report:
+            return []
+        return self.query(company=company, source_report=source_report)
+
+    def metric_history(self, company: str, metric: str) -> List[Dict]:
+        """某公司某指标在历次报告中的取值（按报告时间正序）"""
+        return self.query(company=company, metric=metric, ascending=True)
+
+    def compare(self, companies: List[str], metrics: Optional[List[str]] = None) -> Dict[str, Dict[str, Dict]]:
+        """
+        取每家公司最新报告中各指标的首个取值
+
+        Returns:
+            {company: {metric: row}}
+        """
+        wanted = {m.lower() for m in metrics} if metrics else None
+        comparison = {}
+        for company in companies:
+            per_metric = {}
+            for row in self.latest_metrics(company):
+                key = row['metric']
+                if wanted is not None and key.lower() not in wanted:
+                    continue
+                per_metric.setdefault(key, row)
+            comparison[company] = per_metric
+        return comparison
+
+    def format_comparison_table(self, companies: List[str], metrics: Optional[List[str]] = None, max_metrics: int = 15) -> str:
+        """生成多公司指标对比的Markdown表格（无数据时返回空字符串）"""
+        comparison = self.compare(companies, metrics)
+        if metrics:
+            metric_names = list(metrics)
+        else:
+            counts = {}
+            for per_metric in comparison.values():
+                for name in per_metric:
+                    counts[name] = counts.get(name, 0) + 1
+            # 优先展示多家公司共有的指标
+            metric_names = sorted(counts, key=lambda name: -counts[name])[:max_metrics]
+        if not metric_names:
+            return ""
+
+        lines = ['| Metric | ' + ' | '.join(companies) + ' |',
+                 '| --- | ' + ' | '.join(['---'] * len(companies)) + ' |']
+        for name in metric_names:
+            cells = []
+            for company in companies:
+                row = self._lookup(comparison.get(company, {}), name)
+                cells.append(f"{row['raw_value']} ({row['period']})" if row else 'N/A')
+            lines.append(f'| {name} | ' + ' | '.join(cells) + ' |')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _lookup(per_metric: Dict[str, Dict], name: str) -> Optional[Dict]:
+        for key, row in per_metric.items():
+            if key.lower() == name.lower():
+                return row
+        return None
+
+
+def main():
+    """命令行工具：将已有报告回填到指标库"""
+    import sys
+    import glob
+
+    paths = sys.argv[1:] or [
+        p for p in glob.glob("reports/*.md")
+        if '_formatted' not in p and '_with_chart' not in p
+    ]
+    # 同一份报告优先使用增强版
+    selected = {}
+    for path in sorted(paths):
+        key = path.replace('_enhanced.md', '.md')
+        if key not in selected or '_enhanced' in path:
+            selected[key] = path
+
+    store = MetricsStore()
+    total = 0
+    for path in selected.values():
+        count = store.ingest_report(path)
+        total += count
+        print(f"  {os.path.basename(path)}: {count} 条指标")
+    print(f"✅ 共写入 {total} 条指标 -> {store.db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+报告渲染缓存
+Web界面查看报告时，不再在每次重新运行页面时重新解析和渲染整份报告：
+- 以 (报告ID, 内容哈希) 为键缓存报告的章节切分结果（各章节在原文中的偏移）
+- 章节在第一次展开时才渲染为HTML，渲染结果随条目缓存，之后直接复用
+- 进程内共享（所有会话共用），总量有上限，超出时淘汰最久未使用的报告；
+  单份报告的原文加HTML超过上限时，超出部分的章节HTML不缓存（每次请求时渲染）
+
+报告内容变化（重新生成、增强、图表补齐）时内容哈希随之变化，旧条目自然失效。
+HTML渲染使用可选的 markdown 包；未安装时缓存章节的Markdown原文，由 st.markdown 渲染。
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+from .report_search import MD_HEADING
+from .stage_cache import content_hash
+
+try:
+    import markdown as _markdown
+except ImportError:  # 可选依赖
+    _markdown = None
+
+# 渲染规则变化时递增，旧的缓存条目不再命中
+RENDER_VERSION = '1'
+
+# 缓存上限（原文加已渲染HTML的字符数）
+DEFAULT_MAX_CACHE_CHARS = 32 * 1024 * 1024
+
+# 按这一级及以上的标题切分章节（更低级的标题留在所属章节内）
+SECTION_MAX_LEVEL = 2
+
+# 渲染格式
+FORMAT_HTML = 'html'
+FORMAT_MARKDOWN = 'markdown'
+
+
+def split_section_offsets(content: str, max_level: int = SECTION_MAX_LEVEL) -> List[Dict]:
+    """
+    按一、二级Markdown标题切分报告，只记录偏移不复制文本
+
+    Returns:
+        [{'heading', 'level', 'start', 'end'}, ...]；第一个标题之前的内容（封面等）标题为空、level为0
+    """
+    starts = [(m.start(), len(m.group(1)), m.group(2).strip())
+              for m in MD_HEADING.finditer(content) if len(m.group(1)) <= max_level]
+    sections = []
+    first = starts[0][0] if starts else len(content)
+    if content[:first].strip():
+        sections.append({'heading': '', 'level': 0, 'start': 0, 'end': first})
+    for idx, (start, level, heading) in enumerate(starts):
+        end = starts[idx + 1][0] if idx + 1 < len(starts) else len(content)
+        sections.append({'heading': heading, 'level': level, 'start': start, 'end': end})
+    return sections
+
+
+def render_markdown(text: str) -> str:
+    """把Markdown渲染为HTML（未安装 markdown 包时原样返回）"""
+    if _markdown is None:
+        return text
+    return _markdown.markdown(text, extensions=['tables', 'fenced_code'], output_format='html')
+
+
+class ReportRenderCache:
+    """线程安全的报告渲染缓存（可在多个Streamlit会话间共享）"""
+
+    def __init__(self, max_cache_chars: int = DEFAULT_MAX_CACHE_CHARS):
+        self.max_cache_chars = max_cache_chars
+        self.format = FORMAT_HTML if _markdown is not None else FORMAT_MARKDOWN
+        self._entries: 'OrderedDict[tuple, Dict]' = OrderedDict()
+        self._cached_chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rendered_sections = 0
+
+    def open(self, report_id: str, content: Union[str, bytes]) -> Dict:
+        """
+        取得报告的渲染条目（章节切分结果已缓存时直接返回）
+
+        Args:
+            report_id: 报告ID（目录中的文件名、任务ID等）
+            content: 报告原文
+
+        Returns:
+            {'report_id', 'hash', 'format', 'sections': [{'heading', 'level', 'start', 'end', 'chars'}, ...]}
+            （不含原文和HTML，章节内容通过 section() 取得）
+        """
+        digest = content_hash(RENDER_VERSION, content)
+        key = (report_id, digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._public(entry)
+
+        text = content.decode('utf-8') if isinstance(content, bytes) else content
+        entry = {
+            'report_id': report_id,
+            'hash': digest,
+            'text': text,
+            'sections': split_section_offsets(text),
+            'html': {},
+            'size': len(text),
+        }
+        with self._lock:
+            self.misses += 1
+            self._remember(key, entry)
+        return self._public(entry)
+
+    def _public(self, entry: Dict) -> Dict:
+        return {
+            'report_id': entry['report_id'],
+            'hash': entry['hash'],
+            'format': self.format,
+            'sections': [dict(s, chars=s['end'] - s['start']) for s in entry['sections']],
+        }
+
+    def section(self, report_id: str, digest: str, index: int) -> Optional[str]:
+        """
+        章节的渲染结果（第一次请求时渲染并缓存）
+
+        Returns:
+            HTML（或未安装 markdown 包时的Markdown原文）；条目已被淘汰时返回None，调用方重新 open()
+        """
+        key = (report_id, digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            rendered = entry['html'].get(index)
+            if rendered is not None:
+                return rendered
+            bounds = entry['sections'][index]
+            text = entry['text'][bounds['start']:bounds['end']]
+
+        rendered = render_markdown(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            # 淘汰其他报告也容纳不下时不缓存，否则唯一保留的条目会让总量超过上限
+            if entry is not None and index not in entry['html'] and \
+                    entry['size'] + len(rendered) <= self.max_cache_chars:
+                entry['html'][index] = rendered
+                entry['size'] += len(rendered)
+                self._cached_chars += len(rendered)
+                self.rendered_sections += 1
+                self._evict()
+        return rendered
+
+    def _remember(self, key: tuple, entry: Dict):
+        """加入缓存（调用方持有锁），同一报告的旧内容和超出上限的条目被淘汰（至少保留刚加入的条目）"""
+        for old_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+            self._cached_chars -= self._entries.pop(old_key)['size']
+        if key not in self._entries:
+            self._entries[key] = entry
+            self._cached_chars += entry['size']
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        while self._cached_chars > self.max_cache_chars and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._cached_chars -= evicted['size']
+
+    def invalidate(self, report_id: str):
+        """报告删除时丢弃其缓存条目"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == report_id]:
+                self._cached_chars -= self._entries.pop(key)['size']
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._cached_chars = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'reports': len(self._entries),
+                    'chars': self._cached_chars, 'rendered_sections': self.rendered_sections}
+
+
+_default_render_cache: Optional[ReportRenderCache] = None
+_default_render_cache_lock = threading.Lock()
+
+
+def get_default_render_cache() -> ReportRenderCache:
+    """进程内共享的报告渲染缓存"""
+    global _default_render_cache
+    with _default_render_cache_lock:
+        if _default_render_cache is None:
+            _default_render_cache = ReportRenderCache()
+        return _default_render_cache
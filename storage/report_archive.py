@@ -0,0 +1,288 @@
+"""
+报告归档存储（压缩 + 内容寻址 + 变体差分）
+同一次运行产生的 X.md、X_enhanced.md、X_formatted.md 内容几乎相同。归档时：
+- 每个文件的内容按sha256寻址保存为一个blob，内容相同的文件（包括不同报告中的）只存一份
+- 报告的原始版本整体gzip压缩；其他变体以原始版本为预置字典做deflate压缩（差分），
+  只需几百字节就能表示与原始版本的差异
+- 每个归档文件一个清单（manifests/<文件名>.json），读取时按需解压
+
+磁盘占用和备份增量（objects/ 下的blob一旦写入就不再改变）只随不重复的内容增长。
+使用标准库的zlib/gzip，不引入额外依赖（deflate的预置字典最多利用原始版本的32KB）。
+"""
+import gzip
+import json
+import os
+import tempfile
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set
+
+from .stage_cache import content_hash
+
+# blob格式：完整gzip，或以另一个blob为字典的deflate差分（首行是字典blob的哈希）
+BLOB_FULL = '.gz'
+BLOB_DELTA = '.zd'
+
+# deflate窗口大小：预置字典只有最后这么多字节有效
+DELTA_WINDOW = 32 * 1024
+
+# 差分没有明显更小时（不足整体压缩的这个比例）改为整体压缩
+DELTA_MIN_SAVING = 0.8
+
+# 报告变体后缀，去掉后缀得到原始版本的文件名
+VARIANT_SUFFIXES = ('_enhanced_with_chart', '_enhanced', '_formatted')
+
+
+def base_variant_name(name: str) -> Optional[str]:
+    """变体对应的原始版本文件名（X_enhanced.md -> X.md），原始版本本身返回None"""
+    basename = os.path.basename(name)
+    stem, ext = os.path.splitext(basename)
+    for suffix in VARIANT_SUFFIXES:
+        if stem.endswith(suffix):
+            return stem[:-len(suffix)] + ext
+    return None
+
+
+class ReportArchive:
+    """
+    reports/archive 下的压缩归档
+
+    目录结构:
+        objects/<哈希前2位>/<哈希>.gz|.zd   blob（内容寻址，写入后不变）
+        manifests/<文件名>.json             文件 -> blob
+    """
+
+    def __init__(self, archive_dir: str = "reports/archive"):
+        self.archive_dir = archive_dir
+        self.objects_dir = os.path.join(archive_dir, "objects")
+        self.manifests_dir = os.path.join(archive_dir, "manifests")
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # blob
+    # ------------------------------------------------------------------
+    def _object_path(self, digest: str, kind: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest + kind)
+
+    def _find_object(self, digest: str) -> Optional[str]:
+        """blob路径（完整或差分），不存在时返回None"""
+        for kind in (BLOB_FULL, BLOB_DELTA):
+            path = self._object_path(digest, kind)
+            if os.path.exists(path):
+                return path
+        return None
+
+    @staticmethod
+    def _write_atomic(path: str, payload: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _delta_compress(data: bytes, base: bytes) -> bytes:
+        compressor = zlib.compressobj(9, zdict=base[-DELTA_WINDOW:])
+        return compressor.compress(data) + compressor.flush()
+
+    def _put_blob(self, data: bytes, base_digest: Optional[str] = None) -> Dict:
+        """
+        写入blob（内容已存在时跳过）
+
+        Returns:
+            {'hash', 'base'（差分的字典blob，整体压缩时为None）, 'stored'（本次写入字节数）}
+        """
+        digest = content_hash(data)
+        existing = self._find_object(digest)
+        if existing:
+            return {'hash': digest, 'base': self._blob_base(existing), 'stored': 0}
+
+        full = gzip.compress(data, compresslevel=9, mtime=0)
+        if base_digest and base_digest != digest:
+            delta = self._delta_compress(data, self.read_blob(base_digest))
+            if len(delta) < len(full) * DELTA_MIN_SAVING:
+                self._write_atomic(self._object_path(digest, BLOB_DELTA),
+                                   base_digest.encode('ascii') + b'\n' + delta)
+                return {'hash': digest, 'base': base_digest, 'stored': len(delta) + len(base_digest) + 1}
+
+        self._write_atomic(self._object_path(digest, BLOB_FULL), full)
+        return {'hash': digest, 'base': None, 'stored': len(full)}
+
+    @staticmethod
+    def _blob_base(path: str) -> Optional[str]:
+        if not path.endswith(BLOB_DELTA):
+            return None
+        with open(path, 'rb') as f:
+            return f.readline().strip().decode('ascii')
+
+    def read_blob(self, digest: str) -> bytes:
+        """解压blob（差分blob先解压其字典blob）"""
+        path = self._find_object(digest)
+        if path is None:
+            raise FileNotFoundError(f"归档blob缺失: {digest}")
+        with open(path, 'rb') as f:
+            payload = f.read()
+        if path.endswith(BLOB_FULL):
+            return gzip.decompress(payload)
+
+        base_digest, delta = payload.split(b'\n', 1)
+        base = self.read_blob(base_digest.decode('ascii'))
+        decompressor = zlib.decompressobj(zdict=base[-DELTA_WINDOW:])
+        return decompressor.decompress(delta) + decompressor.flush()
+
+    # ------------------------------------------------------------------
+    # 文件
+    # ------------------------------------------------------------------
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(self.manifests_dir, os.path.basename(name) + '.json')
+
+    def has(self, name: str) -> bool:
+        return os.path.exists(self._manifest_path(name))
+
+    def manifest(self, name: str) -> Optional[Dict]:
+        try:
+            with open(self._manifest_path(name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def archive_bytes(self, name: str, data: bytes, mtime: Optional[float] = None) -> Dict:
+        """
+        归档一段内容（变体的原始版本已归档时以它为字典做差分）
+
+        Args:
+            name: 文件名（同名文件覆盖旧清单）
+            data: 文件内容
+            mtime: 原文件修改时间（恢复时还原）
+
+        Returns:
+            清单，另含 'stored_bytes'（本次新写入的字节数，内容已存在时为0）
+        """
+        base_name = base_variant_name(name)
+        base_manifest = self.manifest(base_name) if base_name else None
+        with self._lock:
+            blob = self._put_blob(data, base_manifest['blob'] if base_manifest else None)
+        manifest = {
+            'name': os.path.basename(name),
+            'size': len(data),
+            'blob': blob['hash'],
+            'base': blob['base'],
+            'mtime': mtime,
+            'archived_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self._write_atomic(self._manifest_path(name), json.dumps(manifest, ensure_ascii=False).encode('utf-8'))
+        manifest['stored_bytes'] = blob['stored']
+        return manifest
+
+    def archive_file(self, path: str, remove_original: bool = False) -> Dict:
+        """
+        归档文件（先归档原始版本，变体才能做差分）
+
+        Args:
+            path: 文件路径
+            remove_original: 归档并校验成功后删除原文件
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        manifest = self.archive_bytes(path, data, mtime=os.path.getmtime(path))
+        if remove_original:
+            if self.read_bytes(path) != data:
+                raise IOError(f"归档校验失败，保留原文件: {path}")
+            os.remove(path)
+        return manifest
+
+    def read_bytes(self, name: str) -> bytes:
+        """按需解压读取归档文件"""
+        manifest = self.manifest(name)
+        if manifest is None:
+            raise FileNotFoundError(f"归档中没有: {os.path.basename(name)}")
+        return self.read_blob(manifest['blob'])
+
+    def restore(self, name: str, dest_path: str) -> str:
+        """把归档文件恢复到 dest_path（还原修改时间）"""
+        manifest = self.manifest(name)
+        data = self.read_bytes(name)
+        self._write_atomic(os.path.abspath(dest_path), data)
+        os.chmod(dest_path, 0o644)
+        if manifest.get('mtime'):
+            os.utime(dest_path, (manifest['mtime'], manifest['mtime']))
+        return dest_path
+
+    def delete(self, name: str) -> bool:
+        """删除文件的清单（blob由 collect_garbage 回收）"""
+        path = self._manifest_path(name)
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        return True
+
+    def list_files(self) -> List[Dict]:
+        """已归档的文件清单（按文件名排序）"""
+        if not os.path.isdir(self.manifests_dir):
+            return []
+        files = []
+        for entry_name in sorted(os.listdir(self.manifests_dir)):
+            if entry_name.endswith('.json'):
+                manifest = self.manifest(entry_name[:-len('.json')])
+                if manifest:
+                    files.append(manifest)
+        return files
+
+    def _iter_objects(self) -> Iterator[os.DirEntry]:
+        if not os.path.isdir(self.objects_dir):
+            return
+        for prefix in os.scandir(self.objects_dir):
+            if prefix.is_dir():
+                for entry in os.scandir(prefix.path):
+                    if entry.is_file() and not entry.name.endswith('.tmp'):
+                        yield entry
+
+    def _live_blobs(self) -> Set[str]:
+        """清单引用的blob，以及它们差分所依赖的字典blob"""
+        live = set()
+        pending = [m['blob'] for m in self.list_files()]
+        while pending:
+            digest = pending.pop()
+            if digest in live:
+                continue
+            live.add(digest)
+            path = self._find_object(digest)
+            base = self._blob_base(path) if path else None
+            if base:
+                pending.append(base)
+        return live
+
+    def collect_garbage(self, dry_run: bool = False) -> Dict:
+        """删除没有被任何清单（直接或作为差分字典）引用的blob"""
+        live = self._live_blobs()
+        removed, freed = 0, 0
+        for entry in self._iter_objects():
+            if entry.name.split('.', 1)[0] in live:
+                continue
+            freed += entry.stat().st_size
+            removed += 1
+            if not dry_run:
+                os.remove(entry.path)
+        return {'removed': removed, 'bytes': freed}
+
+    def stats(self) -> Dict:
+        """
+        归档统计
+
+        Returns:
+            {'files', 'logical_bytes'（原始总大小）, 'blobs', 'stored_bytes'（磁盘占用）, 'ratio'}
+        """
+        manifests = self.list_files()
+        logical = sum(m['size'] for m in manifests)
+        blobs, stored = 0, 0
+        for entry in self._iter_objects():
+            blobs += 1
+            stored += entry.stat().st_size
+        return {
+            'files': len(manifests),
+            'logical_bytes': logical,
+            'blobs': blobs,
+            'stored_bytes': stored,
+            'ratio': logical / stored if stored else 0.0,
+        }
@@ -0,0 +1,324 @@
+"""
+报告目录索引（SQLite）
+reports/ 下每个报告文件一行：公司、代码、报告类型、版本（raw/enhanced/pdf）、
+生成时间、修改时间、大小和状态。报告写入时由生成流程更新，
+Web界面的历史页面按索引筛选、分页查询，不再每次重新运行都扫描和stat整个目录。
+"""
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .metrics_store import parse_report_filename
+
+# 报告状态：ready（文件已写完）、pending（PDF在后台导出队列中）、
+# archived（原文件已移入 ReportArchive，通过 ReportFileStore 按需解压读取）
+STATUS_READY = 'ready'
+STATUS_PENDING = 'pending'
+STATUS_ARCHIVED = 'archived'
+
+# 报告版本
+VARIANT_RAW = 'raw'
+VARIANT_ENHANCED = 'enhanced'
+VARIANT_PDF = 'pdf'
+
+# 报告分类（历史页面的类型筛选），按判定顺序
+CATEGORIES = ('hotspot', 'comparison', 'enhanced', 'pdf', 'valuation')
+
+REPORT_EXTENSIONS = ('.md', '.pdf')
+
+# 公司名中的股票代码：纯代码（AAPL、0700.HK）或括号中的代码（Apple (AAPL)）
+TICKER_PATTERN = re.compile(r'^[A-Z0-9]{1,6}(?:[.\-][A-Z]{1,3})?$')
+TICKER_IN_PARENS = re.compile(r'\(([A-Z0-9]{1,6}(?:[.\-][A-Z]{1,3})?)\)')
+
+
+def extract_ticker(company: Optional[str]) -> Optional[str]:
+    """从公司名称中提取股票代码，没有时返回None"""
+    if not company:
+        return None
+    company = company.strip()
+    if TICKER_PATTERN.match(company):
+        return company
+    match = TICKER_IN_PARENS.search(company)
+    return match.group(1) if match else None
+
+
+def classify_report(path: str) -> Dict[str, str]:
+    """
+    根据文件名判断报告类型、版本和分类
+
+    Returns:
+        {'report_type': valuation/hotspot/comparison, 'variant': raw/enhanced/pdf, 'category': CATEGORIES之一}
+    """
+    basename = os.path.basename(path).lower()
+    if 'hotspot' in basename:
+        report_type = 'hotspot'
+    elif 'comparison' in basename:
+        report_type = 'comparison'
+    else:
+        report_type = 'valuation'
+
+    if basename.endswith('.pdf'):
+        variant = VARIANT_PDF
+    elif 'enhanced' in basename:
+        variant = VARIANT_ENHANCED
+    else:
+        variant = VARIANT_RAW
+
+    if report_type != 'valuation':
+        category = report_type
+    elif variant == VARIANT_ENHANCED:
+        category = 'enhanced'
+    elif variant == VARIANT_PDF:
+        category = 'pdf'
+    else:
+        category = 'valuation'
+    return {'report_type': report_type, 'variant': variant, 'category': category}
+
+
+class ReportCatalog:
+    """
+    基于SQLite的报告目录
+
+    以文件名为主键，重复登记同一文件是幂等的（覆盖旧记录）。
+    筛选条件（分类、公司）和排序（修改时间）都走索引，分页查询只读取一页的行。
+    """
+
+    def __init__(self, reports_dir: str = "reports", db_path: Optional[str] = None):
+        self.reports_dir = reports_dir
+        self.db_path = db_path or os.path.join(reports_dir, "catalog.db")
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            # WAL：多个生成进程登记报告时，历史页面的读取不会被写入阻塞
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    name TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    company TEXT COLLATE NOCASE,
+                    ticker TEXT COLLATE NOCASE,
+                    report_type TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    mtime REAL NOT NULL,
+                    report_time TEXT,
+                    indexed_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_reports_mtime ON reports(mtime);
+                CREATE INDEX IF NOT EXISTS idx_reports_category_mtime ON reports(category, mtime);
+                CREATE INDEX IF NOT EXISTS idx_reports_company_mtime ON reports(company, mtime);
+                CREATE INDEX IF NOT EXISTS idx_reports_ticker ON reports(ticker);
+            """)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def _row(self, path: str, company: Optional[str], status: str) -> Tuple:
+        """文件对应的记录（文件不存在时大小为0、修改时间为当前时间）"""
+        info = parse_report_filename(path)
+        kinds = classify_report(path)
+        try:
+            stat = os.stat(path)
+            size, mtime = stat.st_size, stat.st_mtime
+        except OSError:
+            size, mtime = 0, datetime.now().timestamp()
+        company = company or info['company']
+        return (
+            os.path.basename(path), path, company, extract_ticker(company),
+            kinds['report_type'], kinds['variant'], kinds['category'], status,
+            size, mtime, info['report_time'], datetime.now().isoformat(timespec='seconds'),
+        )
+
+    def record(self, path: str, company: Optional[str] = None, status: str = STATUS_READY):
+        """
+        登记（或更新）一个报告文件
+
+        Args:
+            path: 报告路径
+            company: 公司名称，缺省时从文件名推断
+            status: STATUS_READY，或后台导出中的 STATUS_PENDING
+        """
+        self._upsert([self._row(path, company, status)])
+
+    def _upsert(self, rows: List[Tuple]):
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                """INSERT OR REPLACE INTO reports
+                   (name, path, company, ticker, report_type, variant, category, status,
+                    size, mtime, report_time, indexed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+
+    def set_status(self, path: str, status: str) -> int:
+        """只更新报告状态（保留大小、修改时间等元数据）"""
+        with self._connect() as conn:
+            return conn.execute("UPDATE reports SET status = ? WHERE name = ?",
+                                (status, os.path.basename(path))).rowcount
+
+    def remove(self, path: str) -> int:
+        """删除报告文件的记录"""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM reports WHERE name = ?", (os.path.basename(path),)).rowcount
+
+    def clear(self):
+        """清空目录（reports/ 被整体删除后调用，会重新建表）"""
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        self._init_schema()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM reports")
+
+    def sync(self) -> Dict[str, int]:
+        """
+        与 reports/ 目录对账：登记新增或变化的文件，删除已不存在的已完成报告。
+        只读取目录项元数据，用于首次建立索引，以及收录其他工具直接写入的报告。
+
+        Returns:
+            {'added': 新增或更新数, 'removed': 删除数}
+        """
+        with self._connect() as conn:
+            known = {row['name']: (row['size'], row['mtime'], row['status'])
+                     for row in conn.execute("SELECT name, size, mtime, status FROM reports")}
+
+        rows = []
+        present = set()
+        if os.path.isdir(self.reports_dir):
+            with os.scandir(self.reports_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not entry.name.endswith(REPORT_EXTENSIONS):
+                        continue
+                    present.add(entry.name)
+                    stat = entry.stat()
+                    previous = known.get(entry.name)
+                    if previous and previous == (stat.st_size, stat.st_mtime, STATUS_READY):
+                        continue
+                    # 沿用已登记的公司名（文件名里的公司名经过了替换）
+                    company = self._company(entry.name) if previous else None
+                    rows.append(self._row(entry.path, company, STATUS_READY))
+
+        missing = [name for name, (_, _, status) in known.items()
+                   if name not in present and status == STATUS_READY]
+        self._upsert(rows)
+        if missing:
+            with self._connect() as conn:
+                conn.executemany("DELETE FROM reports WHERE name = ?", [(name,) for name in missing])
+        return {'added': len(rows), 'removed': len(missing)}
+
+    def _company(self, name: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT company FROM reports WHERE name = ?", (name,)).fetchone()
+        return row['company'] if row else None
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _where(category: Optional[str], company: Optional[str], search: Optional[str],
+               status: Optional[str]) -> Tuple[str, List]:
+        clauses, params = [], []
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if company:
+            clauses.append("company = ?")
+            params.append(company)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if search:
+            clauses.append("(name LIKE ? ESCAPE '\\' OR company LIKE ? ESCAPE '\\' OR ticker LIKE ? ESCAPE '\\')")
+            pattern = '%' + re.sub(r'([%_\\])', r'\\\1', search) + '%'
+            params.extend([pattern] * 3)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def list_reports(self, category: Optional[str] = None, company: Optional[str] = None,
+                     search: Optional[str] = None, status: Optional[str] = None,
+                     limit: int = 10, offset: int = 0) -> List[Dict]:
+        """
+        按修改时间从新到旧分页查询报告
+
+        Args:
+            category: 分类（CATEGORIES之一）
+            company: 公司名称（不区分大小写）
+            search: 文件名、公司名或代码中包含的关键词
+            status: 报告状态
+            limit / offset: 分页
+        """
+        where, params = self._where(category, company, search, status)
+        sql = f"SELECT * FROM reports{where} ORDER BY mtime DESC, name LIMIT ? OFFSET ?"
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(sql, params + [int(limit), int(offset)])]
+
+    def count(self, category: Optional[str] = None, company: Optional[str] = None,
+              search: Optional[str] = None, status: Optional[str] = None) -> int:
+        """符合条件的报告数"""
+        where, params = self._where(category, company, search, status)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM reports{where}", params).fetchone()[0]
+
+    def entries(self) -> List[Dict]:
+        """全部报告的元数据（不分页，供保留策略等批量处理使用）"""
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(
+                """SELECT name, path, company, ticker, report_type, variant, status, size, mtime
+                   FROM reports ORDER BY mtime DESC, name""")]
+
+    def get(self, path: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM reports WHERE name = ?", (os.path.basename(path),)).fetchone()
+        return dict(row) if row else None
+
+    def stats(self) -> Dict:
+        """
+        汇总统计
+
+        Returns:
+            {'count', 'bytes', 'categories': {分类: 数量}, 'variants': {版本: {'count', 'bytes'}}}
+        """
+        with self._connect() as conn:
+            categories = {row['category']: row['n'] for row in conn.execute(
+                "SELECT category, COUNT(*) AS n FROM reports GROUP BY category")}
+            variants = {row['variant']: {'count': row['n'], 'bytes': row['bytes']} for row in conn.execute(
+                "SELECT variant, COUNT(*) AS n, COALESCE(SUM(size), 0) AS bytes FROM reports GROUP BY variant")}
+        return {
+            'count': sum(categories.values()),
+            'bytes': sum(v['bytes'] for v in variants.values()),
+            'categories': categories,
+            'variants': variants,
+        }
+
+
+_default_catalog: Optional[ReportCatalog] = None
+_default_catalog_lock = threading.Lock()
+
+
+def get_default_catalog() -> ReportCatalog:
+    """进程内共享的报告目录（首次使用时与 reports/ 对账一次）"""
+    global _default_catalog
+    with _default_catalog_lock:
+        if _default_catalog is None:
+            _default_catalog = ReportCatalog()
+            _default_catalog.sync()
+        return _default_catalog
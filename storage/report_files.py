@@ -0,0 +1,199 @@
+"""
+报告文件字节源
+Web界面渲染报告列表时只需要文件名、大小和修改时间，文件内容在真正下载时才读取：
+- ReportByteSource 是惰性字节源：按需一次读取，或分块迭代；
+  刚生成的报告可以直接包装内存中的bytes，不必先写盘再读回
+- ReportFileStore 按 (路径, 修改时间, 大小) 缓存已读取的内容，总量有上限（LRU），
+  Streamlit每次重新运行页面时不再重复读取同一个文件；已归档（原文件已删除）的报告
+  从 ReportArchive 按需解压
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .report_archive import ReportArchive
+from .report_writer import atomic_write
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+# 字节缓存上限（超过时淘汰最久未使用的文件）
+DEFAULT_MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class ReportByteSource:
+    """惰性字节源：磁盘文件或内存中的bytes"""
+
+    def __init__(self, path: Optional[str] = None, data: Optional[bytes] = None, name: Optional[str] = None):
+        if path is None and data is None:
+            raise ValueError("path 和 data 至少提供一个")
+        self.path = path
+        self._data = data
+        self.name = name or (os.path.basename(path) if path else 'report.pdf')
+
+    @classmethod
+    def from_bytes(cls, data: bytes, name: str) -> 'ReportByteSource':
+        """包装内存中已生成的内容（如 generate_report_pdf_bytes 的结果）"""
+        return cls(data=data, name=name)
+
+    @property
+    def size(self) -> int:
+        if self._data is not None:
+            return len(self._data)
+        return os.path.getsize(self.path)
+
+    def open(self) -> BinaryIO:
+        """以文件对象形式打开（调用方负责关闭）"""
+        if self._data is not None:
+            return io.BytesIO(self._data)
+        return open(self.path, 'rb')
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """分块读取，内存占用与文件大小无关"""
+        with self.open() as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def read_bytes(self) -> bytes:
+        """读取全部内容（按文件大小一次分配并读入，不经过中间缓冲）"""
+        if self._data is not None:
+            return self._data
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class ReportFileStore:
+    """报告目录的文件元数据与内容缓存（线程安全，可在多个Streamlit会话间共享）"""
+
+    def __init__(self, reports_dir: str = "reports", max_cache_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+                 archive: Optional[ReportArchive] = None):
+        self.reports_dir = reports_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.archive = archive
+        self._cache: 'OrderedDict[Tuple, bytes]' = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def list_reports(self, extensions: Tuple[str, ...] = ('.md', '.pdf')) -> List[Dict]:
+        """
+        列出报告文件（只读取目录项元数据，不打开文件），按修改时间从新到旧排序
+
+        Returns:
+            [{'name', 'path', 'size', 'mtime'}, ...]
+        """
+        if not os.path.isdir(self.reports_dir):
+            return []
+        reports = []
+        with os.scandir(self.reports_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(extensions):
+                    continue
+                stat = entry.stat()
+                reports.append({
+                    'name': entry.name,
+                    'path': entry.path,
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                })
+        reports.sort(key=lambda r: r['mtime'], reverse=True)
+        return reports
+
+    def source(self, path: str) -> ReportByteSource:
+        """文件的惰性字节源（不读取内容）"""
+        return ReportByteSource(path=path)
+
+    @staticmethod
+    def _key(path: str) -> Tuple[str, int, int]:
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    def exists(self, path: str) -> bool:
+        """文件在磁盘上或已归档（load_bytes 可以读取）"""
+        return os.path.exists(path) or (self.archive is not None and self.archive.has(path))
+
+    def load_bytes(self, path: str) -> bytes:
+        """读取文件内容；文件未变化时直接返回缓存，原文件已归档时从归档解压"""
+        if self.archive is not None and not os.path.exists(path) and self.archive.has(path):
+            return self._load_archived(path)
+
+        key = self._key(path)
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self.source(path).read_bytes()
+        with self._lock:
+            self.misses += 1
+            self._remember(key, data)
+        return data
+
+    def _load_archived(self, path: str) -> bytes:
+        """归档文件以 (路径, 'archive', blob哈希) 为缓存键"""
+        manifest = self.archive.manifest(path)
+        key = (os.path.abspath(path), 'archive', manifest['blob'])
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self.archive.read_blob(manifest['blob'])
+        with self._lock:
+            self.misses += 1
+            self._remember(key, data)
+        return data
+
+    def write_bytes(self, path: str, data: bytes):
+        """原子写入文件（fsync后替换）并放入缓存（刚生成的报告下载时无需再读盘）"""
+        atomic_write(path, data)
+        with self._lock:
+            self._remember(self._key(path), data)
+
+    def _remember(self, key: Tuple, data: bytes):
+        """加入缓存（调用方持有锁），同一路径的旧版本和超出上限的条目被淘汰"""
+        if len(data) > self.max_cache_bytes:
+            return
+        for old_key in [k for k in self._cache if k[0] == key[0] and k != key]:
+            self._cached_bytes -= len(self._cache.pop(old_key))
+        if key not in self._cache:
+            self._cache[key] = data
+            self._cached_bytes += len(data)
+        self._cache.move_to_end(key)
+        while self._cached_bytes > self.max_cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+
+    def invalidate(self, path: str):
+        """删除文件前调用，丢弃缓存内容"""
+        abs_path = os.path.abspath(path)
+        with self._lock:
+            for key in [k for k in self._cache if k[0] == abs_path]:
+                self._cached_bytes -= len(self._cache.pop(key))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'files': len(self._cache), 'bytes': self._cached_bytes}
+
+
+_default_store: Optional[ReportFileStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store() -> ReportFileStore:
+    """进程内共享的报告文件缓存"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ReportFileStore(archive=ReportArchive())
+        return _default_store
@@ -0,0 +1,375 @@
+"""
+报告全文检索（SQLite FTS5）
+报告按Markdown标题切分为章节写入倒排索引，引用来源章节单独标记，
+支持按BM25排序的查询、命中片段高亮，以及按公司和日期筛选。
+
+- 同一份报告的原始版和 _enhanced 等版本内容几乎相同，只索引一份（优先增强版）
+- 索引是增量的：内容哈希未变化的报告不会重新写入
+- 已归档（原文件已删除、内容在 ReportArchive 中）的报告保留索引，仍可检索和查看
+- 使用trigram分词，中英文都能按子串匹配；少于3个字的关键词（如"芯片"）
+  无法走倒排索引，改为对章节文本做子串匹配
+"""
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from agents import regex_patterns as rx
+from .metrics_store import parse_report_filename
+from .report_archive import ReportArchive
+from .stage_cache import content_hash
+
+MD_HEADING = rx.register('search.md_heading', r'^(#{1,6})\s+(.+?)\s*#*\s*$', re.MULTILINE)
+CITATION_HEADING = rx.register('search.citation_heading', r'reference|citation|sources|参考|引用|来源', re.IGNORECASE)
+REPORT_STEM = rx.register('search.report_stem', r'^(.+?_\d{8}_\d{6})')
+QUERY_TERM = rx.register('search.query_term', r'"([^"]+)"|(\S+)')
+
+# 章节类型
+KIND_SECTION = 'section'
+KIND_CITATION = 'citation'
+
+# 同一报告多个版本中优先索引的版本（越靠前越优先）
+VARIANT_PREFERENCE = ('_enhanced_with_chart', '_enhanced', '_formatted', '')
+
+# trigram分词能走索引的最短关键词长度
+TRIGRAM_MIN_LENGTH = 3
+
+# 章节的rowid = 报告id * STRIDE + 序号，删除报告时按rowid区间删除，不必扫描整个FTS表
+SECTION_ROWID_STRIDE = 100000
+
+
+def report_stem(path: str) -> str:
+    """报告的版本无关标识（AAPL_20251101_120000_enhanced.md -> AAPL_20251101_120000）"""
+    basename = os.path.basename(path)
+    match = REPORT_STEM.match(basename)
+    return match.group(1) if match else basename.rsplit('.', 1)[0]
+
+
+def split_sections(content: str) -> List[Tuple[str, str, str]]:
+    """
+    按Markdown标题切分报告
+
+    Returns:
+        [(标题, 正文, 章节类型), ...]；第一个标题之前的内容标题为空
+    """
+    sections = []
+    headings = list(MD_HEADING.finditer(content))
+    if not headings or headings[0].start() > 0:
+        preamble = content[:headings[0].start() if headings else len(content)].strip()
+        if preamble:
+            sections.append(('', preamble, KIND_SECTION))
+
+    kind = KIND_SECTION
+    for idx, match in enumerate(headings):
+        level, heading = len(match.group(1)), match.group(2).strip()
+        end = headings[idx + 1].start() if idx + 1 < len(headings) else len(content)
+        body = content[match.end():end].strip()
+        # 引用来源章节下的子标题也属于引用
+        if level <= 2:
+            kind = KIND_CITATION if CITATION_HEADING.search(heading) else KIND_SECTION
+        elif CITATION_HEADING.search(heading):
+            kind = KIND_CITATION
+        if body:
+            sections.append((heading, body, kind))
+    return sections
+
+
+class ReportSearchIndex:
+    """
+    基于SQLite FTS5的报告全文索引
+
+    documents 表每份报告一行（按版本无关标识去重），sections 虚拟表存放章节文本。
+    """
+
+    def __init__(self, reports_dir: str = "reports", db_path: Optional[str] = None,
+                 archive: Optional[ReportArchive] = None):
+        self.reports_dir = reports_dir
+        self.db_path = db_path or os.path.join(reports_dir, "search.db")
+        self.archive = archive or ReportArchive(os.path.join(reports_dir, "archive"))
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.trigram = self._has_trigram()
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _has_trigram() -> bool:
+        """SQLite 3.34 起才有 trigram 分词器，更早的版本退回 unicode61"""
+        try:
+            conn = sqlite3.connect(':memory:')
+            conn.execute("CREATE VIRTUAL TABLE t USING fts5(a, tokenize='trigram')")
+            conn.close()
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def _init_schema(self):
+        tokenizer = 'trigram' if self.trigram else 'unicode61'
+        with self._connect() as conn:
+            conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    report TEXT NOT NULL UNIQUE,
+                    path TEXT NOT NULL,
+                    company TEXT COLLATE NOCASE,
+                    report_time TEXT,
+                    content_hash TEXT NOT NULL,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    mtime REAL NOT NULL DEFAULT 0,
+                    indexed_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_documents_company ON documents(company, report_time);
+                CREATE INDEX IF NOT EXISTS idx_documents_time ON documents(report_time);
+                CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+                    heading, body, kind UNINDEXED, doc_id UNINDEXED, tokenize='{tokenizer}'
+                );
+            """)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def index_report(self, path: str, company: Optional[str] = None,
+                     citations: Optional[List] = None) -> bool:
+        """
+        把报告写入索引（同一报告的其他版本被替换）
+
+        Args:
+            path: 报告Markdown路径
+            company: 公司名称，缺省时从文件名推断
+            citations: 额外的引用来源（URL字符串或 {'title', 'url'} 字典）
+
+        Returns:
+            是否写入（内容未变化时跳过，返回False）
+        """
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        sections = split_sections(content)
+        for citation in citations or []:
+            if isinstance(citation, dict):
+                citation = ' '.join(str(citation.get(k, '')) for k in ('title', 'source', 'url', 'link') if citation.get(k))
+            sections.append(('References', str(citation), KIND_CITATION))
+
+        digest = content_hash(content, repr(citations or []))
+        stem = report_stem(path)
+        info = parse_report_filename(path)
+        stat = os.stat(path)
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT id, content_hash, company FROM documents WHERE report = ?", (stem,)).fetchone()
+            if row and row['content_hash'] == digest:
+                conn.execute("UPDATE documents SET path = ?, size = ?, mtime = ? WHERE id = ?",
+                             (path, stat.st_size, stat.st_mtime, row['id']))
+                return False
+            if row:
+                self._delete_document(conn, row['id'])
+            cursor = conn.execute(
+                """INSERT INTO documents (report, path, company, report_time, content_hash, size, mtime, indexed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (stem, path, company or (row['company'] if row else None) or info['company'],
+                 info['report_time'], digest, stat.st_size, stat.st_mtime,
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+            doc_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO sections (rowid, heading, body, kind, doc_id) VALUES (?, ?, ?, ?, ?)",
+                [(doc_id * SECTION_ROWID_STRIDE + idx, heading, body, kind, doc_id)
+                 for idx, (heading, body, kind) in enumerate(sections[:SECTION_ROWID_STRIDE])]
+            )
+        return True
+
+    @staticmethod
+    def _delete_document(conn: sqlite3.Connection, doc_id: int):
+        first = doc_id * SECTION_ROWID_STRIDE
+        conn.execute("DELETE FROM sections WHERE rowid BETWEEN ? AND ?", (first, first + SECTION_ROWID_STRIDE - 1))
+        conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    def remove_report(self, path: str) -> int:
+        """删除报告（任一版本的路径均可）的索引"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT id FROM documents WHERE report = ?", (report_stem(path),)).fetchone()
+            if not row:
+                return 0
+            self._delete_document(conn, row['id'])
+            return 1
+
+    def indexed_path(self, path: str) -> Optional[str]:
+        """报告（任一版本的路径均可）在索引中对应的版本路径，未索引时返回None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT path FROM documents WHERE report = ?", (report_stem(path),)).fetchone()
+        return row['path'] if row else None
+
+    def clear(self):
+        """清空索引（reports/ 被整体删除后调用，会重新建表）"""
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        self._init_schema()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sections")
+            conn.execute("DELETE FROM documents")
+
+    def sync(self) -> Dict[str, int]:
+        """
+        与 reports/ 目录对账：每份报告选优先版本，索引新增或变化的报告，删除已不存在的报告
+        （被索引的版本已归档时保留索引）
+
+        Returns:
+            {'indexed': 写入数, 'removed': 删除数}
+        """
+        candidates: Dict[str, Tuple[int, os.DirEntry]] = {}
+        if os.path.isdir(self.reports_dir):
+            with os.scandir(self.reports_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not entry.name.endswith('.md'):
+                        continue
+                    stem = report_stem(entry.name)
+                    suffix = entry.name[len(stem):-len('.md')]
+                    rank = VARIANT_PREFERENCE.index(suffix) if suffix in VARIANT_PREFERENCE else len(VARIANT_PREFERENCE)
+                    if stem not in candidates or rank < candidates[stem][0]:
+                        candidates[stem] = (rank, entry)
+
+        with self._connect() as conn:
+            known = {row['report']: (row['path'], row['size'], row['mtime'])
+                     for row in conn.execute("SELECT report, path, size, mtime FROM documents")}
+
+        indexed = 0
+        for stem, (_, entry) in candidates.items():
+            stat = entry.stat()
+            if known.get(stem) == (entry.path, stat.st_size, stat.st_mtime):
+                continue
+            if self.index_report(entry.path):
+                indexed += 1
+
+        removed = 0
+        for stem in set(known) - set(candidates):
+            if not self.archive.has(known[stem][0]):
+                removed += self.remove_report(stem)
+        return {'indexed': indexed, 'removed': removed}
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def _match_clauses(self, query: str) -> Tuple[Optional[str], List[str]]:
+        """
+        把查询拆成 FTS MATCH 表达式和需要子串匹配的短关键词
+
+        带双引号的部分作为短语，其余按空白拆分，各关键词之间为 AND
+        """
+        fts_terms, short_terms = [], []
+        for phrase, word in QUERY_TERM.findall(query):
+            term = (phrase or word).strip()
+            if not term:
+                continue
+            if self.trigram and len(term) < TRIGRAM_MIN_LENGTH:
+                short_terms.append(term)
+            else:
+                fts_terms.append('"' + term.replace('"', '""') + '"')
+        return (' AND '.join(fts_terms) or None), short_terms
+
+    def search(self, query: str, company: Optional[str] = None,
+               since: Optional[str] = None, until: Optional[str] = None,
+               kind: Optional[str] = None, limit: int = 20,
+               per_report: bool = True, marker: Tuple[str, str] = ('**', '**')) -> List[Dict]:
+        """
+        全文检索
+
+        Args:
+            query: 关键词（空格分隔，全部匹配），双引号内为短语
+            company: 只查某公司的报告（不区分大小写）
+            since / until: 报告生成日期范围（'YYYY-MM-DD'，含两端）
+            kind: 只查正文（KIND_SECTION）或引用（KIND_CITATION）
+            limit: 返回条数
+            per_report: 每份报告只返回得分最高的章节
+            marker: 片段中命中词两侧的标记（默认Markdown粗体）
+
+        Returns:
+            [{'report', 'path', 'company', 'report_time', 'heading', 'kind', 'snippet', 'score'}, ...]，
+            按相关度从高到低排序
+        """
+        match, short_terms = self._match_clauses(query)
+        if not match and not short_terms:
+            return []
+
+        clauses, params = [], []
+        if match:
+            clauses.append("sections MATCH ?")
+            params.append(match)
+        for term in short_terms:
+            clauses.append("(sections.heading LIKE ? OR sections.body LIKE ?)")
+            params.extend([f'%{term}%'] * 2)
+        if company:
+            clauses.append("d.company = ?")
+            params.append(company)
+        if since:
+            clauses.append("substr(d.report_time, 1, 10) >= ?")
+            params.append(since)
+        if until:
+            clauses.append("substr(d.report_time, 1, 10) <= ?")
+            params.append(until)
+        if kind:
+            clauses.append("sections.kind = ?")
+            params.append(kind)
+
+        if match:
+            # 标题命中的权重是正文的2倍
+            snippet = "snippet(sections, 1, ?, ?, '…', 48)"
+            score, order = "bm25(sections, 2.0, 1.0)", "score"
+            params = list(marker) + params
+        else:
+            snippet = "substr(sections.body, 1, 160)"
+            score, order = "0.0", "d.report_time DESC"
+        sql = f"""
+            SELECT d.report, d.path, d.company, d.report_time, sections.heading, sections.kind,
+                   {snippet} AS snippet, {score} AS score
+            FROM sections JOIN documents d ON d.id = sections.doc_id
+            WHERE {' AND '.join(clauses)}
+            ORDER BY {order}
+        """
+
+        results, seen = [], set()
+        with self._connect() as conn:
+            for row in conn.execute(sql, params):
+                if per_report and row['report'] in seen:
+                    continue
+                seen.add(row['report'])
+                results.append(dict(row))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def companies(self) -> List[str]:
+        """已索引的公司列表"""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT DISTINCT company FROM documents WHERE company IS NOT NULL ORDER BY company")]
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            reports = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            sections = conn.execute("SELECT COUNT(*) FROM sections").fetchone()[0]
+        return {'reports': reports, 'sections': sections}
+
+
+_default_index: Optional[ReportSearchIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_default_search_index() -> ReportSearchIndex:
+    """进程内共享的全文索引（首次使用时与 reports/ 对账一次）"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = ReportSearchIndex()
+            _default_index.sync()
+        return _default_index
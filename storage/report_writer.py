@@ -0,0 +1,386 @@
+"""
+崩溃安全的报告写入（暂存 + 预写日志 + 原子发布）
+一份报告的各个产物（Markdown、增强版、PDF）先写入 reports/.staging/<事务ID>/ 并fsync，
+提交时先把待发布的文件列表写入预写日志（reports/.journal/<报告名>.json）并fsync，
+再逐个 os.replace 到 reports/ 下，最后更新每份报告的清单（reports/.manifests/<报告名>.json）。
+
+- 进程在提交前崩溃：reports/ 下看不到任何半成品，recover() 清理暂存目录
+- 进程在发布中途崩溃：日志已记录全部文件，recover() 把剩余文件继续发布
+- 日志文件以独占方式创建，同一份报告同一时间只有一个事务；新报告的名字
+  （公司_日期_时间）被占用时顺延一秒，多个并发工作进程不会互相覆盖
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from .stage_cache import content_hash
+
+JOURNAL_STAGED = 'staged'
+JOURNAL_COMMITTED = 'committed'
+
+# 等待同一份报告上其他事务结束的最长时间（秒）
+LOCK_TIMEOUT = 30
+
+
+def _fsync_dir(directory: str):
+    """fsync目录，使其中的新建、改名和删除持久化（Windows不支持时跳过）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, data: bytes, mode: int = 0o644):
+    """写入临时文件并fsync，再原子替换目标文件（读者只会看到旧内容或完整的新内容）"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(directory)
+
+
+class ReportTransaction:
+    """
+    一份报告的一次写入事务（由 ReportWriter.begin / open 创建）
+
+    用法:
+        with writer.begin('AAPL') as txn:
+            txn.write_text(f'{txn.stem}.md', content)
+            generator.generate_report_pdf(..., txn.stage_path(f'{txn.stem}.pdf'))
+        # 正常退出 with 时提交，异常时回滚
+    """
+
+    def __init__(self, writer: 'ReportWriter', stem: str, journal_path: str):
+        self.writer = writer
+        self.stem = stem
+        self.txn_id = uuid.uuid4().hex[:12]
+        self.journal_path = journal_path
+        self.staging_dir = os.path.join(writer.staging_root, self.txn_id)
+        self._staged: List[str] = []
+        self._deletes: List[str] = []
+        self._adopted: List[str] = []
+        self.closed = False
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._write_journal(JOURNAL_STAGED)
+
+    def final_path(self, name: str) -> str:
+        """产物发布后的路径"""
+        return os.path.join(self.writer.reports_dir, os.path.basename(name))
+
+    def stage_path(self, name: str) -> str:
+        """
+        产物的暂存路径（供需要文件路径的写入方使用，如PDF生成器），提交时发布
+
+        Returns:
+            暂存文件路径
+        """
+        name = os.path.basename(name)
+        if name not in self._staged:
+            self._staged.append(name)
+        return os.path.join(self.staging_dir, name)
+
+    def write_bytes(self, name: str, data: bytes) -> str:
+        """暂存产物内容，返回发布后的路径"""
+        with open(self.stage_path(name), 'wb') as f:
+            f.write(data)
+        return self.final_path(name)
+
+    def write_text(self, name: str, text: str) -> str:
+        return self.write_bytes(name, text.encode('utf-8'))
+
+    def delete(self, name: str):
+        """提交时删除已发布的产物（如 keep_markdown=False 时的Markdown）"""
+        self._deletes.append(os.path.basename(name))
+
+    def adopt(self, name: str):
+        """把已由其他途径原子写入的产物（如后台导出的PDF）登记到报告清单"""
+        self._adopted.append(os.path.basename(name))
+
+    def _write_journal(self, state: str):
+        journal = {
+            'report': self.stem,
+            'txn_id': self.txn_id,
+            'state': state,
+            'staged': self._staged,
+            'deletes': self._deletes,
+            'pid': os.getpid(),
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        atomic_write(self.journal_path, json.dumps(journal, ensure_ascii=False).encode('utf-8'))
+
+    def commit(self) -> List[str]:
+        """
+        提交：fsync暂存文件 -> 日志标记为已提交 -> 原子发布 -> 更新报告清单
+
+        Returns:
+            发布的文件路径
+        """
+        if self.closed:
+            raise RuntimeError(f"事务已结束: {self.stem}")
+        self._staged = [name for name in self._staged if os.path.exists(os.path.join(self.staging_dir, name))]
+        for name in self._staged:
+            with open(os.path.join(self.staging_dir, name), 'rb') as f:
+                os.fsync(f.fileno())
+        _fsync_dir(self.staging_dir)
+
+        # 日志落盘之后，即使崩溃也会由 recover() 继续完成发布
+        self._write_journal(JOURNAL_COMMITTED)
+        published = self.writer._apply(self.stem, self.staging_dir, self._staged, self._deletes, self._adopted)
+        self._close()
+        return published
+
+    def abort(self):
+        """回滚：丢弃暂存文件，reports/ 不受影响"""
+        if not self.closed:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            self._close()
+
+    def _close(self):
+        self.closed = True
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def __enter__(self) -> 'ReportTransaction':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+class ReportWriter:
+    """reports/ 目录的事务化写入器"""
+
+    def __init__(self, reports_dir: str = "reports"):
+        self.reports_dir = reports_dir
+        self.staging_root = os.path.join(reports_dir, ".staging")
+        self.journal_dir = os.path.join(reports_dir, ".journal")
+        self.manifests_dir = os.path.join(reports_dir, ".manifests")
+        for directory in (self.staging_root, self.journal_dir, self.manifests_dir):
+            os.makedirs(directory, exist_ok=True)
+        self._manifest_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 事务
+    # ------------------------------------------------------------------
+    def _journal_path(self, stem: str) -> str:
+        return os.path.join(self.journal_dir, stem + '.json')
+
+    def _try_lock(self, stem: str) -> bool:
+        """独占创建日志文件作为该报告的锁"""
+        # reports/ 可能被Web界面整体清空过
+        os.makedirs(self.journal_dir, exist_ok=True)
+        os.makedirs(self.staging_root, exist_ok=True)
+        try:
+            fd = os.open(self._journal_path(stem), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+    def _name_taken(self, stem: str) -> bool:
+        return (os.path.exists(self._manifest_path(stem))
+                or os.path.exists(os.path.join(self.reports_dir, stem + '.md'))
+                or os.path.exists(os.path.join(self.reports_dir, stem + '.pdf')))
+
+    def begin(self, company_slug: str, timestamp: Optional[datetime] = None) -> ReportTransaction:
+        """
+        为新报告开始事务，报告名为 {company_slug}_{YYYYMMDD}_{HHMMSS}，被占用时顺延一秒
+
+        Args:
+            company_slug: 文件名中的公司标识（已替换空格和斜杠）
+            timestamp: 报告时间，默认当前时间
+        """
+        moment = timestamp or datetime.now()
+        while True:
+            stem = f"{company_slug}_{moment.strftime('%Y%m%d_%H%M%S')}"
+            if not self._name_taken(stem) and self._try_lock(stem):
+                if not self._name_taken(stem):
+                    return ReportTransaction(self, stem, self._journal_path(stem))
+                os.remove(self._journal_path(stem))
+            moment += timedelta(seconds=1)
+
+    def open(self, stem: str, timeout: float = LOCK_TIMEOUT) -> ReportTransaction:
+        """为已有报告开始后续事务（如生成PDF、删除Markdown），等待同一报告上的其他事务结束"""
+        deadline = time.monotonic() + timeout
+        while not self._try_lock(stem):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"等待报告事务超时: {stem}")
+            time.sleep(0.05)
+        return ReportTransaction(self, stem, self._journal_path(stem))
+
+    def _apply(self, stem: str, staging_dir: str, staged: List[str], deletes: List[str],
+               adopted: Optional[List[str]] = None) -> List[str]:
+        """发布暂存文件、执行删除并更新报告清单（可重复执行，用于崩溃恢复）"""
+        published = []
+        for name in staged:
+            source = os.path.join(staging_dir, name)
+            target = os.path.join(self.reports_dir, name)
+            if os.path.exists(source):
+                os.chmod(source, 0o644)
+                os.replace(source, target)
+            if os.path.exists(target):
+                published.append(target)
+        for name in deletes:
+            target = os.path.join(self.reports_dir, name)
+            if os.path.exists(target):
+                os.remove(target)
+        _fsync_dir(self.reports_dir)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        self._update_manifest(stem, staged + list(adopted or []), deletes)
+        return published
+
+    # ------------------------------------------------------------------
+    # 报告清单
+    # ------------------------------------------------------------------
+    def _manifest_path(self, stem: str) -> str:
+        return os.path.join(self.manifests_dir, stem + '.json')
+
+    def manifest(self, stem: str) -> Optional[Dict]:
+        """报告的清单：{'report', 'artifacts': {文件名: {'size', 'sha256'}}, 'updated_at'}"""
+        try:
+            with open(self._manifest_path(stem), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _update_manifest(self, stem: str, added: List[str], removed: List[str]):
+        with self._manifest_lock:
+            manifest = self.manifest(stem) or {'report': stem, 'artifacts': {}}
+            for name in added:
+                path = os.path.join(self.reports_dir, name)
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    manifest['artifacts'][name] = {'size': len(data), 'sha256': content_hash(data)}
+            for name in removed:
+                manifest['artifacts'].pop(name, None)
+            manifest['updated_at'] = datetime.now().isoformat(timespec='seconds')
+            atomic_write(self._manifest_path(stem), json.dumps(manifest, ensure_ascii=False).encode('utf-8'))
+
+    def drop_manifest(self, stem: str) -> bool:
+        """报告的产物已全部删除时删除其清单（还有产物时保留）"""
+        with self._manifest_lock:
+            manifest = self.manifest(stem)
+            if manifest is None or manifest.get('artifacts'):
+                return False
+            os.remove(self._manifest_path(stem))
+            return True
+
+    def verify(self, stem: str) -> Dict[str, str]:
+        """
+        按清单校验报告的产物
+
+        Returns:
+            {文件名: 'ok' / 'missing' / 'corrupt'}
+        """
+        manifest = self.manifest(stem) or {'artifacts': {}}
+        status = {}
+        for name, info in manifest['artifacts'].items():
+            path = os.path.join(self.reports_dir, name)
+            if not os.path.exists(path):
+                status[name] = 'missing'
+                continue
+            with open(path, 'rb') as f:
+                status[name] = 'ok' if content_hash(f.read()) == info['sha256'] else 'corrupt'
+        return status
+
+    # ------------------------------------------------------------------
+    # 崩溃恢复
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _pid_alive(pid: int) -> bool:
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except (PermissionError, OSError):
+            return True
+        return True
+
+    def recover(self) -> Dict[str, int]:
+        """
+        处理崩溃遗留的事务（进程仍在运行的事务不处理）：
+        已提交的继续发布，未提交的丢弃暂存文件；没有日志的暂存目录过期后删除
+
+        Returns:
+            {'rolled_forward': 继续发布数, 'rolled_back': 回滚数}
+        """
+        result = {'rolled_forward': 0, 'rolled_back': 0}
+        active = set()
+        if not os.path.isdir(self.journal_dir):
+            return result
+        for entry_name in os.listdir(self.journal_dir):
+            if not entry_name.endswith('.json'):
+                continue
+            journal_path = os.path.join(self.journal_dir, entry_name)
+            try:
+                with open(journal_path, 'r', encoding='utf-8') as f:
+                    journal = json.load(f)
+            except (OSError, ValueError):
+                # 刚独占创建、尚未写入内容的日志：超过锁等待时间仍为空时视为遗留
+                if time.time() - os.path.getmtime(journal_path) > LOCK_TIMEOUT:
+                    os.remove(journal_path)
+                continue
+
+            if self._pid_alive(journal.get('pid', 0)):
+                active.add(journal['txn_id'])
+                continue
+            staging_dir = os.path.join(self.staging_root, journal['txn_id'])
+            if journal['state'] == JOURNAL_COMMITTED:
+                self._apply(journal['report'], staging_dir, journal['staged'], journal['deletes'])
+                result['rolled_forward'] += 1
+            else:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                result['rolled_back'] += 1
+            os.remove(journal_path)
+
+        # 没有日志的暂存目录：可能是刚创建、日志尚未写入的事务，超过锁等待时间才清理
+        for entry in os.scandir(self.staging_root):
+            if entry.is_dir() and entry.name not in active \
+                    and time.time() - entry.stat().st_mtime > LOCK_TIMEOUT:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        return result
+
+
+_default_writer: Optional[ReportWriter] = None
+_default_writer_lock = threading.Lock()
+
+
+def get_default_writer() -> ReportWriter:
+    """进程内共享的报告写入器（首次使用时恢复崩溃遗留的事务）"""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = ReportWriter()
+            result = _default_writer.recover()
+            if result['rolled_forward'] or result['rolled_back']:
+                print(f"♻️  恢复未完成的报告写入: 继续发布 {result['rolled_forward']} 个，回滚 {result['rolled_back']} 个")
+        return _default_writer
@@ -0,0 +1,308 @@
+"""
+报告保留策略
+reports/ 和 reports/charts 不再只增不减。保留策略按报告目录索引（不扫描目录）
+计算要删除的内容，删除通过报告写入器的事务完成（与生成流程互斥，崩溃可恢复）：
+
+- 被取代的变体: 同一报告有多个增强版本时只保留最完整的一个
+  （_enhanced_with_chart > _enhanced > _formatted），原始版本和PDF保留
+- 每个代码保留最新N份: 同一公司（代码）的估值报告、各类热点/比较报告只保留最近N次运行
+- 最长保留时间: 删除超过指定天数的报告
+- 总大小上限: 超出时从最旧的报告开始删除（每个公司最新的一份不删）
+
+删除以“一次运行”（报告名 X_YYYYMMDD_HHMMSS 的所有版本）为单位，同时清理目录索引、
+全文索引、图表引用、归档清单、渲染缓存和后处理缓存条目；之后回收不再被引用的图表、
+归档blob和后处理缓存对象。
+刚生成的报告（min_age_seconds 内）和PDF仍在后台导出的报告不会被删除。
+"""
+import os
+import time
+from typing import Dict, List, Optional
+
+from .chart_store import ChartStore
+from .render_cache import ReportRenderCache, get_default_render_cache
+from .report_archive import ReportArchive
+from .report_catalog import STATUS_ARCHIVED, STATUS_PENDING, ReportCatalog, get_default_catalog
+from .report_files import ReportFileStore, get_default_store
+from .report_search import VARIANT_PREFERENCE, ReportSearchIndex, get_default_search_index, report_stem
+from .report_writer import ReportWriter, get_default_writer
+from .stage_cache import StageCache
+
+# 删除原因
+REASON_SUPERSEDED = 'superseded'
+REASON_KEEP_LATEST = 'keep_latest'
+REASON_MAX_AGE = 'max_age'
+REASON_MAX_BYTES = 'max_bytes'
+
+# 这段时间内生成或修改过的报告不参与清理（增强、图表、PDF可能仍在进行）
+DEFAULT_MIN_AGE = 3600
+
+
+class RetentionPolicy:
+    """保留策略（各项为0时不启用）"""
+
+    def __init__(self, keep_latest_per_ticker: int = 0, max_age_days: float = 0, max_total_bytes: int = 0,
+                 drop_superseded_variants: bool = True, min_age_seconds: float = DEFAULT_MIN_AGE):
+        """
+        Args:
+            keep_latest_per_ticker: 每个公司（代码）/报告类型保留的最近运行数
+            max_age_days: 最长保留天数
+            max_total_bytes: 报告总大小上限（按目录索引中的原始大小计算，含已归档的报告）
+            drop_superseded_variants: 是否删除被取代的中间变体
+            min_age_seconds: 比这更新的报告不参与清理
+        """
+        self.keep_latest_per_ticker = int(keep_latest_per_ticker or 0)
+        self.max_age_days = float(max_age_days or 0)
+        self.max_total_bytes = int(max_total_bytes or 0)
+        self.drop_superseded_variants = drop_superseded_variants
+        self.min_age_seconds = min_age_seconds
+
+    @classmethod
+    def from_config(cls) -> 'RetentionPolicy':
+        """按 config.py 中的 RETENTION_* 设置创建"""
+        from config import RETENTION_KEEP_PER_TICKER, RETENTION_MAX_AGE_DAYS, RETENTION_MAX_TOTAL_MB
+        return cls(keep_latest_per_ticker=RETENTION_KEEP_PER_TICKER,
+                   max_age_days=RETENTION_MAX_AGE_DAYS,
+                   max_total_bytes=int(RETENTION_MAX_TOTAL_MB * 1024 * 1024))
+
+    def describe(self) -> str:
+        rules = []
+        if self.keep_latest_per_ticker:
+            rules.append(f"每个公司保留最新 {self.keep_latest_per_ticker} 份")
+        if self.max_age_days:
+            rules.append(f"最长保留 {self.max_age_days:g} 天")
+        if self.max_total_bytes:
+            rules.append(f"总大小不超过 {self.max_total_bytes / 1024 / 1024:.0f} MB")
+        if self.drop_superseded_variants:
+            rules.append("删除被取代的变体")
+        return "，".join(rules) or "不清理"
+
+
+def group_key(row: Dict) -> str:
+    """保留计数的分组：估值报告按代码（没有代码时按公司名），其他报告按类型"""
+    if row['report_type'] != 'valuation':
+        return row['report_type']
+    company = row['ticker'] or row['company'] or report_stem(row['name']).rsplit('_', 2)[0]
+    return f"valuation:{company.lower()}"
+
+
+def variant_rank(name: str) -> Optional[int]:
+    """Markdown版本在 VARIANT_PREFERENCE 中的位置（越小越完整），不是已知版本时返回None"""
+    stem, ext = os.path.splitext(name)
+    if ext != '.md':
+        return None
+    suffix = stem[len(report_stem(name)):]
+    return VARIANT_PREFERENCE.index(suffix) if suffix in VARIANT_PREFERENCE else None
+
+
+def superseded_variants(names: List[str]) -> List[str]:
+    """一次运行的文件中被更完整版本取代的中间变体（原始版本和PDF不算）"""
+    ranked = sorted((rank, name) for name in names
+                    for rank in [variant_rank(name)] if rank is not None and VARIANT_PREFERENCE[rank])
+    return [name for _, name in ranked[1:]]
+
+
+class RetentionEngine:
+    """按保留策略计算并执行清理"""
+
+    def __init__(self, policy: Optional[RetentionPolicy] = None, reports_dir: str = "reports",
+                 catalog: Optional[ReportCatalog] = None, writer: Optional[ReportWriter] = None,
+                 store: Optional[ReportFileStore] = None, search_index: Optional[ReportSearchIndex] = None,
+                 chart_store: Optional[ChartStore] = None, render_cache: Optional[ReportRenderCache] = None,
+                 stage_cache: Optional[StageCache] = None):
+        """
+        Args:
+            policy: 保留策略，默认按 config.py 的设置
+            reports_dir: 报告目录；为默认的 reports/ 时使用进程内共享的目录、写入器和索引
+        """
+        shared = reports_dir == "reports"
+        self.policy = policy or RetentionPolicy.from_config()
+        self.reports_dir = reports_dir
+        self.catalog = catalog or (get_default_catalog() if shared else ReportCatalog(reports_dir))
+        self.writer = writer or (get_default_writer() if shared else ReportWriter(reports_dir))
+        self.store = store or (get_default_store() if shared else ReportFileStore(
+            reports_dir, archive=ReportArchive(os.path.join(reports_dir, "archive"))))
+        self.archive = self.store.archive or ReportArchive(os.path.join(reports_dir, "archive"))
+        self.search_index = search_index or (get_default_search_index() if shared else ReportSearchIndex(reports_dir))
+        self.chart_store = chart_store or ChartStore(os.path.join(reports_dir, "charts"))
+        self.render_cache = render_cache or get_default_render_cache()
+        self.stage_cache = stage_cache or StageCache(os.path.join(reports_dir, ".cache"))
+
+    # ------------------------------------------------------------------
+    # 计划
+    # ------------------------------------------------------------------
+    def _runs(self) -> List[Dict]:
+        """目录索引中的报告按运行（报告名）汇总，从新到旧"""
+        runs: Dict[str, Dict] = {}
+        for row in self.catalog.entries():
+            stem = report_stem(row['name'])
+            run = runs.get(stem)
+            if run is None:
+                run = runs[stem] = {'stem': stem, 'group': group_key(row), 'rows': [],
+                                    'newest': 0.0, 'bytes': 0, 'pending': False}
+            run['rows'].append(row)
+            run['newest'] = max(run['newest'], row['mtime'])
+            run['bytes'] += row['size']
+            run['pending'] = run['pending'] or row['status'] == STATUS_PENDING
+        return sorted(runs.values(), key=lambda r: r['newest'], reverse=True)
+
+    @staticmethod
+    def _action(run: Dict, reason: str, rows: Optional[List[Dict]] = None) -> Dict:
+        rows = run['rows'] if rows is None else rows
+        return {
+            'stem': run['stem'],
+            'group': run['group'],
+            'reason': reason,
+            'whole': len(rows) == len(run['rows']),
+            'rows': rows,
+            'names': [row['name'] for row in rows],
+            'bytes': sum(row['size'] for row in rows),
+        }
+
+    def plan(self, now: Optional[float] = None) -> List[Dict]:
+        """
+        计算清理计划（只读取目录索引，不修改任何文件）
+
+        Returns:
+            [{'stem', 'group', 'reason', 'whole'（是否删除整次运行）, 'names', 'rows', 'bytes'}, ...]，
+            整次运行的删除按从旧到新排列
+        """
+        policy = self.policy
+        now = time.time() if now is None else now
+        fresh_after = now - policy.min_age_seconds
+        runs = self._runs()
+        actions, doomed = [], set()
+        latest_in_group = {}
+        for run in runs:
+            latest_in_group.setdefault(run['group'], run['stem'])
+
+        def protected(run: Dict) -> bool:
+            return run['pending'] or run['newest'] > fresh_after
+
+        # 每个分组保留最新N份、最长保留时间
+        rank_in_group: Dict[str, int] = {}
+        for run in runs:
+            rank = rank_in_group.get(run['group'], 0)
+            rank_in_group[run['group']] = rank + 1
+            if protected(run):
+                continue
+            if policy.keep_latest_per_ticker and rank >= policy.keep_latest_per_ticker:
+                reason = REASON_KEEP_LATEST
+            elif policy.max_age_days and run['newest'] < now - policy.max_age_days * 86400:
+                reason = REASON_MAX_AGE
+            else:
+                continue
+            actions.append(self._action(run, reason))
+            doomed.add(run['stem'])
+
+        # 保留下来的运行中被取代的变体
+        variant_actions = []
+        if policy.drop_superseded_variants:
+            for run in runs:
+                if run['stem'] in doomed or protected(run):
+                    continue
+                names = set(superseded_variants([row['name'] for row in run['rows']]))
+                if names:
+                    variant_actions.append(self._action(run, REASON_SUPERSEDED,
+                                                        [row for row in run['rows'] if row['name'] in names]))
+
+        # 总大小上限：从最旧的运行开始删除，每个分组最新的一份保留
+        if policy.max_total_bytes:
+            total = (sum(run['bytes'] for run in runs if run['stem'] not in doomed)
+                     - sum(action['bytes'] for action in variant_actions))
+            for run in reversed(runs):
+                if total <= policy.max_total_bytes:
+                    break
+                if run['stem'] in doomed or protected(run) or latest_in_group[run['group']] == run['stem']:
+                    continue
+                actions.append(self._action(run, REASON_MAX_BYTES))
+                doomed.add(run['stem'])
+                # 该运行的变体已从总量中扣除过
+                total -= run['bytes'] - sum(a['bytes'] for a in variant_actions if a['stem'] == run['stem'])
+            variant_actions = [a for a in variant_actions if a['stem'] not in doomed]
+
+        actions.sort(key=lambda a: min(row['mtime'] for row in a['rows']))
+        return actions + variant_actions
+
+    # ------------------------------------------------------------------
+    # 执行
+    # ------------------------------------------------------------------
+    def _delete(self, action: Dict) -> List[str]:
+        """执行一项删除，返回删除的文件名（报告有进行中的事务时抛出 TimeoutError）"""
+        ready = [row for row in action['rows'] if row['status'] != STATUS_ARCHIVED]
+        if ready:
+            # 与生成流程（写入、PDF发布）互斥，删除记入日志，崩溃后由 recover 完成
+            with self.writer.open(action['stem'], timeout=0) as txn:
+                for row in ready:
+                    txn.delete(row['name'])
+
+        for row in action['rows']:
+            path = os.path.join(self.reports_dir, row['name'])
+            self.store.invalidate(path)
+            self.render_cache.invalidate(row['name'])
+            if row['status'] == STATUS_ARCHIVED:
+                self.archive.delete(row['name'])
+            self.catalog.remove(path)
+            if row['name'].endswith('.md'):
+                self.chart_store.drop_refs(path)
+                self.stage_cache.forget(path)
+
+        stem_path = os.path.join(self.reports_dir, action['stem'] + '.md')
+        if action['whole']:
+            self.search_index.remove_report(stem_path)
+            self.writer.drop_manifest(action['stem'])
+        else:
+            # 全文索引指向被删除的变体时改为索引保留的版本
+            indexed = self.search_index.indexed_path(stem_path)
+            if indexed and os.path.basename(indexed) in action['names']:
+                kept = self.catalog.list_reports(search=action['stem'], limit=20)
+                kept = sorted((variant_rank(e['name']), e['path']) for e in kept
+                              if variant_rank(e['name']) is not None and os.path.exists(e['path']))
+                if kept:
+                    self.search_index.index_report(kept[0][1])
+                else:
+                    self.search_index.remove_report(stem_path)
+        return action['names']
+
+    def apply(self, actions: Optional[List[Dict]] = None, max_actions: Optional[int] = None,
+              dry_run: bool = False) -> Dict:
+        """
+        执行清理计划（默认重新计算）
+
+        Args:
+            actions: plan() 的结果
+            max_actions: 本次最多执行的项数（增量清理），其余留到下次
+            dry_run: 只统计不删除
+
+        Returns:
+            {'reports': 删除的运行数, 'variants': 删除的变体项数, 'files', 'bytes',
+             'skipped': 因报告正被写入而跳过的项数, 'remaining': 未执行的项数, 'reasons': {原因: 项数}}
+        """
+        actions = self.plan() if actions is None else actions
+        batch = actions if max_actions is None else actions[:max_actions]
+        summary = {'reports': 0, 'variants': 0, 'files': 0, 'bytes': 0, 'skipped': 0,
+                   'remaining': len(actions) - len(batch), 'reasons': {}}
+        for action in batch:
+            if not dry_run:
+                try:
+                    self._delete(action)
+                except TimeoutError:
+                    summary['skipped'] += 1
+                    continue
+                except OSError as e:
+                    print(f"⚠️  清理报告失败 {action['stem']}: {e}")
+                    summary['skipped'] += 1
+                    continue
+            summary['reports' if action['whole'] else 'variants'] += 1
+            summary['files'] += len(action['names'])
+            summary['bytes'] += action['bytes']
+            summary['reasons'][action['reason']] = summary['reasons'].get(action['reason'], 0) + 1
+        return summary
+
+    def collect_garbage(self, dry_run: bool = False) -> Dict:
+        """回收没有报告引用的图表、归档blob和后处理缓存"""
+        charts = self.chart_store.collect_garbage(dry_run=dry_run)
+        blobs = self.archive.collect_garbage(dry_run=dry_run)
+        cache = self.stage_cache.collect_garbage(dry_run=dry_run)
+        return {'charts': len(charts['removed']), 'chart_bytes': charts['bytes'],
+                'blobs': blobs['removed'], 'blob_bytes': blobs['bytes'],
+                'cache_objects': cache['objects'], 'cache_bytes': cache['bytes']}
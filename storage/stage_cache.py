@@ -0,0 +1,363 @@
+"""
+后处理阶段的内容寻址缓存
+以 (阶段名, 阶段版本, 输入内容) 的哈希为键保存阶段输出：
+- 文本阶段（表格修复、HTML清理等）输入不变时直接返回缓存结果
+- 图表按表格内容缓存PNG，命中时硬链接（或复制）到目标位置，不再重新绘制
+- manifest 记录每个源报告的输入哈希和输出，未变化的报告整体跳过
+  （每个源报告一个条目文件，多进程并行处理不同报告时互不覆盖）
+- 对象总大小有上限：超出时按最近使用时间（命中时刷新修改时间）淘汰，
+  manifest 引用的对象最后淘汰；源报告被删除后由 forget / collect_garbage 清理条目
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+# 对象总大小上限（0表示不限制）
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+# 新写入的对象累计超过上限的这一比例时检查一次总大小（避免每次写入都扫描对象目录）
+EVICT_CHECK_FRACTION = 0.1
+
+# collect_garbage 回收多久未使用、且没有manifest引用的对象（秒）
+DEFAULT_GC_MAX_IDLE = 30 * 24 * 3600
+
+
+def content_hash(*parts) -> str:
+    """对若干文本/字节片段计算sha256（片段之间带长度前缀，避免拼接歧义）"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode('utf-8')
+        digest.update(str(len(data)).encode('ascii') + b':')
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def link_or_copy(src: str, dest: str):
+    """把缓存对象放到目标路径：优先硬链接，跨设备或不支持时复制"""
+    if os.path.exists(dest):
+        if os.path.samefile(src, dest):
+            return
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+def detach_output(path: str):
+    """
+    写入输出文件前调用：删除已有文件
+
+    输出文件可能是缓存对象的硬链接，原地覆盖写会连带改坏缓存对象
+    """
+    if os.path.lexists(path):
+        os.remove(path)
+
+
+class StageCache:
+    """内容寻址的阶段缓存（对象文件 + JSON manifest）"""
+
+    def __init__(self, cache_dir: str = "reports/.cache", max_bytes: int = DEFAULT_MAX_CACHE_BYTES):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 对象总大小上限，0表示不限制
+        """
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.manifest_dir = os.path.join(cache_dir, "manifest")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._written_bytes = 0
+
+    # ------------------------------------------------------------------
+    # 对象存储
+    # ------------------------------------------------------------------
+    @staticmethod
+    def key(stage: str, version: str, *inputs) -> str:
+        """阶段输出的缓存键"""
+        return content_hash(stage, version, *inputs)
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.objects_dir, key[:2], key)
+
+    @staticmethod
+    def _touch(path: str):
+        """命中时刷新修改时间（淘汰按修改时间判断最近使用）"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        path = self._object_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            # 不存在，或刚被其他进程淘汰
+            return None
+        self._touch(path)
+        return data
+
+    def put_bytes(self, key: str, data: bytes) -> str:
+        """原子写入对象，返回对象路径"""
+        path = self._object_path(key)
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # 对象会被硬链接到报告目录，权限与普通输出文件一致（mkstemp默认只有属主可读）
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+        self._written_bytes += len(data)
+        if self.max_bytes and self._written_bytes > self.max_bytes * EVICT_CHECK_FRACTION:
+            self._written_bytes = 0
+            self.evict()
+        return path
+
+    def put_file(self, key: str, file_path: str) -> str:
+        """把已生成的文件存入缓存"""
+        with open(file_path, 'rb') as f:
+            return self.put_bytes(key, f.read())
+
+    def link_to(self, key: str, dest: str) -> bool:
+        """缓存命中时把对象链接到目标路径，返回是否命中"""
+        path = self._object_path(key)
+        if not os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+        try:
+            link_or_copy(path, dest)
+        except FileNotFoundError:
+            return False
+        self._touch(path)
+        return True
+
+    # ------------------------------------------------------------------
+    # 文本阶段
+    # ------------------------------------------------------------------
+    def run_text_stage(self, stage: str, version: str, func: Callable[[str], str], text: str, *extra) -> str:
+        """
+        执行文本阶段 func(text)，输入（含 extra 参与哈希的附加参数）不变时直接返回缓存
+
+        Args:
+            stage: 阶段名
+            version: 阶段版本，阶段逻辑变化时递增以使旧缓存失效
+            func: 阶段函数
+            text: 输入文本
+            extra: 影响输出的其他输入（如报告名）
+        """
+        key = self.key(stage, version, text, *extra)
+        cached = self.get_bytes(key)
+        if cached is not None:
+            self.hits += 1
+            return cached.decode('utf-8')
+
+        self.misses += 1
+        result = func(text)
+        self.put_bytes(key, result.encode('utf-8'))
+        return result
+
+    # ------------------------------------------------------------------
+    # Manifest：源报告 -> (输入哈希, 输出对象)
+    # ------------------------------------------------------------------
+    def _entry_path(self, source_path: str) -> str:
+        return os.path.join(self.manifest_dir, content_hash(os.path.abspath(source_path)) + '.json')
+
+    def _load_entry(self, source_path: str) -> Optional[Dict]:
+        path = self._entry_path(source_path)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # 损坏的条目只会导致重新计算
+            return None
+
+    def _save_entry(self, source_path: str, entry: Dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.manifest_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._entry_path(source_path))
+
+    def lookup(self, source_path: str, input_key: str) -> Optional[Dict]:
+        """
+        源报告输入未变化时返回manifest记录（并确保输出文件就位），否则返回None
+
+        输出文件被删除时从对象存储重新链接；对象也不存在时视为未命中
+        """
+        entry = self._load_entry(source_path)
+        if not entry or entry.get('input_key') != input_key:
+            return None
+
+        outputs = entry.get('outputs', {})
+        for dest, object_key in outputs.items():
+            if os.path.exists(dest) and content_hash(self._read(dest)) == object_key:
+                continue
+            if not self.link_to(object_key, dest):
+                return None
+        self.hits += 1
+        return entry
+
+    def record(self, source_path: str, input_key: str, outputs: List[str]):
+        """
+        记录源报告的处理结果
+
+        Args:
+            source_path: 源报告路径
+            input_key: 输入哈希（含流水线版本）
+            outputs: 输出文件路径，文件内容存入对象存储
+        """
+        object_keys = {}
+        for dest in outputs:
+            data = self._read(dest)
+            object_key = content_hash(data)
+            self.put_bytes(object_key, data)
+            object_keys[os.path.abspath(dest)] = object_key
+
+        self._save_entry(source_path, {
+            'source': os.path.abspath(source_path),
+            'input_key': input_key,
+            'outputs': object_keys,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        })
+
+    def forget(self, source_path: str) -> bool:
+        """删除源报告的manifest条目（报告被删除时调用），返回是否存在"""
+        try:
+            os.remove(self._entry_path(source_path))
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    # ------------------------------------------------------------------
+    # 容量与回收
+    # ------------------------------------------------------------------
+    def _iter_entries(self):
+        """全部manifest条目 (条目文件路径, 条目内容)"""
+        for entry in os.scandir(self.manifest_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    yield entry.path, json.load(f)
+            except (OSError, ValueError):
+                continue
+
+    def _referenced(self) -> Set[str]:
+        """被manifest引用的对象键"""
+        return {key for _, entry in self._iter_entries() for key in entry.get('outputs', {}).values()}
+
+    def _iter_objects(self):
+        """全部对象 (路径, 键, 大小, 修改时间)，跳过写入中的临时文件"""
+        for shard in os.scandir(self.objects_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, entry.name, stat.st_size, stat.st_mtime
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def evict(self, max_bytes: Optional[int] = None) -> Dict[str, int]:
+        """
+        对象总大小超过上限时淘汰最久未使用的对象（manifest引用的对象最后淘汰）
+
+        报告目录中已链接的输出文件不受影响；被淘汰的对象只会导致下次重新计算
+
+        Returns:
+            {'removed': 淘汰的对象数, 'bytes': 释放字节数}
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        objects = list(self._iter_objects())
+        total = sum(size for _, _, size, _ in objects)
+        removed, freed = 0, 0
+        if not limit or total <= limit:
+            return {'removed': removed, 'bytes': freed}
+
+        referenced = self._referenced()
+        objects.sort(key=lambda o: (o[1] in referenced, o[3]))
+        for path, _, size, _ in objects:
+            if total <= limit:
+                break
+            if self._remove(path):
+                removed += 1
+                freed += size
+            total -= size
+        self.evicted += removed
+        return {'removed': removed, 'bytes': freed}
+
+    def collect_garbage(self, dry_run: bool = False, max_idle: float = DEFAULT_GC_MAX_IDLE) -> Dict[str, int]:
+        """
+        回收不再需要的缓存
+
+        - 源报告已不存在的manifest条目
+        - 没有manifest引用、且 max_idle 秒内未被使用的对象（已删除报告的输出、过期的阶段结果）
+        - 之后总大小仍超过上限时按 evict 淘汰
+
+        Returns:
+            {'entries': 删除的条目数, 'objects': 删除的对象数, 'bytes': 释放字节数}
+        """
+        entries = 0
+        referenced = set()
+        for entry_path, entry in list(self._iter_entries()):
+            if entry.get('source') and not os.path.exists(entry['source']):
+                if dry_run or self._remove(entry_path):
+                    entries += 1
+                continue
+            referenced.update(entry.get('outputs', {}).values())
+
+        cutoff = time.time() - max_idle
+        objects, freed = 0, 0
+        for path, key, size, mtime in self._iter_objects():
+            if key in referenced or mtime > cutoff:
+                continue
+            if dry_run or self._remove(path):
+                objects += 1
+                freed += size
+
+        if not dry_run:
+            evicted = self.evict()
+            objects += evicted['removed']
+            freed += evicted['bytes']
+        return {'entries': entries, 'objects': objects, 'bytes': freed}
+
+    def stats(self) -> Dict[str, int]:
+        reports = sum(1 for name in os.listdir(self.manifest_dir) if name.endswith('.json'))
+        return {'hits': self.hits, 'misses': self.misses, 'reports': reports, 'evicted': self.evicted}
+
+    def clear(self):
+        """删除全部缓存"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifest_dir, exist_ok=True)
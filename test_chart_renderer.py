@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+测试图表渲染
+验证表格到图表规格的转换、SVG后端（不依赖matplotlib），
+以及经后台渲染服务（进程池）生成图表并写回报告的完整流程
+"""
+import os
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+
+from chart_renderer import ChartRenderService, build_bar_chart_spec, get_chart_backend, render_batch
+from report_enhancer import ReportEnhancer
+from storage.report_writer import ReportWriter
+
+
+SAMPLE_TABLE = {
+    'headers': ['Metric', 'Q3 2025', 'Q3 2024'],
+    'rows': [
+        ['Revenue', '$28.1B', '$25.1B'],
+        ['Net Income', '$1.4B', '$2.2B'],
+        ['R&D <est.>', '$1.6B', '$1.0B'],
+    ],
+}
+
+
+def test_bar_chart_spec():
+    """测试表格转换为图表规格"""
+    print("="*80)
+    print("🧪 测试1: 图表规格")
+    print("="*80)
+
+    spec = build_bar_chart_spec(SAMPLE_TABLE, 0)
+    print(f"  {spec}")
+    assert spec['title'] == 'Data Visualization - Table 1'
+    assert spec['labels'] == ['Revenue', 'Net Income', 'R&D <est.>']
+    assert spec['series'][0] == ['Q3 2025', [28100.0, 1400.0, 1600.0]]
+
+    empty = {'headers': ['Metric', 'Status'], 'rows': [['Growth', 'Strong'], ['Margin', 'Weak']]}
+    assert build_bar_chart_spec(empty, 1) is None
+    print("✅ 图表规格正确")
+
+
+def test_svg_backend():
+    """测试SVG后端输出合法的SVG文件"""
+    print("\n" + "="*80)
+    print("🧪 测试2: SVG后端")
+    print("="*80)
+
+    spec = build_bar_chart_spec(SAMPLE_TABLE, 0)
+    line_spec = dict(spec, kind='line', series=[['Growth', [12.0, -3.5, 8.0]]])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        jobs = [
+            {'spec': spec, 'output_path': os.path.join(tmp_dir, 'bar.svg'), 'backend': 'svg'},
+            {'spec': line_spec, 'output_path': os.path.join(tmp_dir, 'line.svg'), 'backend': 'svg'},
+        ]
+        results = render_batch(jobs)
+        assert all(r['success'] for r in results), results
+
+        for job in jobs:
+            root = ET.parse(job['output_path']).getroot()
+            assert root.tag.endswith('svg')
+            size = os.path.getsize(job['output_path'])
+            print(f"  {os.path.basename(job['output_path'])}: {size} 字节")
+
+        bar_svg = open(jobs[0]['output_path'], encoding='utf-8').read()
+        assert bar_svg.count('<rect') == 1 + 6 + 2  # 背景 + 6根柱子 + 2个图例
+        assert 'R&amp;D &lt;est.&gt;' in bar_svg
+        assert '<polyline' in open(jobs[1]['output_path'], encoding='utf-8').read()
+
+    try:
+        get_chart_backend('gif')
+        assert False, "未知后端应抛出ValueError"
+    except ValueError:
+        pass
+    print("✅ SVG后端正常")
+
+
+def _report(company: str, base: int) -> str:
+    """含两张数值表格的报告（每份报告的数值不同，图表不会互相复用）"""
+    return f"""# {company} 估值报告
+
+## 财务数据
+| 指标 | 2024 | 2025 |
+| --- | --- | --- |
+| 营收 | {base} | {base + 10} |
+| 净利润 | {base // 5} | {base // 4} |
+
+## 估值
+| 方法 | 低 | 高 |
+| --- | --- | --- |
+| 市盈率 | {base + 1} | {base + 2} |
+| 现金流折现 | {base + 3} | {base + 4} |
+"""
+
+
+def _publish(writer: ReportWriter, enhancer: ReportEnhancer, company: str, content: str):
+    """与 main._save_report 相同：原始版和增强版在一个事务中发布，之后提交后台图表"""
+    with writer.begin(company) as txn:
+        report_path = txn.write_text(f'{txn.stem}.md', content)
+        enhanced = enhancer.enhance_content(content, report_path, async_charts=True)
+        enhanced_path = txn.write_text(enhancer.enhanced_path(report_path), enhanced)
+    enhancer.finish_enhancement(content, report_path, enhanced_path)
+    return txn.stem, enhanced_path
+
+
+def _read(path: str) -> str:
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_async_charts_end_to_end():
+    """测试进程池渲染 + 写回：wait_for_charts 返回时占位符都已替换，报告事务被占用时不拖住其他报告"""
+    print("\n" + "="*80)
+    print("🧪 测试3: 后台渲染与写回")
+    print("="*80)
+
+    service = ChartRenderService(max_workers=2)
+    try:
+        with tempfile.TemporaryDirectory() as reports_dir:
+            writer = ReportWriter(reports_dir)
+            enhancer = ReportEnhancer(use_cache=False, chart_service=service, chart_backend='svg',
+                                      charts_dir=os.path.join(reports_dir, 'charts'), report_writer=writer)
+
+            paths = [_publish(writer, enhancer, f"CO{i}", _report(f"CO{i}", 100 + i * 50))[1] for i in range(10)]
+            enhancer.wait_for_charts(timeout=120)
+            for path in paths:
+                content = _read(path)
+                assert 'chart-pending' not in content, f"wait_for_charts 返回时已写回: {path}"
+                assert content.count('](charts/') == 2
+            print(f"  {len(paths)} 份报告的图表已全部写回")
+
+            # 一份报告的事务被占用（如同步生成PDF）时，另一份报告的图表照常写回
+            stem, busy_path = _publish(writer, enhancer, "BUSY", _report("BUSY", 900))
+            with writer.open(stem):
+                _, free_path = _publish(writer, enhancer, "FREE", _report("FREE", 950))
+                free_done = threading.Event()
+
+                def wait_free():
+                    while 'chart-pending' in _read(free_path):
+                        threading.Event().wait(0.05)
+                    free_done.set()
+
+                threading.Thread(target=wait_free, daemon=True).start()
+                assert free_done.wait(60), "被占用的报告不阻塞其他报告的写回"
+                assert 'chart-pending' in _read(busy_path), "事务结束前不写回"
+            enhancer.wait_for_charts(timeout=120)
+            assert 'chart-pending' not in _read(busy_path), "事务结束后完成写回"
+    finally:
+        service.shutdown()
+    print("✅ 后台渲染与写回正常")
+
+
+if __name__ == "__main__":
+    test_bar_chart_spec()
+    test_svg_backend()
+    test_async_charts_end_to_end()
+    print("\n🎉 图表渲染测试全部通过！")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+测试内容寻址图表存储
+验证引用计数、孤儿图表回收，以及旧报告中链接的图表不被误删
+"""
+import os
+import tempfile
+import time
+
+from storage.chart_store import ChartStore
+
+
+def _write(path, content):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def test_ref_counts_and_gc():
+    """测试引用计数和孤儿回收"""
+    print("="*80)
+    print("🧪 测试1: 引用计数与回收")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as reports_dir:
+        store = ChartStore(os.path.join(reports_dir, 'charts'))
+        shared = store.chart_name('a' * 64, 'svg')
+        only_b = store.chart_name('b' * 64, 'svg')
+        orphan = store.chart_name('c' * 64, 'svg')
+        for name in (shared, only_b, orphan):
+            _write(store.path(name), '<svg/>')
+
+        report_a = os.path.join(reports_dir, 'AAPL_20251101_000000_enhanced.md')
+        report_b = os.path.join(reports_dir, 'AAPL_20251102_000000_enhanced.md')
+        _write(report_a, f"![图表 1](charts/{shared})")
+        _write(report_b, f"![图表 1](charts/{shared})\n<!-- chart-pending: charts/{only_b} -->")
+        store.set_refs(report_a, [shared])
+        store.set_refs(report_b, [shared, only_b])
+
+        counts = store.ref_counts()
+        print(f"  引用计数: {counts}")
+        assert counts == {shared: 2, only_b: 1}
+
+        result = store.collect_garbage(min_age=0)
+        print(f"  回收: {result}")
+        assert result['removed'] == [orphan] and result['kept'] == 2
+
+        # 报告删除后，只被它引用的图表变为孤儿
+        os.remove(report_b)
+        assert store.ref_counts() == {shared: 1}
+        result = store.collect_garbage(min_age=0)
+        assert result['removed'] == [only_b]
+        assert store.has(shared) and not store.has(only_b)
+        assert len(os.listdir(store.refs_dir)) == 1, "失效的引用记录应被删除"
+    print("✅ 引用计数与回收正常")
+
+
+def test_legacy_and_recent_charts_kept():
+    """测试没有引用记录但被报告链接的旧图表、以及刚写入的图表不会被回收"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 旧图表保护")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as reports_dir:
+        store = ChartStore(os.path.join(reports_dir, 'charts'))
+        legacy = 'TSLA_20251104_231709_chart_0.png'
+        _write(store.path(legacy), 'png')
+        _write(os.path.join(reports_dir, 'TSLA_20251104_231709_enhanced.md'), f"![图表 1](charts/{legacy})")
+        _write(store.path('rendering.svg'), '<svg/>')
+
+        dry = store.collect_garbage(dry_run=True, min_age=0)
+        print(f"  立即回收(预览): {dry}")
+        assert dry['removed'] == ['rendering.svg']
+
+        # 被复用（touch）的旧图表在写入引用记录之前也不会被回收
+        reused = 'reused.svg'
+        _write(store.path(reused), '<svg/>')
+        os.utime(store.path(reused), (time.time() - 2 * 86400,) * 2)
+        assert store.touch(reused) and not store.touch('missing.svg')
+
+        result = store.collect_garbage()
+        print(f"  默认最小年龄: {result}")
+        assert result['removed'] == [] and result['kept'] == 3
+    print("✅ 旧图表保护正常")
+
+
+if __name__ == "__main__":
+    test_ref_counts_and_gc()
+    test_legacy_and_recent_charts_kept()
+    print("\n🎉 图表存储测试全部通过！")
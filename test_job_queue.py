@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+测试后台任务队列
+验证并发领取时每个任务只被领取一次、排队位置、取消，以及崩溃工作者遗留任务的重新排队
+"""
+import os
+import tempfile
+import threading
+
+from storage.job_queue import (JOB_CANCELLED, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, MAX_ATTEMPTS,
+                               JobQueue)
+
+
+def test_concurrent_claim():
+    """测试两个线程同时领取：每个任务恰好被领取一次"""
+    print("="*80)
+    print("🧪 测试1: 并发领取")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = JobQueue(db_path=os.path.join(tmp_dir, "jobs.db"))
+        job_ids = [queue.submit('report', {'company': f"公司{i}"}) for i in range(40)]
+
+        claimed = {'w1': [], 'w2': []}
+        start = threading.Barrier(2)
+
+        def worker(name: str):
+            start.wait()
+            while True:
+                job = queue.claim(name)
+                if job is None:
+                    return
+                claimed[name].append(job['job_id'])
+
+        threads = [threading.Thread(target=worker, args=(name,)) for name in claimed]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        all_claimed = claimed['w1'] + claimed['w2']
+        print(f"  w1 领取 {len(claimed['w1'])} 个，w2 领取 {len(claimed['w2'])} 个")
+        assert sorted(all_claimed) == sorted(job_ids), "每个任务恰好被领取一次"
+        assert all(queue.status(job_id)['status'] == JOB_RUNNING for job_id in job_ids)
+        assert all(queue.status(job_id)['worker'] in claimed for job_id in job_ids)
+        assert queue.claim('w3') is None
+    print("✅ 并发领取正常")
+
+
+def test_position_and_cancel():
+    """测试排队位置和取消（只能取消排队中的任务）"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 排队位置与取消")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = JobQueue(db_path=os.path.join(tmp_dir, "jobs.db"))
+        first, second, third = [queue.submit('hotspot', {}) for _ in range(3)]
+        assert [queue.queue_position(j) for j in (first, second, third)] == [0, 1, 2]
+
+        running = queue.claim('w1')
+        assert running['job_id'] == first and queue.queue_position(first) == 0, "执行中的任务不在队列中"
+        assert [queue.queue_position(j) for j in (second, third)] == [0, 1]
+
+        assert not queue.cancel(first), "执行中的任务不能取消"
+        assert queue.status(first)['status'] == JOB_RUNNING
+        assert queue.cancel(second)
+        assert queue.status(second)['status'] == JOB_CANCELLED
+        assert queue.queue_position(third) == 0, "取消的任务不再占用排队位置"
+        assert queue.claim('w1')['job_id'] == third, "取消的任务不会被领取"
+        assert queue.pending_count() == 2
+    print("✅ 排队位置与取消正常")
+
+
+def test_requeue_orphans():
+    """测试崩溃工作者遗留的任务：未超过重试次数的重新排队，否则标记失败"""
+    print("\n" + "="*80)
+    print("🧪 测试3: 遗留任务重新排队")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = JobQueue(db_path=os.path.join(tmp_dir, "jobs.db"))
+        orphan = queue.submit('report', {'company': 'Apple'})
+        alive = queue.submit('report', {'company': 'Tesla'})
+        queue.claim('dead:1:1')
+        queue.claim('alive:2:1')
+
+        def is_dead(worker: str) -> bool:
+            return worker.startswith('dead')
+
+        assert queue.requeue_orphans(is_dead) == {'requeued': 1, 'failed': 0}
+        assert queue.status(orphan)['status'] == JOB_QUEUED and queue.status(orphan)['worker'] is None
+        assert queue.status(alive)['status'] == JOB_RUNNING, "仍在运行的工作者的任务不受影响"
+
+        # 再次崩溃直到超过重试次数
+        for _ in range(MAX_ATTEMPTS - 1):
+            assert queue.claim('dead:1:2')['job_id'] == orphan
+        result = queue.requeue_orphans(is_dead)
+        print(f"  超过重试次数后: {result}")
+        assert result == {'requeued': 0, 'failed': 1}
+        assert queue.status(orphan)['status'] == JOB_FAILED
+    print("✅ 遗留任务处理正常")
+
+
+if __name__ == "__main__":
+    test_concurrent_claim()
+    test_position_and_cancel()
+    test_requeue_orphans()
+    print("\n🎉 后台任务队列测试全部通过！")
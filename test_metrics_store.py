@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+测试结构化指标库
+验证表格指标抽取、单位规范化和按公司/指标查询
+"""
+import os
+import tempfile
+
+from storage.metrics_store import MetricsStore, parse_metric_value, parse_report_filename
+
+
+SAMPLE_REPORT = """# TSLA 估值报告
+
+| Metric | Q3 2025 | Q3 2024 | YoY Change |
+| --- | --- | --- | --- |
+| Revenue | $28.1B | $25.1B | +12% |
+| Gross Margin | 18.0% | 23.5% | -550bps |
+| Vehicle Deliveries | 497,099 | 435,059 | +14.3% |
+
+Some analysis text.
+
+| Metric | Status | Trend |
+| --- | --- | --- |
+| Revenue Growth | Strong | ⬆️ |
+
+| Quarter | Revenue | Net Loss |
+| --- | --- | --- |
+| Q1 2025 | ¥12.5亿 | ¥-1.2亿 |
+"""
+
+
+def test_parse_metric_value():
+    """测试单元格数值解析"""
+    print("="*80)
+    print("🧪 测试1: 单元格数值解析")
+    print("="*80)
+
+    cases = {
+        "$46.7B": (46.7, "USD B"),
+        "+12%": (12.0, "%"),
+        "-550bps": (-550.0, "bps"),
+        "¥382.81亿": (382.81, "CNY 亿"),
+        "28.5x": (28.5, "x"),
+        "497,099": (497099.0, ""),
+        "~$1.5B": (1.5, "USD B"),
+        "N/A": None,
+        "Strong": None,
+    }
+    for cell, expected in cases.items():
+        result = parse_metric_value(cell)
+        print(f"  {cell!r:>14} -> {result}")
+        assert result == expected, f"{cell}: {result} != {expected}"
+    print("✅ 数值解析正确")
+
+
+def test_ingest_and_query():
+    """测试报告入库与查询"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 报告入库与查询")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report_path = os.path.join(tmp_dir, "TSLA_20251104_231709_enhanced.md")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_REPORT)
+
+        store = MetricsStore(os.path.join(tmp_dir, "metrics.db"))
+        count = store.ingest_report(report_path)
+        print(f"  写入 {count} 条指标")
+        assert count == 11
+
+        # 重复入库是幂等的
+        assert store.ingest_report(report_path) == 11
+        assert len(store.query(company="tsla")) == 11
+
+        revenue = store.query(company="TSLA", metric="revenue", period="Q3 2025")
+        assert revenue[0]['value'] == 28.1 and revenue[0]['unit'] == "USD B"
+
+        # 第一列为期间的表格：行=期间，列=指标
+        net_loss = store.query(company="TSLA", metric="Net Loss")
+        assert net_loss[0]['period'] == "Q1 2025" and net_loss[0]['value'] == -1.2
+
+        table = store.format_comparison_table(["TSLA", "AAPL"], metrics=["Revenue"])
+        print(table)
+        assert "$28.1B (Q3 2025)" in table and "N/A" in table
+
+    info = parse_report_filename("reports/9880.hk_20251104_234136_enhanced.md")
+    assert info == {'company': '9880.hk', 'report_time': '2025-11-04T23:41:36'}
+    print("✅ 入库与查询正常")
+
+
+if __name__ == "__main__":
+    test_parse_metric_value()
+    test_ingest_and_query()
+    print("\n🎉 指标库测试全部通过！")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+测试后台PDF导出队列
+验证任务ID与状态流转、完成回调（回调返回后才标记完成）、失败任务的错误记录
+"""
+import os
+import tempfile
+import threading
+
+from pdf_export import PDFExportQueue, PDF_JOB_DONE, PDF_JOB_FAILED, PDF_JOB_QUEUED, PDF_JOB_RUNNING
+
+
+def write_fake_pdf(company, pdf_data, pdf_path, **options):
+    """代替ReportLab排版的导出函数：写一个最小的PDF文件"""
+    if not pdf_data.get('fundamentalAnalysis'):
+        raise ValueError("缺少章节内容")
+    with open(pdf_path, 'wb') as f:
+        f.write(b'%PDF-1.4\n% ' + company.encode('utf-8') + b'\n%%EOF\n')
+    return pdf_path
+
+
+def test_job_lifecycle():
+    """测试提交后立即返回，任务完成后回调写回PDF路径"""
+    print("="*80)
+    print("🧪 测试1: 导出任务状态")
+    print("="*80)
+
+    release = threading.Event()
+
+    def slow_export(company, pdf_data, pdf_path, **options):
+        release.wait(5)
+        return write_fake_pdf(company, pdf_data, pdf_path, **options)
+
+    queue = PDFExportQueue(exporter=slow_export)
+    finished = []
+    seen_in_callback = []
+
+    def on_done(job):
+        # 回调执行期间轮询方还看不到 done（调用方此时才写回PDF路径）
+        seen_in_callback.append(queue.status(job['job_id'])['status'])
+        finished.append(job)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, 'AAPL.pdf')
+        job_id = queue.submit('AAPL', {'fundamentalAnalysis': 'text'}, pdf_path, on_done=on_done)
+
+        # 排版未结束时提交已经返回
+        status = queue.status(job_id)
+        print(f"  提交后: {status['status']}")
+        assert status['status'] in (PDF_JOB_QUEUED, PDF_JOB_RUNNING)
+        assert queue.pending_count() == 1 and not finished
+
+        release.set()
+        status = queue.wait(job_id, timeout=5)
+        print(f"  完成后: {status['status']}, 耗时 {status['elapsed']:.3f}s")
+        assert status['status'] == PDF_JOB_DONE
+        assert status['pdf_path'] == pdf_path and os.path.exists(pdf_path)
+        assert finished and finished[0]['job_id'] == job_id and finished[0]['status'] == PDF_JOB_DONE
+        assert seen_in_callback == [PDF_JOB_RUNNING], "回调返回前任务不标记为完成"
+        assert queue.pending_count() == 0
+
+    queue.shutdown()
+    assert queue.status('unknown') is None
+    print("✅ 任务状态流转正常")
+
+
+def test_failed_job():
+    """测试导出失败时记录错误，不影响后续任务"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 失败任务")
+    print("="*80)
+
+    queue = PDFExportQueue(exporter=write_fake_pdf)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bad_id = queue.submit('BAD', {}, os.path.join(tmp_dir, 'bad.pdf'))
+        good_id = queue.submit('GOOD', {'fundamentalAnalysis': 'text'}, os.path.join(tmp_dir, 'good.pdf'))
+
+        bad = queue.wait(bad_id, timeout=5)
+        good = queue.wait(good_id, timeout=5)
+        print(f"  {bad['company']}: {bad['status']} ({bad['error']})")
+        print(f"  {good['company']}: {good['status']}")
+        assert bad['status'] == PDF_JOB_FAILED and 'ValueError' in bad['error']
+        assert good['status'] == PDF_JOB_DONE
+        assert [job['job_id'] for job in queue.jobs()] == [bad_id, good_id]
+
+    queue.shutdown()
+    print("✅ 失败任务处理正常")
+
+
+if __name__ == "__main__":
+    test_job_lifecycle()
+    test_failed_job()
+    print("\n🎉 PDF导出队列测试全部通过！")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+测试进度事件总线
+验证运行上下文（含asyncio任务和PDF导出线程）、订阅过滤、事件补读和 stream_events
+"""
+import asyncio
+import os
+import tempfile
+
+from pdf_export import PDFExportQueue, PDF_JOB_DONE
+from progress_bus import (
+    EVENT_PDF, EVENT_QUERY_DONE, EVENT_RUN_FINISHED, EVENT_RUN_STARTED, EVENT_STAGE,
+    ProgressBus, emit, get_default_bus, progress_run, stream_events,
+)
+
+
+def test_publish_and_subscribe():
+    """测试发布、按运行订阅与补读"""
+    print("="*80)
+    print("🧪 测试1: 发布与订阅")
+    print("="*80)
+
+    bus = ProgressBus(max_events_per_run=3, max_runs=2)
+    received, all_events = [], []
+    bus.subscribe(all_events.append)
+    token = bus.subscribe(received.append, run_id='a')
+
+    assert bus.publish(EVENT_STAGE, stage='x') is None, "不在运行中时不发布"
+    with progress_run('a'):
+        for i in range(5):
+            bus.publish(EVENT_STAGE, stage='collecting', progress=i * 10)
+    bus.publish(EVENT_STAGE, run_id='b', stage='planning')
+
+    assert len(received) == 5 and len(all_events) == 6
+    history = bus.events('a')
+    assert [e['progress'] for e in history] == [20, 30, 40], "每次运行只保留最近的事件"
+    assert [e['progress'] for e in bus.events('a', after_seq=history[1]['seq'])] == [40]
+    assert bus.latest('b', EVENT_STAGE)['stage'] == 'planning'
+
+    bus.unsubscribe(token)
+    bus.publish(EVENT_STAGE, run_id='a', stage='done')
+    assert len(received) == 5
+
+    bus.publish(EVENT_STAGE, run_id='c', stage='planning')
+    assert bus.events('a') == [], "超过运行数上限时丢弃最早的运行"
+    print("✅ 发布与订阅正常")
+
+
+def test_context_propagation():
+    """测试asyncio任务中的事件归属，以及PDF导出线程按提交时的运行发布"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 运行上下文传递")
+    print("="*80)
+
+    bus = get_default_bus()
+
+    async def search(index):
+        await asyncio.sleep(0.01 * (3 - index))
+        emit(EVENT_QUERY_DONE, index=index, total=3, status='success')
+
+    async def batch():
+        await asyncio.gather(*(search(i) for i in range(3)))
+
+    with progress_run('ctx-run'):
+        asyncio.run(batch())
+    order = [e['index'] for e in bus.events('ctx-run', event_type=EVENT_QUERY_DONE)]
+    print(f"  查询完成顺序: {order}")
+    assert order == [2, 1, 0], "查询按完成顺序逐条发布"
+
+    def export(company, pdf_data, pdf_path, **options):
+        with open(pdf_path, 'wb') as f:
+            f.write(b'%PDF')
+        return pdf_path
+
+    queue = PDFExportQueue(exporter=export)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with progress_run('pdf-run'):
+            job_id = queue.submit('AAPL', {}, os.path.join(tmp_dir, 'AAPL.pdf'))
+        queue.wait(job_id, timeout=5)
+        queue.shutdown()
+    statuses = [e['status'] for e in bus.events('pdf-run', event_type=EVENT_PDF)]
+    print(f"  PDF事件: {statuses}")
+    assert statuses[0] == 'queued' and statuses[-1] == PDF_JOB_DONE
+    print("✅ 运行上下文传递正常")
+
+
+def test_stream_events():
+    """测试在后台运行函数并逐个产出事件"""
+    print("\n" + "="*80)
+    print("🧪 测试3: stream_events")
+    print("="*80)
+
+    def work(n):
+        for i in range(n):
+            emit(EVENT_STAGE, stage='collecting', progress=i)
+        return {'status': 'success', 'value': n}
+
+    events = [e for e in stream_events(work, 3, title='测试', poll_interval=0.05) if e]
+    types = [e['type'] for e in events]
+    assert types[0] == EVENT_RUN_STARTED and types[-1] == EVENT_RUN_FINISHED
+    assert types.count(EVENT_STAGE) == 3
+    assert events[-1]['result'] == {'status': 'success', 'value': 3}
+
+    def broken():
+        raise RuntimeError('boom')
+
+    finished = [e for e in stream_events(broken, poll_interval=0.05) if e][-1]
+    assert finished['status'] == 'error' and 'boom' in finished['error']
+    print("✅ stream_events 正常")
+
+
+if __name__ == "__main__":
+    test_publish_and_subscribe()
+    test_context_propagation()
+    test_stream_events()
+    print("\n🎉 进度事件总线测试全部通过！")
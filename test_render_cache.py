@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+测试报告渲染缓存
+验证章节偏移缓存、按需渲染、字符数上限下的LRU淘汰，以及报告删除时失效
+"""
+from storage import ReportRenderCache
+from storage.render_cache import split_section_offsets
+
+REPORT = """封面说明
+
+# Apple 估值报告
+
+## 商业模式
+服务收入占比提升
+
+### 细分业务
+可穿戴设备
+
+## 估值分析
+自由现金流折现
+"""
+
+
+def test_section_offsets_and_lazy_render():
+    """测试章节切分只记录偏移，重复打开命中缓存，章节第一次请求时才渲染"""
+    print("="*80)
+    print("🧪 测试1: 章节偏移与按需渲染")
+    print("="*80)
+
+    sections = split_section_offsets(REPORT)
+    print(f"  章节: {[(s['heading'], s['level']) for s in sections]}")
+    assert [s['heading'] for s in sections] == ['', 'Apple 估值报告', '商业模式', '估值分析'], "三级标题留在所属章节内"
+    assert ''.join(REPORT[s['start']:s['end']] for s in sections) == REPORT, "偏移覆盖全文"
+
+    cache = ReportRenderCache()
+    entry = cache.open("Apple_20250101_120000.md", REPORT)
+    assert cache.open("Apple_20250101_120000.md", REPORT.encode('utf-8')) == entry, "bytes 与 str 内容相同"
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    assert cache.stats()['rendered_sections'] == 0, "打开报告时不渲染章节"
+
+    rendered = cache.section(entry['report_id'], entry['hash'], 2)
+    assert '服务收入' in rendered and '可穿戴设备' in rendered and '自由现金流' not in rendered
+    assert cache.section(entry['report_id'], entry['hash'], 2) == rendered
+    assert cache.stats()['rendered_sections'] == 1, "同一章节只渲染一次"
+
+    changed = cache.open("Apple_20250101_120000.md", REPORT + "\n## 风险\n汇率\n")
+    assert changed['hash'] != entry['hash'] and len(changed['sections']) == 5
+    assert cache.section(entry['report_id'], entry['hash'], 2) is None, "内容变化后旧条目被替换"
+    assert cache.stats()['reports'] == 1
+    print("✅ 章节偏移与按需渲染正常")
+
+
+def test_lru_bound_and_invalidate():
+    """测试字符数上限下淘汰最久未用的报告，invalidate 删除报告的全部条目"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 上限淘汰与失效")
+    print("="*80)
+
+    cache = ReportRenderCache(max_cache_chars=len(REPORT) * 2 + 10)
+    first = cache.open("A.md", REPORT)
+    cache.open("B.md", REPORT)
+    cache.open("A.md", REPORT)  # A 最近使用
+    cache.open("C.md", REPORT)
+    stats = cache.stats()
+    print(f"  缓存: {stats}")
+    assert stats['reports'] == 2 and stats['chars'] <= cache.max_cache_chars
+    assert cache.section("A.md", first['hash'], 0) is not None, "最近使用的报告保留"
+    assert cache.open("B.md", REPORT) and cache.stats()['misses'] == 4, "最久未用的报告被淘汰"
+
+    # 渲染结果也计入上限；单份报告容纳不下的章节照常返回，只是不缓存
+    rendered = [cache.section("B.md", first['hash'], index) for index in range(len(first['sections']))]
+    assert all(rendered), "超出上限的章节仍返回渲染结果"
+    assert cache.stats()['chars'] <= cache.max_cache_chars
+
+    cache.invalidate("B.md")
+    stats = cache.stats()
+    assert cache.section("B.md", first['hash'], 0) is None, "失效后该报告的条目全部删除"
+    assert not any(key[0] == "B.md" for key in cache._entries)
+    assert stats['chars'] == sum(e['size'] for e in cache._entries.values()), "字符数随之扣除"
+    cache.clear()
+    assert cache.stats()['reports'] == 0 and cache.stats()['chars'] == 0
+    print("✅ 上限淘汰与失效正常")
+
+
+if __name__ == "__main__":
+    test_section_offsets_and_lazy_render()
+    test_lru_bound_and_invalidate()
+    print("\n🎉 报告渲染缓存测试全部通过！")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+测试报告归档
+验证内容寻址去重、变体差分压缩、按需读取与恢复，以及blob回收
+"""
+import os
+import tempfile
+
+from storage.report_archive import ReportArchive, base_variant_name
+from storage.report_files import ReportFileStore
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_archive_variants():
+    """测试变体差分、去重与按需读取"""
+    print("="*80)
+    print("🧪 测试1: 变体差分与去重")
+    print("="*80)
+
+    assert base_variant_name('reports/X_20251101_000000_enhanced.md') == 'X_20251101_000000.md'
+    assert base_variant_name('X_20251101_000000_enhanced_with_chart.md') == 'X_20251101_000000.md'
+    assert base_variant_name('X_20251101_000000.md') is None
+
+    with tempfile.TemporaryDirectory() as reports_dir:
+        archive = ReportArchive(os.path.join(reports_dir, 'archive'))
+        raw = ''.join(f"| Revenue {i} | ${i * 3.7:.1f}B | +{i % 17}% |\n" for i in range(400)).encode('utf-8')
+        enhanced = raw.replace(b'| Revenue 7 |', b'| **Revenue 7** |') + b'\n![chart](charts/abc.svg)\n'
+        raw_path = os.path.join(reports_dir, 'X_20251101_000000.md')
+        enhanced_path = os.path.join(reports_dir, 'X_20251101_000000_enhanced.md')
+        copy_path = os.path.join(reports_dir, 'Y_20251102_000000.md')
+        _write(raw_path, raw)
+        _write(enhanced_path, enhanced)
+        _write(copy_path, raw)
+
+        raw_manifest = archive.archive_file(raw_path, remove_original=True)
+        enhanced_manifest = archive.archive_file(enhanced_path, remove_original=True)
+        copy_manifest = archive.archive_file(copy_path, remove_original=True)
+        print(f"  原始: {raw_manifest['size']} -> {raw_manifest['stored_bytes']}")
+        print(f"  增强: {enhanced_manifest['size']} -> {enhanced_manifest['stored_bytes']}")
+
+        assert enhanced_manifest['base'] == raw_manifest['blob'], "变体应以原始版本为字典差分"
+        assert enhanced_manifest['stored_bytes'] < raw_manifest['stored_bytes'] / 5
+        assert copy_manifest['stored_bytes'] == 0, "相同内容只存一份"
+        assert not os.path.exists(raw_path) and not os.path.exists(enhanced_path)
+
+        assert archive.read_bytes(raw_path) == raw
+        assert archive.read_bytes(enhanced_path) == enhanced
+
+        # Web界面通过文件缓存按需解压已归档的报告
+        store = ReportFileStore(reports_dir, archive=archive)
+        assert store.load_bytes(enhanced_path) == enhanced
+        assert store.load_bytes(enhanced_path) == enhanced and store.hits == 1
+
+        stats = archive.stats()
+        print(f"  统计: {stats}")
+        assert stats['files'] == 3 and stats['blobs'] == 2
+    print("✅ 变体差分与去重正常")
+
+
+def test_restore_and_gc():
+    """测试恢复与回收（差分依赖的原始版本blob不被回收）"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 恢复与回收")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as reports_dir:
+        archive = ReportArchive(os.path.join(reports_dir, 'archive'))
+        raw = b'# Report\n' + b'Revenue grew strongly this quarter.\n' * 200
+        raw_path = os.path.join(reports_dir, 'X_20251101_000000.md')
+        enhanced_path = os.path.join(reports_dir, 'X_20251101_000000_enhanced.md')
+        _write(raw_path, raw)
+        _write(enhanced_path, raw + b'\nEnhanced.\n')
+        os.utime(raw_path, (1700000000, 1700000000))
+        archive.archive_file(raw_path, remove_original=True)
+        archive.archive_file(enhanced_path, remove_original=True)
+
+        # 删除原始版本的清单后，增强版仍依赖它的blob
+        archive.delete(raw_path)
+        assert archive.collect_garbage() == {'removed': 0, 'bytes': 0}
+        assert archive.read_bytes(enhanced_path) == raw + b'\nEnhanced.\n'
+
+        archive.delete(enhanced_path)
+        result = archive.collect_garbage()
+        print(f"  回收: {result}")
+        assert result['removed'] == 2
+
+        _write(raw_path, raw)
+        os.utime(raw_path, (1700000000, 1700000000))
+        archive.archive_file(raw_path, remove_original=True)
+        restored = archive.restore(raw_path, raw_path)
+        with open(restored, 'rb') as f:
+            assert f.read() == raw
+        assert os.path.getmtime(restored) == 1700000000, "恢复时应还原修改时间"
+    print("✅ 恢复与回收正常")
+
+
+if __name__ == "__main__":
+    test_archive_variants()
+    test_restore_and_gc()
+    print("\n🎉 报告归档测试全部通过！")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+测试报告目录索引
+验证登记、分类、分页筛选，以及与 reports/ 目录的对账
+"""
+import os
+import tempfile
+
+from storage.report_catalog import ReportCatalog, STATUS_PENDING, classify_report, extract_ticker
+
+
+def _write(path, content='x'):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def test_classify_and_ticker():
+    """测试文件名分类和股票代码提取"""
+    print("="*80)
+    print("🧪 测试1: 分类与代码")
+    print("="*80)
+
+    assert classify_report('reports/AAPL_20251101_000000.md')['category'] == 'valuation'
+    assert classify_report('reports/AAPL_20251101_000000_enhanced.md') == {
+        'report_type': 'valuation', 'variant': 'enhanced', 'category': 'enhanced'}
+    assert classify_report('reports/AAPL_20251101_000000.pdf')['variant'] == 'pdf'
+    assert classify_report('reports/sector_hotspot_20251101_000000.md')['category'] == 'hotspot'
+    assert extract_ticker('AAPL') == 'AAPL'
+    assert extract_ticker('0700.HK') == '0700.HK'
+    assert extract_ticker('Apple Inc (AAPL)') == 'AAPL'
+    assert extract_ticker('Apple Inc') is None
+    print("✅ 分类与代码正常")
+
+
+def test_record_query_and_sync():
+    """测试登记、分页查询和目录对账"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 登记、查询与对账")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as reports_dir:
+        catalog = ReportCatalog(reports_dir)
+        paths = []
+        for i in range(25):
+            path = os.path.join(reports_dir, f'AAPL_202511{i+1:02d}_000000.md')
+            _write(path, 'x' * (i + 1))
+            os.utime(path, (1700000000 + i, 1700000000 + i))
+            catalog.record(path, company='AAPL')
+            paths.append(path)
+
+        hotspot = os.path.join(reports_dir, 'sector_hotspot_20251201_000000.md')
+        _write(hotspot)
+        catalog.record(hotspot)
+        pending_pdf = paths[0].replace('.md', '.pdf')
+        catalog.record(pending_pdf, company='AAPL', status=STATUS_PENDING)
+
+        assert catalog.count() == 27
+        assert catalog.count(category='valuation') == 25
+        assert catalog.count(search='hotspot') == 1
+        assert catalog.count(search='aapl') == 26
+
+        page = catalog.list_reports(category='valuation', limit=10, offset=10)
+        print(f"  第2页: {[r['name'] for r in page][:3]} ...")
+        assert len(page) == 10
+        assert page[0]['name'] == os.path.basename(paths[14]), "应按修改时间倒序"
+        assert page[0]['ticker'] == 'AAPL' and page[0]['report_time'] == '2025-11-15T00:00:00'
+
+        stats = catalog.stats()
+        print(f"  统计: {stats}")
+        assert stats['categories']['valuation'] == 25
+        assert stats['variants']['raw']['bytes'] == sum(range(1, 26)) + 1
+
+        # 对账：收录直接写入的文件，删除已不存在的报告，保留导出中的PDF
+        os.remove(paths[1])
+        _write(os.path.join(reports_dir, 'TSLA_20251201_000000.md'))
+        result = catalog.sync()
+        print(f"  对账: {result}")
+        assert result == {'added': 1, 'removed': 1}
+        assert catalog.get(paths[1]) is None
+        assert catalog.get(pending_pdf)['status'] == STATUS_PENDING
+        assert catalog.sync() == {'added': 0, 'removed': 0}, "未变化的文件不应重新登记"
+
+        catalog.clear()
+        assert catalog.count() == 0
+    print("✅ 登记、查询与对账正常")
+
+
+if __name__ == "__main__":
+    test_classify_and_ticker()
+    test_record_query_and_sync()
+    print("\n🎉 报告目录测试全部通过！")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+测试报告全文索引
+验证同一报告多个版本只索引优先版本、按版本路径定位索引、删除后不再命中、归档后仍可检索
+"""
+import os
+import tempfile
+
+from storage import ReportArchive, ReportFileStore, ReportSearchIndex
+from storage.report_search import KIND_CITATION, report_stem, split_sections
+
+
+def _write(reports_dir: str, name: str, content: str) -> str:
+    path = os.path.join(reports_dir, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+REPORT = """# {company} 估值报告
+
+## 商业模式
+{company} 的数据中心业务{extra}
+
+## 估值分析
+市盈率与自由现金流折现
+
+## 参考来源
+https://example.com/{company}
+"""
+
+
+def test_variant_preference():
+    """测试同一运行只索引优先版本（_enhanced 优先于 _formatted 和原始版）"""
+    print("="*80)
+    print("🧪 测试1: 版本优先级")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ReportSearchIndex(reports_dir=tmp_dir)
+        raw = _write(tmp_dir, "NVIDIA_20250101_120000.md", REPORT.format(company="NVIDIA", extra="（原始）"))
+        formatted = _write(tmp_dir, "NVIDIA_20250101_120000_formatted.md",
+                           REPORT.format(company="NVIDIA", extra="（格式化）"))
+        enhanced = _write(tmp_dir, "NVIDIA_20250101_120000_enhanced.md",
+                          REPORT.format(company="NVIDIA", extra="（增强）"))
+        other = _write(tmp_dir, "AMD_20250102_090000.md", REPORT.format(company="AMD", extra=""))
+
+        assert report_stem(enhanced) == report_stem(raw) == "NVIDIA_20250101_120000"
+        assert index.sync() == {'indexed': 2, 'removed': 0}
+        assert index.indexed_path(formatted) == enhanced, "任一版本的路径都定位到被索引的优先版本"
+
+        hits = index.search("数据中心")
+        print(f"  命中: {[(h['report'], os.path.basename(h['path'])) for h in hits]}")
+        assert sorted(h['report'] for h in hits) == ["AMD_20250102_090000", "NVIDIA_20250101_120000"]
+        nvidia = [h for h in hits if h['report'] == "NVIDIA_20250101_120000"]
+        assert len(nvidia) == 1 and nvidia[0]['path'] == enhanced, "每份报告只返回优先版本"
+        assert index.search("原始") == [] and index.search("增强")[0]['path'] == enhanced
+        assert index.search("数据中心", company="amd")[0]['path'] == other, "公司过滤不区分大小写"
+        assert index.search("example", kind=KIND_CITATION), "参考来源作为引用索引"
+        assert index.sync() == {'indexed': 0, 'removed': 0}, "未变化时不重新索引"
+    print("✅ 版本优先级正常")
+
+
+def test_reindex_and_remove():
+    """测试改为索引保留的版本，以及删除后查询不再命中"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 重新索引与删除")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ReportSearchIndex(reports_dir=tmp_dir)
+        raw = _write(tmp_dir, "Apple_20250101_120000.md", REPORT.format(company="Apple", extra="（原始）"))
+        enhanced = _write(tmp_dir, "Apple_20250101_120000_enhanced.md",
+                          REPORT.format(company="Apple", extra="（增强）"))
+        index.sync()
+        assert index.indexed_path(raw) == enhanced
+
+        # 增强版被删除（如保留策略清理变体）后改为索引原始版
+        os.remove(enhanced)
+        assert index.index_report(raw)
+        assert index.indexed_path(enhanced) == raw
+        assert index.search("增强") == [] and index.search("原始")[0]['path'] == raw
+        assert index.stats()['reports'] == 1, "同一报告只保留一份索引"
+
+        assert index.remove_report(enhanced) == 1, "任一版本的路径都可删除整份报告的索引"
+        assert index.indexed_path(raw) is None
+        assert index.search("数据中心") == [] and index.search("Apple") == []
+        assert index.remove_report(raw) == 0
+    print("✅ 重新索引与删除正常")
+
+
+def test_archived_report_kept():
+    """测试原文件归档后对账仍保留索引，命中的报告可从归档读取"""
+    print("\n" + "="*80)
+    print("🧪 测试3: 归档报告")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        archive = ReportArchive(os.path.join(tmp_dir, "archive"))
+        index = ReportSearchIndex(reports_dir=tmp_dir, archive=archive)
+        archived = _write(tmp_dir, "Intel_20240101_120000.md", REPORT.format(company="Intel", extra="（归档）"))
+        deleted = _write(tmp_dir, "AMD_20240102_090000.md", REPORT.format(company="AMD", extra=""))
+        index.sync()
+
+        archive.archive_file(archived, remove_original=True)
+        os.remove(deleted)
+        assert index.sync() == {'indexed': 0, 'removed': 1}, "只删除真正不存在的报告"
+
+        hits = index.search("归档")
+        assert [h['path'] for h in hits] == [archived], "归档报告仍可检索"
+        store = ReportFileStore(tmp_dir, archive=archive)
+        assert store.exists(hits[0]['path']) and not store.exists(deleted)
+        assert "（归档）" in store.load_bytes(hits[0]['path']).decode('utf-8')
+    print("✅ 归档报告保留索引")
+
+
+def test_split_sections():
+    """测试按标题切分章节，参考来源单独标记为引用"""
+    sections = split_sections(REPORT.format(company="Tesla", extra=""))
+    headings = [(heading, kind) for heading, _, kind in sections]
+    assert ("商业模式", "section") in headings and ("参考来源", KIND_CITATION) in headings
+
+
+if __name__ == "__main__":
+    test_variant_preference()
+    test_reindex_and_remove()
+    test_archived_report_kept()
+    test_split_sections()
+    print("\n🎉 报告全文索引测试全部通过！")
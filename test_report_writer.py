@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+测试报告写入事务
+验证原子发布、并发报告名分配、报告清单，崩溃后的回滚与继续发布，
+以及后台图表写回与删除Markdown的事务互斥
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+
+from report_enhancer import CHART_PLACEHOLDER, ReportEnhancer
+from storage.report_writer import JOURNAL_COMMITTED, ReportWriter
+
+
+def _dead_pid() -> int:
+    """一个已经退出的进程号（模拟崩溃的写入进程）"""
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def _set_journal_pid(path: str, pid: int):
+    with open(path, 'r', encoding='utf-8') as f:
+        journal = json.load(f)
+    journal['pid'] = pid
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(journal, f)
+
+
+def test_publish_and_concurrent_names():
+    """测试原子发布与同一秒内的并发报告"""
+    print("="*80)
+    print("🧪 测试1: 原子发布与并发报告名")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as reports_dir:
+        writer = ReportWriter(reports_dir)
+        moment = datetime(2025, 11, 1, 9, 30, 0)
+
+        with writer.begin('AAPL', moment) as txn:
+            raw_path = txn.write_text(f'{txn.stem}.md', '# AAPL\n')
+            enhanced_path = txn.write_text(f'{txn.stem}_enhanced.md', '# AAPL enhanced\n')
+            assert not os.path.exists(raw_path), "提交前不应出现在 reports/ 下"
+        assert os.path.exists(raw_path) and os.path.exists(enhanced_path)
+        assert writer.verify('AAPL_20251101_093000') == {
+            'AAPL_20251101_093000.md': 'ok', 'AAPL_20251101_093000_enhanced.md': 'ok'}
+
+        # 异常退出时回滚，不留下任何文件
+        try:
+            with writer.begin('MSFT', moment) as txn:
+                txn.write_text(f'{txn.stem}.md', 'partial')
+                raise RuntimeError('增强失败')
+        except RuntimeError:
+            pass
+        assert not os.path.exists(os.path.join(reports_dir, 'MSFT_20251101_093000.md'))
+
+        # 同一秒的并发报告各自得到不同的名字
+        stems = []
+        lock = threading.Lock()
+
+        def worker(i):
+            with writer.begin('AAPL', moment) as txn:
+                txn.write_text(f'{txn.stem}.md', f'report {i}\n')
+            with lock:
+                stems.append(txn.stem)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        print(f"  并发报告名: {sorted(stems)[:3]} ...")
+        assert len(set(stems)) == 8 and 'AAPL_20251101_093000' not in stems
+
+        # 后续事务：删除Markdown并登记PDF
+        with open(os.path.join(reports_dir, 'AAPL_20251101_093000.pdf'), 'wb') as f:
+            f.write(b'%PDF')
+        with writer.open('AAPL_20251101_093000') as txn:
+            txn.adopt('AAPL_20251101_093000.pdf')
+            txn.delete(raw_path)
+        assert not os.path.exists(raw_path)
+        assert set(writer.manifest('AAPL_20251101_093000')['artifacts']) == {
+            'AAPL_20251101_093000_enhanced.md', 'AAPL_20251101_093000.pdf'}
+        assert os.listdir(writer.journal_dir) == [] and os.listdir(writer.staging_root) == []
+    print("✅ 原子发布与并发报告名正常")
+
+
+def test_crash_recovery():
+    """测试崩溃恢复：已提交的继续发布，未提交的回滚"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 崩溃恢复")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as reports_dir:
+        writer = ReportWriter(reports_dir)
+        pid = _dead_pid()
+
+        committed = writer.begin('AAPL')
+        committed_path = committed.write_text(f'{committed.stem}.md', 'done\n')
+        committed._write_journal(JOURNAL_COMMITTED)
+        _set_journal_pid(committed.journal_path, pid)
+
+        staged = writer.begin('MSFT')
+        staged_path = staged.write_text(f'{staged.stem}.md', 'half')
+        _set_journal_pid(staged.journal_path, pid)
+
+        live = writer.begin('TSLA')
+        live.write_text(f'{live.stem}.md', 'in progress')
+
+        result = writer.recover()
+        print(f"  恢复: {result}")
+        assert result == {'rolled_forward': 1, 'rolled_back': 1}
+        with open(committed_path, 'r', encoding='utf-8') as f:
+            assert f.read() == 'done\n'
+        assert not os.path.exists(staged_path)
+        assert not os.path.exists(staged.staging_dir)
+
+        # 仍在运行的事务不受影响
+        live_path = live.commit()[0]
+        assert os.path.exists(live_path)
+    print("✅ 崩溃恢复正常")
+
+
+def test_chart_patch_after_markdown_deleted():
+    """测试后台图表写回：增强版存在时在事务中替换占位符，已被删除时跳过且不重新创建"""
+    print("\n" + "="*80)
+    print("🧪 测试3: 图表写回与删除Markdown")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as reports_dir:
+        writer = ReportWriter(reports_dir)
+        enhancer = ReportEnhancer(use_cache=False, charts_dir=os.path.join(reports_dir, 'charts'),
+                                  report_writer=writer)
+        job = {'link': 'charts/a.svg', 'number': 1, 'output_path': os.path.join(reports_dir, 'charts', 'a.svg')}
+        done = Future()
+        done.set_result([{'success': True}])
+
+        with writer.begin('AAPL') as txn:
+            report_path = txn.write_text(f'{txn.stem}.md', 'raw')
+            enhanced_path = txn.write_text(f'{txn.stem}_enhanced.md', CHART_PLACEHOLDER.format(link=job['link']))
+        enhancer._finish_pending_charts(done, [job], [], report_path, enhanced_path, 'key')
+        with open(enhanced_path, 'r', encoding='utf-8') as f:
+            assert f.read() == '![图表 1](charts/a.svg)', "占位符替换为图表链接"
+        assert os.path.basename(enhanced_path) in writer.manifest(txn.stem)['artifacts']
+
+        # PDF发布时不保留Markdown：增强版在事务中删除后，迟到的图表回调不再写回
+        with writer.open(txn.stem) as pdf_txn:
+            pdf_txn.delete(enhanced_path)
+        enhancer._finish_pending_charts(done, [job], [], report_path, enhanced_path, 'key')
+        assert not os.path.exists(enhanced_path), "已删除的增强版不会被重新创建"
+        assert not os.listdir(os.path.join(reports_dir, '.journal')), "写回事务已结束"
+    print("✅ 图表写回与删除Markdown互斥正常")
+
+
+if __name__ == "__main__":
+    test_publish_and_concurrent_names()
+    test_crash_recovery()
+    test_chart_patch_after_markdown_deleted()
+    print("\n🎉 报告写入事务测试全部通过！")
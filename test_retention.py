@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+测试报告保留策略
+验证清理计划（保留最新N份、被取代的变体、总大小上限）、事务删除后目录索引同步，
+以及刚生成和PDF导出中的报告不被删除
+"""
+import os
+import tempfile
+import time
+
+from storage import ReportCatalog, ReportRenderCache, ReportSearchIndex, ReportWriter
+from storage.report_catalog import STATUS_PENDING
+from storage.retention import REASON_KEEP_LATEST, REASON_MAX_BYTES, REASON_SUPERSEDED, RetentionEngine, RetentionPolicy
+
+DAY = 86400
+
+
+def _make_run(reports_dir: str, catalog: ReportCatalog, stem: str, age_days: float, variants=('',)):
+    """写入一次运行的各版本并收录到目录，修改时间设为 age_days 天前"""
+    mtime = time.time() - age_days * DAY
+    paths = []
+    for suffix in variants:
+        path = os.path.join(reports_dir, f"{stem}{suffix}.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# {stem}{suffix}\n\n## 估值\n内容" + "x" * 100)
+        os.utime(path, (mtime, mtime))
+        catalog.record(path, company=stem.rsplit('_', 2)[0])
+        paths.append(path)
+    return paths
+
+
+def _engine(tmp_dir: str, policy: RetentionPolicy):
+    catalog = ReportCatalog(reports_dir=tmp_dir)
+    engine = RetentionEngine(policy, reports_dir=tmp_dir, catalog=catalog,
+                             writer=ReportWriter(tmp_dir), search_index=ReportSearchIndex(tmp_dir),
+                             render_cache=ReportRenderCache())
+    return engine, catalog
+
+
+def test_keep_latest_and_variants():
+    """测试每个公司保留最新N份、删除被取代的变体"""
+    print("="*80)
+    print("🧪 测试1: 保留最新N份与被取代的变体")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine, catalog = _engine(tmp_dir, RetentionPolicy(keep_latest_per_ticker=1, min_age_seconds=0))
+        old = _make_run(tmp_dir, catalog, "Apple_20250101_120000", 30)
+        latest = _make_run(tmp_dir, catalog, "Apple_20250201_120000", 2,
+                           variants=('', '_formatted', '_enhanced'))
+        tesla = _make_run(tmp_dir, catalog, "Tesla_20250101_120000", 30)
+
+        actions = engine.plan()
+        reasons = {(a['stem'], a['reason']) for a in actions}
+        print(f"  清理计划: {sorted(reasons)}")
+        assert ("Apple_20250101_120000", REASON_KEEP_LATEST) in reasons
+        assert ("Apple_20250201_120000", REASON_SUPERSEDED) in reasons
+        assert all(a['stem'] != "Tesla_20250101_120000" for a in actions), "每个公司分别计数"
+
+        engine.render_cache.open(os.path.basename(old[0]), "# 旧报告")
+        engine.stage_cache.record(old[0], "input", [old[0]])
+        engine.stage_cache.record(tesla[0], "input", [tesla[0]])
+        engine.render_cache.open(os.path.basename(latest[0]), "# 最新报告")
+        preview = engine.apply(actions, dry_run=True)
+        assert preview['files'] == 2 and os.path.exists(old[0]), "dry_run 不删除文件"
+
+        summary = engine.apply()
+        print(f"  执行结果: {summary}")
+        assert summary['reports'] == 1 and summary['variants'] == 1
+        assert not os.path.exists(old[0]) and catalog.get(old[0]) is None
+        assert not os.path.exists(latest[1]), "_formatted 被 _enhanced 取代"
+        assert engine.render_cache.stats()['reports'] == 1, "被删除报告的渲染缓存随之失效"
+        assert engine.stage_cache.lookup(old[0], "input") is None, "被删除报告的后处理缓存条目随之删除"
+        assert engine.stage_cache.stats()['reports'] == 1
+        assert all(os.path.exists(p) for p in (latest[0], latest[2], tesla[0])), "原始版本和最完整的版本保留"
+        assert engine.plan() == [], "执行后没有剩余的清理项"
+    print("✅ 保留最新N份与变体清理正常")
+
+
+def test_protected_and_max_bytes():
+    """测试刚生成、PDF导出中的报告受保护，总大小上限保留每个公司最新的一份"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 受保护的报告与总大小上限")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine, catalog = _engine(tmp_dir, RetentionPolicy(max_total_bytes=1, min_age_seconds=DAY))
+        oldest = _make_run(tmp_dir, catalog, "Apple_20250101_120000", 30)
+        pending = _make_run(tmp_dir, catalog, "Apple_20250115_120000", 20)
+        catalog.record(pending[0].replace('.md', '.pdf'), status=STATUS_PENDING)
+        _make_run(tmp_dir, catalog, "Apple_20250120_120000", 10)
+        fresh = _make_run(tmp_dir, catalog, "Apple_20250301_120000", 0)
+
+        actions = engine.plan()
+        print(f"  清理计划: {[(a['stem'], a['reason']) for a in actions]}")
+        stems = [a['stem'] for a in actions]
+        assert stems == ["Apple_20250101_120000", "Apple_20250120_120000"], "从最旧的开始删除"
+        assert all(a['reason'] == REASON_MAX_BYTES for a in actions)
+
+        summary = engine.apply(max_actions=1)
+        assert summary['reports'] == 1 and summary['remaining'] == 1, "增量清理每次只执行一批"
+        assert not os.path.exists(oldest[0])
+        assert os.path.exists(pending[0]) and os.path.exists(fresh[0]), "PDF导出中和刚生成的报告保留"
+    print("✅ 受保护的报告与总大小上限正常")
+
+
+if __name__ == "__main__":
+    test_keep_latest_and_variants()
+    test_protected_and_max_bytes()
+    print("\n🎉 报告保留策略测试全部通过！")
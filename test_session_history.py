@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+测试会话分析历史
+验证记录数上限与LRU淘汰、按需从报告目录和任务结果读取正文
+"""
+import os
+import tempfile
+
+from session_history import AnalysisHistory
+from storage import JobQueue, ReportCatalog, ReportFileStore
+
+
+def test_bounded_lru():
+    """测试记录数上限和最久未使用淘汰"""
+    print("="*80)
+    print("🧪 测试1: 记录上限与LRU淘汰")
+    print("="*80)
+
+    history = AnalysisHistory(max_items=3)
+    ids = [history.add(f"公司{i}", "quick") for i in range(3)]
+    assert history.touch(ids[0]), "查看最早的记录"
+    history.add("公司3", "quick")
+
+    titles = [r['company'] for r in history.records()]
+    print(f"  保留记录: {titles}")
+    assert titles == ["公司3", "公司2", "公司0"], "淘汰最久未使用的记录，显示仍按添加时间"
+    assert history.get(ids[1]) is None and history.evicted == 1
+
+    for i in range(100):
+        history.add(f"批量{i}", "quick")
+    assert len(history) == 3, "记录数不随分析次数增长"
+    print("✅ 记录上限与LRU淘汰正常")
+
+
+def test_load_body_on_demand():
+    """测试从报告目录和任务结果按需读取正文"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 按需读取正文")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        catalog = ReportCatalog(reports_dir=tmp_dir)
+        store = ReportFileStore(reports_dir=tmp_dir)
+        job_queue = JobQueue(db_path=os.path.join(tmp_dir, "jobs.db"))
+
+        report_path = os.path.join(tmp_dir, "Apple_20250101_120000.md")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write("# Apple 估值报告")
+        catalog.record(report_path, company="Apple")
+
+        job_id = job_queue.submit('comparison', {'companies': ['A', 'B']})
+        job_queue.finish(job_id, {'status': 'success', 'comparison': '## 比较结果'})
+
+        history = AnalysisHistory(max_items=10, catalog=catalog, store=store, job_queue=job_queue)
+        report_id = history.add("Apple", "comprehensive", path=report_path)
+        comparison_id = history.add("比较分析: A, B", "comparison", job_id=job_id)
+        quick_id = history.add("Tesla", "quick")
+
+        assert history.load_body(report_id) == "# Apple 估值报告"
+        assert history.load_body(comparison_id) == "## 比较结果"
+        assert not history.has_body(history.get(quick_id)) and history.load_body(quick_id) is None
+        assert all('report' not in r and 'content' not in r for r in history.records()), "会话中不保存正文"
+
+        catalog.remove(report_path)
+        assert history.load_body(report_id) is None, "目录中已删除的报告不再读取"
+    print("✅ 按需读取正文正常")
+
+
+if __name__ == "__main__":
+    test_bounded_lru()
+    test_load_body_on_demand()
+    print("\n🎉 会话分析历史测试全部通过！")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+测试进程内共享的API资源
+验证令牌桶限速确实拉开请求间隔、响应缓存的过期与LRU淘汰，
+以及各会话（线程）取到的是同一组限速器、缓存和客户端
+"""
+import importlib.util
+import threading
+
+from api_clients.shared import (RateLimiter, ResponseCache, get_rate_limiter, get_response_cache,
+                                get_shared_qwen_client, get_shared_sonar_client)
+
+
+class FakeClock:
+    """可注入的时钟：sleep 只推进时间，不真正等待"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter_spacing():
+    """测试限速：突发额度用完后按速率间隔放行，空闲后额度恢复"""
+    print("="*80)
+    print("🧪 测试1: 令牌桶限速")
+    print("="*80)
+
+    clock = FakeClock()
+    limiter = RateLimiter(60, burst=2, clock=clock, sleep=clock.sleep)
+    start = clock.now
+    waits = [limiter.acquire() for _ in range(6)]
+    print(f"  各请求等待: {waits}")
+    assert waits[:2] == [0.0, 0.0], "突发额度内不等待"
+    assert all(abs(w - 1.0) < 1e-9 for w in waits[2:]), "之后每秒放行一个（60次/分钟）"
+    assert abs((clock.now - start) - 4.0) < 1e-9
+
+    clock.now += 10  # 空闲后积累的令牌不超过突发额度
+    assert [limiter.acquire() for _ in range(3)][:2] == [0.0, 0.0]
+    assert clock.slept[-1] > 0
+
+    unlimited = RateLimiter(0, clock=clock, sleep=clock.sleep)
+    assert not unlimited.enabled and unlimited.acquire() == 0.0, "0表示不限速"
+    print("✅ 限速间隔正常")
+
+
+def test_response_cache_ttl_and_lru():
+    """测试响应缓存：过期前命中（返回副本），过期后失效，超出上限淘汰最久未用的"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 响应缓存")
+    print("="*80)
+
+    clock = FakeClock()
+    cache = ResponseCache(ttl_seconds=60, max_entries=2, clock=clock)
+    key = ResponseCache.make_key('sonar', 'Apple 估值', 0.2)
+    assert key == ResponseCache.make_key('sonar', 'Apple 估值', 0.2)
+    cache.put(key, {'status': 'success', 'content': 'A'})
+
+    clock.now += 59
+    hit = cache.get(key)
+    assert hit == {'status': 'success', 'content': 'A'}
+    hit['content'] = 'changed'
+    assert cache.get(key)['content'] == 'A', "取出的是副本"
+
+    clock.now += 2
+    assert cache.get(key) is None, "过期后失效"
+    assert cache.stats() == {'entries': 0, 'hits': 2, 'misses': 1}
+
+    for name in ('a', 'b'):
+        cache.put(name, {'content': name})
+    cache.get('a')
+    cache.put('c', {'content': 'c'})
+    assert cache.get('b') is None and cache.get('a') is not None, "淘汰最久未使用的条目"
+    print("✅ 响应缓存正常")
+
+
+def test_shared_across_sessions():
+    """测试多个会话（线程）取到同一组限速器、缓存和客户端"""
+    print("\n" + "="*80)
+    print("🧪 测试3: 进程内共享")
+    print("="*80)
+
+    getters = {'sonar_limiter': lambda: get_rate_limiter('sonar'),
+               'qwen_limiter': lambda: get_rate_limiter('qwen'),
+               'cache': get_response_cache}
+    if importlib.util.find_spec('aiohttp'):
+        getters['sonar'] = get_shared_sonar_client
+    else:
+        print("  ⏭️  未安装 aiohttp，跳过Sonar客户端")
+    if importlib.util.find_spec('requests'):
+        getters['qwen'] = get_shared_qwen_client
+    else:
+        print("  ⏭️  未安装 requests，跳过Qwen客户端")
+
+    seen = []
+    start = threading.Barrier(4)
+
+    def session():
+        start.wait()
+        seen.append({name: getter() for name, getter in getters.items()})
+
+    threads = [threading.Thread(target=session) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for name in getters:
+        assert len({id(s[name]) for s in seen}) == 1, f"{name} 在各会话间共享"
+    assert seen[0]['sonar_limiter'] is not seen[0]['qwen_limiter'], "不同服务各自限速"
+    if 'sonar' in getters:
+        assert seen[0]['sonar'].rate_limiter is seen[0]['sonar_limiter']
+        assert seen[0]['sonar'].cache is seen[0]['cache']
+    if 'qwen' in getters:
+        assert seen[0]['qwen'].rate_limiter is seen[0]['qwen_limiter']
+    print("✅ 进程内共享正常")
+
+
+if __name__ == "__main__":
+    test_rate_limiter_spacing()
+    test_response_cache_ttl_and_lru()
+    test_shared_across_sessions()
+    print("\n🎉 共享API资源测试全部通过！")
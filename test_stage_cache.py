@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+测试后处理阶段缓存
+验证文本阶段复用、manifest跳过未变化报告、输出被删除后重新链接、容量上限淘汰与回收
+"""
+import os
+import tempfile
+import time
+
+from storage.stage_cache import StageCache, detach_output
+
+
+def test_text_stage_memoization():
+    """测试文本阶段按内容哈希复用"""
+    print("="*80)
+    print("🧪 测试1: 文本阶段缓存")
+    print("="*80)
+
+    calls = []
+
+    def upper_stage(text):
+        calls.append(text)
+        return text.upper()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = StageCache(os.path.join(tmp_dir, ".cache"))
+        assert cache.run_text_stage('upper', '1', upper_stage, "revenue") == "REVENUE"
+        assert cache.run_text_stage('upper', '1', upper_stage, "revenue") == "REVENUE"
+        assert len(calls) == 1, "相同输入不应重复计算"
+
+        # 版本变化或输入变化都会重新计算
+        cache.run_text_stage('upper', '2', upper_stage, "revenue")
+        cache.run_text_stage('upper', '2', upper_stage, "margin")
+        assert len(calls) == 3
+        print(f"  统计: {cache.stats()}")
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 3
+    print("✅ 文本阶段缓存正常")
+
+
+def test_manifest_lookup():
+    """测试manifest跳过未变化的报告并恢复被删除的输出"""
+    print("\n" + "="*80)
+    print("🧪 测试2: 报告级manifest")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "TSLA_20251104_231709.md")
+        output = os.path.join(tmp_dir, "TSLA_20251104_231709_enhanced.md")
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write("# TSLA")
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write("# TSLA enhanced")
+
+        cache = StageCache(os.path.join(tmp_dir, ".cache"))
+        key = StageCache.key('enhance_report', 'v1', "# TSLA")
+        assert cache.lookup(source, key) is None
+        cache.record(source, key, [output])
+
+        # 新实例从磁盘读取manifest
+        cache = StageCache(os.path.join(tmp_dir, ".cache"))
+        assert cache.lookup(source, key) is not None
+        assert cache.lookup(source, StageCache.key('enhance_report', 'v2', "# TSLA")) is None
+
+        # 输出被删除后从对象存储重新链接
+        os.remove(output)
+        assert cache.lookup(source, key) is not None
+        with open(output, 'r', encoding='utf-8') as f:
+            assert f.read() == "# TSLA enhanced"
+
+        # 写入前断开硬链接，覆盖输出不会改坏缓存对象
+        detach_output(output)
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write("changed")
+        os.remove(output)
+        assert cache.lookup(source, key) is not None
+        with open(output, 'r', encoding='utf-8') as f:
+            assert f.read() == "# TSLA enhanced"
+    print("✅ manifest查找与恢复正常")
+
+
+def _age(cache: StageCache, key: str, seconds: float):
+    """把对象的最近使用时间调到 seconds 秒前"""
+    mtime = time.time() - seconds
+    os.utime(cache._object_path(key), (mtime, mtime))
+
+
+def test_eviction_and_gc():
+    """测试超出上限淘汰最久未用的对象（manifest引用的最后淘汰），以及源报告删除后的回收"""
+    print("\n" + "="*80)
+    print("🧪 测试3: 容量上限与回收")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, "AMD_20251104_231709.md")
+        output = os.path.join(tmp_dir, "AMD_20251104_231709_enhanced.md")
+        for path in (source, output):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("x" * 100)
+
+        cache = StageCache(os.path.join(tmp_dir, ".cache"), max_bytes=0)
+        key = StageCache.key('enhance_report', 'v1', "x")
+        cache.record(source, key, [output])
+        output_key = cache._load_entry(source)['outputs'][os.path.abspath(output)]
+        stage_keys = [cache.key('stage', '1', str(i)) for i in range(3)]
+        for i, stage_key in enumerate(stage_keys):
+            cache.put_bytes(stage_key, b"y" * 100)
+            _age(cache, stage_key, 300 - i * 100)
+        _age(cache, output_key, 1000)
+        assert cache.get_bytes(stage_keys[0]) is not None, "命中刷新最近使用时间"
+
+        # 上限200字节：淘汰最久未用的阶段结果，manifest引用的输出虽然最旧也保留
+        assert cache.evict(max_bytes=200) == {'removed': 2, 'bytes': 200}
+        assert cache.get_bytes(stage_keys[0]) is not None and cache.get_bytes(output_key) is not None
+        assert cache.get_bytes(stage_keys[1]) is None and cache.get_bytes(stage_keys[2]) is None
+
+        # 写入超过上限时自动淘汰
+        cache.max_bytes = 250
+        cache.put_bytes(cache.key('stage', '1', 'new'), b"z" * 100)
+        assert cache.stats()['evicted'] == 3
+
+        # 源报告删除后条目和它独占的对象被回收；刚用过的阶段结果保留
+        os.remove(source)
+        _age(cache, output_key, 1000)
+        result = cache.collect_garbage(max_idle=500)
+        print(f"  回收: {result}")
+        assert result == {'entries': 1, 'objects': 1, 'bytes': 100}
+        assert cache.lookup(source, key) is None and cache.get_bytes(output_key) is None
+        assert cache.forget(source) is False
+    print("✅ 容量上限与回收正常")
+
+
+if __name__ == "__main__":
+    test_text_stage_memoization()
+    test_manifest_lookup()
+    test_eviction_and_gc()
+    print("\n🎉 阶段缓存测试全部通过！")
@@ -6,10 +6,16 @@
 import streamlit as st
 import os
 import time
-from datetime import datetime
-from main import ValuationReportSystem
-from agents.sector_leader_analyzer import SectorLeaderAnalyzer
-import glob
+import uuid
+from datetime import datetime, timedelta
+from main import get_shared_system
+from agents.sector_leader_analyzer import get_shared_sector_analyzer
+from storage import get_default_catalog, get_default_render_cache, get_default_search_index, get_default_store
+from storage.report_catalog import STATUS_ARCHIVED, STATUS_PENDING
+from job_service import get_default_job_service
+from retention_service import get_default_retention_service
+from session_history import TYPE_ICONS, AnalysisHistory
+from progress_bus import EVENT_PARTIAL, EVENT_PDF, EVENT_QUERY_DONE, EVENT_SECTION_DONE, get_default_bus
 
 # 页面配置
 st.set_page_config(
@@ -58,15 +64,152 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# 报告系统和行业分析器在进程内共享（所有会话共用API客户端、限速器、响应缓存和连接池）
+system = get_shared_system()
+sector_analyzer = get_shared_sector_analyzer()
+
 # 初始化session state
-if 'system' not in st.session_state:
-    st.session_state.system = ValuationReportSystem()
-if 'sector_analyzer' not in st.session_state:
-    st.session_state.sector_analyzer = SectorLeaderAnalyzer()
-if 'current_report' not in st.session_state:
-    st.session_state.current_report = None
-if 'analysis_history' not in st.session_state:
-    st.session_state.analysis_history = []
+if 'current_pdf_job_id' not in st.session_state:
+    st.session_state.current_pdf_job_id = None
+    st.session_state.current_pdf_path = None
+# 会话中只保存轻量的历史记录（有上限），报告正文查看时再从报告目录或任务结果读取
+if not isinstance(st.session_state.get('analysis_history'), AnalysisHistory):
+    st.session_state.analysis_history = AnalysisHistory()
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:12]
+
+# 后台任务服务（进程内共享）：分析在工作线程中执行，页面只提交任务并显示进度
+job_service = get_default_job_service()
+# 报告保留策略（config.RETENTION_ENABLED 时在后台增量清理）
+retention_service = get_default_retention_service()
+
+# 任务执行中时自动刷新页面的间隔（秒）
+JOB_REFRESH_SECONDS = 2
+
+JOB_STAGE_LABELS = {
+    "planning": "第1步: 智能查询规划",
+    "collecting": "第2步: 并行收集实时信息",
+    "analyzing": "第3步: 深度分析生成报告",
+    "saving": "保存并增强报告",
+    "pdf": "生成PDF",
+    "leaders": "查找行业龙头",
+}
+
+
+def render_live_events(run_id: str):
+    """
+    显示进度事件总线上该运行已产生的阶段性结果：逐条到达的搜索结果、已完成的报告章节等
+    （事件在本进程内存中；sidecar模式下任务在其他进程执行，只显示队列中的进度）
+    """
+    bus = get_default_bus()
+    
+    queries = bus.events(run_id, event_type=EVENT_QUERY_DONE)
+    if queries:
+        succeeded = sum(1 for e in queries if e['status'] == 'success')
+        with st.expander(f"🔍 搜索结果（已完成 {len(queries)}/{queries[-1]['total']}，成功 {succeeded}）"):
+            for e in queries:
+                icon = "✅" if e['status'] == 'success' else "❌"
+                st.markdown(f"{icon} **{e['purpose'] or e['query'][:80]}**")
+                if e['status'] == 'success':
+                    st.caption(e['content'][:300])
+                else:
+                    st.caption(e['error'] or "查询失败")
+    
+    for e in bus.events(run_id, event_type=EVENT_PARTIAL):
+        if e['name'] == 'hotspots':
+            sectors = [f"{s.get('sector', '')}（{s.get('market', '')}）" for s in e['data'].get('top_sectors', [])]
+            st.markdown(f"🔥 **热点行业**: {', '.join(sectors) or '无'}")
+        elif e['name'] == 'sector_leaders':
+            st.markdown(f"🏆 已找到 **{e['sector']}** 行业龙头")
+    
+    for e in bus.events(run_id, event_type=EVENT_SECTION_DONE):
+        with st.expander(f"📄 {e['title']}（已完成）"):
+            st.markdown(e['content'], unsafe_allow_html=True)
+    
+    pdf_event = bus.latest(run_id, EVENT_PDF)
+    if pdf_event:
+        st.caption(f"📄 PDF: {pdf_event['status']}")
+
+
+def render_report_viewer(viewer_key: str, report_id: str, content):
+    """
+    分章节查看报告：章节切分和渲染结果来自进程内共享的渲染缓存（按报告ID和内容哈希），
+    页面重新运行时不再重新解析整份报告，未展开的章节不渲染也不发送到浏览器
+    """
+    render_cache = get_default_render_cache()
+    entry = render_cache.open(report_id, content)
+    sections = entry['sections']
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.caption(f"共 {len(sections)} 个章节，勾选后展开")
+    with col2:
+        expand_all = st.checkbox("全部展开", key=f"{viewer_key}_all")
+    
+    for index, section in enumerate(sections):
+        label = section['heading'] or "封面与摘要"
+        indent = "　　" if section['level'] > 1 else ""
+        expanded = expand_all or st.checkbox(
+            f"{indent}{label}（{section['chars'] / 1000:.1f}k 字符）",
+            value=index == 0,
+            key=f"{viewer_key}_{entry['hash'][:12]}_{index}"
+        )
+        if not expanded:
+            continue
+        body = render_cache.section(report_id, entry['hash'], index)
+        if body is None:
+            # 条目刚被其他会话挤出缓存，重新切分
+            entry = render_cache.open(report_id, content)
+            body = render_cache.section(report_id, entry['hash'], index)
+        st.markdown(body, unsafe_allow_html=True)
+
+
+def toggle_viewer(state_key: str, value, label: str = "📖 查看报告", key: str = None) -> bool:
+    """查看/收起按钮：打开的报告记在会话中，展开章节导致页面重新运行后仍然显示"""
+    is_open = st.session_state.get(state_key) == value
+    if st.button("🔼 收起报告" if is_open else label, key=key, use_container_width=True):
+        st.session_state[state_key] = None if is_open else value
+        st.experimental_rerun()
+    return is_open
+
+
+def render_job_progress(job_key: str, label: str):
+    """
+    显示本会话 st.session_state[job_key] 对应后台任务的状态
+
+    Returns:
+        任务状态（done时含结果），没有任务时返回None
+    """
+    job_id = st.session_state.get(job_key)
+    if not job_id:
+        return None
+    job = job_service.status(job_id)
+    if job is None:
+        st.session_state.pop(job_key, None)
+        return None
+    
+    if job['status'] == 'queued':
+        st.info(f"⏳ {label}排队中（前面还有 {job['position']} 个任务）")
+        if st.button("✖️ 取消", key=f"cancel_{job_id}"):
+            job_service.cancel(job_id)
+    elif job['status'] == 'running':
+        st.progress(job['progress'] / 100)
+        stage = JOB_STAGE_LABELS.get(job['stage'], job['stage'] or "准备中")
+        st.text(f"{stage}: {job['message'] or ''}".rstrip(': '))
+        st.caption(f"任务 {job_id} 在后台执行，可以切换到其他页面，回来后继续显示进度")
+        render_live_events(job_id)
+    elif job['status'] == 'failed':
+        st.error(f"❌ {label}失败: {job['error'] or '未知错误'}")
+    elif job['status'] == 'cancelled':
+        st.warning(f"⚠️ {label}已取消")
+    return job
+
+
+def refresh_while_active(*jobs):
+    """有任务排队或执行中时，稍后自动重新运行页面以刷新进度"""
+    if any(job and job['status'] in ('queued', 'running') for job in jobs):
+        time.sleep(JOB_REFRESH_SECONDS)
+        st.experimental_rerun()
 
 # 侧边栏
 with st.sidebar:
@@ -89,8 +232,9 @@ with st.sidebar:
     st.markdown("---")
     st.markdown("### 快速统计")
     if os.path.exists("reports"):
-        md_count = len(glob.glob("reports/*.md"))
-        pdf_count = len(glob.glob("reports/*.pdf"))
+        catalog_variants = get_default_catalog().stats()['variants']
+        md_count = sum(catalog_variants.get(v, {}).get('count', 0) for v in ('raw', 'enhanced'))
+        pdf_count = catalog_variants.get('pdf', {}).get('count', 0)
         st.metric("Markdown报告", md_count)
         st.metric("PDF报告", pdf_count)
     
@@ -186,242 +330,251 @@ elif page == "📈 单公司分析":
         if not company:
             st.error("❌ 请输入公司名称")
         else:
-            with st.spinner(f"正在分析 {company}，请稍候..."):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                # 模拟进度
-                status_text.text("第1步: 智能查询规划...")
-                progress_bar.progress(20)
-                time.sleep(0.5)
-                
-                status_text.text("第2步: 并行收集实时信息...")
-                progress_bar.progress(50)
-                
+            # 提交到后台任务服务：分析在工作线程中进行，页面重新运行或切换页面都不会中断
+            st.session_state.report_job_id = job_service.submit('report', {
+                'company': company,
+                'report_type': report_type,
+                'save_to_file': save_file,
+            }, owner=st.session_state.session_id)
+    
+    report_job = render_job_progress('report_job_id', "估值报告")
+    if report_job and report_job['status'] == 'done':
+        result = report_job['result']
+        company = result.get('company', company)
+        save_file = report_job['params'].get('save_to_file', True)
+        if st.session_state.get('report_job_seen') != report_job['job_id']:
+            # 任务完成后首次显示时记录到历史
+            st.session_state.report_job_seen = report_job['job_id']
+            st.session_state.current_pdf_job_id = result.get('metadata', {}).get('pdf_job_id')
+            st.session_state.current_pdf_path = result.get('metadata', {}).get('pdf_path')
+            st.session_state.analysis_history.add(
+                company, report_job['params'].get('report_type'),
+                path=result.get('metadata', {}).get('saved_file'), job_id=report_job['job_id']
+            )
+        
+        st.success(f"✅ {company} 估值报告生成成功！")
+        
+        # 显示元数据
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("执行查询", f"{result['metadata']['queries_successful']}/{result['metadata']['queries_executed']}")
+        with col2:
+            st.metric("总耗时", f"{result['metadata']['elapsed_time']:.2f}秒")
+        with col3:
+            st.metric("报告长度", f"{len(result['report'])} 字符")
+        
+        # 显示报告
+        st.markdown("---")
+        st.markdown("### 📄 生成的报告")
+        
+        # 添加专业CSS样式
+        st.markdown("""
+        <style>
+        .metric-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 20px 0;
+            background: white;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        .metric-table th {
+            background: #1f77b4;
+            color: white;
+            padding: 12px;
+            text-align: left;
+            font-weight: bold;
+        }
+        .metric-table td {
+            padding: 10px 12px;
+            border-bottom: 1px solid #ddd;
+        }
+        .metric-table tr:hover {
+            background: #f5f5f5;
+        }
+        .highlight-box {
+            background: #e8f4f8;
+            border-left: 4px solid #1f77b4;
+            padding: 15px;
+            margin: 15px 0;
+            border-radius: 4px;
+        }
+        .positive {
+            color: #28a745;
+            font-weight: bold;
+        }
+        .negative {
+            color: #dc3545;
+            font-weight: bold;
+        }
+        .neutral {
+            color: #6c757d;
+        }
+        .recommendation-buy {
+            background: #28a745;
+            color: white;
+            padding: 8px 16px;
+            border-radius: 4px;
+            font-weight: bold;
+            display: inline-block;
+        }
+        .recommendation-sell {
+            background: #dc3545;
+            color: white;
+            padding: 8px 16px;
+            border-radius: 4px;
+            font-weight: bold;
+            display: inline-block;
+        }
+        .recommendation-hold {
+            background: #ffc107;
+            color: #000;
+            padding: 8px 16px;
+            border-radius: 4px;
+            font-weight: bold;
+            display: inline-block;
+        }
+        .data-source-link {
+            color: #1f77b4;
+            text-decoration: none;
+            font-size: 0.9em;
+        }
+        .data-source-link:hover {
+            text-decoration: underline;
+        }
+        .section-title {
+            color: #1f77b4;
+            border-bottom: 2px solid #1f77b4;
+            padding-bottom: 10px;
+            margin-top: 30px;
+        }
+        .subsection-title {
+            color: #333;
+            margin-top: 20px;
+            font-weight: 600;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+        
+        # 检查是否有JSON格式的报告
+        if "report_json" in result and result.get("report_json"):
+            # 渲染HTML格式的专业报告
+            json_report = result["report_json"]
+            
+            st.markdown(f"<h2 class='section-title'>1. 基本面分析 (Fundamental Analysis)</h2>", unsafe_allow_html=True)
+            st.markdown(json_report.get("fundamentalAnalysis", ""), unsafe_allow_html=True)
+            
+            st.markdown(f"<h2 class='section-title'>2. 业务板块分析 (Business Segments)</h2>", unsafe_allow_html=True)
+            st.markdown(json_report.get("businessSegments", ""), unsafe_allow_html=True)
+            
+            st.markdown(f"<h2 class='section-title'>3. 增长催化剂 (Growth Catalysts)</h2>", unsafe_allow_html=True)
+            st.markdown(json_report.get("growthCatalysts", ""), unsafe_allow_html=True)
+            
+            st.markdown(f"<h2 class='section-title'>4. 估值分析 (Valuation Analysis)</h2>", unsafe_allow_html=True)
+            st.markdown(json_report.get("valuationAnalysis", ""), unsafe_allow_html=True)
+        else:
+            # 使用Markdown格式显示
+            st.markdown(result["report"], unsafe_allow_html=True)
+        
+        # 下载按钮 - 优先下载PDF
+        if save_file:
+            # 检查是否有PDF文件
+            pdf_file = result.get("metadata", {}).get("pdf_file")
+            
+            if pdf_file and os.path.exists(pdf_file):
+                # 下载PDF（文件内容按修改时间缓存，页面重新运行时不再读盘）
+                pdf_data = get_default_store().load_bytes(pdf_file)
+                st.download_button(
+                    label="📥 下载报告 (PDF)",
+                    data=pdf_data,
+                    file_name=os.path.basename(pdf_file),
+                    mime="application/pdf"
+                )
+            elif result.get("metadata", {}).get("pdf_job_id"):
+                # PDF正在后台生成，就绪后在下方的PDF导出面板中下载
+                st.info("⏳ PDF正在后台生成，可以先阅读报告，完成后在页面下方下载")
+            else:
+                # 如果没有PDF，尝试生成PDF
                 try:
-                    # 实际分析
-                    result = st.session_state.system.generate_report(
-                        company=company,
-                        report_type=report_type,
-                        save_to_file=save_file
-                    )
-                    
-                    progress_bar.progress(90)
-                    status_text.text("第3步: 深度分析生成报告...")
+                    from pdf_generator import ProfessionalPDFGenerator
                     
-                    if result["status"] == "success":
-                        progress_bar.progress(100)
-                        status_text.text("✅ 分析完成！")
-                        
-                        st.session_state.current_report = result
-                        st.session_state.analysis_history.append({
-                            "company": company,
-                            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "type": report_type
-                        })
-                        
-                        st.success(f"✅ {company} 估值报告生成成功！")
-                        
-                        # 显示元数据
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.metric("执行查询", f"{result['metadata']['queries_successful']}/{result['metadata']['queries_executed']}")
-                        with col2:
-                            st.metric("总耗时", f"{result['metadata']['elapsed_time']:.2f}秒")
-                        with col3:
-                            st.metric("报告长度", f"{len(result['report'])} 字符")
-                        
-                        # 显示报告
-                        st.markdown("---")
-                        st.markdown("### 📄 生成的报告")
-                        
-                        # 添加专业CSS样式
-                        st.markdown("""
-                        <style>
-                        .metric-table {
-                            width: 100%;
-                            border-collapse: collapse;
-                            margin: 20px 0;
-                            background: white;
-                            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                        }
-                        .metric-table th {
-                            background: #1f77b4;
-                            color: white;
-                            padding: 12px;
-                            text-align: left;
-                            font-weight: bold;
-                        }
-                        .metric-table td {
-                            padding: 10px 12px;
-                            border-bottom: 1px solid #ddd;
-                        }
-                        .metric-table tr:hover {
-                            background: #f5f5f5;
-                        }
-                        .highlight-box {
-                            background: #e8f4f8;
-                            border-left: 4px solid #1f77b4;
-                            padding: 15px;
-                            margin: 15px 0;
-                            border-radius: 4px;
-                        }
-                        .positive {
-                            color: #28a745;
-                            font-weight: bold;
-                        }
-                        .negative {
-                            color: #dc3545;
-                            font-weight: bold;
-                        }
-                        .neutral {
-                            color: #6c757d;
-                        }
-                        .recommendation-buy {
-                            background: #28a745;
-                            color: white;
-                            padding: 8px 16px;
-                            border-radius: 4px;
-                            font-weight: bold;
-                            display: inline-block;
-                        }
-                        .recommendation-sell {
-                            background: #dc3545;
-                            color: white;
-                            padding: 8px 16px;
-                            border-radius: 4px;
-                            font-weight: bold;
-                            display: inline-block;
-                        }
-                        .recommendation-hold {
-                            background: #ffc107;
-                            color: #000;
-                            padding: 8px 16px;
-                            border-radius: 4px;
-                            font-weight: bold;
-                            display: inline-block;
-                        }
-                        .data-source-link {
-                            color: #1f77b4;
-                            text-decoration: none;
-                            font-size: 0.9em;
-                        }
-                        .data-source-link:hover {
-                            text-decoration: underline;
-                        }
-                        .section-title {
-                            color: #1f77b4;
-                            border-bottom: 2px solid #1f77b4;
-                            padding-bottom: 10px;
-                            margin-top: 30px;
-                        }
-                        .subsection-title {
-                            color: #333;
-                            margin-top: 20px;
-                            font-weight: 600;
-                        }
-                        </style>
-                        """, unsafe_allow_html=True)
-                        
-                        # 检查是否有JSON格式的报告
-                        if "report_json" in result and result.get("report_json"):
-                            # 渲染HTML格式的专业报告
-                            json_report = result["report_json"]
-                            
-                            st.markdown(f"<h2 class='section-title'>1. 基本面分析 (Fundamental Analysis)</h2>", unsafe_allow_html=True)
-                            st.markdown(json_report.get("fundamentalAnalysis", ""), unsafe_allow_html=True)
-                            
-                            st.markdown(f"<h2 class='section-title'>2. 业务板块分析 (Business Segments)</h2>", unsafe_allow_html=True)
-                            st.markdown(json_report.get("businessSegments", ""), unsafe_allow_html=True)
-                            
-                            st.markdown(f"<h2 class='section-title'>3. 增长催化剂 (Growth Catalysts)</h2>", unsafe_allow_html=True)
-                            st.markdown(json_report.get("growthCatalysts", ""), unsafe_allow_html=True)
-                            
-                            st.markdown(f"<h2 class='section-title'>4. 估值分析 (Valuation Analysis)</h2>", unsafe_allow_html=True)
-                            st.markdown(json_report.get("valuationAnalysis", ""), unsafe_allow_html=True)
-                        else:
-                            # 使用Markdown格式显示
-                            st.markdown(result["report"], unsafe_allow_html=True)
-                        
-                        # 下载按钮 - 优先下载PDF
-                        if save_file:
-                            # 检查是否有PDF文件
-                            pdf_file = result.get("metadata", {}).get("pdf_file")
-                            
-                            if pdf_file and os.path.exists(pdf_file):
-                                # 下载PDF
-                                with open(pdf_file, 'rb') as f:
-                                    pdf_data = f.read()
-                                st.download_button(
-                                    label="📥 下载报告 (PDF)",
-                                    data=pdf_data,
-                                    file_name=os.path.basename(pdf_file),
-                                    mime="application/pdf"
-                                )
-                            else:
-                                # 如果没有PDF，尝试生成PDF
-                                try:
-                                    from pdf_generator import ProfessionalPDFGenerator
-                                    import tempfile
-                                    
-                                    # 准备报告数据
-                                    report_json = result.get("report_json", {})
-                                    if not report_json:
-                                        # 如果没有JSON，从Markdown解析
-                                        st.warning("⚠️ 无法生成PDF，将下载Markdown格式")
-                                        st.download_button(
-                                            label="📥 下载报告 (Markdown)",
-                                            data=result["report"],
-                                            file_name=f"{company}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
-                                            mime="text/markdown"
-                                        )
-                                    else:
-                                        # 生成PDF
-                                        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                                            pdf_path = tmp_file.name
-                                        
-                                        generator = ProfessionalPDFGenerator()
-                                        generator.generate_report_pdf(
-                                            company,
-                                            {
-                                                'metadata': result.get("metadata", {}),
-                                                'fundamentalAnalysis': report_json.get('fundamentalAnalysis', ''),
-                                                'businessSegments': report_json.get('businessSegments', ''),
-                                                'growthCatalysts': report_json.get('growthCatalysts', ''),
-                                                'valuationAnalysis': report_json.get('valuationAnalysis', ''),
-                                                'aiInsights': report_json.get('aiInsights', ''),
-                                            },
-                                            pdf_path
-                                        )
-                                        
-                                        # 下载PDF
-                                        with open(pdf_path, 'rb') as f:
-                                            pdf_data = f.read()
-                                        st.download_button(
-                                            label="📥 下载报告 (PDF)",
-                                            data=pdf_data,
-                                            file_name=f"{company}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                                            mime="application/pdf"
-                                        )
-                                        # 清理临时文件
-                                        try:
-                                            os.unlink(pdf_path)
-                                        except:
-                                            pass
-                                except Exception as e:
-                                    # 如果PDF生成失败，回退到Markdown
-                                    st.warning(f"⚠️ PDF生成失败: {str(e)}，将下载Markdown格式")
-                                    st.download_button(
-                                        label="📥 下载报告 (Markdown)",
-                                        data=result["report"],
-                                        file_name=f"{company}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
-                                        mime="text/markdown"
-                                    )
+                    # 准备报告数据
+                    report_json = result.get("report_json", {})
+                    if not report_json:
+                        # 如果没有JSON，从Markdown解析
+                        st.warning("⚠️ 无法生成PDF，将下载Markdown格式")
+                        st.download_button(
+                            label="📥 下载报告 (Markdown)",
+                            data=result["report"],
+                            file_name=f"{company}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
+                            mime="text/markdown"
+                        )
                     else:
-                        st.error(f"❌ 分析失败: {result.get('error', '未知错误')}")
+                        # 在内存中生成PDF（不经过临时文件）
+                        generator = ProfessionalPDFGenerator()
+                        pdf_data = generator.generate_report_pdf_bytes(
+                            company,
+                            {
+                                'metadata': result.get("metadata", {}),
+                                'fundamentalAnalysis': report_json.get('fundamentalAnalysis', ''),
+                                'businessSegments': report_json.get('businessSegments', ''),
+                                'growthCatalysts': report_json.get('growthCatalysts', ''),
+                                'valuationAnalysis': report_json.get('valuationAnalysis', ''),
+                                'aiInsights': report_json.get('aiInsights', ''),
+                            }
+                        )
                         
+                        # 下载PDF
+                        st.download_button(
+                            label="📥 下载报告 (PDF)",
+                            data=pdf_data,
+                            file_name=f"{company}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                            mime="application/pdf"
+                        )
                 except Exception as e:
-                    st.error(f"❌ 发生错误: {str(e)}")
+                    # 如果PDF生成失败，回退到Markdown
+                    st.warning(f"⚠️ PDF生成失败: {str(e)}，将下载Markdown格式")
+                    st.download_button(
+                        label="📥 下载报告 (Markdown)",
+                        data=result["report"],
+                        file_name=f"{company}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
+                        mime="text/markdown"
+                    )
+    
+    # 后台PDF导出状态（页面重新运行后仍然显示）
+    pdf_job_id = st.session_state.current_pdf_job_id
+    if pdf_job_id:
+        st.markdown("---")
+        st.markdown("### 📄 PDF导出")
+        pdf_job = system.get_pdf_status(pdf_job_id)
+        if pdf_job is None and st.session_state.get('current_pdf_path'):
+            # 报告任务由其他工作进程执行时导出队列不在本进程中，按报告目录中PDF的状态显示
+            pdf_entry = get_default_catalog().get(st.session_state.current_pdf_path)
+            if pdf_entry:
+                pdf_job = {
+                    "status": "running" if pdf_entry['status'] == STATUS_PENDING else "done",
+                    "pdf_path": pdf_entry['path'],
+                    "elapsed": 0.0,
+                }
+        pdf_job = pdf_job or {}
+        pdf_status = pdf_job.get("status")
+        
+        if pdf_status == "done" and os.path.exists(pdf_job["pdf_path"]):
+            st.success(f"✅ PDF已就绪（排版耗时 {pdf_job['elapsed']:.1f}秒）" if pdf_job['elapsed'] else "✅ PDF已就绪")
+            # 后台导出时已放入文件缓存，这里不会再读盘
+            st.download_button(
+                label="📥 下载报告 (PDF)",
+                data=get_default_store().load_bytes(pdf_job["pdf_path"]),
+                file_name=os.path.basename(pdf_job["pdf_path"]),
+                mime="application/pdf",
+                key=f"pdf_ready_{pdf_job_id}"
+            )
+        elif pdf_status in ("queued", "running"):
+            st.info("⏳ PDF排队中..." if pdf_status == "queued" else "⏳ PDF正在生成...")
+            st.button("🔄 刷新PDF状态", key=f"pdf_refresh_{pdf_job_id}")
+        else:
+            st.warning(f"⚠️ PDF生成失败: {pdf_job.get('error') or '任务不存在'}，请下载Markdown版本")
+    
+    refresh_while_active(report_job)
 
 # 行业热点分析
 elif page == "🔥 行业热点":
@@ -435,117 +588,108 @@ elif page == "🔥 行业热点":
         refresh = st.button("🔄 刷新数据", use_container_width=True)
     
     if st.button("🔥 分析今日热点", type="primary", use_container_width=True) or refresh:
-        with st.spinner("正在分析市场热点，请稍候..."):
-            try:
-                result = st.session_state.sector_analyzer.analyze_market_hotspots()
+        st.session_state.hotspot_job_id = job_service.submit('hotspot', {}, owner=st.session_state.session_id)
+    
+    hotspot_job = render_job_progress('hotspot_job_id', "热点分析")
+    report_job = None
+    if hotspot_job and hotspot_job['status'] == 'done':
+        result = hotspot_job['result']
+        st.success("✅ 热点分析完成！")
+        
+        # 市场概况
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("分析日期", result.get('date', 'Today'))
+        with col2:
+            sentiment = result.get('market_sentiment', 'N/A').upper()
+            sentiment_color = "🟢" if sentiment == "BULLISH" else "🔴" if sentiment == "BEARISH" else "🟡"
+            st.metric("市场情绪", f"{sentiment_color} {sentiment}")
+        with col3:
+            st.metric("热点板块数", len(result.get('top_sectors', [])))
+        
+        # 关键主题
+        themes = result.get('key_themes', [])
+        if themes:
+            st.markdown("### 🎯 今日关键主题")
+            theme_html = " | ".join([f"**{theme}**" for theme in themes])
+            st.markdown(theme_html)
+        
+        st.markdown("---")
+        
+        # 热点行业排行榜
+        st.markdown("### 📊 热点行业排行榜")
+        
+        top_sectors = result.get('top_sectors', [])
+        if top_sectors:
+            for i, sector in enumerate(top_sectors, 1):
+                heat_score = sector.get('heat_score', 0)
                 
-                if result.get("status") == "success":
-                    st.success("✅ 热点分析完成！")
-                    
-                    # 市场概况
+                # 根据热度选择颜色
+                if heat_score >= 80:
+                    color = "🔴"
+                    heat_level = "极度火热"
+                elif heat_score >= 60:
+                    color = "🟠"
+                    heat_level = "热门板块"
+                else:
+                    color = "🟡"
+                    heat_level = "活跃板块"
+                
+                with st.expander(f"{i}. {color} **{sector.get('sector', '')}** - {sector.get('market', '')} (热度: {heat_score})", expanded=(i <= 3)):
                     col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("分析日期", result.get('date', 'Today'))
-                    with col2:
-                        sentiment = result.get('market_sentiment', 'N/A').upper()
-                        sentiment_color = "🟢" if sentiment == "BULLISH" else "🔴" if sentiment == "BEARISH" else "🟡"
-                        st.metric("市场情绪", f"{sentiment_color} {sentiment}")
-                    with col3:
-                        st.metric("热点板块数", len(result.get('top_sectors', [])))
-                    
-                    # 关键主题
-                    themes = result.get('key_themes', [])
-                    if themes:
-                        st.markdown("### 🎯 今日关键主题")
-                        theme_html = " | ".join([f"**{theme}**" for theme in themes])
-                        st.markdown(theme_html)
                     
-                    st.markdown("---")
+                    with col1:
+                        st.metric("热度等级", heat_level)
+                        st.metric("涨跌幅", sector.get('avg_change', 'N/A'))
                     
-                    # 热点行业排行榜
-                    st.markdown("### 📊 热点行业排行榜")
+                    with col2:
+                        st.metric("成交量变化", sector.get('volume_surge', 'N/A'))
+                        st.metric("所属市场", sector.get('market', 'N/A'))
                     
-                    top_sectors = result.get('top_sectors', [])
-                    if top_sectors:
-                        for i, sector in enumerate(top_sectors, 1):
-                            heat_score = sector.get('heat_score', 0)
-                            
-                            # 根据热度选择颜色
-                            if heat_score >= 80:
-                                color = "🔴"
-                                heat_level = "极度火热"
-                            elif heat_score >= 60:
-                                color = "🟠"
-                                heat_level = "热门板块"
-                            else:
-                                color = "🟡"
-                                heat_level = "活跃板块"
-                            
-                            with st.expander(f"{i}. {color} **{sector.get('sector', '')}** - {sector.get('market', '')} (热度: {heat_score})", expanded=(i <= 3)):
-                                col1, col2, col3 = st.columns(3)
-                                
-                                with col1:
-                                    st.metric("热度等级", heat_level)
-                                    st.metric("涨跌幅", sector.get('avg_change', 'N/A'))
-                                
-                                with col2:
-                                    st.metric("成交量变化", sector.get('volume_surge', 'N/A'))
-                                    st.metric("所属市场", sector.get('market', 'N/A'))
-                                
-                                with col3:
-                                    # 热度条形图
-                                    st.progress(heat_score / 100)
-                                    st.caption(f"热度分数: {heat_score}/100")
-                                
-                                # 关键驱动因素
-                                drivers = sector.get('key_drivers', [])
-                                if drivers:
-                                    st.markdown("**💡 关键驱动因素:**")
-                                    for driver in drivers:
-                                        st.markdown(f"- {driver}")
-                                
-                                # 热门股票
-                                stocks = sector.get('top_stocks', [])
-                                if stocks:
-                                    st.markdown("**🏆 热门股票:**")
-                                    st.markdown(", ".join(stocks))
+                    with col3:
+                        # 热度条形图
+                        st.progress(heat_score / 100)
+                        st.caption(f"热度分数: {heat_score}/100")
                     
-                    # 保存按钮
-                    st.markdown("---")
-                    if st.button("💾 生成完整热点报告", use_container_width=True):
-                        with st.spinner("正在生成完整报告..."):
-                            try:
-                                full_result = st.session_state.sector_analyzer.generate_hotspot_report()
-                                if full_result.get("status") == "success":
-                                    st.success("✅ 完整报告已生成！")
-                                    
-                                    # 记录到历史
-                                    st.session_state.analysis_history.append({
-                                        "company": "行业热点分析",
-                                        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                        "type": "hotspot"
-                                    })
-                                    
-                                    # 提供下载
-                                    st.download_button(
-                                        label="📥 下载Markdown报告",
-                                        data=full_result["report"],
-                                        file_name=f"hotspot_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
-                                        mime="text/markdown"
-                                    )
-                                else:
-                                    st.error("报告生成失败")
-                            except Exception as e:
-                                st.error(f"错误: {str(e)}")
-                
-                else:
-                    st.error(f"❌ 分析失败: {result.get('error', '未知错误')}")
+                    # 关键驱动因素
+                    drivers = sector.get('key_drivers', [])
+                    if drivers:
+                        st.markdown("**💡 关键驱动因素:**")
+                        for driver in drivers:
+                            st.markdown(f"- {driver}")
                     
-            except Exception as e:
-                st.error(f"❌ 发生错误: {str(e)}")
-                import traceback
-                with st.expander("查看详细错误"):
-                    st.code(traceback.format_exc())
+                    # 热门股票
+                    stocks = sector.get('top_stocks', [])
+                    if stocks:
+                        st.markdown("**🏆 热门股票:**")
+                        st.markdown(", ".join(stocks))
+        
+        # 完整报告（含龙头公司）同样作为后台任务生成，结果在页面重新运行后仍然可见
+        st.markdown("---")
+        if st.button("💾 生成完整热点报告", use_container_width=True):
+            st.session_state.hotspot_report_job_id = job_service.submit(
+                'hotspot', {'full': True}, owner=st.session_state.session_id
+            )
+        
+        report_job = render_job_progress('hotspot_report_job_id', "完整热点报告")
+        if report_job and report_job['status'] == 'done':
+            full_result = report_job['result']
+            st.success("✅ 完整报告已生成！")
+            
+            # 记录到历史（每个任务只记录一次）
+            if st.session_state.get('hotspot_report_job_seen') != report_job['job_id']:
+                st.session_state.hotspot_report_job_seen = report_job['job_id']
+                st.session_state.analysis_history.add("行业热点分析", "hotspot", job_id=report_job['job_id'])
+            
+            # 提供下载
+            st.download_button(
+                label="📥 下载Markdown报告",
+                data=full_result["report"],
+                file_name=f"hotspot_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
+                mime="text/markdown"
+            )
+    
+    refresh_while_active(hotspot_job, report_job)
 
 # 行业龙头筛选
 elif page == "🏆 行业龙头":
@@ -598,17 +742,13 @@ elif page == "🏆 行业龙头":
         else:
             with st.spinner(f"正在查找 {sector_name} 行业龙头..."):
                 try:
-                    result = st.session_state.sector_analyzer.find_sector_leaders(sector_name, markets)
+                    result = sector_analyzer.find_sector_leaders(sector_name, markets)
                     
                     if result.get("status") == "success":
                         st.success(f"✅ 已找到 {sector_name} 行业龙头！")
                         
                         # 记录到历史
-                        st.session_state.analysis_history.append({
-                            "company": f"{sector_name} 行业龙头",
-                            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "type": "sector_leader"
-                        })
+                        st.session_state.analysis_history.add(f"{sector_name} 行业龙头", "sector_leader")
                         
                         markets_data = result.get('markets', {})
                         
@@ -738,13 +878,9 @@ elif page == "⚡ 快速分析":
                 
                 with st.spinner(f"正在分析 {company}..."):
                     try:
-                        summary = st.session_state.system.quick_analysis(company)
+                        summary = system.quick_analysis(company)
                         
-                        st.session_state.analysis_history.append({
-                            "company": company,
-                            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "type": "quick"
-                        })
+                        st.session_state.analysis_history.add(company, "quick")
                         
                         st.markdown(summary)
                         st.markdown("---")
@@ -773,116 +909,164 @@ elif page == "🔄 比较分析":
     
     companies = [c for c in [company1, company2, company3] if c]
     
+    # 指标库直接查询（无需API调用）
+    if companies:
+        metrics_table = system.metrics_store.format_comparison_table(companies)
+        with st.expander("📊 历史报告中的结构化指标（本地指标库）", expanded=bool(metrics_table)):
+            if metrics_table:
+                st.markdown(metrics_table)
+            else:
+                st.info("指标库中暂无这些公司的数据，生成估值报告后会自动入库")
+    
     if st.button("🔄 开始比较分析", type="primary", use_container_width=True):
         if len(companies) < 2:
             st.error("❌ 请至少输入2个公司名称")
         else:
-            with st.spinner(f"正在比较 {', '.join(companies)}..."):
-                progress_bar = st.progress(0)
-                
-                try:
-                    # 显示进度
-                    for i, company in enumerate(companies):
-                        progress_bar.progress(int((i + 1) / (len(companies) + 1) * 100))
-                        st.info(f"📊 正在收集 {company} 的信息...")
-                        time.sleep(0.5)
-                    
-                    comparison = st.session_state.system.compare_companies(companies)
-                    
-                    progress_bar.progress(100)
-                    
-                    if comparison["status"] == "success":
-                        st.success(f"✅ 比较分析完成！")
-                        
-                        # 记录到历史
-                        st.session_state.analysis_history.append({
-                            "company": f"比较分析: {', '.join(companies)}",
-                            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "type": "comparison"
-                        })
-                        
-                        st.markdown("---")
-                        st.markdown("### 📊 比较报告")
-                        st.markdown(comparison["comparison"])
-                        
-                        # 下载按钮
-                        st.download_button(
-                            label="📥 下载比较报告",
-                            data=comparison["comparison"],
-                            file_name=f"comparison_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
-                            mime="text/markdown"
-                        )
-                    else:
-                        st.error(f"❌ 比较分析失败: {comparison.get('error', '未知错误')}")
-                        
-                except Exception as e:
-                    st.error(f"❌ 发生错误: {str(e)}")
+            st.session_state.comparison_job_id = job_service.submit(
+                'comparison', {'companies': companies}, owner=st.session_state.session_id
+            )
+    
+    comparison_job = render_job_progress('comparison_job_id', "比较分析")
+    if comparison_job and comparison_job['status'] == 'done':
+        comparison = comparison_job['result']
+        compared = comparison_job['params']['companies']
+        st.success(f"✅ 比较分析完成！")
+        
+        # 记录到历史（每个任务只记录一次）
+        if st.session_state.get('comparison_job_seen') != comparison_job['job_id']:
+            st.session_state.comparison_job_seen = comparison_job['job_id']
+            st.session_state.analysis_history.add(
+                f"比较分析: {', '.join(compared)}", "comparison", job_id=comparison_job['job_id']
+            )
+        
+        st.markdown("---")
+        st.markdown("### 📊 比较报告")
+        if comparison.get("metrics_table"):
+            st.markdown("#### 📋 关键指标对比（指标库）")
+            st.markdown(comparison["metrics_table"])
+        st.markdown(comparison["comparison"])
+        
+        # 下载按钮
+        st.download_button(
+            label="📥 下载比较报告",
+            data=comparison["comparison"],
+            file_name=f"comparison_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
+            mime="text/markdown"
+        )
+    
+    refresh_while_active(comparison_job)
 
 # 历史报告
 elif page == "📚 历史报告":
     st.title("📚 历史报告")
     
     # 分析历史
-    if st.session_state.analysis_history:
+    history = st.session_state.analysis_history
+    if history:
         st.markdown("### 📊 本次会话分析历史")
-        st.markdown(f"共 {len(st.session_state.analysis_history)} 条记录")
+        st.markdown(f"共 {len(history)} 条记录（最多保留 {history.max_items} 条）")
         
-        for item in reversed(st.session_state.analysis_history[-20:]):
+        for item in history.records(limit=20):
             # 根据类型显示不同的图标
-            type_icons = {
-                "comprehensive": "📈",
-                "quick": "⚡",
-                "comparison": "🔄",
-                "hotspot": "🔥",
-                "sector_leader": "🏆"
-            }
-            icon = type_icons.get(item.get('type', ''), "📄")
+            icon = TYPE_ICONS.get(item.get('type') or '', "📄")
             
             # 格式化显示
             company = item.get('company', 'N/A')
-            time = item.get('time', '')
+            item_time = item.get('time', '')
             type_name = item.get('type', '')
             
-            st.markdown(f"{icon} **{company}** - {time} - *{type_name}*")
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                st.markdown(f"{icon} **{company}** - {item_time} - *{type_name}*")
+            with col2:
+                view_history = history.has_body(item) and toggle_viewer(
+                    'viewing_history', item['id'], label="📖 查看", key=f"history_view_{item['id']}"
+                )
+            if view_history:
+                # 正文按需读取，不保存在会话中
+                body = history.load_body(item['id'])
+                if body:
+                    with st.expander(f"{icon} {company}", expanded=True):
+                        history_report_id = os.path.basename(item['path']) if item.get('path') else item['job_id']
+                        render_report_viewer(f"history_{item['id']}", history_report_id, body)
+                else:
+                    st.warning("报告内容已不存在（文件已删除或任务记录已清理）")
     else:
         st.info("暂无分析历史")
     
     st.markdown("---")
     
+    # 全文搜索（报告章节和引用来源）
+    st.markdown("### 🔎 全文搜索")
+    
+    search_index = get_default_search_index()
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        fulltext_query = st.text_input(
+            "搜索报告内容",
+            placeholder="如: HBM supply、\"gross margin\"、人工智能",
+            help="多个关键词同时匹配，双引号内为短语"
+        )
+    with col2:
+        fulltext_company = st.selectbox("公司", ["全部"] + search_index.companies())
+    with col3:
+        fulltext_range = st.selectbox("时间范围", ["全部", "最近7天", "最近30天", "最近90天"])
+    
+    if fulltext_query.strip():
+        since = None
+        if fulltext_range != "全部":
+            days = int(fulltext_range[2:-1])
+            since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        
+        search_start = datetime.now()
+        hits = search_index.search(
+            fulltext_query,
+            company=None if fulltext_company == "全部" else fulltext_company,
+            since=since,
+            limit=20
+        )
+        st.caption(f"找到 {len(hits)} 份报告（{(datetime.now() - search_start).total_seconds() * 1000:.0f} ms）")
+        
+        for n, hit in enumerate(hits, 1):
+            report_time = (hit['report_time'] or '')[:16].replace('T', ' ')
+            kind_label = "📚 引用" if hit['kind'] == 'citation' else "📄 正文"
+            viewing_hit = st.session_state.get('viewing_fulltext') == hit['path']
+            with st.expander(f"{n}. {hit['company']} - {report_time} - {hit['heading'] or hit['report']}",
+                             expanded=n <= 3 or viewing_hit):
+                st.markdown(hit['snippet'])
+                st.caption(f"{kind_label} | {os.path.basename(hit['path'])}")
+                if toggle_viewer('viewing_fulltext', hit['path'], key=f"fulltext_view_{n}"):
+                    if get_default_store().exists(hit['path']):
+                        st.markdown("---")
+                        render_report_viewer(f"fulltext_{n}", os.path.basename(hit['path']),
+                                             get_default_store().load_bytes(hit['path']))
+                    else:
+                        st.warning("报告文件已不存在，请刷新列表")
+    
+    st.markdown("---")
+    
     # 保存的报告
     st.markdown("### 💾 已保存的报告")
     
     if os.path.exists("reports"):
-        # 获取所有报告文件（.md 和 .pdf）
-        all_md = glob.glob("reports/*.md")
-        all_pdf = glob.glob("reports/*.pdf")
-        all_reports = sorted(all_md + all_pdf, key=os.path.getmtime, reverse=True)
+        # 报告列表来自报告目录索引（生成报告时登记），不再每次扫描目录
+        catalog = get_default_catalog()
+        catalog_stats = catalog.stats()
         
-        if all_reports:
-            # 统计不同类型的报告
-            def classify_report(filename):
-                basename = os.path.basename(filename).lower()
-                if 'hotspot' in basename or 'sector_hotspot' in basename:
-                    return '🔥 行业热点'
-                elif 'comparison' in basename:
-                    return '🔄 比较分析'
-                elif 'enhanced' in basename:
-                    return '📊 增强报告'
-                elif filename.endswith('.pdf'):
-                    return '📄 PDF报告'
-                else:
-                    return '📈 估值报告'
-            
-            # 统计
-            report_types = {}
-            for report in all_reports:
-                rtype = classify_report(report)
-                report_types[rtype] = report_types.get(rtype, 0) + 1
+        if catalog_stats['count']:
+            category_labels = {
+                'hotspot': '🔥 行业热点',
+                'comparison': '🔄 比较分析',
+                'enhanced': '📊 增强报告',
+                'pdf': '📄 PDF报告',
+                'valuation': '📈 估值报告',
+            }
+            report_types = {category_labels[c]: n for c, n in catalog_stats['categories'].items() if c in category_labels}
             
             # 显示统计
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("总报告数", len(all_reports))
+                st.metric("总报告数", catalog_stats['count'])
             with col2:
                 st.metric("估值报告", report_types.get('📈 估值报告', 0))
             with col3:
@@ -909,21 +1093,19 @@ elif page == "📚 历史报告":
                     help="搜索报告文件名"
                 )
             
-            # 应用筛选
-            filtered_reports = all_reports
-            
+            # 应用筛选（在索引中查询）
+            filter_category = None
             if filter_type != "全部":
-                filtered_reports = [r for r in filtered_reports if classify_report(r) == filter_type]
+                filter_category = next(c for c, label in category_labels.items() if label == filter_type)
+            filter_search = search_term.strip() or None
+            filtered_count = catalog.count(category=filter_category, search=filter_search)
             
-            if search_term:
-                filtered_reports = [r for r in filtered_reports if search_term.lower() in os.path.basename(r).lower()]
+            st.markdown(f"**显示 {filtered_count} / {catalog_stats['count']} 份报告**")
             
-            st.markdown(f"**显示 {len(filtered_reports)} / {len(all_reports)} 份报告**")
-            
-            if filtered_reports:
+            if filtered_count:
                 # 分页显示
                 reports_per_page = 10
-                total_pages = (len(filtered_reports) - 1) // reports_per_page + 1
+                total_pages = (filtered_count - 1) // reports_per_page + 1
                 
                 if total_pages > 1:
                     page_num = st.number_input(
@@ -937,17 +1119,23 @@ elif page == "📚 历史报告":
                     page_num = 1
                 
                 start_idx = (page_num - 1) * reports_per_page
-                end_idx = min(start_idx + reports_per_page, len(filtered_reports))
-                page_reports = filtered_reports[start_idx:end_idx]
+                page_reports = catalog.list_reports(
+                    category=filter_category,
+                    search=filter_search,
+                    limit=reports_per_page,
+                    offset=start_idx
+                )
                 
                 # 显示报告列表
-                for i, report_path in enumerate(page_reports, start_idx + 1):
-                    report_name = os.path.basename(report_path)
-                    report_type = classify_report(report_path)
-                    file_size = os.path.getsize(report_path) / 1024  # KB
-                    mod_time = datetime.fromtimestamp(os.path.getmtime(report_path)).strftime("%Y-%m-%d %H:%M")
+                for i, report_entry in enumerate(page_reports, start_idx + 1):
+                    report_path = report_entry['path']
+                    report_name = report_entry['name']
+                    report_type = category_labels.get(report_entry['category'], '📈 估值报告')
+                    file_size = report_entry['size'] / 1024  # KB
+                    mod_time = datetime.fromtimestamp(report_entry['mtime']).strftime("%Y-%m-%d %H:%M")
                     
-                    with st.expander(f"{i}. {report_type} - {report_name}", expanded=False):
+                    viewing_report = st.session_state.get('viewing_report') == report_path
+                    with st.expander(f"{i}. {report_type} - {report_name}", expanded=viewing_report):
                         col1, col2, col3 = st.columns(3)
                         
                         with col1:
@@ -955,7 +1143,7 @@ elif page == "📚 历史报告":
                         with col2:
                             st.caption(f"📦 文件大小: {file_size:.1f} KB")
                         with col3:
-                            st.caption(f"🏷️ 类型: {report_type}")
+                            st.caption(f"🏷️ 类型: {report_type}{'（已归档）' if report_entry['status'] == STATUS_ARCHIVED else ''}")
                         
                         st.markdown("---")
                         
@@ -966,46 +1154,31 @@ elif page == "📚 历史报告":
                         is_pdf = report_path.endswith('.pdf')
                         
                         with col1:
-                            if is_pdf:
-                                # PDF文件：提供下载按钮
-                                with open(report_path, 'rb') as f:
-                                    pdf_data = f.read()
-                                st.download_button(
-                                    label="📄 下载PDF",
-                                    data=pdf_data,
-                                    file_name=report_name,
-                                    mime="application/pdf",
-                                    key=f"download_pdf_{i}",
-                                    use_container_width=True
-                                )
+                            if report_entry['status'] == STATUS_PENDING:
+                                st.caption("⏳ PDF正在后台生成")
+                            elif is_pdf:
+                                # PDF文件：点击后才读取内容并显示下载按钮
+                                # （列表每次重新运行都会渲染，不能为每个条目读取整个PDF）
+                                prepare_key = f"prepare_pdf_{report_path}"
+                                if st.session_state.get(prepare_key):
+                                    st.download_button(
+                                        label="📄 下载PDF",
+                                        data=get_default_store().load_bytes(report_path),
+                                        file_name=report_name,
+                                        mime="application/pdf",
+                                        key=f"download_pdf_{i}",
+                                        use_container_width=True
+                                    )
+                                elif st.button("📄 准备下载PDF", key=f"prepare_{i}", use_container_width=True):
+                                    st.session_state[prepare_key] = True
+                                    st.experimental_rerun()
                             else:
-                                # Markdown文件：查看报告
-                                if st.button("📖 查看报告", key=f"view_{i}", use_container_width=True):
-                                    with open(report_path, 'r', encoding='utf-8') as f:
-                                        content = f.read()
-                                    
-                                    # 在新的区域显示
-                                    st.markdown("---")
-                                    st.markdown("### 📄 报告内容")
-                                    
-                                    # 添加专业样式
-                                    st.markdown("""
-                                    <style>
-                                    .report-content {
-                                        background: white;
-                                        padding: 2rem;
-                                        border-radius: 8px;
-                                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                                    }
-                                    </style>
-                                    """, unsafe_allow_html=True)
-                                    
-                                    st.markdown(content, unsafe_allow_html=True)
+                                # Markdown文件：查看报告（在按钮行下方分章节显示）
+                                toggle_viewer('viewing_report', report_path, key=f"view_{i}")
                         
                         with col2:
                             if not is_pdf:  # 只有Markdown文件才有下载按钮
-                                with open(report_path, 'r', encoding='utf-8') as f:
-                                    content = f.read()
+                                content = get_default_store().load_bytes(report_path)
                                 st.download_button(
                                     label="📥 下载MD",
                                     data=content,
@@ -1018,18 +1191,32 @@ elif page == "📚 历史报告":
                         with col3:
                             if st.button("🗑️ 删除", key=f"delete_{i}", use_container_width=True):
                                 try:
-                                    os.remove(report_path)
+                                    get_default_store().invalidate(report_path)
+                                    if report_entry['status'] == STATUS_ARCHIVED:
+                                        get_default_store().archive.delete(report_path)
+                                    else:
+                                        os.remove(report_path)
+                                    catalog.remove(report_path)
+                                    if not is_pdf:
+                                        search_index.remove_report(report_path)
+                                        get_default_render_cache().invalidate(report_name)
                                     st.success(f"✅ 已删除 {report_name}")
                                     st.experimental_rerun()
                                 except Exception as e:
                                     st.error(f"❌ 删除失败: {str(e)}")
+                        
+                        if viewing_report and not is_pdf:
+                            # 已归档的报告从归档中解压（文件缓存命中时不读盘）
+                            st.markdown("---")
+                            st.markdown("### 📄 报告内容")
+                            render_report_viewer(f"catalog_{i}", report_name, get_default_store().load_bytes(report_path))
                 
                 # 分页导航
                 if total_pages > 1:
                     st.markdown("---")
                     col1, col2, col3 = st.columns([1, 2, 1])
                     with col2:
-                        st.markdown(f"第 {page_num} / {total_pages} 页 | 共 {len(filtered_reports)} 份报告")
+                        st.markdown(f"第 {page_num} / {total_pages} 页 | 共 {filtered_count} 份报告")
             else:
                 st.warning("没有符合条件的报告")
         else:
@@ -1041,26 +1228,43 @@ elif page == "📚 历史报告":
     st.markdown("---")
     st.markdown("### 🛠️ 批量操作")
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         if st.button("🔄 刷新列表", use_container_width=True):
+            # 与目录对账，收录其他工具直接写入 reports/ 的报告
+            get_default_catalog().sync()
+            get_default_search_index().sync()
             st.experimental_rerun()
     
     with col2:
         if st.button("📊 查看统计", use_container_width=True):
             if os.path.exists("reports"):
-                all_reports = glob.glob("reports/*.md")
-                total_size = sum(os.path.getsize(f) for f in all_reports) / 1024 / 1024  # MB
+                catalog_variants = get_default_catalog().stats()['variants']
+                md_variants = [catalog_variants.get(v, {}) for v in ('raw', 'enhanced')]
+                md_count = sum(v.get('count', 0) for v in md_variants)
+                total_size = sum(v.get('bytes', 0) for v in md_variants) / 1024 / 1024  # MB
                 
                 st.info(f"""
                 **报告统计信息**
-                - 总报告数: {len(all_reports)}
+                - 总报告数: {md_count}
                 - 总大小: {total_size:.2f} MB
                 - 目录: reports/
                 """)
     
     with col3:
+        if st.button("🧹 按保留策略清理", use_container_width=True):
+            # 计划存入会话，确认按钮在页面重新运行后仍然显示
+            engine = retention_service.engine
+            actions = engine.plan()
+            st.session_state.retention_plan = {
+                'keys': [(a['stem'], tuple(a['names'])) for a in actions],
+                'policy': engine.policy.describe(),
+                'preview': engine.apply(actions, dry_run=True),
+            }
+            st.session_state.pop('retention_result', None)
+    
+    with col4:
         if st.button("⚠️ 清空所有报告", use_container_width=True):
             st.warning("此操作将删除所有报告，请谨慎！")
             if st.checkbox("我确认要删除所有报告"):
@@ -1069,10 +1273,43 @@ elif page == "📚 历史报告":
                         import shutil
                         shutil.rmtree("reports")
                         os.makedirs("reports")
+                        get_default_catalog().clear()
+                        get_default_search_index().clear()
+                        get_default_render_cache().clear()
                         st.success("✅ 已清空所有报告")
                         st.experimental_rerun()
                 except Exception as e:
                     st.error(f"❌ 清空失败: {str(e)}")
+    
+    retention_plan = st.session_state.get('retention_plan')
+    if retention_plan:
+        preview = retention_plan['preview']
+        st.info(f"""
+        **保留策略**: {retention_plan['policy']}
+        - 待删除运行: {preview['reports']}
+        - 待删除变体: {preview['variants']}
+        - 文件数: {preview['files']}（{preview['bytes'] / 1024 / 1024:.2f} MB）
+        """)
+        col1, col2 = st.columns(2)
+        with col1:
+            if retention_plan['keys'] and st.button("🗑️ 确认按保留策略删除", use_container_width=True):
+                engine = retention_service.engine
+                # 按当前目录重新计算，只执行预览中确认过的项
+                confirmed = set(retention_plan['keys'])
+                actions = [a for a in engine.plan() if (a['stem'], tuple(a['names'])) in confirmed]
+                summary = engine.apply(actions)
+                gc = engine.collect_garbage()
+                st.session_state.retention_result = (
+                    f"✅ 已删除 {summary['files']} 个文件，回收图表 {gc['charts']} 个"
+                    + (f"，{summary['skipped']} 项正在写入已跳过" if summary['skipped'] else ""))
+                st.session_state.retention_plan = None
+                st.experimental_rerun()
+        with col2:
+            if st.button("取消", key="retention_cancel", use_container_width=True):
+                st.session_state.retention_plan = None
+                st.experimental_rerun()
+    if st.session_state.get('retention_result'):
+        st.success(st.session_state.pop('retention_result'))
 
 # 设置
 elif page == "⚙️ 设置":